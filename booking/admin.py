@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Place, Route, RouteStopPoint, Vehicle, VehicleSeat, VehicleImage, VehicleSchedule, Trip, Location, VehicleTicketBooking, SeatBooking
+from .models import Place, Route, RouteStopPoint, RoutePlaceOrder, Vehicle, VehicleSeat, VehicleImage, VehicleSchedule, Trip, Location, TripTrack, VehicleLastPosition, VehicleTicketBooking, VehicleTicketBookingSeat, SeatHold, SeatBooking, NodeOutboxEvent, GeocodeCache, AddressResolutionJob
 
 
 @admin.register(Place)
@@ -43,6 +43,16 @@ class RouteStopPointAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 
+@admin.register(RoutePlaceOrder)
+class RoutePlaceOrderAdmin(admin.ModelAdmin):
+    """RoutePlaceOrder admin (derived from routes and stop points; read only)"""
+    list_display = ('id', 'route', 'place', 'forward_index', 'reverse_index', 'updated_at')
+    list_filter = ('route',)
+    search_fields = ('route__name', 'place__name')
+    raw_id_fields = ('route', 'place')
+    readonly_fields = ('route', 'place', 'forward_index', 'reverse_index', 'created_at', 'updated_at')
+
+
 class VehicleSeatInline(admin.StackedInline):
     """Inline for VehicleSeat in Vehicle admin"""
     model = VehicleSeat
@@ -122,6 +132,25 @@ class LocationAdmin(admin.ModelAdmin):
     # date_hierarchy removed: requires MySQL timezone tables when USE_TZ=True (see Django ValueError)
 
 
+@admin.register(TripTrack)
+class TripTrackAdmin(admin.ModelAdmin):
+    """TripTrack admin"""
+    list_display = ('id', 'trip', 'tolerance_m', 'point_count', 'source_point_count', 'updated_at')
+    search_fields = ('trip__trip_id',)
+    raw_id_fields = ('trip',)
+    exclude = ('points',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(VehicleLastPosition)
+class VehicleLastPositionAdmin(admin.ModelAdmin):
+    """VehicleLastPosition admin"""
+    list_display = ('id', 'vehicle', 'trip', 'latitude', 'longitude', 'speed', 'recorded_at', 'updated_at')
+    search_fields = ('vehicle__name', 'vehicle__vehicle_no')
+    raw_id_fields = ('vehicle', 'trip')
+    readonly_fields = ('created_at', 'updated_at')
+
+
 @admin.register(VehicleTicketBooking)
 class VehicleTicketBookingAdmin(admin.ModelAdmin):
     """VehicleTicketBooking admin"""
@@ -132,6 +161,25 @@ class VehicleTicketBookingAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 
+@admin.register(VehicleTicketBookingSeat)
+class VehicleTicketBookingSeatAdmin(admin.ModelAdmin):
+    """VehicleTicketBookingSeat admin (rows derived from VehicleTicketBooking.seat)"""
+    list_display = ('id', 'booking', 'vehicle_schedule', 'side', 'number', 'from_order', 'to_order', 'created_at')
+    search_fields = ('booking__pnr', 'booking__ticket_id')
+    raw_id_fields = ('booking', 'vehicle_schedule')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    """SeatHold admin"""
+    list_display = ('id', 'token', 'vehicle_schedule', 'user', 'side', 'number', 'from_order', 'to_order', 'expires_at', 'created_at')
+    list_filter = ('expires_at',)
+    search_fields = ('token',)
+    raw_id_fields = ('vehicle_schedule', 'user')
+    readonly_fields = ('created_at',)
+
+
 @admin.register(SeatBooking)
 class SeatBookingAdmin(admin.ModelAdmin):
     """SeatBooking admin"""
@@ -141,3 +189,31 @@ class SeatBookingAdmin(admin.ModelAdmin):
     list_editable = ('is_paid',)
     raw_id_fields = ('user', 'vehicle', 'vehicle_seat', 'trip')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(NodeOutboxEvent)
+class NodeOutboxEventAdmin(admin.ModelAdmin):
+    """NodeOutboxEvent admin"""
+    list_display = ('id', 'kind', 'status', 'attempts', 'next_attempt_at', 'delivered_at', 'created_at')
+    list_filter = ('kind', 'status', 'created_at')
+    search_fields = ('coalesce_key', 'last_error')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    """GeocodeCache admin"""
+    list_display = ('id', 'lat_key', 'lng_key', 'address', 'expires_at', 'updated_at')
+    list_filter = ('expires_at',)
+    search_fields = ('address',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(AddressResolutionJob)
+class AddressResolutionJobAdmin(admin.ModelAdmin):
+    """AddressResolutionJob admin"""
+    list_display = ('id', 'seat_booking', 'field', 'status', 'attempts', 'next_attempt_at', 'resolved_at', 'created_at')
+    list_filter = ('field', 'status', 'created_at')
+    search_fields = ('placeholder', 'resolved_address', 'last_error')
+    raw_id_fields = ('seat_booking', 'transactions')
+    readonly_fields = ('created_at', 'updated_at')
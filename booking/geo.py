@@ -0,0 +1,210 @@
+"""
+Shared great-circle distance helpers (Haversine, km) and track simplification (Douglas-Peucker).
+Used by vehicle nearby search, trip start / stop detection, seat booking distance checks and the
+stored playback tracks of finished trips (services.trip_track).
+
+Batched helpers take one point against N points (or consecutive points of a track) and use NumPy
+when it is installed and the batch is large enough to pay for the array conversion; otherwise they
+fall back to a plain Python loop with the same results (up to float rounding).
+Inputs may be float, str or Decimal (model DecimalFields).
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+HAS_NUMPY = np is not None
+
+EARTH_RADIUS_KM = 6371.0
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000.0
+
+# Below this many points the Python loop beats building NumPy arrays
+NUMPY_MIN_POINTS = 32
+# Douglas-Peucker: segments shorter than this are scanned in Python even when NumPy is used
+NUMPY_MIN_SEGMENT_POINTS = 128
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance in km between two points (Haversine)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _use_numpy(n, use_numpy):
+    if use_numpy is None:
+        return HAS_NUMPY and n >= NUMPY_MIN_POINTS
+    return bool(use_numpy) and HAS_NUMPY
+
+
+def _py_one_to_many(lat, lng, lats, lngs):
+    lat_r, lng_r = math.radians(float(lat)), math.radians(float(lng))
+    cos_lat = math.cos(lat_r)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    out = []
+    for plat, plng in zip(lats, lngs):
+        plat_r = radians(float(plat))
+        a = sin((plat_r - lat_r) / 2) ** 2 + cos_lat * cos(plat_r) * sin((radians(float(plng)) - lng_r) / 2) ** 2
+        out.append(2 * EARTH_RADIUS_KM * asin(sqrt(min(1.0, a))))
+    return out
+
+
+def _np_one_to_many(lat, lng, lats, lngs):
+    lat_r, lng_r = math.radians(float(lat)), math.radians(float(lng))
+    plat = np.radians(np.asarray(lats, dtype=float))
+    plng = np.radians(np.asarray(lngs, dtype=float))
+    a = np.sin((plat - lat_r) / 2) ** 2 + math.cos(lat_r) * np.cos(plat) * np.sin((plng - lng_r) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_many(lat, lng, lats, lngs, use_numpy=None):
+    """
+    Distances in km from (lat, lng) to each point of (lats, lngs), as a list in input order.
+    use_numpy: None = automatic, False = force the Python loop (True is ignored without NumPy).
+    """
+    lats = lats if isinstance(lats, (list, tuple)) else list(lats)
+    lngs = lngs if isinstance(lngs, (list, tuple)) else list(lngs)
+    if not lats:
+        return []
+    if _use_numpy(len(lats), use_numpy):
+        return _np_one_to_many(lat, lng, lats, lngs).tolist()
+    return _py_one_to_many(lat, lng, lats, lngs)
+
+
+def nearest_index(lat, lng, lats, lngs, use_numpy=None):
+    """Return (index, distance_km) of the point nearest to (lat, lng), or (None, None) for no points.
+    Ties resolve to the first point, as with a strict `<` loop."""
+    lats = lats if isinstance(lats, (list, tuple)) else list(lats)
+    lngs = lngs if isinstance(lngs, (list, tuple)) else list(lngs)
+    if not lats:
+        return None, None
+    if _use_numpy(len(lats), use_numpy):
+        dists = _np_one_to_many(lat, lng, lats, lngs)
+        idx = int(np.argmin(dists))
+        return idx, float(dists[idx])
+    dists = _py_one_to_many(lat, lng, lats, lngs)
+    idx = min(range(len(dists)), key=dists.__getitem__)
+    return idx, dists[idx]
+
+
+def first_within(lat, lng, lats, lngs, radius_km, use_numpy=None):
+    """Return (index, distance_km) of the first point (input order) within radius_km, or (None, None)."""
+    for idx, dist in enumerate(haversine_many(lat, lng, lats, lngs, use_numpy=use_numpy)):
+        if dist <= radius_km:
+            return idx, dist
+    return None, None
+
+
+def segment_lengths_km(lats, lngs, use_numpy=None):
+    """Distances in km between consecutive points of a track (len(points) - 1 values)."""
+    lats = lats if isinstance(lats, (list, tuple)) else list(lats)
+    lngs = lngs if isinstance(lngs, (list, tuple)) else list(lngs)
+    if len(lats) < 2:
+        return []
+    if _use_numpy(len(lats), use_numpy):
+        lat_r = np.radians(np.asarray(lats, dtype=float))
+        lng_r = np.radians(np.asarray(lngs, dtype=float))
+        a = (
+            np.sin(np.diff(lat_r) / 2) ** 2
+            + np.cos(lat_r[:-1]) * np.cos(lat_r[1:]) * np.sin(np.diff(lng_r) / 2) ** 2
+        )
+        return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).tolist()
+    return [
+        haversine_km(lats[i], lngs[i], lats[i + 1], lngs[i + 1])
+        for i in range(len(lats) - 1)
+    ]
+
+
+def track_length_km(lats, lngs, use_numpy=None):
+    """Total length in km of a track given as parallel lat/lng sequences."""
+    return sum(segment_lengths_km(lats, lngs, use_numpy=use_numpy))
+
+
+def _local_xy(lats, lngs):
+    """Equirectangular projection in metres around the first point (accurate over a city-sized track)."""
+    lat0 = math.radians(float(lats[0]))
+    lng0 = math.radians(float(lngs[0]))
+    kx = EARTH_RADIUS_M * math.cos(lat0)
+    xs = [(math.radians(float(v)) - lng0) * kx for v in lngs]
+    ys = [(math.radians(float(v)) - lat0) * EARTH_RADIUS_M for v in lats]
+    return xs, ys
+
+
+def _py_farthest(xs, ys, first, last):
+    """(index, squared distance) of the point between first and last farthest from that segment."""
+    ax, ay = xs[first], ys[first]
+    dx, dy = xs[last] - ax, ys[last] - ay
+    seg2 = dx * dx + dy * dy
+    best, best_d2 = first + 1, -1.0
+    for i in range(first + 1, last):
+        px, py = xs[i] - ax, ys[i] - ay
+        if seg2 > 0:
+            t = (px * dx + py * dy) / seg2
+            t = 0.0 if t < 0 else 1.0 if t > 1 else t
+            px, py = px - t * dx, py - t * dy
+        d2 = px * px + py * py
+        if d2 > best_d2:
+            best, best_d2 = i, d2
+    return best, best_d2
+
+
+def _np_farthest(x, y, first, last):
+    ax, ay = x[first], y[first]
+    dx, dy = x[last] - ax, y[last] - ay
+    px = x[first + 1:last] - ax
+    py = y[first + 1:last] - ay
+    seg2 = dx * dx + dy * dy
+    if seg2 > 0:
+        t = np.clip((px * dx + py * dy) / seg2, 0.0, 1.0)
+        px = px - t * dx
+        py = py - t * dy
+    d2 = px * px + py * py
+    k = int(np.argmax(d2))
+    return first + 1 + k, float(d2[k])
+
+
+def track_significance(lats, lngs, min_tolerance_m, use_numpy=None):
+    """
+    Douglas-Peucker significance (metres) of each point of a track: the point is kept when simplifying
+    at any tolerance below its value. Endpoints are inf; points dropped at min_tolerance_m are 0.0.
+    One pass serves every tolerance >= min_tolerance_m (a point's value is capped by its ancestors in
+    the split tree, so `significance > tolerance` is exactly the Douglas-Peucker result).
+    Distances are to the segment (not the infinite line), so GPS back-tracking is kept.
+    """
+    lats = lats if isinstance(lats, (list, tuple)) else list(lats)
+    lngs = lngs if isinstance(lngs, (list, tuple)) else list(lngs)
+    n = len(lats)
+    if n == 0:
+        return []
+    significance = [0.0] * n
+    significance[0] = significance[-1] = math.inf
+    xs, ys = _local_xy(lats, lngs)
+    # Long segments (the first splits) are scanned with NumPy; short ones, most of the splits, with the
+    # Python loop, which beats the array call overhead there
+    x = np.asarray(xs) if _use_numpy(n, use_numpy) else None
+    y = np.asarray(ys) if x is not None else None
+    tol2 = float(min_tolerance_m) ** 2
+    stack = [(0, n - 1, math.inf)]
+    while stack:
+        first, last, parent = stack.pop()
+        if last - first < 2:
+            continue
+        if x is not None and last - first >= NUMPY_MIN_SEGMENT_POINTS:
+            idx, d2 = _np_farthest(x, y, first, last)
+        else:
+            idx, d2 = _py_farthest(xs, ys, first, last)
+        if d2 <= tol2:
+            continue
+        value = min(math.sqrt(d2), parent)
+        significance[idx] = value
+        stack.append((first, idx, value))
+        stack.append((idx, last, value))
+    return significance
+
+
+def simplify_track(lats, lngs, tolerance_m, use_numpy=None):
+    """Indices of the points kept by Douglas-Peucker at tolerance_m (metres), in track order."""
+    significance = track_significance(lats, lngs, tolerance_m, use_numpy=use_numpy)
+    return [i for i, value in enumerate(significance) if value > tolerance_m]
@@ -0,0 +1,55 @@
+"""
+Management command to (re)build VehicleLastPosition from the Location history.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from booking.models import Location, Vehicle, VehicleLastPosition
+
+
+class Command(BaseCommand):
+    help = 'Backfills vehicle_last_positions from the latest Location row of each vehicle'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows written per bulk upsert',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options.get('batch_size') or 500
+
+        latest_loc = Location.objects.filter(vehicle_id=OuterRef('pk')).order_by('-created_at', '-id')
+        latest_ids = (
+            Vehicle.objects.annotate(last_location_id=Subquery(latest_loc.values('id')[:1]))
+            .filter(last_location_id__isnull=False)
+            .values_list('last_location_id', flat=True)
+        )
+        locations = Location.objects.filter(id__in=list(latest_ids))
+
+        rows = [
+            VehicleLastPosition(
+                vehicle_id=loc.vehicle_id,
+                trip_id=loc.trip_id,
+                latitude=loc.latitude,
+                longitude=loc.longitude,
+                speed=loc.speed,
+                course=loc.course,
+                recorded_at=loc.recorded_at or loc.created_at,
+            )
+            for loc in locations
+        ]
+        if not rows:
+            self.stdout.write(self.style.WARNING('No locations found; nothing to backfill.'))
+            return
+
+        VehicleLastPosition.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['vehicle'],
+            update_fields=['trip', 'latitude', 'longitude', 'speed', 'course', 'recorded_at', 'updated_at'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Backfilled last position for {len(rows)} vehicle(s).'))
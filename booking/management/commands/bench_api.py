@@ -0,0 +1,250 @@
+"""
+Management command to benchmark key API endpoints through the Django test client.
+
+Runs each endpoint --requests times from --concurrency threads (each with its own client and DB
+connection), after a short warm-up, and reports per-endpoint latency percentiles, SQL query
+counts, status codes and throughput as JSON (stdout, and --output). --baseline takes an earlier
+output file and adds the ratio to it for each endpoint, so runs can be compared over time.
+
+Request parameters are drawn with --seed from the data in the database (e.g. `manage.py
+seed_fleet`): trip ids, place names, vehicle positions and open seat bookings. Checkout runs
+inside a transaction that is rolled back, so the bookings stay open for the next run.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.utils import timezone
+
+from booking.models import Place, SeatBooking, Trip, VehicleLastPosition
+from core.models import User
+
+SAMPLE_SIZE = 500
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks key endpoints with concurrent test clients; reports latency percentiles and query counts as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint first')
+        parser.add_argument('--endpoints', default='', help='Comma-separated endpoint names (default: all)')
+        parser.add_argument('--user', type=int, default=None, help='User the clients log in as (default: first superuser)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for request parameters')
+        parser.add_argument('--output', default=None, help='Also write the JSON report to this file')
+        parser.add_argument('--baseline', default=None, help='Earlier JSON report to compare against')
+
+    # --- Request parameters ---------------------------------------------------------------
+
+    def _load_fixtures(self):
+        self.trip_ids = list(Trip.objects.filter(end_time__isnull=False).order_by('-id').values_list('id', flat=True)[:SAMPLE_SIZE])
+        self.names = [name for name in Place.objects.order_by('-id').values_list('name_roman', flat=True)[:SAMPLE_SIZE] if name]
+        self.positions = [
+            (float(lat), float(lng))
+            for lat, lng in VehicleLastPosition.objects.values_list('latitude', 'longitude')[:SAMPLE_SIZE]
+        ]
+        self.open_bookings = list(
+            SeatBooking.objects.filter(check_out_datetime__isnull=True, trip__end_time__isnull=True, destination_place__isnull=False)
+            .values_list('vehicle_seat_id', 'destination_place__latitude', 'destination_place__longitude')[:SAMPLE_SIZE]
+        )
+
+    def _scenarios(self):
+        """name -> (request factory (rng) -> (method, path, data), mutates, available)."""
+        today = timezone.localdate().isoformat()
+
+        def nearby(rng):
+            lat, lng = rng.choice(self.positions)
+            return 'get', '/api/vehicles/nearby/', {'latitude': f'{lat + rng.uniform(-0.01, 0.01):.6f}', 'longitude': f'{lng + rng.uniform(-0.01, 0.01):.6f}'}
+
+        def trip_detail(rng):
+            return 'get', f'/api/trips/{rng.choice(self.trip_ids)}/', {}
+
+        def locations(rng):
+            return 'get', '/api/locations/', {'trip': rng.choice(self.trip_ids)}
+
+        def place_search(rng):
+            name = rng.choice(self.names)
+            return 'get', '/api/places/', {'search': name[:rng.randint(3, 6)]}
+
+        def autocomplete(rng):
+            name = rng.choice(self.names)
+            return 'get', '/api/places/autocomplete/', {'q': name[:rng.randint(2, 5)]}
+
+        def checkout(rng):
+            seat_id, lat, lng = rng.choice(self.open_bookings)
+            return 'post', '/api/seat-bookings/checkout/', {
+                'vehicle_seat_id': seat_id, 'check_out_lat': str(lat), 'check_out_lng': str(lng), 'is_paid': 'true',
+            }
+
+        return {
+            'vehicles/nearby': (nearby, False, bool(self.positions)),
+            'monitoring': (lambda rng: ('get', '/api/monitoring/', {}), False, True),
+            'trips': (lambda rng: ('get', '/api/trips/', {}), False, True),
+            'trips/<id>': (trip_detail, False, bool(self.trip_ids)),
+            'locations': (locations, False, bool(self.trip_ids)),
+            'places?search': (place_search, False, bool(self.names)),
+            'places/autocomplete': (autocomplete, False, bool(self.names)),
+            'vehicle-schedules': (lambda rng: ('get', '/api/vehicle-schedules/', {'date': today}), False, True),
+            'seat-bookings/checkout': (checkout, True, bool(self.open_bookings)),
+        }
+
+    # --- Running --------------------------------------------------------------------------
+
+    def _request(self, client, method, path, data, mutates):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        status_code = None
+        with connection.execute_wrapper(counter):
+            if mutates:
+                try:
+                    with transaction.atomic():
+                        status_code = getattr(client, method)(path, data).status_code
+                        raise _Rollback
+                except _Rollback:
+                    pass
+            else:
+                status_code = getattr(client, method)(path, data).status_code
+        return (time.perf_counter() - started) * 1000.0, counter.count, status_code
+
+    def _run_endpoint(self, factory, mutates, user, n_requests, n_warmup, concurrency, seed):
+        requests = [factory(random.Random(seed * 1_000_003 + i)) for i in range(n_warmup + n_requests)]
+        warmup, measured = requests[:n_warmup], requests[n_warmup:]
+        # Warm-up in this thread: fills the per-process indexes and caches before timing
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        for method, path, data in warmup:
+            self._request(client, method, path, data, mutates)
+        results = []
+        lock = threading.Lock()
+
+        def _worker(index):
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            try:
+                for method, path, data in measured[index::concurrency]:
+                    result = self._request(client, method, path, data, mutates)
+                    with lock:
+                        results.append(result)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=_worker, args=(i,)) for i in range(concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+        return results, wall
+
+    def _summarize(self, results, wall):
+        latencies = sorted(r[0] for r in results)
+        queries = sorted(r[1] for r in results)
+        statuses = Counter(str(r[2]) for r in results)
+        n = len(results)
+        return {
+            'requests': n,
+            'errors': sum(count for code, count in statuses.items() if not code.startswith(('2', '3'))),
+            'status': dict(sorted(statuses.items())),
+            'throughput_rps': round(n / wall, 1) if wall > 0 else 0.0,
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 50), 2),
+                'p95': round(_percentile(latencies, 95), 2),
+                'p99': round(_percentile(latencies, 99), 2),
+                'mean': round(sum(latencies) / n, 2) if n else 0.0,
+                'max': round(latencies[-1], 2) if n else 0.0,
+            },
+            'queries': {
+                'p50': _percentile(queries, 50),
+                'p95': _percentile(queries, 95),
+                'max': queries[-1] if n else 0,
+                'mean': round(sum(queries) / n, 2) if n else 0.0,
+            },
+        }
+
+    @staticmethod
+    def _compare(summary, baseline):
+        def _ratio(new, old):
+            return round(new / old, 2) if old else None
+        return {
+            'latency_p50': _ratio(summary['latency_ms']['p50'], baseline['latency_ms']['p50']),
+            'latency_p95': _ratio(summary['latency_ms']['p95'], baseline['latency_ms']['p95']),
+            'latency_p99': _ratio(summary['latency_ms']['p99'], baseline['latency_ms']['p99']),
+            'queries_p50': _ratio(summary['queries']['p50'], baseline['queries']['p50']),
+        }
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        user_id = options['user']
+        user = User.objects.get(pk=user_id) if user_id else User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to log in as; pass --user or create a superuser')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f).get('endpoints', {})
+
+        self._load_fixtures()
+        scenarios = self._scenarios()
+        selected = [name.strip() for name in options['endpoints'].split(',') if name.strip()] or list(scenarios)
+        unknown = [name for name in selected if name not in scenarios]
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(unknown)} (choose from {", ".join(scenarios)})')
+
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'concurrency': concurrency,
+            'requests_per_endpoint': options['requests'],
+            'seed': options['seed'],
+            'endpoints': {},
+            'skipped': [],
+        }
+        for name in selected:
+            factory, mutates, available = scenarios[name]
+            if not available:
+                report['skipped'].append(name)
+                continue
+            results, wall = self._run_endpoint(
+                factory, mutates, user, options['requests'], options['warmup'], concurrency, options['seed'],
+            )
+            summary = self._summarize(results, wall)
+            if baseline and name in baseline:
+                summary['vs_baseline'] = self._compare(summary, baseline[name])
+            report['endpoints'][name] = summary
+            self.stderr.write(
+                f"{name}: p50 {summary['latency_ms']['p50']} ms, p95 {summary['latency_ms']['p95']} ms, "
+                f"p99 {summary['latency_ms']['p99']} ms, {summary['queries']['p50']} queries, {summary['errors']} errors"
+            )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,97 @@
+"""
+Management command to micro-benchmark the distance kernels in booking.geo on synthetic points.
+Compares the previous per-call Haversine loop with the batched Python and NumPy kernels.
+No database access.
+"""
+import math
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from booking import geo
+
+
+def _legacy_haversine(lat1, lon1, lat2, lon2):
+    """Per-call Haversine as the views had it (float() of each Decimal on every call, rounded)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    c = 2 * math.asin(math.sqrt(a))
+    return round(c * 6371, 4)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks booking.geo distance kernels (one-to-many and track segments) for 1k-100k points'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated point counts',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per kernel (best time is reported)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed')
+
+    def _best_ms(self, fn, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        repeat = max(1, options['repeat'])
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',') if s.strip()]
+        except ValueError:
+            self.stdout.write(self.style.ERROR('--sizes must be comma-separated integers'))
+            return
+
+        if not geo.HAS_NUMPY:
+            self.stdout.write(self.style.WARNING('NumPy is not installed; only the Python kernels are measured.'))
+        origin = (27.7172, 85.3240)
+        for n in sizes:
+            # Decimal coordinates, as loaded from Place / VehicleLastPosition
+            lats = [Decimal(str(round(origin[0] + rng.uniform(-1, 1), 6))) for _ in range(n)]
+            lngs = [Decimal(str(round(origin[1] + rng.uniform(-1, 1), 6))) for _ in range(n)]
+
+            legacy_ms = self._best_ms(
+                lambda: [_legacy_haversine(origin[0], origin[1], a, b) for a, b in zip(lats, lngs)], repeat,
+            )
+            python_ms = self._best_ms(
+                lambda: geo.haversine_many(origin[0], origin[1], lats, lngs, use_numpy=False), repeat,
+            )
+            self.stdout.write(f'n={n}')
+            self.stdout.write(f'  one-to-many  legacy loop  {legacy_ms:9.2f} ms')
+            self.stdout.write(f'  one-to-many  python       {python_ms:9.2f} ms  ({legacy_ms / python_ms:.1f}x)')
+            if geo.HAS_NUMPY:
+                numpy_ms = self._best_ms(
+                    lambda: geo.haversine_many(origin[0], origin[1], lats, lngs, use_numpy=True), repeat,
+                )
+                self.stdout.write(f'  one-to-many  numpy        {numpy_ms:9.2f} ms  ({legacy_ms / numpy_ms:.1f}x)')
+                py = geo.haversine_many(origin[0], origin[1], lats, lngs, use_numpy=False)
+                vec = geo.haversine_many(origin[0], origin[1], lats, lngs, use_numpy=True)
+                max_diff = max(abs(a - b) for a, b in zip(py, vec))
+                self.stdout.write(f'  max |python - numpy| = {max_diff:.2e} km')
+
+            legacy_track_ms = self._best_ms(
+                lambda: [_legacy_haversine(lats[i], lngs[i], lats[i + 1], lngs[i + 1]) for i in range(n - 1)],
+                repeat,
+            )
+            python_track_ms = self._best_ms(lambda: geo.segment_lengths_km(lats, lngs, use_numpy=False), repeat)
+            self.stdout.write(f'  track        legacy loop  {legacy_track_ms:9.2f} ms')
+            self.stdout.write(
+                f'  track        python       {python_track_ms:9.2f} ms  ({legacy_track_ms / python_track_ms:.1f}x)'
+            )
+            if geo.HAS_NUMPY:
+                numpy_track_ms = self._best_ms(lambda: geo.segment_lengths_km(lats, lngs, use_numpy=True), repeat)
+                self.stdout.write(
+                    f'  track        numpy        {numpy_track_ms:9.2f} ms  ({legacy_track_ms / numpy_track_ms:.1f}x)'
+                )
+        self.stdout.write(self.style.SUCCESS('Done.'))
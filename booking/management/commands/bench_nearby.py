@@ -0,0 +1,76 @@
+"""
+Management command to benchmark nearby-vehicle candidate selection on synthetic positions.
+Compares the full haversine scan (previous vehicles/nearby behaviour) with the grid index.
+No database access.
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from booking.geo import haversine_km
+from booking.services.spatial_index import VehicleGridIndex
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks nearby radius queries: linear haversine scan vs in-memory grid index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=10000, help='Number of synthetic vehicles')
+        parser.add_argument('--queries', type=int, default=200, help='Number of radius queries')
+        parser.add_argument('--radius', type=float, default=20.0, help='Query radius in km')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def handle(self, *args, **options):
+        n = options['vehicles']
+        n_queries = options['queries']
+        radius = options['radius']
+        rng = random.Random(options['seed'])
+
+        # Roughly Nepal's bounding box; Decimal like VehicleLastPosition values
+        def _point():
+            return (
+                Decimal(str(round(rng.uniform(26.3, 30.4), 7))),
+                Decimal(str(round(rng.uniform(80.0, 88.2), 7))),
+            )
+
+        positions = {vid: _point() for vid in range(1, n + 1)}
+        queries = [tuple(float(x) for x in _point()) for _ in range(n_queries)]
+
+        started = time.perf_counter()
+        index = VehicleGridIndex()
+        index.load((vid, lat, lng) for vid, (lat, lng) in positions.items())
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        linear_results = []
+        for qlat, qlng in queries:
+            hits = []
+            for vid, (lat, lng) in positions.items():
+                d = haversine_km(qlat, qlng, float(lat), float(lng))
+                if d <= radius:
+                    hits.append(vid)
+            linear_results.append(set(hits))
+        linear_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        grid_results = [
+            {vid for vid, _ in index.query_radius(qlat, qlng, radius)}
+            for qlat, qlng in queries
+        ]
+        grid_s = time.perf_counter() - started
+
+        mismatches = sum(1 for a, b in zip(linear_results, grid_results) if a != b)
+        avg_hits = sum(len(r) for r in grid_results) / max(n_queries, 1)
+
+        self.stdout.write(f'vehicles={n} queries={n_queries} radius_km={radius} avg_hits={avg_hits:.1f}')
+        self.stdout.write(f'grid build: {build_s * 1000:.1f} ms')
+        self.stdout.write(f'linear scan: {linear_s / n_queries * 1000:.3f} ms/query')
+        self.stdout.write(f'grid index:  {grid_s / n_queries * 1000:.3f} ms/query')
+        if grid_s > 0:
+            self.stdout.write(f'speedup: {linear_s / grid_s:.1f}x')
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} queries returned different vehicles'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Results identical.'))
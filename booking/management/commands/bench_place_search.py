@@ -0,0 +1,99 @@
+"""
+Management command to benchmark place name search on synthetic Nepali / romanized names.
+Compares the previous per-request scan (search_matches on every place) with the n-gram index
+in services.place_search and checks both return the same places.
+No database access.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.services.place_search import PlaceSearchIndex
+from booking.transliteration import name_search_forms, search_matches
+
+# Devanagari syllables and their usual Latin spellings (several per syllable for phonetic variants)
+_SYLLABLES = [
+    ('बसु', ('basu', 'vasu', 'bsu')),
+    ('न्धरा', ('ndhara', 'ndhra', 'ndara')),
+    ('कोटे', ('kote', 'kotey')),
+    ('श्वर', ('shwor', 'shwar', 'swor')),
+    ('चौक', ('chowk', 'chok', 'chauk')),
+    ('गोंगबु', ('gongabu', 'gongbu')),
+    ('थामेल', ('thamel', 'tamel')),
+    ('पाटन', ('patan', 'paatan')),
+    ('भक्तपुर', ('bhaktapur', 'bhaktpur')),
+    ('कलंकी', ('kalanki', 'kalankee')),
+    ('समाखुशी', ('samakhusi', 'samakhushi', 'sama kusi')),
+    ('बानेश्वर', ('baneshwor', 'baneswar')),
+    ('नयाँ', ('naya', 'nayan')),
+    ('बजार', ('bazar', 'bajar')),
+    ('गाउँ', ('gaun', 'gau')),
+    ('डाँडा', ('danda', 'dada')),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks place search: search_matches scan vs in-memory n-gram index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--places', type=int, default=50000, help='Number of synthetic places')
+        parser.add_argument('--queries', type=int, default=20, help='Number of search queries')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def handle(self, *args, **options):
+        n = options['places']
+        n_queries = options['queries']
+        rng = random.Random(options['seed'])
+
+        def _name():
+            parts = rng.sample(_SYLLABLES, rng.randint(1, 3))
+            if rng.random() < 0.5:
+                return ''.join(deva for deva, _ in parts)
+            return ' '.join(rng.choice(latin) for _, latin in parts).title()
+
+        names = {pid: _name() for pid in range(1, n + 1)}
+        # Queries as users type them: a whole name, a prefix, or a phonetic / vowel-less variant
+        queries = []
+        for _ in range(n_queries):
+            deva, latin = rng.choice(_SYLLABLES)
+            choice = rng.random()
+            if choice < 0.25:
+                queries.append(deva)
+            elif choice < 0.5:
+                queries.append(rng.choice(latin)[:rng.randint(3, 6)])
+            elif choice < 0.75:
+                queries.append(rng.choice(latin))
+            else:
+                queries.append(''.join(c for c in rng.choice(latin) if c not in 'aeiou') or latin[0])
+
+        started = time.perf_counter()
+        rows = [(pid, name, *name_search_forms(name)) for pid, name in names.items()]
+        forms_s = time.perf_counter() - started
+        started = time.perf_counter()
+        index = PlaceSearchIndex()
+        index.load(rows)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        linear_results = [{pid for pid, name in names.items() if search_matches(name, q)} for q in queries]
+        linear_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index_results = [index.search(q) for q in queries]
+        index_s = time.perf_counter() - started
+
+        mismatches = [q for q, a, b in zip(queries, linear_results, index_results) if a != set(b)]
+        avg_hits = sum(len(r) for r in index_results) / max(n_queries, 1)
+
+        self.stdout.write(f'places={n} queries={n_queries} avg_hits={avg_hits:.1f}')
+        self.stdout.write(f'search forms (done on save): {forms_s * 1000:.1f} ms total')
+        self.stdout.write(f'index build: {build_s * 1000:.1f} ms')
+        self.stdout.write(f'linear scan: {linear_s / n_queries * 1000:.3f} ms/query')
+        self.stdout.write(f'n-gram index: {index_s / n_queries * 1000:.3f} ms/query')
+        if index_s > 0:
+            self.stdout.write(f'speedup: {linear_s / index_s:.1f}x')
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{len(mismatches)} queries returned different places: {mismatches[:5]}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Results identical.'))
@@ -0,0 +1,125 @@
+"""
+Management command to compare track payload sizes and encode times of the JSON location dicts
+with format=polyline and format=binary (booking.services.track_format) on a synthetic GPS track,
+and check both compact formats decode back to the original points within their precision.
+No database access.
+"""
+import gzip
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from booking.services.track_format import (
+    TRACK_RECORD, decode_polyline, track_binary, track_point_tuple, track_polyline,
+)
+from booking.services.trip_track import track_point, track_point_to_response
+
+
+def _synthetic_rows(n, interval_s, rng):
+    """TRACK_POINT_FIELDS rows of a vehicle wandering around Kathmandu, one fix every interval_s."""
+    lat, lng = 27.7172, 85.3240
+    heading = rng.uniform(0, 360)
+    started = datetime(2026, 1, 1, 6, tzinfo=dt_timezone.utc)
+    rows = []
+    for i in range(n):
+        heading = (heading + rng.gauss(0, 8)) % 360
+        speed = max(0.0, rng.gauss(32, 10))
+        step_m = speed / 3.6 * interval_s
+        lat += step_m * math.cos(math.radians(heading)) / 111320
+        lng += step_m * math.sin(math.radians(heading)) / (111320 * math.cos(math.radians(lat)))
+        rows.append((
+            i + 1,
+            Decimal(f'{lat:.10f}'),
+            Decimal(f'{lng:.10f}'),
+            Decimal(f'{speed:.2f}') if rng.random() > 0.02 else None,
+            Decimal(f'{heading:.2f}'),
+            started + timedelta(seconds=i * interval_s),
+        ))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks track payloads: JSON location dicts vs format=polyline vs format=binary'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=17280, help='Track length (default: a day at 5 s)')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds between fixes')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per format (best time is reported)')
+        parser.add_argument('--seed', type=int, default=7, help='Random seed')
+
+    def _best(self, fn, repeat):
+        best = result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        repeat = max(1, options['repeat'])
+        points = [track_point(row) for row in _synthetic_rows(options['points'], options['interval'], rng)]
+        n = len(points)
+        if not n:
+            self.stdout.write(self.style.WARNING('No points.'))
+            return
+
+        json_s, json_body = self._best(
+            lambda: json.dumps({'locations': [track_point_to_response(p) for p in points]}).encode(), repeat,
+        )
+        polyline_s, polyline_body = self._best(
+            lambda: json.dumps(track_polyline([track_point_tuple(p) for p in points])).encode(), repeat,
+        )
+        binary_s, binary_body = self._best(
+            lambda: track_binary([track_point_tuple(p) for p in points]), repeat,
+        )
+
+        self.stdout.write(f'points={n} interval={options["interval"]}s')
+        for name, seconds, body in (
+            ('json', json_s, json_body),
+            ('polyline', polyline_s, polyline_body),
+            ('binary', binary_s, binary_body),
+        ):
+            raw, gz = len(body), len(gzip.compress(body))
+            self.stdout.write(
+                f'{name:<8} {raw:>10,} B ({raw / n:5.1f} B/point, {len(json_body) / raw:5.1f}x smaller)  '
+                f'gzip {gz:>9,} B ({len(gzip.compress(json_body)) / gz:4.1f}x)  encode {seconds * 1000:7.1f} ms'
+            )
+
+        errors = []
+        expected = [track_point_tuple(p) for p in points]
+        payload = json.loads(polyline_body)
+        decoded = decode_polyline(payload['polyline'])
+        timestamps = speeds = 0
+        for i, ((lat, lng), ts_delta, speed_delta, (e_lat, e_lng, e_ts, e_speed)) in enumerate(
+            zip(decoded, payload['timestamps'], payload['speeds'], expected)
+        ):
+            timestamps += ts_delta
+            if speed_delta is not None:
+                speeds += speed_delta
+            speed_known = speeds / 100 if speed_delta is not None else None
+            if abs(lat - e_lat) > 6e-6 or abs(lng - e_lng) > 6e-6 or timestamps != round(e_ts * 1000) \
+                    or (speed_known is None) != (e_speed is None) \
+                    or (e_speed is not None and abs(speed_known - e_speed) > 1e-9):
+                errors.append(f'polyline point {i}')
+        if len(decoded) != n:
+            errors.append(f'polyline decoded {len(decoded)} points')
+        records = list(TRACK_RECORD.iter_unpack(binary_body))
+        for i, ((lat, lng, ts, speed), (e_lat, e_lng, e_ts, e_speed)) in enumerate(zip(records, expected)):
+            # float32 keeps ~7 significant digits: about 1e-5 degrees (~1 m) at these coordinates
+            if abs(lat - e_lat) > 1e-5 or abs(lng - e_lng) > 1e-5 or ts != int(e_ts) \
+                    or math.isnan(speed) != (e_speed is None) \
+                    or (e_speed is not None and abs(speed - e_speed) > 1e-3):
+                errors.append(f'binary point {i}')
+        if len(records) != n:
+            errors.append(f'binary decoded {len(records)} points')
+        if errors:
+            self.stdout.write(self.style.ERROR(f'{len(errors)} round-trip mismatches: {errors[:5]}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Results identical within format precision.'))
@@ -0,0 +1,118 @@
+"""
+Management command to benchmark transliteration on synthetic Nepali / romanized place names.
+Compares the previous character loop and chained str.replace implementation with the
+table-driven one in booking.transliteration, cold (empty memo) and memoized, and checks all
+three produce the same outputs.
+No database access.
+"""
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking import transliteration
+from booking.management.commands.bench_place_search import _SYLLABLES
+from booking.transliteration import _DEVA_TO_ROMAN, consonant_skeleton, normalize_phonetic, romanize
+
+
+def _legacy_romanize(text):
+    if not text:
+        return ""
+    out = []
+    i = 0
+    text = text.strip()
+    while i < len(text):
+        c = text[i]
+        if i + 1 < len(text) and (text[i] + text[i + 1]) in _DEVA_TO_ROMAN:
+            out.append(_DEVA_TO_ROMAN[text[i] + text[i + 1]])
+            i += 2
+            continue
+        if c in _DEVA_TO_ROMAN:
+            out.append(_DEVA_TO_ROMAN[c])
+        elif "\u0900" <= c <= "\u097f":
+            pass  # unmapped Devanagari (virama, digits, ...) is dropped
+        elif c.isalpha() or c.isdigit():
+            out.append(c.lower())
+        elif c.isspace():
+            out.append(" ")
+        i += 1
+    return "".join(out).lower()
+
+
+def _legacy_normalize_phonetic(text):
+    if not text:
+        return ""
+    s = _legacy_romanize(text).lower()
+    s = re.sub(r"\s+", "", s)
+    for old, new in (
+        ("sh", "s"), ("kh", "k"), ("gh", "g"), ("ch", "c"), ("th", "t"), ("dh", "d"), ("ph", "p"),
+        ("bh", "b"), ("ng", "n"), ("w", "v"), ("v", "b"), ("z", "j"), ("au", "o"), ("ow", "o"), ("ou", "o"),
+    ):
+        s = s.replace(old, new)
+    return re.sub(r"(.)\1+", r"\1", s)
+
+
+def _legacy_consonant_skeleton(text):
+    s = _legacy_normalize_phonetic(text)
+    for v in "aeiou":
+        s = s.replace(v, "")
+    return s
+
+
+def _clear_caches():
+    for func in (romanize, normalize_phonetic, consonant_skeleton):
+        func.cache_clear()
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks transliteration: legacy loop vs translate tables, cold and memoized'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=10000, help='Number of distinct synthetic names')
+        parser.add_argument('--rounds', type=int, default=5, help='Passes over the names for the memoized run')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def _run(self, names, funcs):
+        started = time.perf_counter()
+        results = [tuple(func(name) for func in funcs) for name in names]
+        return time.perf_counter() - started, results
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rounds = options['rounds']
+        names = set()
+        while len(names) < options['names']:
+            parts = rng.sample(_SYLLABLES, rng.randint(1, 3))
+            if rng.random() < 0.5:
+                names.add(''.join(deva for deva, _ in parts) + rng.choice(('', f' {rng.randint(1, 99)}')))
+            else:
+                names.add(' '.join(rng.choice(latin) for _, latin in parts).title() + f' {rng.randint(1, 999)}')
+        names = sorted(names)
+        if len(names) > transliteration.TRANSLITERATION_CACHE_SIZE:
+            self.stdout.write(self.style.WARNING(
+                f'{len(names)} names exceed the memo size ({transliteration.TRANSLITERATION_CACHE_SIZE}); '
+                'the memoized run will mostly miss',
+            ))
+
+        legacy_s, legacy = self._run(names, (_legacy_romanize, _legacy_normalize_phonetic, _legacy_consonant_skeleton))
+        _clear_caches()
+        cold_s, cold = self._run(names, (romanize, normalize_phonetic, consonant_skeleton))
+        warm_s = 0.0
+        warm = cold
+        for _ in range(rounds):
+            elapsed, warm = self._run(names, (romanize, normalize_phonetic, consonant_skeleton))
+            warm_s += elapsed
+        _clear_caches()
+
+        n = len(names)
+        self.stdout.write(f'names={n} rounds={rounds}')
+        self.stdout.write(f'legacy: {legacy_s / n * 1e6:.2f} us/name ({n / legacy_s:,.0f} names/s)')
+        self.stdout.write(f'tables, cold memo: {cold_s / n * 1e6:.2f} us/name ({n / cold_s:,.0f} names/s)')
+        self.stdout.write(f'tables, memoized: {warm_s / (n * rounds) * 1e6:.2f} us/name ({n * rounds / warm_s:,.0f} names/s)')
+        self.stdout.write(f'speedup: {legacy_s / cold_s:.1f}x cold, {legacy_s * rounds / warm_s:.1f}x memoized')
+        mismatches = [name for name, a, b, c in zip(names, legacy, cold, warm) if not a == b == c]
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{len(mismatches)} names transliterate differently: {mismatches[:5]}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Results identical.'))
@@ -0,0 +1,70 @@
+"""
+Management command to build the stored simplified tracks (TripTrack) of finished trips.
+Trips ended after this feature are queued for the track worker at trip end; use this for older trips,
+or with --all after changing TRIP_TRACK_TOLERANCES_M. --stale builds trips that just ended or received
+late points (Trip.track_stale_at), for deployments running with TRIP_TRACK_INLINE_WORKER=0.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.models import Trip, TripTrack
+from booking.services.trip_track import BATCH_SIZE, TRACK_TOLERANCES_M, build_trip_tracks, rebuild_stale_tracks
+
+
+class Command(BaseCommand):
+    help = 'Builds stored simplified tracks for finished trips that have none (or all with --all)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild every finished trip, not only those without stored tracks',
+        )
+        parser.add_argument(
+            '--trip',
+            type=int,
+            action='append',
+            default=[],
+            help='Build only this trip (repeatable)',
+        )
+        parser.add_argument(
+            '--stale',
+            action='store_true',
+            help='Build trips that just ended or whose stored tracks are stale after late points, without waiting for the rebuild delay',
+        )
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            total = 0
+            while True:
+                taken = rebuild_stale_tracks(limit=BATCH_SIZE, delay_seconds=0)
+                total += taken
+                if not taken:
+                    break
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt tracks for {total} stale trip(s).'))
+            return
+
+        trips = Trip.objects.filter(end_time__isnull=False)
+        if options['trip']:
+            trips = trips.filter(pk__in=options['trip'])
+        elif not options['all']:
+            trips = trips.exclude(pk__in=TripTrack.objects.values('trip_id'))
+        trip_ids = list(trips.order_by('pk').values_list('pk', flat=True))
+        if not trip_ids:
+            self.stdout.write(self.style.WARNING('No finished trips to build.'))
+            return
+
+        started = time.perf_counter()
+        points_in = points_stored = 0
+        for i, trip_id in enumerate(trip_ids, 1):
+            tracks = build_trip_tracks(trip_id)
+            points_in += tracks[0].source_point_count if tracks else 0
+            points_stored += sum(t.point_count for t in tracks)
+            if i % 500 == 0:
+                self.stdout.write(f'{i}/{len(trip_ids)} trips...')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Built tracks for {len(trip_ids)} trip(s) at {", ".join(f"{t:g}" for t in TRACK_TOLERANCES_M)} m: '
+            f'{points_in} points -> {points_stored} stored across levels in {elapsed:.1f} s.'
+        ))
@@ -0,0 +1,164 @@
+"""
+Management command to check SQL query budgets of the hot read endpoints.
+
+booking/data/query_budgets.json maps URL names to the most queries one request may run on the
+dataset described in the file (`manage.py seed_fleet`). Each endpoint is requested with a small
+and a large fixture: {count} is a page size of 2 vs 40, and {vehicle} / {trip} / {route} / {user}
+are the rows with the fewest vs the most related rows (drivers and trips, stops and bookings,
+stop points, bookings). An endpoint fails when either request exceeds max_queries, or when a
+statement runs repeatedly and more often for the large fixture (an N+1) and the endpoint is not
+listed in known_growth. Failures show the statements that grew and the most repeated SQL; the
+command exits non-zero. booking.tests.QueryBudgetTests runs it on a seeded fleet at two sizes in
+the test suite.
+"""
+import json
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from booking.models import Route, Trip, Vehicle, VehicleLastPosition
+from core.models import User
+from ev_yatayat_sewa_server.query_budget import format_statements, record_queries
+
+BUDGETS_PATH = Path(__file__).resolve().parents[2] / 'data' / 'query_budgets.json'
+PAGE_SIZES = {'small': 2, 'large': 40}
+
+
+def _fewest_and_most(queryset, *counts):
+    """(pk with the fewest, pk with the most) related rows, ordered by the annotated counts in turn."""
+    pks = queryset.values_list('pk', flat=True)
+    return pks.order_by(*counts, 'pk').first(), pks.order_by(*(f'-{c}' for c in counts), 'pk').first()
+
+
+def _grown_statements(small, large):
+    """(statement, count) run repeatedly in the large request and more often than in the small one.
+
+    A statement going from 0 to 1 is not growth: prefetches of an empty relation skip their query.
+    """
+    return [(sql, n) for sql, n in large.statements.most_common() if n > 1 and n > small.statements.get(sql, 0)]
+
+
+class Command(BaseCommand):
+    help = 'Fails when a hot endpoint exceeds its query budget or its query count grows with data size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budgets', default=str(BUDGETS_PATH), help='Query budget JSON file')
+        parser.add_argument('--user', type=int, default=None, help='User the client logs in as (default: first superuser)')
+        parser.add_argument('--endpoints', default='', help='Comma-separated URL names (default: all in the file)')
+
+    def _fixtures(self):
+        """{'small': {placeholder: value}, 'large': {...}}; None values mean the dataset has no such rows."""
+        vehicles = _fewest_and_most(
+            Vehicle.objects.annotate(n_drivers=Count('drivers', distinct=True), n_trips=Count('trips', distinct=True)),
+            'n_drivers', 'n_trips',
+        )
+        trips = _fewest_and_most(
+            Trip.objects.filter(end_time__isnull=False).annotate(
+                n_stops=Count('route__stop_points', distinct=True), n_bookings=Count('seat_bookings', distinct=True),
+            ),
+            'n_stops', 'n_bookings',
+        )
+        routes = _fewest_and_most(Route.objects.annotate(n_stops=Count('stop_points')), 'n_stops')
+        users = _fewest_and_most(
+            User.objects.filter(seat_bookings__isnull=False).annotate(n_bookings=Count('seat_bookings')),
+            'n_bookings',
+        )
+        position = VehicleLastPosition.objects.order_by('vehicle_id').values_list('latitude', 'longitude').first()
+        latitude, longitude = position if position else (None, None)
+        return {
+            size: {
+                'count': PAGE_SIZES[size],
+                'vehicle': vehicles[i],
+                'trip': trips[i],
+                'route': routes[i],
+                'user': users[i],
+                'latitude': latitude,
+                'longitude': longitude,
+            }
+            for i, size in enumerate(('small', 'large'))
+        }
+
+    @staticmethod
+    def _fill(template, fixture):
+        """Template dict with '{name}' placeholders filled; None when a placeholder has no fixture."""
+        filled = {}
+        for key, value in (template or {}).items():
+            value = str(value)
+            if value.startswith('{') and value.endswith('}'):
+                value = fixture.get(value[1:-1])
+                if value is None:
+                    return None
+            filled[key] = value
+        return filled
+
+    def _measure(self, client, url_name, spec, fixture):
+        kwargs = self._fill(spec.get('kwargs'), fixture)
+        params = self._fill(spec.get('params'), fixture)
+        if kwargs is None or params is None:
+            return None
+        url = reverse(url_name, kwargs=kwargs or None)
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        client.get(url)  # warm-up: settings cache, in-process indexes
+        with record_queries() as queries:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url_name}: GET {url} returned {response.status_code}')
+        return url, queries
+
+    def handle(self, *args, **options):
+        with open(options['budgets'], encoding='utf-8') as f:
+            budgets = json.load(f)
+        endpoints = budgets['endpoints']
+        known_growth = budgets.get('known_growth', {})
+        selected = [name.strip() for name in options['endpoints'].split(',') if name.strip()] or list(endpoints)
+        unknown = [name for name in selected if name not in endpoints]
+        if unknown:
+            raise CommandError(f'Not in the budget file: {", ".join(unknown)}')
+
+        user_id = options['user']
+        user = User.objects.get(pk=user_id) if user_id else User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to log in as; pass --user or create a superuser')
+        client = Client()
+        client.force_login(user)
+        fixtures = self._fixtures()
+
+        failures = []
+        for url_name in selected:
+            spec = endpoints[url_name]
+            small = self._measure(client, url_name, spec, fixtures['small'])
+            large = self._measure(client, url_name, spec, fixtures['large'])
+            if small is None or large is None:
+                self.stdout.write(self.style.WARNING(f'{url_name}: skipped (no data for its fixtures)'))
+                continue
+            (_, small_q), (large_url, large_q) = small, large
+            budget = spec['max_queries']
+            problems = []
+            if max(small_q.count, large_q.count) > budget:
+                problems.append(f'over budget ({budget})')
+            grown = _grown_statements(small_q, large_q)
+            if grown:
+                if url_name in known_growth:
+                    self.stdout.write(self.style.WARNING(
+                        f'{url_name}: grows {small_q.count} -> {large_q.count} (known: {known_growth[url_name]})'
+                    ))
+                else:
+                    problems.append('grows with data size')
+            line = f'{url_name}: {small_q.count} -> {large_q.count} queries (budget {budget})'
+            if not problems:
+                self.stdout.write(line)
+                continue
+            self.stdout.write(self.style.ERROR(f'{line}: {", ".join(problems)}\n  GET {large_url}'))
+            if grown:
+                self.stdout.write('  repeated statements that grew:\n' + format_statements(grown))
+            self.stdout.write('  most repeated:\n' + format_statements(large_q.repeated() or large_q.statements.most_common()))
+            failures.append(url_name)
+
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint(s) failed their query budget: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All endpoints within their query budgets.'))
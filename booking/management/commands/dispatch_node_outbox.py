@@ -0,0 +1,65 @@
+"""
+Management command to deliver pending Node webhook events from the outbox.
+"""
+import time
+from datetime import timedelta
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from booking.models import NodeOutboxEvent
+from booking.services.node_dispatcher import SWEEP_INTERVAL_SECONDS, dispatch_due, get_dispatcher_stats
+
+
+class Command(BaseCommand):
+    help = 'Delivers due Node outbox events (use --loop to run as a standalone worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll the outbox every few seconds',
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=None,
+            help='Delete delivered events older than this many days, then exit',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue depth and delivery counters, then exit',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('stats'):
+            for key, value in get_dispatcher_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        purge_days = options.get('purge_days')
+        if purge_days is not None:
+            cutoff = timezone.now() - timedelta(days=purge_days)
+            deleted, _ = NodeOutboxEvent.objects.filter(status='delivered', delivered_at__lt=cutoff).delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} delivered event(s).'))
+            return
+
+        session = requests.Session()
+        if not options.get('loop'):
+            total = 0
+            while True:
+                sent = dispatch_due(session)
+                total += sent
+                if not sent:
+                    break
+            self.stdout.write(self.style.SUCCESS(f'Processed {total} event(s).'))
+            return
+
+        self.stdout.write('Dispatching Node outbox events (Ctrl+C to stop)...')
+        while True:
+            close_old_connections()
+            if not dispatch_due(session):
+                time.sleep(SWEEP_INTERVAL_SECONDS)
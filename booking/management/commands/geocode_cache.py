@@ -0,0 +1,28 @@
+"""
+Management command to inspect and maintain the reverse-geocode cache (GeocodeCache table).
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.models import GeocodeCache
+from booking.services.reverse_geocode import get_geocode_stats
+
+
+class Command(BaseCommand):
+    help = 'Prints reverse-geocode cache counters or purges expired GeocodeCache rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--purge-expired',
+            action='store_true',
+            help='Delete expired cache rows, then exit',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('purge_expired'):
+            deleted, _ = GeocodeCache.objects.filter(expires_at__lte=timezone.now()).delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired cache row(s).'))
+            return
+        # Hit/miss counters are per process; from a fresh command they are zero and only the sizes are useful
+        for key, value in get_geocode_stats().items():
+            self.stdout.write(f'{key}: {value}')
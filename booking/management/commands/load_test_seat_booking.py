@@ -0,0 +1,209 @@
+"""
+Management command to load-test seat reservation with many concurrent bookers on one bus.
+
+Starts --bookers threads at once (each with its own DB connection) that compete for the seats of
+one vehicle through the real endpoints, then checks that no seat was booked twice for overlapping
+segments and reports latency percentiles. Modes:
+  tickets  vehicle-ticket-bookings/create/ on one schedule (random segments)
+  holds    vehicle-ticket-bookings/holds/ then create/ with the hold_token
+  live     seat-bookings/book/ (guest check-in) on the schedule's vehicle
+Bookings, holds and seat statuses created by the run are removed afterwards unless --keep.
+Run against the production database engine (MySQL); SQLite serialises writers and reports
+"database is locked" errors instead of measuring contention.
+"""
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from booking.models import SeatBooking, SeatHold, Trip, VehicleSchedule, VehicleSeat, VehicleTicketBooking, VehicleTicketBookingSeat
+from booking.route_order import get_route_place_order
+from booking.vehicle_payload import invalidate_vehicle_payload
+from core.models import User
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+class Command(BaseCommand):
+    help = 'Runs concurrent bookers against one bus and verifies there are no double bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', type=int, default=None, help='VehicleSchedule id (default: latest)')
+        parser.add_argument('--bookers', type=int, default=200, help='Concurrent bookers (threads)')
+        parser.add_argument('--mode', choices=('tickets', 'holds', 'live'), default='tickets', help='Booking path to exercise')
+        parser.add_argument('--user', type=int, default=None, help='User the bookers log in as (default: first superuser)')
+        parser.add_argument(
+            '--allow-running-trip',
+            action='store_true',
+            help='Allow live mode on a vehicle with a running trip (each booking queues a Node seat_booked event)',
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep created bookings instead of cleaning up')
+
+    def _ticket_requests(self, schedule, seats, n):
+        place_order = get_route_place_order(schedule.route, schedule.reverse_direction)
+        places = sorted(place_order, key=place_order.get)
+        segments = [(a, b) for i, a in enumerate(places) for b in places[i + 1:]] or [(None, None)]
+        requests = []
+        for i in range(n):
+            seat = seats[i % len(seats)]
+            pickup, destination = segments[(i // len(seats)) % len(segments)]
+            data = {
+                'name': f'Load {i}',
+                'phone': f'98{i:08d}',
+                'vehicle_schedule': schedule.id,
+                'is_guest': 'true',
+                'seats': json.dumps([{'side': seat.side, 'number': seat.number}]),
+            }
+            if pickup and destination:
+                data['pickup_point'] = pickup
+                data['destination_point'] = destination
+            requests.append(data)
+        return requests
+
+    def _book(self, session_key, mode, data, vehicle_seat=None):
+        """One booker: returns (outcome, created id or None, hold token or None)."""
+        client = Client(raise_request_exception=False)
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        if mode == 'live':
+            resp = client.post('/api/seat-bookings/book/', {
+                'vehicle': vehicle_seat.vehicle_id,
+                'vehicle_seat': vehicle_seat.id,
+                'is_guest': 'true',
+                'check_in_lat': '27.7172',
+                'check_in_lng': '85.3240',
+                'check_in_address': 'Load test',
+                'check_in_datetime': timezone.now().isoformat(),
+            })
+        else:
+            token = None
+            if mode == 'holds':
+                hold = client.post('/api/vehicle-ticket-bookings/holds/', data)
+                if hold.status_code != 201:
+                    return ('rejected' if hold.status_code == 400 else 'error'), None, None
+                token = hold.json()['hold_token']
+                data = dict(data, hold_token=token)
+            resp = client.post('/api/vehicle-ticket-bookings/create/', data)
+            if resp.status_code != 201:
+                return ('rejected' if resp.status_code == 400 else 'error'), None, token
+        if resp.status_code == 201:
+            return 'ok', int(resp.json()['id']), None
+        return ('rejected' if resp.status_code == 400 else 'error'), None, None
+
+    def handle(self, *args, **options):
+        n = max(1, options['bookers'])
+        mode = options['mode']
+        users = User.objects.filter(pk=options['user']) if options.get('user') else User.objects.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to book as; pass --user.')
+        # One session shared by all bookers, so logging in does not add writes to the measured run
+        login_client = Client()
+        login_client.force_login(user)
+        session_key = login_client.cookies[settings.SESSION_COOKIE_NAME].value
+        schedules = VehicleSchedule.objects.select_related('route', 'vehicle')
+        if options.get('schedule'):
+            schedules = schedules.filter(pk=options['schedule'])
+        schedule = schedules.order_by('-date', '-time').first()
+        if schedule is None:
+            raise CommandError('No vehicle schedule found.')
+        seats = list(VehicleSeat.objects.filter(vehicle=schedule.vehicle).order_by('side', 'number'))
+        if not seats:
+            raise CommandError(f'Vehicle {schedule.vehicle} has no seats.')
+        original_status = {s.id: s.status for s in seats}
+        if mode == 'live':
+            running = Trip.objects.filter(vehicle=schedule.vehicle, end_time__isnull=True).exists()
+            if running and not options.get('allow_running_trip'):
+                raise CommandError('Vehicle has a running trip; live bookings would notify Node. Pass --allow-running-trip.')
+            seats = [s for s in seats if s.status == 'available']
+            if not seats:
+                raise CommandError('No available seats on the vehicle.')
+            jobs = [(None, seats[i % len(seats)]) for i in range(n)]
+        else:
+            jobs = [(data, None) for data in self._ticket_requests(schedule, seats, n)]
+
+        self.stdout.write(f'{n} {mode} bookers on schedule {schedule.id} ({schedule.vehicle.name}, {len(seats)} seats)')
+        results = [None] * n
+        barrier = threading.Barrier(n)
+
+        def _worker(i):
+            data, vehicle_seat = jobs[i]
+            try:
+                barrier.wait()
+                started = time.perf_counter()
+                outcome, created_id, token = self._book(session_key, mode, data, vehicle_seat)
+                results[i] = (outcome, created_id, token, (time.perf_counter() - started) * 1000)
+            except Exception as exc:
+                results[i] = ('error', None, None, 0.0)
+                self.stderr.write(f'booker {i}: {exc}')
+            finally:
+                connection.close()
+
+        wall_started = time.perf_counter()
+        threads = [threading.Thread(target=_worker, args=(i,)) for i in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall_ms = (time.perf_counter() - wall_started) * 1000
+
+        created = [r[1] for r in results if r[0] == 'ok']
+        tokens = [r[2] for r in results if r[2]]
+        counts = {k: sum(1 for r in results if r[0] == k) for k in ('ok', 'rejected', 'error')}
+        latencies = sorted(r[3] for r in results if r[0] != 'error')
+        self.stdout.write(f"booked {counts['ok']}, rejected {counts['rejected']}, errors {counts['error']}, wall {wall_ms:.0f} ms")
+        self.stdout.write(
+            f'latency ms: p50 {_percentile(latencies, 50):.1f}  p95 {_percentile(latencies, 95):.1f}  '
+            f'p99 {_percentile(latencies, 99):.1f}  max {(latencies[-1] if latencies else 0):.1f}'
+        )
+
+        double_booked = self._double_bookings(mode, created)
+        if not options.get('keep'):
+            self._cleanup(mode, created, tokens, original_status, schedule.vehicle_id)
+
+        if double_booked:
+            raise CommandError(f'Double-booked seats: {", ".join(double_booked)}')
+        self.stdout.write(self.style.SUCCESS('No double bookings.'))
+
+    def _double_bookings(self, mode, created):
+        """Seats booked twice for overlapping segments (tickets/holds) or checked in twice (live)."""
+        if mode == 'live':
+            labels = Counter(
+                f'{side}{number}' for side, number in SeatBooking.objects.filter(pk__in=created).values_list(
+                    'vehicle_seat__side', 'vehicle_seat__number',
+                )
+            )
+            return sorted(label for label, hits in labels.items() if hits > 1)
+        by_seat = {}
+        for side, number, from_order, to_order in VehicleTicketBookingSeat.objects.filter(booking_id__in=created).values_list(
+            'side', 'number', 'from_order', 'to_order',
+        ):
+            by_seat.setdefault(f'{side}{number}', []).append((from_order, to_order))
+        doubled = []
+        for label, spans in by_seat.items():
+            spans.sort()
+            if any(spans[i + 1][0] < spans[i][1] for i in range(len(spans) - 1)):
+                doubled.append(label)
+        return sorted(doubled)
+
+    def _cleanup(self, mode, created, tokens, original_status, vehicle_id):
+        if mode == 'live':
+            SeatBooking.objects.filter(pk__in=created).delete()
+            for seat_id, seat_status in original_status.items():
+                VehicleSeat.objects.filter(pk=seat_id).update(status=seat_status)
+            invalidate_vehicle_payload(vehicle_id)
+        else:
+            for booking in VehicleTicketBooking.objects.filter(pk__in=created):
+                booking.delete()
+            SeatHold.objects.filter(token__in=tokens).delete()
+        self.stdout.write(f'Cleaned up {len(created)} booking(s).')
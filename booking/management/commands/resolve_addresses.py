@@ -0,0 +1,54 @@
+"""
+Management command to resolve deferred seat booking addresses (AddressResolutionJob) via Nominatim.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from booking.services.address_resolution import BATCH_SIZE, SWEEP_INTERVAL_SECONDS, get_address_resolution_stats, resolve_due
+
+
+class Command(BaseCommand):
+    help = 'Resolves due address jobs in batches (use --loop to run as a standalone worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for due jobs every few seconds',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Jobs taken per batch (default: {BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print pending jobs and resolution counters, then exit',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('stats'):
+            for key, value in get_address_resolution_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        batch = max(1, options['batch'])
+        if not options.get('loop'):
+            total = 0
+            while True:
+                taken = resolve_due(limit=batch)
+                total += taken
+                if not taken:
+                    break
+            self.stdout.write(self.style.SUCCESS(f'Processed {total} job(s).'))
+            return
+
+        self.stdout.write('Resolving seat booking addresses (Ctrl+C to stop)...')
+        while True:
+            close_old_connections()
+            if not resolve_due(limit=batch):
+                time.sleep(SWEEP_INTERVAL_SECONDS)
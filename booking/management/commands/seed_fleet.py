@@ -0,0 +1,581 @@
+"""
+Management command to seed a synthetic fleet for benchmarks (bench_api, bench_* commands).
+
+Generates, from a fixed --seed: places around Kathmandu with Nepali / romanized names, routes with
+stop points (and their RoutePlaceOrder rows), drivers and passengers with wallets, vehicles with
+seats (some shared with a relief driver), --days of finished trips with GPS locations, seat
+bookings and wallet transactions, a running trip with open seat bookings and a last position for
+most vehicles, and vehicle schedules with ticket bookings (seat rows and occupancy filled in)
+around today. Finished trips get their stored simplified tracks (services.trip_track).
+
+Everything is inserted with bulk_create, so model signals do not run: derived rows are written
+directly and created_at/updated_at carry the simulated times. Primary keys are assigned
+explicitly (MySQL does not return ids from bulk_create). Seeded rows are recognisable by
+--prefix (place codes, vehicle numbers, ticket ids) and --phone-prefix (users); --flush
+removes them first.
+"""
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from booking.geo import haversine_km
+from booking.management.commands.bench_place_search import _SYLLABLES
+from booking.models import (
+    Location,
+    Place,
+    Route,
+    RoutePlaceOrder,
+    RouteStopPoint,
+    SeatBooking,
+    Trip,
+    Vehicle,
+    VehicleLastPosition,
+    VehicleSchedule,
+    VehicleSeat,
+    VehicleTicketBooking,
+    VehicleTicketBookingSeat,
+)
+from booking.services.seat_occupancy import build_occupancy
+from booking.services.trip_track import build_trip_tracks
+from booking.transliteration import name_search_forms
+from booking.vehicle_payload import invalidate_vehicle_payload
+from core.models import Transaction, User, Wallet
+from core.services.super_setting import get_super_settings
+
+CENTER = (27.7172, 85.3240)  # Kathmandu
+SPREAD_KM = 18.0
+AVG_SPEED_KMH = 22.0
+SEAT_SIDES = ('A', 'B')
+STOP_CORRIDOR_KM = 1.5
+MAX_STOPS = 8
+RELIEF_DRIVER_SHARE = 0.3  # vehicles that also have another vehicle's driver, who drives some of their trips
+RELIEF_TRIP_SHARE = 0.3
+DEFAULT_PER_KM_CHARGE = Decimal('5')
+SEED_PASSWORD = 'seed-fleet'
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create keep the given created_at/updated_at instead of auto_now(_add)."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _dec(value, places=7):
+    return Decimal(f'{value:.{places}f}')
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def _bearing(lat1, lng1, lat2, lng2):
+    lat1, lat2 = math.radians(lat1), math.radians(lat2)
+    dlng = math.radians(lng2 - lng1)
+    x = math.sin(dlng) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlng)
+    return (math.degrees(math.atan2(x, y)) + 360.0) % 360.0
+
+
+class _Ids:
+    """Sequential primary keys per model, continuing after the current maximum."""
+
+    def __init__(self):
+        self._next = {}
+
+    def take(self, model, n=1):
+        start = self._next.get(model)
+        if start is None:
+            start = (model.objects.aggregate(m=Max('pk'))['m'] or 0) + 1
+        self._next[model] = start + n
+        return range(start, start + n)
+
+    def one(self, model):
+        return self.take(model)[0]
+
+
+class _RoutePath:
+    """Route points (place id, lat, lng) in one direction with cumulative distances."""
+
+    def __init__(self, points):
+        self.points = points
+        self.cumulative = [0.0]
+        for (_, lat1, lng1), (_, lat2, lng2) in zip(points, points[1:]):
+            self.cumulative.append(self.cumulative[-1] + haversine_km(lat1, lng1, lat2, lng2))
+        self.length_km = self.cumulative[-1]
+
+    def at(self, distance_km):
+        """(lat, lng, course) at distance_km along the path."""
+        distance_km = min(max(distance_km, 0.0), self.length_km)
+        for i in range(1, len(self.points)):
+            if distance_km <= self.cumulative[i] or i == len(self.points) - 1:
+                _, lat1, lng1 = self.points[i - 1]
+                _, lat2, lng2 = self.points[i]
+                span = self.cumulative[i] - self.cumulative[i - 1]
+                t = (distance_km - self.cumulative[i - 1]) / span if span else 0.0
+                return lat1 + (lat2 - lat1) * t, lng1 + (lng2 - lng1) * t, _bearing(lat1, lng1, lat2, lng2)
+        _, lat, lng = self.points[-1]
+        return lat, lng, 0.0
+
+
+class Command(BaseCommand):
+    help = 'Seeds synthetic places, routes, vehicles, a year of trips/locations and bookings with bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--places', type=int, default=300, help='Number of places')
+        parser.add_argument('--routes', type=int, default=40, help='Number of routes')
+        parser.add_argument('--vehicles', type=int, default=40, help='Number of vehicles (one driver each)')
+        parser.add_argument('--passengers', type=int, default=1000, help='Number of passenger users')
+        parser.add_argument('--days', type=int, default=365, help='Days of trip history before today')
+        parser.add_argument('--trips-per-day', type=int, default=2, help='Finished trips per vehicle per day')
+        parser.add_argument('--points-per-trip', type=int, default=30, help='GPS locations per trip')
+        parser.add_argument('--bookings-per-trip', type=int, default=4, help='Average seat bookings per trip')
+        parser.add_argument('--seats', type=int, default=30, help='Seats per vehicle')
+        parser.add_argument('--running', type=float, default=0.8, help='Share of vehicles with a running trip now')
+        parser.add_argument('--schedule-days', type=int, default=7, help='Days of vehicle schedules before and after today')
+        parser.add_argument('--tickets-per-schedule', type=int, default=6, help='Average ticket bookings per schedule')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--prefix', default='SF', help='Prefix of seeded place codes, vehicle numbers and ticket ids')
+        parser.add_argument('--phone-prefix', default='900', help='Prefix of seeded user phone numbers')
+        parser.add_argument('--batch-size', type=int, default=2000, help='bulk_create batch size')
+        parser.add_argument('--flush', action='store_true', help='Delete previously seeded rows (same prefixes) first')
+
+    # --- Helpers -----------------------------------------------------------------------
+
+    def _bulk(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(objs)
+
+    def _flush(self):
+        vehicles = Vehicle.objects.filter(vehicle_no__startswith=f'{self.prefix}-')
+        VehicleTicketBooking.objects.filter(ticket_id__startswith=self.prefix).delete()
+        Location.objects.filter(vehicle__in=vehicles).delete()
+        vehicles.delete()
+        User.objects.filter(phone__startswith=self.phone_prefix, is_superuser=False).delete()
+        Place.objects.filter(code__startswith=f'{self.prefix}-').delete()
+
+    def _name(self):
+        parts = self.rng.sample(_SYLLABLES, self.rng.randint(1, 3))
+        if self.rng.random() < 0.5:
+            return ''.join(deva for deva, _ in parts)
+        return ' '.join(self.rng.choice(latin) for _, latin in parts).title()
+
+    def _point_near(self, lat, lng, km):
+        dlat = self.rng.gauss(0, km) / 111.32
+        dlng = self.rng.gauss(0, km) / (111.32 * math.cos(math.radians(lat)))
+        return lat + dlat, lng + dlng
+
+    def _fare(self, distance_km):
+        settings = get_super_settings()
+        per_km = settings.per_km_charge or DEFAULT_PER_KM_CHARGE
+        amount = Decimal(f'{distance_km:.2f}') * per_km
+        if settings.initial_km and settings.initial_km_charge and Decimal(f'{distance_km:.2f}') <= settings.initial_km:
+            amount = settings.initial_km_charge
+        return _money(amount)
+
+    # --- Seeding -----------------------------------------------------------------------
+
+    def _seed_places(self, n):
+        rows = []
+        for pk in self.ids.take(Place, n):
+            lat, lng = self._point_near(*CENTER, SPREAD_KM / 2)
+            name = self._name()
+            roman, phonetic, skeleton = name_search_forms(name)
+            rows.append(Place(
+                id=pk, name=name, code=f'{self.prefix}-P{pk:06d}', latitude=_dec(lat), longitude=_dec(lng),
+                address=f'{name}, Kathmandu', name_roman=roman, name_phonetic=phonetic, name_skeleton=skeleton,
+            ))
+        self._bulk(Place, rows)
+        return [(p.id, float(p.latitude), float(p.longitude), p.name) for p in rows]
+
+    def _seed_routes(self, n, places):
+        routes, stops, orders = [], [], []
+        paths = {}
+        for pk in self.ids.take(Route, n):
+            start, end = self.rng.sample(places, 2)
+            while haversine_km(start[1], start[2], end[1], end[2]) < 4.0:
+                start, end = self.rng.sample(places, 2)
+            # Stops: places in a corridor along start -> end, ordered by their projection on the line
+            dx, dy = end[2] - start[2], end[1] - start[1]
+            norm = dx * dx + dy * dy
+            corridor = []
+            for place in places:
+                if place[0] in (start[0], end[0]):
+                    continue
+                t = ((place[2] - start[2]) * dx + (place[1] - start[1]) * dy) / norm
+                if 0.05 < t < 0.95:
+                    lat, lng = start[1] + dy * t, start[2] + dx * t
+                    if haversine_km(lat, lng, place[1], place[2]) <= STOP_CORRIDOR_KM:
+                        corridor.append((t, place))
+            corridor.sort()
+            if len(corridor) > MAX_STOPS:
+                corridor = sorted(self.rng.sample(corridor, MAX_STOPS))
+            route_stops = [place for _, place in corridor]
+            routes.append(Route(
+                id=pk, name=f'{start[3]} - {end[3]}', is_bidirectional=self.rng.random() < 0.7,
+                start_point_id=start[0], end_point_id=end[0],
+            ))
+            for order, place in enumerate(route_stops, start=1):
+                stops.append(RouteStopPoint(route_id=pk, place_id=place[0], order=order, announcement_text=place[3]))
+            forward = [start] + route_stops + [end]
+            last = len(forward) - 1
+            for index, place in enumerate(forward):
+                orders.append(RoutePlaceOrder(route_id=pk, place_id=place[0], forward_index=index, reverse_index=last - index))
+            points = [(p[0], p[1], p[2]) for p in forward]
+            paths[(pk, False)] = _RoutePath(points)
+            paths[(pk, True)] = _RoutePath(points[::-1])
+        self._bulk(Route, routes)
+        self._bulk(RouteStopPoint, stops)
+        self._bulk(RoutePlaceOrder, orders)
+        return [r.id for r in routes], {r.id: r.is_bidirectional for r in routes}, paths
+
+    def _seed_users(self, n_drivers, n_passengers):
+        password = make_password(SEED_PASSWORD)
+        users, wallets = [], []
+        ids = self.ids.take(User, n_drivers + n_passengers)
+        wallet_ids = self.ids.take(Wallet, len(ids))
+        for i, (pk, wallet_pk) in enumerate(zip(ids, wallet_ids)):
+            is_driver = i < n_drivers
+            phone = f'{self.phone_prefix}{pk:07d}'
+            users.append(User(
+                id=pk, username=phone, phone=phone, password=password, is_driver=is_driver,
+                name=f'{"Driver" if is_driver else "Passenger"} {i + 1}',
+                license_no=f'{self.prefix}-L{pk:06d}' if is_driver else None,
+            ))
+            wallets.append(Wallet(id=wallet_pk, user_id=pk, balance=Decimal('0'), to_pay=Decimal('0'), to_receive=Decimal('0')))
+        self._bulk(User, users)
+        self._bulk(Wallet, wallets)
+        drivers = [u.id for u in users[:n_drivers]]
+        passengers = [u.id for u in users[n_drivers:]]
+        self.wallets = {w.user_id: w for w in wallets}
+        return drivers, passengers
+
+    def _seed_vehicles(self, drivers, route_ids):
+        layout = get_super_settings().seat_layout
+        vehicles, seats, vehicle_drivers, vehicle_routes = [], [], [], []
+        seat_ids = {}
+        fleet = []
+        for pk, driver_id in zip(self.ids.take(Vehicle, len(drivers)), drivers):
+            routes = self.rng.sample(route_ids, min(len(route_ids), self.rng.randint(1, 3)))
+            vehicles.append(Vehicle(
+                id=pk, imei=f'86{pk:013d}', name=f'EV Bus {pk}', vehicle_no=f'{self.prefix}-{pk:05d}',
+                vehicle_type='EV Bus', odometer=Decimal(self.rng.randint(1000, 90000)), seat_layout=layout,
+                active_driver_id=driver_id, active_route_id=routes[0], is_active=True,
+            ))
+            vehicle_drivers.append(Vehicle.drivers.through(vehicle_id=pk, user_id=driver_id))
+            if len(drivers) > 1 and self.rng.random() < RELIEF_DRIVER_SHARE:
+                relief = drivers[(drivers.index(driver_id) + 1) % len(drivers)]
+                vehicle_drivers.append(Vehicle.drivers.through(vehicle_id=pk, user_id=relief))
+                self.relief_drivers[pk] = relief
+            vehicle_routes.extend(Vehicle.routes.through(vehicle_id=pk, route_id=route_id) for route_id in routes)
+            per_side = max(1, self.seats // len(SEAT_SIDES))
+            seat_pks = iter(self.ids.take(VehicleSeat, per_side * len(SEAT_SIDES)))
+            seat_ids[pk] = []
+            for side in SEAT_SIDES:
+                for number in range(1, per_side + 1):
+                    seat_pk = next(seat_pks)
+                    seats.append(VehicleSeat(id=seat_pk, vehicle_id=pk, side=side, number=number))
+                    seat_ids[pk].append((seat_pk, side, number))
+            fleet.append((pk, driver_id, routes))
+        self._bulk(Vehicle, vehicles)
+        self._bulk(Vehicle.drivers.through, vehicle_drivers)
+        self._bulk(Vehicle.routes.through, vehicle_routes)
+        self._bulk(VehicleSeat, seats)
+        self.vehicle_nos = {v.id: v.vehicle_no for v in vehicles}
+        return fleet, seat_ids
+
+    def _wallet_transaction(self, user_id, amount, kind, remarks, at, to_pay=False):
+        wallet = self.wallets[user_id]
+        before = wallet.balance
+        if to_pay:
+            wallet.to_pay += amount
+        elif kind == 'add':
+            wallet.balance += amount
+        else:
+            wallet.balance -= amount
+        self.transactions.append(Transaction(
+            wallet_id=wallet.id, user_id=user_id, amount=amount, balance_before=before, balance_after=wallet.balance,
+            type=kind, status='success', remarks=remarks, created_at=at, updated_at=at,
+        ))
+
+    def _trip_rows(self, trip, path, started, ended, elapsed_km, seat_pool, passengers, open_bookings):
+        """Locations and seat bookings of one trip up to elapsed_km along the path."""
+        locations = []
+        n_points = max(2, int(self.points_per_trip * elapsed_km / path.length_km)) if path.length_km else 2
+        duration = (ended - started).total_seconds()
+        for i in range(n_points):
+            km = elapsed_km * i / (n_points - 1)
+            lat, lng, course = path.at(km)
+            lat, lng = self._point_near(lat, lng, 0.01)
+            at = started + timedelta(seconds=duration * km / path.length_km if path.length_km else 0)
+            locations.append(Location(
+                vehicle_id=trip.vehicle_id, trip_id=trip.id, latitude=_dec(lat), longitude=_dec(lng),
+                speed=_dec(self.rng.uniform(8, 45), 2), course=_dec(course, 2), recorded_at=at, created_at=at, updated_at=at,
+            ))
+
+        bookings = []
+        points = path.points
+        reached = [i for i, km in enumerate(path.cumulative) if km <= elapsed_km]
+        n_bookings = min(len(seat_pool), self.rng.randint(0, 2 * self.bookings_per_trip))
+        if not reached:
+            n_bookings = 0
+        for seat_pk, side, number in self.rng.sample(seat_pool, n_bookings):
+            if open_bookings is not None:
+                # Boarded at a point already passed, getting off at one still ahead (if any)
+                origin = self.rng.choice(reached)
+                ahead = range(reached[-1] + 1, len(points))
+                destination = self.rng.choice(ahead) if ahead else None
+            else:
+                origin, destination = sorted(self.rng.sample(range(len(points)), 2))
+            guest = self.rng.random() < 0.2
+            user_id = None if guest else self.rng.choice(passengers)
+            o_place, o_lat, o_lng = points[origin]
+            check_in_at = started + timedelta(seconds=duration * path.cumulative[origin] / path.length_km)
+            booking = SeatBooking(
+                id=self.ids.one(SeatBooking), user_id=user_id, is_guest=guest, vehicle_id=trip.vehicle_id,
+                vehicle_seat_id=seat_pk, trip_id=trip.id, check_in_lat=_dec(o_lat), check_in_lng=_dec(o_lng),
+                check_in_datetime=check_in_at, check_in_address=f'Near {self.place_names[o_place]}',
+                origin_place_id=o_place, is_paid=False, created_at=check_in_at, updated_at=check_in_at,
+            )
+            if destination is not None:
+                booking.destination_place_id = points[destination][0]
+            if open_bookings is None:
+                d_place, d_lat, d_lng = points[destination]
+                distance = path.cumulative[destination] - path.cumulative[origin]
+                check_out_at = started + timedelta(seconds=duration * path.cumulative[destination] / path.length_km)
+                booking.check_out_lat, booking.check_out_lng = _dec(d_lat), _dec(d_lng)
+                booking.check_out_datetime = check_out_at
+                booking.check_out_address = f'Near {self.place_names[d_place]}'
+                booking.trip_distance = _money(distance)
+                booking.trip_duration = int((check_out_at - check_in_at).total_seconds())
+                booking.trip_amount = self._fare(distance)
+                booking.is_paid = True
+                booking.updated_at = check_out_at
+                self._booking_transactions(trip, booking, side, number)
+            else:
+                open_bookings.append(seat_pk)
+            bookings.append(booking)
+        return locations, bookings
+
+    def _booking_transactions(self, trip, booking, side, number):
+        at = booking.check_out_datetime
+        route_label = f'Trip: {trip.trip_id}'
+        if booking.user_id:
+            wallet = self.wallets[booking.user_id]
+            if wallet.balance < booking.trip_amount:
+                self._wallet_transaction(
+                    booking.user_id, _money(self.rng.choice((500, 1000, 2000))), 'add',
+                    'Wallet deposit | ConnectIPS', at - timedelta(minutes=self.rng.randint(5, 600)),
+                )
+            self._wallet_transaction(
+                booking.user_id, booking.trip_amount, 'deducted',
+                f'Direct seat booking | Vehicle: {self.vehicle_nos[trip.vehicle_id]} | {route_label}'
+                f' | From: {booking.check_in_address} → To: {booking.check_out_address}'
+                f' | Seat(s): {side}{number} | Total Fare: Rs. {booking.trip_amount}',
+                booking.check_in_datetime,
+            )
+        self._wallet_transaction(
+            trip.driver_id, booking.trip_amount, 'add',
+            f'Seat trip fare | Booking #{booking.id} | Seat: {side}{number}'
+            f' | Vehicle: {self.vehicle_nos[trip.vehicle_id]} | {route_label}'
+            f' | From: {booking.check_in_address} → To: {booking.check_out_address}'
+            f' | Distance: {booking.trip_distance} km | Fare: Rs. {booking.trip_amount}',
+            at, to_pay=True,
+        )
+
+    def _flush_trip_batch(self, trips, locations, bookings):
+        self._bulk(Trip, trips)
+        self._bulk(Location, locations)
+        self._bulk(SeatBooking, bookings)
+        self._bulk(Transaction, self.transactions)
+        trips.clear()
+        locations.clear()
+        bookings.clear()
+        self.transactions = []
+
+    def _seed_trips(self, fleet, seat_ids, passengers, bidirectional, paths, now):
+        today = timezone.localdate(now)
+        trips, locations, bookings = [], [], []
+        last_positions = []
+        booked_seats = []
+        for day_offset in range(self.days, 0, -1):
+            day = today - timedelta(days=day_offset)
+            day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=6))
+            for vehicle_id, driver_id, routes in fleet:
+                slot = timedelta(hours=14) / max(self.trips_per_day, 1)
+                for k in range(self.trips_per_day):
+                    route_id = self.rng.choice(routes)
+                    reverse = bidirectional[route_id] and self.rng.random() < 0.5
+                    path = paths[(route_id, reverse)]
+                    started = day_start + slot * k + timedelta(minutes=self.rng.randint(0, 45))
+                    ended = started + timedelta(hours=path.length_km / AVG_SPEED_KMH)
+                    trip_driver = driver_id
+                    if vehicle_id in self.relief_drivers and self.rng.random() < RELIEF_TRIP_SHARE:
+                        trip_driver = self.relief_drivers[vehicle_id]
+                    trip = self._trip(vehicle_id, trip_driver, route_id, reverse, day, started, ended)
+                    trips.append(trip)
+                    trip_locations, trip_bookings = self._trip_rows(
+                        trip, path, started, ended, path.length_km, seat_ids[vehicle_id], passengers, None,
+                    )
+                    locations.extend(trip_locations)
+                    bookings.extend(trip_bookings)
+            if len(locations) >= self.batch_size * 20:
+                self._flush_trip_batch(trips, locations, bookings)
+
+        # Running trips: part of the route driven, open seat bookings, last position = latest point
+        running = fleet[:int(round(len(fleet) * self.running))]
+        for vehicle_id, driver_id, routes in running:
+            route_id = routes[0]
+            path = paths[(route_id, False)]
+            started = now - timedelta(minutes=self.rng.randint(10, 40))
+            ended = started + timedelta(hours=path.length_km / AVG_SPEED_KMH)
+            elapsed_km = min(path.length_km, AVG_SPEED_KMH * (now - started).total_seconds() / 3600.0)
+            trip = self._trip(vehicle_id, driver_id, route_id, False, today, started, None)
+            trips.append(trip)
+            open_seats = []
+            trip_locations, trip_bookings = self._trip_rows(
+                trip, path, started, ended, elapsed_km, seat_ids[vehicle_id], passengers, open_seats,
+            )
+            booked_seats.extend(open_seats)
+            last = trip_locations[-1]
+            last_positions.append(VehicleLastPosition(
+                vehicle_id=vehicle_id, trip_id=trip.id, latitude=last.latitude, longitude=last.longitude,
+                speed=last.speed, course=last.course, recorded_at=last.recorded_at,
+            ))
+            locations.extend(trip_locations)
+            bookings.extend(trip_bookings)
+        self._flush_trip_batch(trips, locations, bookings)
+        VehicleLastPosition.objects.filter(vehicle_id__in=[p.vehicle_id for p in last_positions]).delete()
+        self._bulk(VehicleLastPosition, last_positions)
+        VehicleSeat.objects.filter(pk__in=booked_seats).update(status='booked')
+        for vehicle_id in {p.vehicle_id for p in last_positions}:
+            invalidate_vehicle_payload(vehicle_id)
+
+    def _trip(self, vehicle_id, driver_id, route_id, reverse, day, started, ended):
+        pk = self.ids.one(Trip)
+        return Trip(
+            id=pk, vehicle_id=vehicle_id, driver_id=driver_id, route_id=route_id,
+            trip_id=f'T-{day:%Y%m%d}-{vehicle_id}-{pk:08x}', start_time=started, end_time=ended,
+            reverse_direction=reverse, created_at=started, updated_at=ended or started,
+        )
+
+    def _seed_schedules(self, fleet, seat_ids, passengers, bidirectional, paths, now):
+        today = timezone.localdate(now)
+        schedules, tickets, ticket_seats = [], [], []
+        for day_offset in range(-self.schedule_days, self.schedule_days + 1):
+            day = today + timedelta(days=day_offset)
+            for vehicle_id, _, routes in fleet:
+                route_id = self.rng.choice(routes)
+                reverse = bidirectional[route_id] and self.rng.random() < 0.5
+                path = paths[(route_id, reverse)]
+                schedule_pk = self.ids.one(VehicleSchedule)
+                price = _money(self.rng.choice((150, 200, 250, 300)))
+                created = now - timedelta(days=max(day_offset, 0) + self.schedule_days + 1)
+                rows = []
+                n_tickets = self.rng.randint(0, 2 * self.tickets_per_schedule)
+                seat_pool = self.rng.sample(seat_ids[vehicle_id], min(len(seat_ids[vehicle_id]), 2 * n_tickets))
+                for i in range(min(n_tickets, len(seat_pool) // 2)):
+                    seats = seat_pool[2 * i:2 * i + self.rng.randint(1, 2)]
+                    pickup, destination = sorted(self.rng.sample(range(len(path.points)), 2))
+                    ticket_pk = self.ids.one(VehicleTicketBooking)
+                    ticket_id = f'{self.prefix}T{ticket_pk:09d}'
+                    guest = self.rng.random() < 0.3
+                    tickets.append(VehicleTicketBooking(
+                        id=ticket_pk, user_id=None if guest else self.rng.choice(passengers), is_guest=guest,
+                        name=f'Passenger {ticket_pk}', phone=f'98{ticket_pk:08d}'[-10:], vehicle_schedule_id=schedule_pk,
+                        pickup_point_id=path.points[pickup][0], destination_point_id=path.points[destination][0],
+                        ticket_id=ticket_id, seat=[{'side': side, 'number': number} for _, side, number in seats],
+                        price=price * len(seats), is_paid=self.rng.random() < 0.8, pnr=f'EYS{ticket_id}',
+                        created_at=created, updated_at=created,
+                    ))
+                    for _, side, number in seats:
+                        rows.append((side, number, pickup, destination))
+                        ticket_seats.append(VehicleTicketBookingSeat(
+                            booking_id=ticket_pk, vehicle_schedule_id=schedule_pk, side=side, number=number,
+                            from_order=pickup, to_order=destination, created_at=created,
+                        ))
+                occupancy, count = build_occupancy(rows)
+                schedules.append(VehicleSchedule(
+                    id=schedule_pk, vehicle_id=vehicle_id, route_id=route_id, date=day,
+                    time=datetime.min.time().replace(hour=self.rng.choice((6, 7, 9, 12, 15))), price=price,
+                    reverse_direction=reverse, seat_occupancy=occupancy, booked_seat_count=count,
+                    created_at=created, updated_at=created,
+                ))
+        self._bulk(VehicleSchedule, schedules)
+        self._bulk(VehicleTicketBooking, tickets)
+        self._bulk(VehicleTicketBookingSeat, ticket_seats)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.phone_prefix = options['phone_prefix']
+        self.batch_size = options['batch_size']
+        self.days = options['days']
+        self.trips_per_day = options['trips_per_day']
+        self.points_per_trip = max(2, options['points_per_trip'])
+        self.bookings_per_trip = options['bookings_per_trip']
+        self.seats = options['seats']
+        self.running = min(max(options['running'], 0.0), 1.0)
+        self.schedule_days = options['schedule_days']
+        self.tickets_per_schedule = options['tickets_per_schedule']
+        if options['places'] < 2 or options['routes'] < 1 or options['vehicles'] < 1 or options['passengers'] < 1:
+            raise CommandError('Need at least 2 places, 1 route, 1 vehicle and 1 passenger')
+        if options['flush']:
+            self._flush()
+        elif Place.objects.filter(code__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f'Seeded rows with prefix {self.prefix!r} exist; use --flush or another --prefix')
+
+        self.ids = _Ids()
+        self.relief_drivers = {}
+        self.counts = {}
+        self.transactions = []
+        started = time.perf_counter()
+        now = timezone.now()
+        models = (Trip, Location, SeatBooking, Transaction, VehicleSchedule, VehicleTicketBooking, VehicleTicketBookingSeat)
+        with transaction.atomic(), _explicit_timestamps(*models):
+            places = self._seed_places(options['places'])
+            self.place_names = {p[0]: p[3] for p in places}
+            route_ids, bidirectional, paths = self._seed_routes(options['routes'], places)
+            drivers, passengers = self._seed_users(options['vehicles'], options['passengers'])
+            fleet, seat_ids = self._seed_vehicles(drivers, route_ids)
+            self._seed_trips(fleet, seat_ids, passengers, bidirectional, paths, now)
+            self._seed_schedules(fleet, seat_ids, passengers, bidirectional, paths, now)
+            Wallet.objects.bulk_update(self.wallets.values(), ['balance', 'to_pay'], batch_size=self.batch_size)
+            # Explicit ids do not advance PostgreSQL sequences (MySQL / SQLite continue after the max id)
+            sequence_sql = connection.ops.sequence_reset_sql(no_style(), [
+                Place, Route, User, Wallet, Vehicle, VehicleSeat, Trip, SeatBooking, VehicleSchedule, VehicleTicketBooking,
+            ])
+            if sequence_sql:
+                with connection.cursor() as cursor:
+                    for sql in sequence_sql:
+                        cursor.execute(sql)
+
+        # Stored simplified tracks of the finished trips, as the track worker builds them after trip end
+        finished = Trip.objects.filter(vehicle__vehicle_no__startswith=f'{self.prefix}-', end_time__isnull=False)
+        for trip_id in finished.values_list('pk', flat=True).iterator():
+            self.counts['TripTrack'] = self.counts.get('TripTrack', 0) + len(build_trip_tracks(trip_id))
+
+        for name, count in self.counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f} s (password of seeded users: {SEED_PASSWORD})')
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,45 @@
+"""
+Management command to delete expired seat holds (run from cron, or with --loop as a worker).
+Expired holds never block bookings; sweeping only keeps the seat_holds table small.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from booking.services.seat_reservation import sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired seat holds (use --loop to keep sweeping)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and sweep every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between sweeps with --loop (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        if not options.get('loop'):
+            deleted = sweep_expired_holds()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired hold(s).'))
+            return
+
+        interval = max(1, options['interval'])
+        self.stdout.write(f'Sweeping expired seat holds every {interval}s (Ctrl+C to stop)')
+        try:
+            while True:
+                close_old_connections()
+                deleted = sweep_expired_holds()
+                if deleted:
+                    self.stdout.write(f'Deleted {deleted} expired hold(s).')
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Stopped.'))
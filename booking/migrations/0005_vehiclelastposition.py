@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_seatbooking_origin_place'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleLastPosition',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('latitude', models.DecimalField(decimal_places=16, max_digits=20)),
+                ('longitude', models.DecimalField(decimal_places=16, max_digits=20)),
+                ('speed', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('course', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('recorded_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+                ('trip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='booking.trip')),
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='last_position', to='booking.vehicle')),
+            ],
+            options={
+                'db_table': 'vehicle_last_positions',
+                'indexes': [models.Index(fields=['recorded_at'], name='vehicle_las_recorde_281e38_idx')],
+            },
+        ),
+    ]
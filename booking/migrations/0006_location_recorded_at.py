@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_vehiclelastposition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='recorded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='location',
+            constraint=models.UniqueConstraint(fields=('vehicle', 'recorded_at'), name='uniq_location_vehicle_recorded_at'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_location_recorded_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeOutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('seat_booked', 'Seat booked'), ('trip_location', 'Trip location')], max_length=30)),
+                ('coalesce_key', models.CharField(blank=True, max_length=100, null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('revision', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+            ],
+            options={
+                'db_table': 'node_outbox_events',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='node_outbox_status_a0847a_idx'), models.Index(fields=['coalesce_key', 'status'], name='node_outbox_coalesc_2a81c5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_nodeoutboxevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehiclelastposition',
+            index=models.Index(fields=['updated_at'], name='vehicle_las_updated_0c1587_idx'),
+        ),
+    ]
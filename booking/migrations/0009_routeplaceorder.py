@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_route_place_orders(apps, schema_editor):
+    Route = apps.get_model('booking', 'Route')
+    RouteStopPoint = apps.get_model('booking', 'RouteStopPoint')
+    RoutePlaceOrder = apps.get_model('booking', 'RoutePlaceOrder')
+    stops_by_route = {}
+    for sp in RouteStopPoint.objects.order_by('route_id', 'order'):
+        stops_by_route.setdefault(sp.route_id, []).append(sp.place_id)
+    rows = []
+    for route in Route.objects.all():
+        stops = stops_by_route.get(route.id, [])
+        # Same precedence as route_order.get_route_place_order (later assignments win)
+        forward = {route.start_point_id: 0}
+        for i, place_id in enumerate(stops):
+            forward[place_id] = i + 1
+        forward[route.end_point_id] = len(stops) + 1
+        reverse = {route.end_point_id: 0}
+        for i, place_id in enumerate(reversed(stops)):
+            reverse[place_id] = i + 1
+        reverse[route.start_point_id] = len(stops) + 1
+        for place_id, index in forward.items():
+            rows.append(RoutePlaceOrder(
+                route_id=route.id, place_id=place_id, forward_index=index, reverse_index=reverse[place_id],
+            ))
+    RoutePlaceOrder.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_vehiclelastposition_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoutePlaceOrder',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('forward_index', models.IntegerField()),
+                ('reverse_index', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='route_orders', to='booking.place')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='place_orders', to='booking.route')),
+            ],
+            options={
+                'db_table': 'route_place_orders',
+                'indexes': [models.Index(fields=['place', 'route'], name='route_place_place_i_d942fe_idx')],
+                'unique_together': {('route', 'place')},
+            },
+        ),
+        migrations.RunPython(backfill_route_place_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+def _segment_mask(from_order, to_order):
+    if to_order <= from_order or from_order < 0:
+        return 0
+    return ((1 << (to_order - from_order)) - 1) << from_order
+
+
+def _parse_seat_entries(seat):
+    if isinstance(seat, dict):
+        seat = [seat]
+    if not isinstance(seat, list):
+        return []
+    entries = []
+    for s in seat:
+        if not isinstance(s, dict) or s.get('side') is None or s.get('number') is None:
+            continue
+        try:
+            number = int(s['number'])
+        except (TypeError, ValueError):
+            continue
+        side = str(s['side'])
+        if len(side) <= 10 and (side, number) not in entries:
+            entries.append((side, number))
+    return entries
+
+
+def backfill_seat_occupancy(apps, schema_editor):
+    """
+    Same rules as booking.services.seat_occupancy.build_occupancy (masks as hex strings) and
+    ticket_seats.parse_seat_entries, on historical models.
+    """
+    VehicleSchedule = apps.get_model('booking', 'VehicleSchedule')
+    VehicleTicketBooking = apps.get_model('booking', 'VehicleTicketBooking')
+    RoutePlaceOrder = apps.get_model('booking', 'RoutePlaceOrder')
+    bookings_by_schedule = {}
+    for b in VehicleTicketBooking.objects.only('vehicle_schedule_id', 'seat', 'pickup_point_id', 'destination_point_id'):
+        bookings_by_schedule.setdefault(b.vehicle_schedule_id, []).append(b)
+    for schedule in VehicleSchedule.objects.filter(id__in=list(bookings_by_schedule)):
+        index_field = 'reverse_index' if schedule.reverse_direction else 'forward_index'
+        place_order = dict(
+            RoutePlaceOrder.objects.filter(route_id=schedule.route_id).values_list('place_id', index_field)
+        )
+        full_mask = _segment_mask(0, max(place_order.values()) + 1) if place_order else 1
+        masks = {}
+        count = 0
+        for b in bookings_by_schedule[schedule.id]:
+            entries = _parse_seat_entries(b.seat)
+            count += len(entries)
+            if b.pickup_point_id in place_order and b.destination_point_id in place_order:
+                mask = _segment_mask(place_order[b.pickup_point_id], place_order[b.destination_point_id])
+            else:
+                mask = full_mask
+            for side, number in entries:
+                key = f'{side}:{number}'
+                masks[key] = masks.get(key, 0) | mask
+        occupancy = {key: format(mask, 'x') for key, mask in masks.items()}
+        VehicleSchedule.objects.filter(pk=schedule.pk).update(seat_occupancy=occupancy, booked_seat_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_routeplaceorder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleschedule',
+            name='booked_seat_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vehicleschedule',
+            name='seat_occupancy',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_seat_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_ticket_seats(apps, schema_editor):
+    """Same rules as booking.services.ticket_seats (parse_seat_entries / segment_orders), on historical models."""
+    VehicleSchedule = apps.get_model('booking', 'VehicleSchedule')
+    VehicleTicketBooking = apps.get_model('booking', 'VehicleTicketBooking')
+    VehicleTicketBookingSeat = apps.get_model('booking', 'VehicleTicketBookingSeat')
+    RoutePlaceOrder = apps.get_model('booking', 'RoutePlaceOrder')
+    place_orders = {}
+    for schedule in VehicleSchedule.objects.filter(ticket_bookings__isnull=False).distinct():
+        index_field = 'reverse_index' if schedule.reverse_direction else 'forward_index'
+        place_orders[schedule.id] = dict(
+            RoutePlaceOrder.objects.filter(route_id=schedule.route_id).values_list('place_id', index_field)
+        )
+    rows = []
+    for b in VehicleTicketBooking.objects.only('id', 'vehicle_schedule_id', 'seat', 'pickup_point_id', 'destination_point_id'):
+        place_order = place_orders.get(b.vehicle_schedule_id, {})
+        if b.pickup_point_id in place_order and b.destination_point_id in place_order:
+            from_order, to_order = place_order[b.pickup_point_id], place_order[b.destination_point_id]
+        else:
+            from_order, to_order = 0, (max(place_order.values()) + 1) if place_order else 1
+        seat = [b.seat] if isinstance(b.seat, dict) else b.seat
+        if not isinstance(seat, list):
+            continue
+        for s in seat:
+            if not isinstance(s, dict) or s.get('side') is None or s.get('number') is None:
+                continue
+            try:
+                number = int(s['number'])
+            except (TypeError, ValueError):
+                continue
+            side = str(s['side'])
+            if len(side) > 10:
+                continue
+            rows.append(VehicleTicketBookingSeat(
+                booking_id=b.id, vehicle_schedule_id=b.vehicle_schedule_id, side=side, number=number,
+                from_order=from_order, to_order=to_order,
+            ))
+    VehicleTicketBookingSeat.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_vehicleschedule_seat_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleTicketBookingSeat',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('side', models.CharField(max_length=10)),
+                ('number', models.IntegerField()),
+                ('from_order', models.IntegerField()),
+                ('to_order', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_seats', to='booking.vehicleticketbooking')),
+                ('vehicle_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ticket_seats', to='booking.vehicleschedule')),
+            ],
+            options={
+                'db_table': 'vehicle_ticket_booking_seats',
+                'indexes': [models.Index(fields=['vehicle_schedule', 'side', 'number'], name='vehicle_tic_vehicle_0d59d6_idx'), models.Index(fields=['booking'], name='vehicle_tic_booking_70c9bc_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ticket_seats, migrations.RunPython.noop),
+    ]
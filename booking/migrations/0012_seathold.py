@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 03:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_vehicleticketbookingseat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(db_index=True, max_length=32)),
+                ('side', models.CharField(max_length=10)),
+                ('number', models.IntegerField()),
+                ('from_order', models.IntegerField()),
+                ('to_order', models.IntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to=settings.AUTH_USER_MODEL)),
+                ('vehicle_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='booking.vehicleschedule')),
+            ],
+            options={
+                'db_table': 'seat_holds',
+                'indexes': [models.Index(fields=['vehicle_schedule', 'side', 'number'], name='seat_holds_vehicle_1494c5_idx'), models.Index(fields=['expires_at'], name='seat_holds_expires_e81062_idx')],
+            },
+        ),
+    ]
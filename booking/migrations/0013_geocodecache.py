@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_seathold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('lat_key', models.IntegerField()),
+                ('lng_key', models.IntegerField()),
+                ('address', models.TextField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+            ],
+            options={
+                'db_table': 'geocode_cache',
+                'indexes': [models.Index(fields=['expires_at'], name='geocode_cac_expires_3d6d22_idx')],
+                'unique_together': {('lat_key', 'lng_key')},
+            },
+        ),
+    ]
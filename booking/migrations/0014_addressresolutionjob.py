@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_geocodecache'),
+        ('core', '0002_supersetting_luna_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressResolutionJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('field', models.CharField(choices=[('check_in_address', 'Check-in address'), ('check_out_address', 'Check-out address')], max_length=20)),
+                ('latitude', models.DecimalField(decimal_places=16, max_digits=20)),
+                ('longitude', models.DecimalField(decimal_places=16, max_digits=20)),
+                ('placeholder', models.TextField(blank=True, default='')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('resolved_address', models.TextField(blank=True, default='')),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+                ('seat_booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='address_jobs', to='booking.seatbooking')),
+                ('transactions', models.ManyToManyField(blank=True, related_name='+', to='core.transaction')),
+            ],
+            options={
+                'db_table': 'address_resolution_jobs',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='address_res_status_d8bacb_idx'), models.Index(fields=['seat_booking', 'status'], name='address_res_seat_bo_0cc6fa_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:00
+
+from django.db import migrations, models
+
+from booking.transliteration import name_search_forms
+
+
+def backfill_name_search_forms(apps, schema_editor):
+    Place = apps.get_model('booking', 'Place')
+    places = list(Place.objects.only('id', 'name'))
+    for place in places:
+        place.name_roman, place.name_phonetic, place.name_skeleton = name_search_forms(place.name)
+    Place.objects.bulk_update(places, ['name_roman', 'name_phonetic', 'name_skeleton'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0014_addressresolutionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='name_phonetic',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='name_roman',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='name_skeleton',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_name_search_forms, migrations.RunPython.noop),
+    ]
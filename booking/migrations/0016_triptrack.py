@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0015_place_search_forms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripTrack',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tolerance_m', models.FloatField()),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('source_point_count', models.PositiveIntegerField(default=0)),
+                ('points', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracks', to='booking.trip')),
+            ],
+            options={
+                'db_table': 'trip_tracks',
+                'constraints': [models.UniqueConstraint(fields=('trip', 'tolerance_m'), name='uniq_trip_track_tolerance')],
+            },
+        ),
+    ]
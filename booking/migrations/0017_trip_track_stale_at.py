@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0016_triptrack'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='track_stale_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
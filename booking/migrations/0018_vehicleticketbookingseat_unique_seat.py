@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 10:30
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_seats(apps, schema_editor):
+    """
+    Keep the first row of each (booking, side, number) so the unique constraint can be added, and
+    recount booked_seat_count of the schedules that lost rows (their masks are unchanged).
+    """
+    VehicleSchedule = apps.get_model('booking', 'VehicleSchedule')
+    VehicleTicketBookingSeat = apps.get_model('booking', 'VehicleTicketBookingSeat')
+    keep = (
+        VehicleTicketBookingSeat.objects.values('booking_id', 'side', 'number')
+        .annotate(keep_id=Min('id')).values_list('keep_id', flat=True)
+    )
+    duplicates = VehicleTicketBookingSeat.objects.exclude(id__in=list(keep))
+    schedule_ids = set(duplicates.values_list('vehicle_schedule_id', flat=True))
+    duplicates.delete()
+    for schedule_id in schedule_ids:
+        count = VehicleTicketBookingSeat.objects.filter(vehicle_schedule_id=schedule_id).count()
+        VehicleSchedule.objects.filter(pk=schedule_id).update(booked_seat_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0017_trip_track_stale_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_seats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vehicleticketbookingseat',
+            constraint=models.UniqueConstraint(fields=('booking', 'side', 'number'), name='uniq_ticket_booking_seat'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from .transliteration import name_search_forms
+
 
 class Place(models.Model):
     """Place/Location model"""
@@ -9,6 +11,10 @@ class Place(models.Model):
     latitude = models.DecimalField(max_digits=20, decimal_places=16)
     longitude = models.DecimalField(max_digits=20, decimal_places=16)
     address = models.TextField(blank=True, null=True)
+    # Search forms of name (booking.transliteration), derived on save for services.place_search
+    name_roman = models.CharField(max_length=255, blank=True, default='', editable=False)
+    name_phonetic = models.CharField(max_length=255, blank=True, default='', editable=False)
+    name_skeleton = models.CharField(max_length=255, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
     updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
     
@@ -19,6 +25,13 @@ class Place(models.Model):
             models.Index(fields=['latitude', 'longitude']),
         ]
     
+    def save(self, *args, **kwargs):
+        self.name_roman, self.name_phonetic, self.name_skeleton = name_search_forms(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'name_roman', 'name_phonetic', 'name_skeleton'}
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.name} ({self.code})"
 
@@ -65,6 +78,28 @@ class RouteStopPoint(models.Model):
         return f"{self.route.name} - {self.place.name} (Order: {self.order})"
 
 
+class RoutePlaceOrder(models.Model):
+    """Traversal index of each place on a route (start, stops, end) in both directions.
+    Derived from Route + RouteStopPoint and rebuilt when they change (see route_order.refresh_route_place_orders)."""
+    id = models.BigAutoField(primary_key=True)
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='place_orders')
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='route_orders')
+    forward_index = models.IntegerField()  # 0 = start_point, 1..n = stops, n+1 = end_point
+    reverse_index = models.IntegerField()  # 0 = end_point, 1..n = stops reversed, n+1 = start_point
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    class Meta:
+        db_table = 'route_place_orders'
+        unique_together = [['route', 'place']]
+        indexes = [
+            models.Index(fields=['place', 'route']),
+        ]
+
+    def __str__(self):
+        return f"{self.route_id} - {self.place_id} ({self.forward_index}/{self.reverse_index})"
+
+
 class Vehicle(models.Model):
     """Vehicle model"""
     id = models.BigAutoField(primary_key=True)
@@ -162,6 +197,9 @@ class VehicleSchedule(models.Model):
     time = models.TimeField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     reverse_direction = models.BooleanField(default=False)
+    # Derived from ticket bookings (services.seat_occupancy): {"side:number": hex bitmask of booked route segments}
+    seat_occupancy = models.JSONField(default=dict, blank=True)
+    booked_seat_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
     updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
 
@@ -189,6 +227,7 @@ class Trip(models.Model):
     is_scheduled = models.BooleanField(default=False)
     vehicle_schedule = models.ForeignKey(VehicleSchedule, on_delete=models.SET_NULL, null=True, blank=True, related_name='trips')
     reverse_direction = models.BooleanField(default=False)
+    track_stale_at = models.DateTimeField(null=True, blank=True, db_index=True)  # last late point after the stored tracks were built
     created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
     updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
 
@@ -214,6 +253,7 @@ class Location(models.Model):
     longitude = models.DecimalField(max_digits=20, decimal_places=16)
     speed = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     course = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)  # direction in degrees 0-360
+    recorded_at = models.DateTimeField(null=True, blank=True)  # client (device) timestamp; set by batch ingest
     created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
     updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
 
@@ -223,11 +263,60 @@ class Location(models.Model):
             models.Index(fields=['vehicle', 'created_at']),
             models.Index(fields=['trip', 'created_at']),
         ]
+        constraints = [
+            # Batch ingest is idempotent on (vehicle, client timestamp); NULLs (single-point ingest) never collide
+            models.UniqueConstraint(fields=['vehicle', 'recorded_at'], name='uniq_location_vehicle_recorded_at'),
+        ]
 
     def __str__(self):
         return f"{self.vehicle.name} @ ({self.latitude}, {self.longitude})"
 
 
+class TripTrack(models.Model):
+    """Simplified (Douglas-Peucker) track of a finished trip at one tolerance, built by services.trip_track after trip end"""
+    id = models.BigAutoField(primary_key=True)
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='tracks')
+    tolerance_m = models.FloatField()
+    point_count = models.PositiveIntegerField(default=0)
+    source_point_count = models.PositiveIntegerField(default=0)  # Location rows the level was simplified from
+    points = models.JSONField(default=list)  # [[location id, "lat", "lng", "speed"|null, "course"|null, "point time"], ...] in track order
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    class Meta:
+        db_table = 'trip_tracks'
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'tolerance_m'], name='uniq_trip_track_tolerance'),
+        ]
+
+    def __str__(self):
+        return f"Trip #{self.trip_id} track @ {self.tolerance_m} m ({self.point_count} points)"
+
+
+class VehicleLastPosition(models.Model):
+    """Last known position per vehicle (one row per vehicle, kept in sync with Location ingest)"""
+    id = models.BigAutoField(primary_key=True)
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, related_name='last_position')
+    trip = models.ForeignKey(Trip, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    latitude = models.DecimalField(max_digits=20, decimal_places=16)
+    longitude = models.DecimalField(max_digits=20, decimal_places=16)
+    speed = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    course = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    recorded_at = models.DateTimeField()  # server-clock time of the mirrored Location: created_at, or recorded_at if earlier
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    class Meta:
+        db_table = 'vehicle_last_positions'
+        indexes = [
+            models.Index(fields=['recorded_at']),
+            models.Index(fields=['updated_at']),  # delta sync of the in-memory nearby index
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle.name} last @ ({self.latitude}, {self.longitude})"
+
+
 class VehicleTicketBooking(models.Model):
     """Ticket booking for a scheduled vehicle trip"""
     id = models.BigAutoField(primary_key=True)
@@ -240,7 +329,7 @@ class VehicleTicketBooking(models.Model):
     pickup_point = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, blank=True, related_name='ticket_bookings_pickup')
     destination_point = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, blank=True, related_name='ticket_bookings_destination')
     ticket_id = models.CharField(max_length=100, unique=True, db_index=True)
-    seat = models.JSONField(default=dict)  # list e.g. [{"side": "A", "number": 1}, ...] or legacy single dict
+    seat = models.JSONField(default=dict)  # list e.g. [{"side": "A", "number": 1}, ...] or legacy single dict; mirrored in booked_seats
     price = models.DecimalField(max_digits=10, decimal_places=2)
     is_paid = models.BooleanField(default=False)
     pnr = models.CharField(max_length=100, db_index=True)  # EYS{ticket_id}
@@ -260,6 +349,55 @@ class VehicleTicketBooking(models.Model):
         return f"{self.pnr} - {self.name}"
 
 
+class VehicleTicketBookingSeat(models.Model):
+    """One booked seat of a ticket booking over route segment [from_order, to_order) of its schedule"""
+    id = models.BigAutoField(primary_key=True)
+    booking = models.ForeignKey(VehicleTicketBooking, on_delete=models.CASCADE, related_name='booked_seats')
+    vehicle_schedule = models.ForeignKey(VehicleSchedule, on_delete=models.CASCADE, related_name='ticket_seats')
+    side = models.CharField(max_length=10)
+    number = models.IntegerField()
+    from_order = models.IntegerField()
+    to_order = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+
+    class Meta:
+        db_table = 'vehicle_ticket_booking_seats'
+        indexes = [
+            models.Index(fields=['vehicle_schedule', 'side', 'number']),
+            models.Index(fields=['booking']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'side', 'number'], name='uniq_ticket_booking_seat'),
+        ]
+
+    def __str__(self):
+        return f"{self.booking_id} - {self.side}{self.number}"
+
+
+class SeatHold(models.Model):
+    """Short-lived hold on a scheduled seat over route segment [from_order, to_order), confirmed by a ticket booking"""
+    id = models.BigAutoField(primary_key=True)
+    token = models.CharField(max_length=32, db_index=True)  # shared by all seats held in one request
+    vehicle_schedule = models.ForeignKey(VehicleSchedule, on_delete=models.CASCADE, related_name='seat_holds')
+    user = models.ForeignKey('core.User', on_delete=models.CASCADE, null=True, blank=True, related_name='seat_holds')
+    side = models.CharField(max_length=10)
+    number = models.IntegerField()
+    from_order = models.IntegerField()
+    to_order = models.IntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+
+    class Meta:
+        db_table = 'seat_holds'
+        indexes = [
+            models.Index(fields=['vehicle_schedule', 'side', 'number']),
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.token} - {self.side}{self.number} (until {self.expires_at})"
+
+
 class SeatBooking(models.Model):
     """Seat booking model"""
     id = models.BigAutoField(primary_key=True)
@@ -299,3 +437,101 @@ class SeatBooking(models.Model):
     def __str__(self):
         user_info = f"{self.user.name if self.user else 'Guest'}"
         return f"{self.vehicle.name} - {self.vehicle_seat.side}{self.vehicle_seat.number} - {user_info}"
+
+
+class GeocodeCache(models.Model):
+    """Persistent reverse-geocode result for one ~25 m lat/lng grid cell (services.reverse_geocode)"""
+    id = models.BigAutoField(primary_key=True)
+    lat_key = models.IntegerField()  # round(latitude * GEOCODE_CELLS_PER_DEGREE)
+    lng_key = models.IntegerField()
+    address = models.TextField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    class Meta:
+        db_table = 'geocode_cache'
+        unique_together = [['lat_key', 'lng_key']]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"({self.lat_key}, {self.lng_key}) {self.address[:50]}"
+
+
+class NodeOutboxEvent(models.Model):
+    """Outbox row for a Node real-time webhook (delivered asynchronously by services.node_dispatcher)"""
+    KIND_CHOICES = [
+        ('seat_booked', 'Seat booked'),
+        ('trip_location', 'Trip location'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    coalesce_key = models.CharField(max_length=100, null=True, blank=True)  # e.g. "trip_location:<trip_id>"; the latest row with the key is reused
+    payload = models.JSONField(default=dict)
+    revision = models.PositiveIntegerField(default=0)  # bumped when the row is reused for a newer payload
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True, default='')
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    class Meta:
+        db_table = 'node_outbox_events'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['coalesce_key', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class AddressResolutionJob(models.Model):
+    """Deferred reverse geocode of a seat booking address (resolved by services.address_resolution)"""
+    FIELD_CHOICES = [
+        ('check_in_address', 'Check-in address'),
+        ('check_out_address', 'Check-out address'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    seat_booking = models.ForeignKey(SeatBooking, on_delete=models.CASCADE, related_name='address_jobs')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    latitude = models.DecimalField(max_digits=20, decimal_places=16)
+    longitude = models.DecimalField(max_digits=20, decimal_places=16)
+    placeholder = models.TextField(blank=True, default='')  # address stored at request time; the field is patched only while unchanged
+    transactions = models.ManyToManyField('core.Transaction', blank=True, related_name='+')  # wallet transactions whose remarks embed the address
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True, default='')
+    resolved_address = models.TextField(blank=True, default='')
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    class Meta:
+        db_table = 'address_resolution_jobs'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['seat_booking', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.field} of booking #{self.seat_booking_id} ({self.status})"
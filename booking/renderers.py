@@ -0,0 +1,49 @@
+"""
+Renderers and responses for the compact track formats (services.track_format).
+
+DRF treats ?format= as a renderer choice, so views offering format=polyline / format=binary list
+these next to the default renderers (TRACK_RENDERER_CLASSES) and branch on
+request.accepted_renderer.format. Clients can also ask for binary with
+Accept: application/octet-stream.
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .services.track_format import TRACK_RECORD, track_binary
+
+
+class TrackPolylineRenderer(JSONRenderer):
+    """JSON body with an encoded polyline track instead of location dicts."""
+    format = 'polyline'
+
+
+class TrackBinaryRenderer(BaseRenderer):
+    """Packed track records; other payloads (errors) are sent as JSON."""
+    media_type = 'application/octet-stream'
+    format = 'binary'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return json.dumps(data).encode('utf-8')
+
+
+TRACK_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, TrackPolylineRenderer, TrackBinaryRenderer]
+
+
+def binary_track_response(points, headers=None):
+    """Response with packed track records; headers describe the track (X-Track-*) and the record layout."""
+    response = Response(track_binary(points), content_type=TrackBinaryRenderer.media_type)
+    response['X-Track-Record-Format'] = TRACK_RECORD.format
+    response['X-Track-Point-Count'] = str(len(points))
+    for name, value in (headers or {}).items():
+        response[name] = '' if value is None else str(value)
+    return response
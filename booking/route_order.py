@@ -1,7 +1,23 @@
 """
 Shared helpers for route place order (forward or reverse).
 Used by trip, vehicle schedule, and ticket booking logic.
+The same order is persisted in RoutePlaceOrder for SQL segment search (refresh_route_place_orders).
 """
+from django.db import transaction
+
+
+def _ordered_stops(route, with_place=False):
+    """
+    Return route stop points sorted by order.
+    Uses prefetched stop_points (e.g. prefetch_related('active_route__stop_points__place')) when present,
+    so list views building details for many routes do not run one query per route.
+    """
+    if 'stop_points' in getattr(route, '_prefetched_objects_cache', {}):
+        return sorted(route.stop_points.all(), key=lambda sp: sp.order)
+    qs = route.stop_points.all()
+    if with_place:
+        qs = qs.select_related('place')
+    return list(qs.order_by('order'))
 
 
 def get_route_place_order(route, reverse=False):
@@ -14,7 +30,7 @@ def get_route_place_order(route, reverse=False):
     if not route:
         return {}
     order_map = {}
-    stops = list(route.stop_points.all().order_by('order'))
+    stops = _ordered_stops(route)
     if reverse:
         order_map[route.end_point_id] = 0
         for i, sp in enumerate(reversed(stops)):
@@ -36,7 +52,7 @@ def get_route_ordered_points(route, reverse=False):
     if not route:
         return []
     points = []
-    stops = list(route.stop_points.all().select_related('place').order_by('order'))
+    stops = _ordered_stops(route, with_place=True)
     if reverse:
         points.append(('start', route.end_point, None))
         for rsp in reversed(stops):
@@ -48,3 +64,20 @@ def get_route_ordered_points(route, reverse=False):
             points.append(('stop', rsp.place, rsp))
         points.append(('end', route.end_point, None))
     return points
+
+
+def refresh_route_place_orders(route_id):
+    """Rebuild RoutePlaceOrder rows for a route from its start/end points and stop points."""
+    from .models import Route, RoutePlaceOrder
+
+    route = Route.objects.filter(pk=route_id).prefetch_related('stop_points').first()
+    if route is None:
+        return  # Deleted route: rows are removed by cascade
+    forward = get_route_place_order(route, reverse=False)
+    reverse = get_route_place_order(route, reverse=True)
+    with transaction.atomic():
+        RoutePlaceOrder.objects.filter(route_id=route_id).delete()
+        RoutePlaceOrder.objects.bulk_create([
+            RoutePlaceOrder(route_id=route_id, place_id=place_id, forward_index=index, reverse_index=reverse[place_id])
+            for place_id, index in forward.items()
+        ])
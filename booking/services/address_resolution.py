@@ -0,0 +1,182 @@
+"""
+Deferred Nominatim fallback for seat booking addresses.
+
+Booking views store the client's address, or "Near <place>" / a cached result from
+reverse_geocode_local, and return. When that still leaves an empty or placeholder address,
+defer_address_resolution writes an AddressResolutionJob in the booking's transaction. Jobs are
+resolved in batches by a single `manage.py resolve_addresses --loop` process: Nominatim's 1 request/s
+limit is enforced per process (reverse_geocode), so web processes do not resolve by default. A
+single-process deployment can set ADDRESS_RESOLUTION_INLINE_WORKER to run a daemon thread that is
+woken after commit instead. Resolving a job patches the booking field, unless it was changed in the
+meantime, and re-renders the remarks of the wallet transactions linked to the job. Lookups that fail are retried with exponential backoff.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from core.models import Transaction
+
+from ..models import AddressResolutionJob, SeatBooking
+from .background_worker import BackgroundWorker
+from .reverse_geocode import needs_reverse_geocode, reverse_geocode
+
+logger = logging.getLogger(__name__)
+
+# Booking address field -> (lat field, lng field)
+ADDRESS_FIELDS = {
+    'check_in_address': ('check_in_lat', 'check_in_lng'),
+    'check_out_address': ('check_out_lat', 'check_out_lng'),
+}
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+CLAIM_LEASE_SECONDS = 60  # a claimed job is skipped by other workers until the lease expires
+SWEEP_INTERVAL_SECONDS = 10
+BATCH_SIZE = 50
+
+_stats_lock = threading.Lock()
+_stats = {
+    'deferred': 0,
+    'resolved': 0,
+    'superseded': 0,
+    'retried': 0,
+    'failed': 0,
+    'remarks_updated': 0,
+}
+
+
+def _bump(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def _backoff_seconds(attempts):
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+
+
+def defer_address_resolution(booking, field, transactions=()):
+    """
+    Queue a Nominatim lookup for booking.<field> when it is empty or a placeholder.
+    transactions: wallet transactions whose remarks embed the address. Returns the job or None.
+    """
+    lat_field, lng_field = ADDRESS_FIELDS[field]
+    placeholder = getattr(booking, field)
+    lat, lng = getattr(booking, lat_field), getattr(booking, lng_field)
+    if lat is None or lng is None or not needs_reverse_geocode(placeholder):
+        return None
+    job = AddressResolutionJob.objects.create(
+        seat_booking=booking,
+        field=field,
+        latitude=lat,
+        longitude=lng,
+        placeholder=placeholder or '',
+        next_attempt_at=timezone.now(),
+    )
+    if transactions:
+        job.transactions.add(*transactions)
+    _bump('deferred')
+    if getattr(settings, 'ADDRESS_RESOLUTION_INLINE_WORKER', False):
+        transaction.on_commit(_worker.wake)
+    return job
+
+
+def link_address_transaction(booking, wallet_transaction):
+    """
+    Link a wallet transaction whose remarks embed the booking's addresses to its address jobs.
+    Jobs that already resolved re-render the remarks right away.
+    """
+    for job in AddressResolutionJob.objects.filter(seat_booking=booking).exclude(status='failed'):
+        if job.status == 'pending':
+            job.transactions.add(wallet_transaction)
+        else:
+            _rerender_remarks([wallet_transaction], job.field, job.placeholder, job.resolved_address)
+
+
+def render_remarks(remarks, field, old_address, new_address):
+    """Replace an address rendered into wallet remarks ('| From: <a> →' / '→ To: <a> |')."""
+    old_label, new_label = old_address or 'N/A', new_address or 'N/A'
+    if field == 'check_in_address':
+        return remarks.replace(f' | From: {old_label} →', f' | From: {new_label} →')
+    return remarks.replace(f'→ To: {old_label} | ', f'→ To: {new_label} | ')
+
+
+def _rerender_remarks(transactions, field, old_address, new_address):
+    for wallet_transaction in transactions:
+        remarks = render_remarks(wallet_transaction.remarks or '', field, old_address, new_address)
+        if remarks != (wallet_transaction.remarks or ''):
+            Transaction.objects.filter(pk=wallet_transaction.pk).update(
+                remarks=remarks, updated_at=timezone.now(),
+            )
+            _bump('remarks_updated')
+
+
+def _handle(_items):
+    while resolve_due():
+        pass
+
+
+_worker = BackgroundWorker('address-resolution', _handle, SWEEP_INTERVAL_SECONDS)
+
+
+def _resolve_one(job):
+    now = timezone.now()
+    claimed = AddressResolutionJob.objects.filter(
+        pk=job.pk, status='pending', next_attempt_at__lte=now,
+    ).update(next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS))
+    if not claimed:
+        return
+    address = reverse_geocode(job.latitude, job.longitude, max_wait=None)
+    done_at = timezone.now()
+    attempts = job.attempts + 1
+    if not address:
+        if attempts >= MAX_ATTEMPTS:
+            AddressResolutionJob.objects.filter(pk=job.pk).update(
+                status='failed', attempts=attempts, last_error='no result',
+            )
+            _bump('failed')
+            return
+        AddressResolutionJob.objects.filter(pk=job.pk).update(
+            attempts=attempts,
+            last_error='no result',
+            next_attempt_at=done_at + timedelta(seconds=_backoff_seconds(attempts)),
+        )
+        _bump('retried')
+        return
+    with transaction.atomic():
+        patched = SeatBooking.objects.filter(pk=job.seat_booking_id, **{job.field: job.placeholder}).update(
+            **{job.field: address}, updated_at=done_at,
+        )
+        if patched:
+            _rerender_remarks(job.transactions.all(), job.field, job.placeholder, address)
+        AddressResolutionJob.objects.filter(pk=job.pk).update(
+            status='done', attempts=attempts, last_error='', resolved_address=address, resolved_at=done_at,
+        )
+    # Not patched: the address was edited after the booking request; the job is done either way
+    _bump('resolved' if patched else 'superseded')
+
+
+def resolve_due(limit=BATCH_SIZE):
+    """Resolve one batch of pending jobs whose next_attempt_at has passed. Returns the number taken."""
+    jobs = list(
+        AddressResolutionJob.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at')[:limit]
+    )
+    for job in jobs:
+        _resolve_one(job)
+    return len(jobs)
+
+
+def get_address_resolution_stats():
+    """Counters for this process plus pending jobs and the age of the oldest one."""
+    with _stats_lock:
+        stats = dict(_stats)
+    pending = AddressResolutionJob.objects.filter(status='pending').aggregate(count=Count('id'), oldest=Min('created_at'))
+    stats['pending'] = pending['count']
+    oldest = pending['oldest']
+    stats['oldest_pending_age_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return stats
@@ -0,0 +1,62 @@
+"""
+Per-process daemon worker threads for the outbox-style services (node_dispatcher, address_resolution,
+trip_track).
+
+A BackgroundWorker owns a queue and a daemon thread started on the first wake(). The thread calls
+handler(items) with up to batch_size queued items as soon as something is queued, and with an empty
+list at least every interval seconds so rows left by other or restarted processes are swept up.
+Handler errors are logged and the loop keeps running.
+"""
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    def __init__(self, name, handler, interval, batch_size=1):
+        self.name = name
+        self.handler = handler
+        self.interval = interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def wake(self, item=None):
+        """Start the thread if needed and queue item (None: just run the handler)."""
+        self._ensure_thread()
+        self._queue.put(item)
+
+    def put(self, item):
+        """Queue item for a running thread without starting one (e.g. from inside the handler)."""
+        self._queue.put(item)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            items = []
+            try:
+                items.append(self._queue.get(timeout=self.interval))
+                while len(items) < self.batch_size:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                close_old_connections()
+                self.handler([item for item in items if item is not None])
+            except Exception:
+                logger.exception('%s worker error', self.name)
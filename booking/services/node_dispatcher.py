@@ -0,0 +1,247 @@
+"""
+Outbox dispatcher for Node real-time webhooks.
+
+Events are written to NodeOutboxEvent (durable) and their ids are pushed onto an in-process
+queue once the surrounding transaction commits. A daemon worker thread delivers them over a
+keep-alive requests.Session, so a slow Node server no longer adds latency to the request thread.
+Per-trip location events reuse one row per trip that always holds the latest point; failed
+deliveries are retried with exponential backoff. Rows left behind by a restarted process are picked up by the worker's
+periodic sweep or by `manage.py dispatch_node_outbox`.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from ..models import NodeOutboxEvent
+from .background_worker import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+EVENT_PATHS = {
+    'seat_booked': '/internal/seat-booked',
+    'trip_location': '/internal/trip-location',
+}
+EVENT_TIMEOUTS = {
+    'seat_booked': 3,
+    'trip_location': 2,
+}
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 300
+CLAIM_LEASE_SECONDS = 30  # a claimed row is skipped by other workers until the lease expires
+SWEEP_INTERVAL_SECONDS = 5
+BATCH_SIZE = 100
+
+_session = None  # keep-alive session, used by the worker thread only
+_last_sweep = 0.0
+_stats_lock = threading.Lock()
+_stats = {
+    'enqueued': 0,
+    'coalesced': 0,
+    'delivered': 0,
+    'retried': 0,
+    'failed': 0,
+    'last_delivery_lag_seconds': None,
+    'max_delivery_lag_seconds': 0.0,
+}
+
+
+def get_node_base_url():
+    """Return NODE_BASE_URL with scheme, or '' when Node notifications are disabled."""
+    base_url = getattr(settings, 'NODE_BASE_URL', '') or ''
+    if not base_url:
+        return ''
+    if not base_url.startswith(('http://', 'https://')):
+        base_url = 'https://' + base_url
+    return base_url
+
+
+def _bump(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def _record_lag(lag_seconds):
+    with _stats_lock:
+        _stats['last_delivery_lag_seconds'] = lag_seconds
+        if lag_seconds > _stats['max_delivery_lag_seconds']:
+            _stats['max_delivery_lag_seconds'] = lag_seconds
+
+
+def _backoff_seconds(attempts):
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+
+
+def enqueue(kind, payload, coalesce_key=None):
+    """
+    Store an outbox event and schedule delivery after the current transaction commits.
+    With coalesce_key, the latest event with the same key (pending, delivered or failed) is reused:
+    it gets the new payload and is due again now, so the outbox keeps one row per key and a new point
+    never waits behind an older one's retry backoff.
+    Returns the created NodeOutboxEvent, or None if coalesced / Node is not configured.
+    """
+    if not get_node_base_url():
+        return None
+    now = timezone.now()
+    if coalesce_key:
+        event_id = (
+            NodeOutboxEvent.objects.filter(coalesce_key=coalesce_key)
+            .order_by('-id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if event_id is not None:
+            NodeOutboxEvent.objects.filter(pk=event_id).update(
+                payload=payload, revision=F('revision') + 1, status='pending', attempts=0, last_error='',
+                delivered_at=None, next_attempt_at=now, updated_at=now,
+            )
+            _bump('coalesced')
+            _push_on_commit(event_id)
+            return None
+    event = NodeOutboxEvent.objects.create(
+        kind=kind, coalesce_key=coalesce_key, payload=payload, next_attempt_at=now,
+    )
+    _bump('enqueued')
+    _push_on_commit(event.id)
+    return event
+
+
+def _push_on_commit(event_id):
+    if getattr(settings, 'NODE_OUTBOX_INLINE_WORKER', True):
+        transaction.on_commit(lambda: _push(event_id))
+
+
+def _push(event_id):
+    _worker.wake(event_id)
+
+
+def _handle(ids):
+    global _session, _last_sweep
+    if _session is None:
+        _session = requests.Session()
+    if ids:
+        deliver_events(ids, _session)
+    if time.monotonic() - _last_sweep >= SWEEP_INTERVAL_SECONDS:
+        _last_sweep = time.monotonic()
+        dispatch_due(_session)
+
+
+_worker = BackgroundWorker('node-outbox-dispatcher', _handle, SWEEP_INTERVAL_SECONDS, batch_size=BATCH_SIZE)
+
+
+def _post(kind, payload, session):
+    """POST one event to Node. Returns (ok, retryable, error)."""
+    url = f'{get_node_base_url()}{EVENT_PATHS[kind]}'
+    try:
+        resp = session.post(url, json=payload, timeout=EVENT_TIMEOUTS.get(kind, 3))
+    except requests.exceptions.RequestException as e:
+        return False, True, str(e)
+    if resp.status_code >= 400:
+        retryable = resp.status_code >= 500 or resp.status_code in (408, 429)
+        return False, retryable, f'{resp.status_code} {resp.text[:200]}'
+    return True, False, ''
+
+
+def deliver_events(ids, session):
+    """
+    Deliver the given pending events. Older events sharing a coalesce_key with a newer one in the
+    same batch are marked delivered without being sent (only the latest location matters).
+    """
+    events = list(
+        NodeOutboxEvent.objects.filter(pk__in=set(ids), status='pending').order_by('id')
+    )
+    latest_by_key = {}
+    to_send = []
+    for event in events:
+        if event.coalesce_key:
+            latest_by_key[event.coalesce_key] = event
+        else:
+            to_send.append(event)
+    superseded = [e.pk for e in events if e.coalesce_key and latest_by_key[e.coalesce_key].pk != e.pk]
+    if superseded:
+        NodeOutboxEvent.objects.filter(pk__in=superseded, status='pending').update(
+            status='delivered', delivered_at=timezone.now(), last_error='superseded',
+        )
+        _bump('coalesced', len(superseded))
+    to_send.extend(latest_by_key.values())
+    for event in sorted(to_send, key=lambda e: e.pk):
+        _deliver_one(event, session)
+
+
+def _deliver_one(event, session):
+    now = timezone.now()
+    claimed = NodeOutboxEvent.objects.filter(
+        pk=event.pk, status='pending', next_attempt_at__lte=now,
+    ).update(next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS))
+    if not claimed:
+        return
+    event.refresh_from_db(fields=['payload', 'revision', 'attempts', 'updated_at'])
+    ok, retryable, error = _post(event.kind, event.payload, session)
+    done_at = timezone.now()
+    attempts = event.attempts + 1
+    if ok:
+        marked = NodeOutboxEvent.objects.filter(pk=event.pk, revision=event.revision).update(
+            status='delivered', delivered_at=done_at, attempts=attempts, last_error='', updated_at=done_at,
+        )
+        _bump('delivered')
+        _record_lag((done_at - event.updated_at).total_seconds())
+        if not marked:
+            _requeue_coalesced(event, done_at)
+        return
+    if not retryable or attempts >= MAX_ATTEMPTS:
+        marked = NodeOutboxEvent.objects.filter(pk=event.pk, revision=event.revision).update(
+            status='failed', attempts=attempts, last_error=error,
+        )
+        if not marked:
+            _requeue_coalesced(event, done_at)
+            return
+        _bump('failed')
+        logger.warning('Node %s webhook failed permanently (event %s): %s', event.kind, event.pk, error)
+        return
+    marked = NodeOutboxEvent.objects.filter(pk=event.pk, revision=event.revision).update(
+        attempts=attempts,
+        last_error=error,
+        next_attempt_at=done_at + timedelta(seconds=_backoff_seconds(attempts)),
+    )
+    if not marked:
+        _requeue_coalesced(event, done_at)
+        return
+    _bump('retried')
+    logger.warning('Node %s webhook error (event %s, attempt %s): %s', event.kind, event.pk, attempts, error)
+
+
+def _requeue_coalesced(event, done_at):
+    """A newer payload was coalesced into the row while this send was in flight: send it right away."""
+    NodeOutboxEvent.objects.filter(pk=event.pk).update(next_attempt_at=done_at)
+    _worker.put(event.pk)
+
+
+def dispatch_due(session, limit=BATCH_SIZE):
+    """Deliver pending events whose next_attempt_at has passed (retries and rows from a restarted process)."""
+    ids = list(
+        NodeOutboxEvent.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:limit]
+    )
+    if ids:
+        deliver_events(ids, session)
+    return len(ids)
+
+
+def get_dispatcher_stats():
+    """Counters for this process plus outbox queue depth and age of the oldest pending event."""
+    with _stats_lock:
+        stats = dict(_stats)
+    pending = NodeOutboxEvent.objects.filter(status='pending').aggregate(count=Count('id'), oldest=Min('updated_at'))
+    stats['queue_depth'] = _worker.qsize()
+    stats['pending'] = pending['count']
+    oldest = pending['oldest']
+    stats['oldest_pending_age_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return stats
@@ -0,0 +1,208 @@
+"""
+In-memory prefix index (per process) for places/autocomplete/.
+
+A sorted array of (key, kind, id, form) tuples answers a prefix with one bisect plus a short forward
+scan. Keys are a place's name (lowercase, no spaces), code, name_roman, name_phonetic and
+name_skeleton, and a route's name in the same forms. Display payloads are kept next to the array,
+so a lookup runs no queries. Whole-key matches on name, code or romanized name rank first, then
+prefix matches by form. Place and Route signals update single entries in place (insert/remove with bisect).
+Changes made by other processes are picked up by a full rebuild when the Place/Route table
+signature changes, checked at most every PLACE_INDEX_CHECK_SECONDS. version() identifies the
+indexed data for ETags.
+"""
+import bisect
+import hashlib
+import logging
+import threading
+import time
+
+from django.db.models import Count, Max
+
+from ..models import Place, Route
+from ..transliteration import consonant_skeleton, name_search_forms, normalize_phonetic, romanize
+from .place_index import PLACE_INDEX_CHECK_SECONDS, place_table_signature
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_MAX_AGE_SECONDS = 60  # Cache-Control max-age; clients revalidate with the ETag afterwards
+CANDIDATES_PER_FORM = 50
+
+# Form rank: lower is a stronger match for the same prefix
+FORM_NAME = 0
+FORM_CODE = 1
+FORM_ROMAN = 2
+FORM_PHONETIC = 3
+FORM_SKELETON = 4
+SKELETON_MIN_LENGTH = 2
+KIND_ORDER = {'place': 0, 'route': 1}
+
+
+def _compact(text):
+    return ''.join((text or '').lower().split())
+
+
+def route_table_signature():
+    """(count, latest updated_at) of the Route table."""
+    agg = Route.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    return agg['count'], agg['latest']
+
+
+def _place_keys(name, code, roman, phonetic, skeleton):
+    keys = {
+        (_compact(name), FORM_NAME),
+        (_compact(code), FORM_CODE),
+        (_compact(roman), FORM_ROMAN),
+        (phonetic or '', FORM_PHONETIC),
+        (skeleton or '', FORM_SKELETON),
+    }
+    return {(key, form) for key, form in keys if key}
+
+
+def _route_keys(name):
+    roman, phonetic, skeleton = name_search_forms(name)
+    keys = {(_compact(name), FORM_NAME), (_compact(roman), FORM_ROMAN), (phonetic, FORM_PHONETIC), (skeleton, FORM_SKELETON)}
+    return {(key, form) for key, form in keys if key}
+
+
+def _place_payload(place_id, name, code, lat, lng):
+    return {'type': 'place', 'id': str(place_id), 'name': name, 'code': code, 'latitude': str(lat), 'longitude': str(lng)}
+
+
+def _route_payload(route_id, name):
+    return {'type': 'route', 'id': str(route_id), 'name': name}
+
+
+class PrefixIndex:
+    """Sorted (key, kind, id, form) array plus (kind, id) -> (keys, payload)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = None
+        self._items = {}
+        self._signature = None
+        self._checked_at = 0.0
+
+    # --- Writes ------------------------------------------------------------------------
+
+    def load(self, places, routes):
+        """
+        Replace the contents. places: rows of (id, name, code, name_roman, name_phonetic, name_skeleton, lat, lng);
+        routes: rows of (id, name).
+        """
+        items = {}
+        entries = []
+        for place_id, name, code, roman, phonetic, skeleton, lat, lng in places:
+            keys = _place_keys(name, code, roman, phonetic, skeleton)
+            items[('place', place_id)] = (keys, _place_payload(place_id, name, code, lat, lng))
+            entries.extend((key, 'place', place_id, form) for key, form in keys)
+        for route_id, name in routes:
+            keys = _route_keys(name)
+            items[('route', route_id)] = (keys, _route_payload(route_id, name))
+            entries.extend((key, 'route', route_id, form) for key, form in keys)
+        entries.sort()
+        with self._lock:
+            self._entries, self._items = entries, items
+
+    def _remove_locked(self, kind, item_id):
+        old = self._items.pop((kind, item_id), None)
+        if old is None:
+            return
+        for key, form in old[0]:
+            entry = (key, kind, item_id, form)
+            i = bisect.bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def _put(self, kind, item_id, keys, payload):
+        with self._lock:
+            if self._entries is None:
+                return  # not built yet; the first lookup loads everything
+            self._remove_locked(kind, item_id)
+            self._items[(kind, item_id)] = (keys, payload)
+            for key, form in keys:
+                bisect.insort(self._entries, (key, kind, item_id, form))
+        self._resign()
+
+    def _resign(self):
+        """Adopt the current table signature after applying a committed change, so it does not force a rebuild."""
+        signature = (place_table_signature(), route_table_signature())
+        with self._lock:
+            self._signature = signature
+
+    def upsert_place(self, place):
+        keys = _place_keys(place.name, place.code, place.name_roman, place.name_phonetic, place.name_skeleton)
+        self._put('place', place.pk, keys, _place_payload(place.pk, place.name, place.code, place.latitude, place.longitude))
+
+    def upsert_route(self, route):
+        self._put('route', route.pk, _route_keys(route.name), _route_payload(route.pk, route.name))
+
+    def remove(self, kind, item_id):
+        with self._lock:
+            if self._entries is None:
+                return
+            self._remove_locked(kind, item_id)
+        self._resign()
+
+    # --- Reads -------------------------------------------------------------------------
+
+    def _ensure_current(self):
+        with self._lock:
+            built = self._entries is not None
+            check = time.monotonic() - self._checked_at >= PLACE_INDEX_CHECK_SECONDS
+        if built and not check:
+            return
+        signature = (place_table_signature(), route_table_signature())
+        if built and signature == self._signature:
+            with self._lock:
+                self._checked_at = time.monotonic()
+            return
+        self.load(
+            Place.objects.values_list(
+                'id', 'name', 'code', 'name_roman', 'name_phonetic', 'name_skeleton', 'latitude', 'longitude',
+            ),
+            Route.objects.values_list('id', 'name'),
+        )
+        logger.info('Autocomplete index built with %s places/routes', len(self._items))
+        with self._lock:
+            self._signature = signature
+            self._checked_at = time.monotonic()
+
+    def version(self):
+        """Opaque id of the indexed data, derived from the table signatures (same in every in-sync process)."""
+        self._ensure_current()
+        with self._lock:
+            raw = repr(self._signature)
+        return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+    def lookup(self, query, limit=AUTOCOMPLETE_DEFAULT_LIMIT):
+        """Top `limit` payloads whose keys start with the query (as typed, romanized, phonetic or consonant skeleton)."""
+        self._ensure_current()
+        prefixes = {_compact(query), _compact(romanize(query)), normalize_phonetic(query)}
+        skeleton = consonant_skeleton(query)
+        if len(skeleton) >= SKELETON_MIN_LENGTH:
+            prefixes.add(skeleton)
+        prefixes.discard('')
+        best = {}
+        with self._lock:
+            entries = self._entries
+            for prefix in prefixes:
+                i = bisect.bisect_left(entries, (prefix,))
+                taken = 0
+                while i < len(entries) and taken < CANDIDATES_PER_FORM:
+                    key, kind, item_id, form = entries[i]
+                    if not key.startswith(prefix):
+                        break
+                    rank = (not (key == prefix and form <= FORM_ROMAN), form, KIND_ORDER[kind])
+                    ref = (kind, item_id)
+                    if ref not in best or rank < best[ref]:
+                        best[ref] = rank
+                    taken += 1
+                    i += 1
+            items = self._items
+            ranked = sorted(best, key=lambda ref: (best[ref], len(items[ref][1]['name']), items[ref][1]['name'].lower(), ref[1]))
+            return [items[ref][1] for ref in ranked[:limit]]
+
+
+autocomplete_index = PrefixIndex()
@@ -0,0 +1,101 @@
+"""
+In-memory nearest-Place index (per process) for offline reverse geocoding.
+
+Places are bucketed into a uniform lat/lng grid; a nearest query only measures places in the cells
+covering the search radius. The index is built lazily on first use, dropped by the Place signals
+in this process, and rebuilt when the Place table's (count, latest updated_at) signature changes,
+which is checked at most every PLACE_INDEX_CHECK_SECONDS so edits made by other processes are
+picked up too.
+"""
+import logging
+import math
+import threading
+import time
+
+from django.db.models import Count, Max
+
+from ..geo import haversine_many
+from ..models import Place
+from .spatial_index import bbox_for_radius
+
+logger = logging.getLogger(__name__)
+
+PLACE_CELL_SIZE_DEG = 0.01  # ~1.1 km cells
+PLACE_INDEX_CHECK_SECONDS = 60
+
+
+def _cell(lat, lng):
+    return (math.floor(lat / PLACE_CELL_SIZE_DEG), math.floor(lng / PLACE_CELL_SIZE_DEG))
+
+
+def place_table_signature():
+    """(count, latest updated_at) of the Place table; changes whenever a place is added, edited or removed."""
+    agg = Place.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    return agg['count'], agg['latest']
+
+
+class PlaceGridIndex:
+    """Uniform lat/lng grid: cell -> [(lat, lng, place_id, name)]."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        """Drop the index; the next query rebuilds it."""
+        with self._lock:
+            self._cells = None
+
+    def _build(self):
+        signature = place_table_signature()
+        cells = {}
+        for place_id, name, lat, lng in Place.objects.values_list('id', 'name', 'latitude', 'longitude'):
+            lat, lng = float(lat), float(lng)
+            cells.setdefault(_cell(lat, lng), []).append((lat, lng, place_id, name))
+        logger.info('Place index built with %s places', signature[0])
+        return cells, signature
+
+    def _current_cells(self):
+        with self._lock:
+            cells = self._cells
+            check = time.monotonic() - self._checked_at >= PLACE_INDEX_CHECK_SECONDS
+        if cells is not None and check:
+            if place_table_signature() != self._signature:
+                cells = None
+            with self._lock:
+                self._checked_at = time.monotonic()
+        if cells is None:
+            cells, signature = self._build()
+            with self._lock:
+                self._cells, self._signature = cells, signature
+                self._checked_at = time.monotonic()
+        return cells
+
+    def nearest(self, lat, lng, radius_m):
+        """(place_id, name, distance_m) of the nearest place within radius_m, or None."""
+        lat, lng = float(lat), float(lng)
+        cells = self._current_cells()
+        min_lat, max_lat, min_lng, max_lng = bbox_for_radius(lat, lng, radius_m / 1000.0)
+        if min_lng is None:
+            return None
+        r0, c0 = _cell(min_lat, min_lng)
+        r1, c1 = _cell(max_lat, max_lng)
+        candidates = []
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                bucket = cells.get((r, c))
+                if bucket:
+                    candidates.extend(bucket)
+        if not candidates:
+            return None
+        dists = haversine_many(lat, lng, [p[0] for p in candidates], [p[1] for p in candidates])
+        best_km, best = min(zip(dists, candidates), key=lambda x: x[0])
+        distance_m = best_km * 1000.0
+        if distance_m > radius_m:
+            return None
+        return best[2], best[3], distance_m
+
+
+place_index = PlaceGridIndex()
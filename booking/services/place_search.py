@@ -0,0 +1,176 @@
+"""
+In-memory place name search index (per process) for Nepali / romanized / phonetic queries.
+
+Matches exactly what transliteration.search_matches accepts, without transliterating every place
+per request. Each place is indexed under four forms of its name: lowercase without spaces
+("direct"), and the stored name_roman, name_phonetic and name_skeleton columns. For each form,
+a trigram posting list answers "query inside name" (the shortest posting list is checked with
+a substring test), and an exact-value map answers "name inside query" from the query's
+substrings. The cost grows with the number of candidates instead of the number of places.
+
+Results are ranked exact > prefix > substring > phonetic > skeleton > name inside the query, then
+by name. The index is built lazily, dropped by the Place signals in this process, and rebuilt
+when the Place table signature changes (checked at most every PLACE_INDEX_CHECK_SECONDS).
+"""
+import logging
+import threading
+import time
+
+from ..models import Place
+from ..transliteration import consonant_skeleton, normalize_phonetic, romanize
+from .place_index import PLACE_INDEX_CHECK_SECONDS, place_table_signature
+
+logger = logging.getLogger(__name__)
+
+NGRAM = 3
+FORMS = ('direct', 'roman', 'phonetic', 'skeleton')
+SKELETON_MIN_LENGTH = 2
+
+RANK_EXACT = 0
+RANK_PREFIX = 1
+RANK_SUBSTRING = 2
+RANK_PHONETIC = 3
+RANK_SKELETON = 4
+RANK_WITHIN_QUERY = 5  # the whole name occurs inside the query (e.g. place "A" for "chowk a")
+
+
+def _direct_form(text):
+    return ''.join((text or '').lower().split())
+
+
+class PlaceSearchIndex:
+    """Per-form trigram postings and exact-value maps over place names."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        """Drop the index; the next search rebuilds it."""
+        with self._lock:
+            self._data = None
+
+    @staticmethod
+    def build(rows):
+        """Index data from rows of (place_id, name, name_roman, name_phonetic, name_skeleton)."""
+        names = {}
+        values = {form: {} for form in FORMS}
+        grams = {form: {} for form in FORMS}
+        exact = {form: {} for form in FORMS}
+        max_length = dict.fromkeys(FORMS, 0)
+        for place_id, name, roman, phonetic, skeleton in rows:
+            names[place_id] = name or ''
+            for form, value in zip(FORMS, (_direct_form(name), roman or '', phonetic or '', skeleton or '')):
+                values[form][place_id] = value
+                exact[form].setdefault(value, []).append(place_id)
+                max_length[form] = max(max_length[form], len(value))
+                form_grams = grams[form]
+                for gram in {value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1)}:
+                    form_grams.setdefault(gram, []).append(place_id)
+        return {'names': names, 'values': values, 'grams': grams, 'exact': exact, 'max_length': max_length}
+
+    def load(self, rows):
+        """Replace the index contents (benchmarks; the view path loads from the Place table)."""
+        data = self.build(rows)
+        with self._lock:
+            self._data = data
+            self._signature = None
+            self._checked_at = float('inf')
+
+    def _current_data(self):
+        with self._lock:
+            data = self._data
+            check = time.monotonic() - self._checked_at >= PLACE_INDEX_CHECK_SECONDS
+        if data is not None and check:
+            if place_table_signature() != self._signature:
+                data = None
+            with self._lock:
+                self._checked_at = time.monotonic()
+        if data is None:
+            signature = place_table_signature()
+            data = self.build(Place.objects.values_list('id', 'name', 'name_roman', 'name_phonetic', 'name_skeleton'))
+            logger.info('Place search index built with %s places', len(data['names']))
+            with self._lock:
+                self._data, self._signature = data, signature
+                self._checked_at = time.monotonic()
+        return data
+
+    @staticmethod
+    def _containing(data, form, query):
+        """Ids whose form value contains query."""
+        values = data['values'][form]
+        if len(query) < NGRAM:
+            return {place_id for place_id, value in values.items() if query in value}
+        grams = data['grams'][form]
+        shortest = None
+        for i in range(len(query) - NGRAM + 1):
+            posting = grams.get(query[i:i + NGRAM])
+            if not posting:
+                return set()
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+        return {place_id for place_id in shortest if query in values[place_id]}
+
+    @staticmethod
+    def _contained(data, form, query):
+        """Ids whose form value is a substring of query (including empty values)."""
+        exact = data['exact'][form]
+        found = set(exact.get('', ()))
+        longest = min(len(query), data['max_length'][form])
+        for i in range(len(query)):
+            for j in range(i + 1, min(len(query), i + longest) + 1):
+                ids = exact.get(query[i:j])
+                if ids:
+                    found.update(ids)
+        return found
+
+    def search(self, query):
+        """Ranked place ids matching query (same matches as transliteration.search_matches)."""
+        query = (query or '').strip()
+        if not query:
+            return []
+        data = self._current_data()
+        q_direct = _direct_form(query)
+        q_roman = romanize(query)
+        q_phonetic = normalize_phonetic(query)
+        q_skeleton = consonant_skeleton(query)
+
+        # Query inside the name, per form
+        substring = self._containing(data, 'direct', q_direct)
+        contained = self._contained(data, 'direct', q_direct)
+        if q_roman:
+            substring |= self._containing(data, 'roman', q_roman)
+            contained |= self._contained(data, 'roman', q_roman)
+        phonetic = set()
+        if q_phonetic:
+            phonetic = self._containing(data, 'phonetic', q_phonetic)
+            contained |= self._contained(data, 'phonetic', q_phonetic)
+        skeleton = set()
+        if len(q_skeleton) >= SKELETON_MIN_LENGTH:
+            skeleton = self._containing(data, 'skeleton', q_skeleton)
+
+        direct_values = data['values']['direct']
+        roman_values = data['values']['roman']
+        names = data['names']
+
+        def _rank(place_id):
+            if place_id in substring:
+                direct, roman = direct_values[place_id], roman_values[place_id]
+                if direct == q_direct or (q_roman and roman == q_roman):
+                    return RANK_EXACT
+                if direct.startswith(q_direct) or (q_roman and roman.startswith(q_roman)):
+                    return RANK_PREFIX
+                return RANK_SUBSTRING
+            if place_id in phonetic:
+                return RANK_PHONETIC
+            if place_id in skeleton:
+                return RANK_SKELETON
+            return RANK_WITHIN_QUERY
+
+        matches = substring | contained | phonetic | skeleton
+        return sorted(matches, key=lambda pid: (_rank(pid), names[pid].lower(), pid))
+
+
+place_search_index = PlaceSearchIndex()
@@ -1,18 +1,68 @@
 """Reverse geocoding for seat booking addresses (lat/lng → human-readable text).
 
+Points within PLACE_GEOCODE_RADIUS_METERS of a stored Place are answered offline as "Near <place>"
+from the in-memory place index (services.place_index). Other points fall back to Nominatim, which
+booking views never call inline: they store the placeholder and services.address_resolution patches
+the address from a background worker.
+
 Uses Nominatim (OpenStreetMap). Policy: https://operations.osmfoundation.org/policies/nominatim/
 Always send a valid User-Agent (see NOMINATIM_USER_AGENT in settings).
+
+Results are cached per ~25 m grid cell in two levels: an in-process LRU and the GeocodeCache table
+(TTL GEOCODE_CACHE_TTL_SECONDS). Concurrent misses for one cell share a single request, and
+requests are spaced at least 1 s apart per process (so only one process may call Nominatim:
+the resolve_addresses worker, see services.address_resolution); a caller that would wait longer than
+NOMINATIM_MAX_WAIT_SECONDS gets None (the placeholder address is kept) instead of blocking.
 """
 import json
 import logging
+import threading
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
+from collections import OrderedDict
+from datetime import timedelta
 
 from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from ..models import GeocodeCache
+from .place_index import place_index
 
 logger = logging.getLogger(__name__)
 
+# 4000 cells per degree = 0.00025 deg (~28 m latitude, ~25 m longitude at 27.7 N)
+GEOCODE_CELLS_PER_DEGREE = 4000
+GEOCODE_DB_TTL_SECONDS = getattr(settings, 'GEOCODE_CACHE_TTL_SECONDS', 30 * 24 * 3600)
+GEOCODE_MEMORY_TTL_SECONDS = 3600
+GEOCODE_NEGATIVE_TTL_SECONDS = 60
+GEOCODE_MEMORY_MAX_ENTRIES = 4096
+# Nominatim usage policy: at most 1 request per second
+NOMINATIM_MIN_INTERVAL_SECONDS = 1.0
+NOMINATIM_MAX_WAIT_SECONDS = getattr(settings, 'NOMINATIM_MAX_WAIT_SECONDS', 2.0)
+PLACE_GEOCODE_RADIUS_METERS = getattr(settings, 'PLACE_GEOCODE_RADIUS_METERS', 300)
+
+_lru_lock = threading.Lock()
+_lru = OrderedDict()  # (lat_key, lng_key) -> (address or None, monotonic expiry)
+_inflight_lock = threading.Lock()
+_inflight = {}  # (lat_key, lng_key) -> threading.Event set when the leader's lookup finishes
+_rate_lock = threading.Lock()
+_next_request_at = 0.0
+
+_stats_lock = threading.Lock()
+_stats = {
+    'place_hits': 0,
+    'memory_hits': 0,
+    'db_hits': 0,
+    'misses': 0,
+    'remote_calls': 0,
+    'remote_failures': 0,
+    'rate_limited': 0,
+    'singleflight_waits': 0,
+}
+
 # Normalized (lowercase, no trailing dot) client placeholders → replace via reverse geocode.
 _PLACEHOLDER_ADDRESSES = frozenset(
     {
@@ -33,16 +83,8 @@ def needs_reverse_geocode(address):
     return s in _PLACEHOLDER_ADDRESSES
 
 
-def reverse_geocode(lat, lng, timeout=10):
-    """
-    Return display name from Nominatim, or None on failure / empty result.
-    """
-    try:
-        lat_f = float(lat)
-        lng_f = float(lng)
-    except (TypeError, ValueError):
-        return None
-
+def _nominatim_reverse(lat_f, lng_f, timeout):
+    """One Nominatim reverse request: display name, or None on failure / empty result."""
     user_agent = getattr(
         settings,
         'NOMINATIM_USER_AGENT',
@@ -70,6 +112,7 @@ def reverse_geocode(lat, lng, timeout=10):
             raw = resp.read().decode()
     except (urllib.error.URLError, OSError, TimeoutError, ValueError) as e:
         logger.warning('reverse_geocode request failed: %s', e)
+        _bump('remote_failures')
         return None
 
     try:
@@ -85,14 +128,185 @@ def reverse_geocode(lat, lng, timeout=10):
     return None
 
 
+def _cell(lat_f, lng_f):
+    """Grid cell (lat_key, lng_key) of a point; about 28 m x 25 m around Nepal's latitudes."""
+    return round(lat_f * GEOCODE_CELLS_PER_DEGREE), round(lng_f * GEOCODE_CELLS_PER_DEGREE)
+
+
+def _bump(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def _memory_get(cell):
+    """(found, address) from the in-process LRU; expired entries count as not found."""
+    with _lru_lock:
+        entry = _lru.get(cell)
+        if entry is None:
+            return False, None
+        address, expires_at = entry
+        if expires_at <= time.monotonic():
+            del _lru[cell]
+            return False, None
+        _lru.move_to_end(cell)
+        return True, address
+
+
+def _memory_put(cell, address, ttl_seconds):
+    with _lru_lock:
+        _lru[cell] = (address, time.monotonic() + ttl_seconds)
+        _lru.move_to_end(cell)
+        while len(_lru) > GEOCODE_MEMORY_MAX_ENTRIES:
+            _lru.popitem(last=False)
+
+
+def _db_get(cell):
+    return GeocodeCache.objects.filter(
+        lat_key=cell[0], lng_key=cell[1], expires_at__gt=timezone.now(),
+    ).values_list('address', flat=True).first()
+
+
+def _db_put(cell, address):
+    try:
+        GeocodeCache.objects.update_or_create(
+            lat_key=cell[0],
+            lng_key=cell[1],
+            defaults={
+                'address': address,
+                'expires_at': timezone.now() + timedelta(seconds=GEOCODE_DB_TTL_SECONDS),
+            },
+        )
+    except IntegrityError:
+        # Another process stored the same cell first
+        pass
+
+
+def _acquire_request_slot(max_wait):
+    """
+    Reserve the next Nominatim request slot (NOMINATIM_MIN_INTERVAL_SECONDS apart, per process) and sleep
+    until it. Returns False without waiting when the slot is more than max_wait seconds away (None: always wait).
+    """
+    global _next_request_at
+    with _rate_lock:
+        now = time.monotonic()
+        start = max(now, _next_request_at)
+        if max_wait is not None and start - now > max_wait:
+            return False
+        _next_request_at = start + NOMINATIM_MIN_INTERVAL_SECONDS
+    if start > now:
+        time.sleep(start - now)
+    return True
+
+
+def _lookup_remote(cell, lat_f, lng_f, timeout, max_wait):
+    """Nominatim lookup for a cell, single-flight: concurrent callers for the same cell wait for one request."""
+    with _inflight_lock:
+        event = _inflight.get(cell)
+        leader = event is None
+        if leader:
+            event = threading.Event()
+            _inflight[cell] = event
+    if not leader:
+        _bump('singleflight_waits')
+        event.wait(timeout + (max_wait if max_wait is not None else NOMINATIM_MAX_WAIT_SECONDS))
+        return _memory_get(cell)[1]
+    try:
+        if not _acquire_request_slot(max_wait):
+            _bump('rate_limited')
+            return None
+        _bump('remote_calls')
+        address = _nominatim_reverse(lat_f, lng_f, timeout)
+        if address:
+            _db_put(cell, address)
+            _memory_put(cell, address, GEOCODE_MEMORY_TTL_SECONDS)
+        else:
+            # Short negative entry so a failing upstream is not hammered from one stop
+            _memory_put(cell, None, GEOCODE_NEGATIVE_TTL_SECONDS)
+        return address
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cell, None)
+        event.set()
+
+
+def _parse_point(lat, lng):
+    try:
+        return float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+
+
+def _lookup_local(lat_f, lng_f):
+    """(found, address) from the place index, the LRU or the GeocodeCache table; no network."""
+    near = place_index.nearest(lat_f, lng_f, PLACE_GEOCODE_RADIUS_METERS)
+    if near is not None:
+        _bump('place_hits')
+        return True, f'Near {near[1]}'
+    cell = _cell(lat_f, lng_f)
+    found, address = _memory_get(cell)
+    if found:
+        _bump('memory_hits')
+        return True, address
+    address = _db_get(cell)
+    if address:
+        _bump('db_hits')
+        _memory_put(cell, address, GEOCODE_MEMORY_TTL_SECONDS)
+        return True, address
+    return False, None
+
+
+def reverse_geocode_local(lat, lng):
+    """
+    Display name for lat/lng without calling Nominatim: "Near <place>" within PLACE_GEOCODE_RADIUS_METERS,
+    else a cached Nominatim result, else None. Safe on the request path.
+    """
+    point = _parse_point(lat, lng)
+    if point is None:
+        return None
+    return _lookup_local(*point)[1]
+
+
+def reverse_geocode(lat, lng, timeout=10, max_wait=NOMINATIM_MAX_WAIT_SECONDS):
+    """
+    Return a display name for lat/lng, or None on failure / empty result.
+    Answers locally (reverse_geocode_local), then from Nominatim (rate limited; with max_wait=None the
+    caller waits for its request slot instead of giving up).
+    """
+    point = _parse_point(lat, lng)
+    if point is None:
+        return None
+    found, address = _lookup_local(*point)
+    if found:
+        return address
+    _bump('misses')
+    return _lookup_remote(_cell(*point), point[0], point[1], timeout, max_wait)
+
+
+def get_geocode_stats():
+    """Cache counters for this process plus LRU size and persisted (unexpired) cells."""
+    with _stats_lock:
+        stats = dict(_stats)
+    with _lru_lock:
+        stats['memory_entries'] = len(_lru)
+    stats['db_entries'] = GeocodeCache.objects.filter(expires_at__gt=timezone.now()).count()
+    return stats
+
+
+def clear_geocode_memory():
+    """Drop the in-process LRU (the GeocodeCache table is kept)."""
+    with _lru_lock:
+        _lru.clear()
+
+
 def resolve_address_from_coords(address, lat, lng):
     """
-    If address is empty/placeholder, try reverse geocode; otherwise return address unchanged.
-    On geocode failure, returns original address (may still be placeholder).
+    If address is empty/placeholder, try the local reverse geocode; otherwise return address unchanged.
+    On a local miss, returns the original address (may still be placeholder) for
+    address_resolution.defer_address_resolution to patch later.
     """
     if not needs_reverse_geocode(address):
         return (address or '').strip()
-    resolved = reverse_geocode(lat, lng)
+    resolved = reverse_geocode_local(lat, lng)
     if resolved:
         return resolved
     return (address or '').strip()
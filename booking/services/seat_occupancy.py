@@ -0,0 +1,100 @@
+"""
+Per-schedule seat occupancy over route segments.
+
+VehicleSchedule.seat_occupancy maps "side:number" to a bitmask of the route segments booked on that
+seat (bit i = segment from route point i to point i+1, in the schedule's direction), and
+booked_seat_count holds the number of booked seat rows. A seat is free for a pickup -> destination
+segment when its mask AND the segment mask is zero, so list pages get availability without
+querying seat rows per schedule. Masks are stored as hex strings (encode_mask / decode_mask): routes
+can have more than 63 segments and MySQL keeps JSON integers past 64 bits as DOUBLE, losing bits.
+
+Both fields are derived from the schedule's VehicleTicketBookingSeat rows (services.ticket_seats)
+and rebuilt after commit whenever a booking's seats or segment change, the booking is deleted, the
+schedule's route/direction changes, or the route's stop points change (booking.signals).
+"""
+from django.db import transaction
+
+from ..models import VehicleSchedule, VehicleTicketBookingSeat
+from .ticket_seats import resync_schedule_seats
+
+
+def seat_key(side, number):
+    return f'{side}:{number}'
+
+
+def segment_mask(from_order, to_order):
+    """Bitmask of segments from_order .. to_order - 1 (0 when the range is empty)."""
+    if from_order is None or to_order is None or to_order <= from_order or from_order < 0:
+        return 0
+    return ((1 << (to_order - from_order)) - 1) << from_order
+
+
+def encode_mask(mask):
+    """JSON-safe form of a segment mask (hex string)."""
+    return format(mask, 'x')
+
+
+def decode_mask(value):
+    """Segment mask from its stored hex string."""
+    return int(value, 16)
+
+
+def build_occupancy(seat_rows):
+    """Return (seat_occupancy dict, booked_seat_count) from (side, number, from_order, to_order) rows."""
+    masks = {}
+    count = 0
+    for side, number, from_order, to_order in seat_rows:
+        count += 1
+        key = seat_key(side, number)
+        masks[key] = masks.get(key, 0) | segment_mask(from_order, to_order)
+    return {key: encode_mask(mask) for key, mask in masks.items()}, count
+
+
+def refresh_schedule_occupancy(schedule_id):
+    """Recompute seat_occupancy / booked_seat_count for one schedule from its seat rows (row locked)."""
+    with transaction.atomic():
+        if not VehicleSchedule.objects.select_for_update().filter(pk=schedule_id).exists():
+            return
+        seat_rows = VehicleTicketBookingSeat.objects.filter(vehicle_schedule_id=schedule_id).values_list(
+            'side', 'number', 'from_order', 'to_order',
+        )
+        occupancy, count = build_occupancy(seat_rows)
+        VehicleSchedule.objects.filter(pk=schedule_id).update(seat_occupancy=occupancy, booked_seat_count=count)
+
+
+def schedule_occupancy_refresh(schedule_id):
+    """Rebuild a schedule's occupancy once the current transaction commits."""
+    if schedule_id:
+        transaction.on_commit(lambda: refresh_schedule_occupancy(schedule_id))
+
+
+def schedule_seats_refresh(schedule_id):
+    """Once the current transaction commits, re-derive a schedule's seat rows and occupancy (route/direction edits)."""
+    def _run():
+        resync_schedule_seats(schedule_id)
+        refresh_schedule_occupancy(schedule_id)
+    if schedule_id:
+        transaction.on_commit(_run)
+
+
+def refresh_route_schedules(route_id):
+    """Re-derive seat rows and occupancy of every booked schedule on a route (after its stop order changed)."""
+    schedule_ids = (
+        VehicleTicketBookingSeat.objects.filter(vehicle_schedule__route_id=route_id)
+        .values_list('vehicle_schedule_id', flat=True)
+        .distinct()
+    )
+    for schedule_id in list(schedule_ids):
+        resync_schedule_seats(schedule_id)
+        refresh_schedule_occupancy(schedule_id)
+
+
+def booked_seats_for_segment(schedule, from_order, to_order):
+    """Set of (side, number) booked on any part of [from_order, to_order) for a schedule."""
+    mask = segment_mask(from_order, to_order)
+    booked = set()
+    for key, seat_mask in (schedule.seat_occupancy or {}).items():
+        if decode_mask(seat_mask) & mask:
+            side, _, number = key.rpartition(':')
+            booked.add((side, int(number)))
+    return booked
@@ -0,0 +1,154 @@
+"""
+Contention-safe seat reservation.
+
+Scheduled trips: every check-then-write on a schedule's seats (taking a hold, creating a ticket
+booking) runs inside a transaction holding the VehicleSchedule row lock (lock_schedule), so
+concurrent bookers of one schedule are serialised and cannot both pass the conflict check. A
+client may first take a SeatHold (short-lived, SEAT_HOLD_TTL_SECONDS) and then confirm it by
+creating the ticket booking with the hold token for exactly the held seats and segment
+(hold_mismatch), or release it. Holds taken while logged in are confirmed or released only by
+their holder or staff. Expired holds are ignored by the
+checks, removed lazily when new holds are taken on the schedule, and deleted by the
+sweep_seat_holds command.
+
+Live buses: VehicleSeat.status moves from available to booked with a conditional UPDATE
+(claim_vehicle_seats), so exactly one of several concurrent requests wins a seat. The UPDATE sends
+no post_save, so the claim drops the vehicle's cached payload itself once the transaction commits.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import SeatHold, VehicleSchedule, VehicleSeat
+from ..vehicle_payload import invalidate_vehicle_payload
+from .ticket_seats import conflicting_seat
+
+SEAT_HOLD_TTL_SECONDS = getattr(settings, 'SEAT_HOLD_TTL_SECONDS', 300)
+
+
+def lock_schedule(schedule_id):
+    """Lock a schedule row for the rest of the current transaction (call inside transaction.atomic)."""
+    return VehicleSchedule.objects.select_for_update().only('id').get(pk=schedule_id)
+
+
+def held_seat(schedule_id, seats, from_order, to_order, exclude_token=None):
+    """First of seats ((side, number) pairs) under another active hold overlapping [from_order, to_order), or None."""
+    if not seats:
+        return None
+    match = Q()
+    for side, number in seats:
+        match |= Q(side=side, number=number)
+    holds = SeatHold.objects.filter(
+        match,
+        vehicle_schedule_id=schedule_id,
+        expires_at__gt=timezone.now(),
+        from_order__lt=to_order,
+        to_order__gt=from_order,
+    )
+    if exclude_token:
+        holds = holds.exclude(token=exclude_token)
+    held = set(holds.values_list('side', 'number'))
+    for seat in seats:
+        if seat in held:
+            return seat
+    return None
+
+
+def unavailable_seat(schedule_id, seats, from_order, to_order, hold_token=None):
+    """First seat already booked or held by someone else for the segment, or None (caller holds lock_schedule)."""
+    return (
+        conflicting_seat(schedule_id, seats, from_order, to_order)
+        or held_seat(schedule_id, seats, from_order, to_order, exclude_token=hold_token)
+    )
+
+
+def hold_mismatch(token, schedule_id, seats, from_order, to_order, user=None):
+    """
+    None when the token's unexpired holds on the schedule cover exactly these seats ((side, number)
+    pairs) over [from_order, to_order) and, for a user-owned hold, user is the holder; else an error message.
+    """
+    holds = list(SeatHold.objects.filter(
+        token=token, vehicle_schedule_id=schedule_id, expires_at__gt=timezone.now(),
+    ).values_list('side', 'number', 'from_order', 'to_order', 'user_id'))
+    if not holds:
+        return 'Seat hold expired or not found'
+    if not hold_user_allowed({user_id for *_, user_id in holds}, user):
+        return 'Seat hold belongs to another user'
+    held = sorted((side, number) for side, number, *_ in holds)
+    if held != sorted(seats) or any((f, t) != (from_order, to_order) for _, _, f, t, _ in holds):
+        return 'Seats or segment do not match the seat hold'
+    return None
+
+
+def hold_user_ids(token):
+    """Holder user ids of a token's holds (None for anonymous holds); empty when the token has none."""
+    return set(SeatHold.objects.filter(token=token).values_list('user_id', flat=True))
+
+
+def hold_user_allowed(user_ids, user):
+    """True when user may confirm or release holds owned by user_ids: anonymous holds, the holder, or staff."""
+    owners = user_ids - {None}
+    if not owners:
+        return True
+    if user is None or not user.is_authenticated:
+        return False
+    return user.is_staff or user.pk in owners
+
+
+def create_hold(schedule_id, seats, from_order, to_order, user=None):
+    """
+    Hold seats for the segment (caller holds lock_schedule).
+    Returns (token, expires_at, None) on success or (None, None, unavailable_seat).
+    """
+    now = timezone.now()
+    SeatHold.objects.filter(vehicle_schedule_id=schedule_id, expires_at__lte=now).delete()
+    taken = unavailable_seat(schedule_id, seats, from_order, to_order)
+    if taken is not None:
+        return None, None, taken
+    token = uuid.uuid4().hex
+    expires_at = now + timedelta(seconds=SEAT_HOLD_TTL_SECONDS)
+    SeatHold.objects.bulk_create([
+        SeatHold(
+            token=token,
+            vehicle_schedule_id=schedule_id,
+            user=user,
+            side=side,
+            number=number,
+            from_order=from_order,
+            to_order=to_order,
+            expires_at=expires_at,
+        )
+        for side, number in seats
+    ])
+    return token, expires_at, None
+
+
+def release_hold(token):
+    """Delete all holds of a token; returns the number of seats released."""
+    deleted, _ = SeatHold.objects.filter(token=token).delete()
+    return deleted
+
+
+def sweep_expired_holds():
+    """Delete expired holds; returns the number deleted."""
+    deleted, _ = SeatHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def claim_vehicle_seats(vehicle_id, seat_ids):
+    """
+    Mark a live bus's seats booked only if all are still available (conditional UPDATE).
+    Returns True when every seat was claimed (a repeated id counts as not claimed); on False the
+    caller must roll back its transaction. The vehicle's cached payload is invalidated on commit.
+    """
+    seat_ids = list(seat_ids)
+    claimed = VehicleSeat.objects.filter(pk__in=seat_ids, vehicle_id=vehicle_id, status='available').update(
+        status='booked', updated_at=timezone.now(),
+    )
+    if claimed:
+        transaction.on_commit(lambda: invalidate_vehicle_payload(vehicle_id))
+    return claimed == len(seat_ids)
@@ -0,0 +1,200 @@
+"""
+In-memory uniform-grid index of current vehicle positions (per process).
+
+Answers radius and k-nearest queries for vehicles/nearby so only candidate vehicles are loaded
+from the database. Positions come from VehicleLastPosition: a full load warms the index, the
+ingest path pushes new points after commit (record_last_position), and each query first pulls
+rows updated since the last sync so points ingested by other processes are picked up too.
+While the index is cold, callers use bbox_filter() (SQL bounding-box prefilter) instead.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ..geo import EARTH_RADIUS_KM, haversine_many
+from ..models import VehicleLastPosition
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE_LAT = 111.32
+CELL_SIZE_DEG = 0.1  # ~11 km cells
+SYNC_MIN_INTERVAL_SECONDS = 1.0
+SYNC_OVERLAP = timedelta(seconds=2)  # re-read a small window to cover commit/clock skew
+
+
+def bbox_for_radius(lat, lng, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing the radius; lng bounds are None near the poles/antimeridian."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 0.01:
+        return min_lat, max_lat, None, None
+    dlng = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    if lng - dlng < -180 or lng + dlng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def bbox_filter(queryset, lat, lng, radius_km, prefix='last_position__'):
+    """SQL bounding-box prefilter on last position lat/lng (used while the grid index is cold)."""
+    min_lat, max_lat, min_lng, max_lng = bbox_for_radius(lat, lng, radius_km)
+    queryset = queryset.filter(**{f'{prefix}latitude__gte': min_lat, f'{prefix}latitude__lte': max_lat})
+    if min_lng is not None:
+        queryset = queryset.filter(**{f'{prefix}longitude__gte': min_lng, f'{prefix}longitude__lte': max_lng})
+    return queryset
+
+
+def _cell(lat, lng):
+    return (math.floor(lat / CELL_SIZE_DEG), math.floor(lng / CELL_SIZE_DEG))
+
+
+class VehicleGridIndex:
+    """Uniform lat/lng grid: cell -> set of vehicle ids, plus vehicle id -> (lat, lng, cell)."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cells = {}
+        self._points = {}
+        self._warm = False
+        self._warming = False
+        self._synced_at = None
+        self._last_sync_check = 0.0
+
+    @property
+    def is_warm(self):
+        return self._warm
+
+    def __len__(self):
+        return len(self._points)
+
+    def update(self, vehicle_id, lat, lng):
+        lat, lng = float(lat), float(lng)
+        cell = _cell(lat, lng)
+        with self._lock:
+            old = self._points.get(vehicle_id)
+            if old is not None and old[2] != cell:
+                bucket = self._cells.get(old[2])
+                if bucket is not None:
+                    bucket.discard(vehicle_id)
+                    if not bucket:
+                        del self._cells[old[2]]
+            self._points[vehicle_id] = (lat, lng, cell)
+            self._cells.setdefault(cell, set()).add(vehicle_id)
+
+    def remove(self, vehicle_id):
+        with self._lock:
+            old = self._points.pop(vehicle_id, None)
+            if old is not None:
+                bucket = self._cells.get(old[2])
+                if bucket is not None:
+                    bucket.discard(vehicle_id)
+                    if not bucket:
+                        del self._cells[old[2]]
+
+    def load(self, rows):
+        """Replace the index contents with rows of (vehicle_id, lat, lng)."""
+        with self._lock:
+            self._cells = {}
+            self._points = {}
+            for vehicle_id, lat, lng in rows:
+                self.update(vehicle_id, lat, lng)
+
+    def _candidate_ids(self, lat, lng, radius_km):
+        min_lat, max_lat, min_lng, max_lng = bbox_for_radius(lat, lng, radius_km)
+        if min_lng is None:
+            return list(self._points)
+        r0, c0 = _cell(min_lat, min_lng)
+        r1, c1 = _cell(max_lat, max_lng)
+        n_cells = (r1 - r0 + 1) * (c1 - c0 + 1)
+        if n_cells >= len(self._cells):
+            # Large radius: scanning occupied cells is cheaper than walking the whole bbox
+            return [
+                vid for (r, c), ids in self._cells.items()
+                if r0 <= r <= r1 and c0 <= c <= c1 for vid in ids
+            ]
+        ids = []
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                bucket = self._cells.get((r, c))
+                if bucket:
+                    ids.extend(bucket)
+        return ids
+
+    def query_radius(self, lat, lng, radius_km):
+        """Return [(vehicle_id, distance_km)] within radius_km, nearest first."""
+        lat, lng = float(lat), float(lng)
+        with self._lock:
+            ids = self._candidate_ids(lat, lng, radius_km)
+            coords = [self._points[vid] for vid in ids]
+        dists = haversine_many(lat, lng, [c[0] for c in coords], [c[1] for c in coords])
+        found = [(vid, d) for vid, d in zip(ids, dists) if d <= radius_km]
+        found.sort(key=lambda x: x[1])
+        return found
+
+    def query_nearest(self, lat, lng, k, max_radius_km=None):
+        """Return up to k [(vehicle_id, distance_km)] nearest first, growing the search ring as needed."""
+        lat, lng = float(lat), float(lng)
+        radius = CELL_SIZE_DEG * KM_PER_DEGREE_LAT
+        limit = max_radius_km if max_radius_km is not None else math.pi * EARTH_RADIUS_KM
+        while True:
+            radius = min(radius, limit)
+            found = self.query_radius(lat, lng, radius)
+            if len(found) >= k or radius >= limit:
+                return found[:k]
+            radius *= 2
+
+    # --- Sync with VehicleLastPosition -------------------------------------------------
+
+    def warm(self):
+        """Full load from VehicleLastPosition."""
+        started = timezone.now()
+        rows = VehicleLastPosition.objects.values_list('vehicle_id', 'latitude', 'longitude')
+        self.load(rows)
+        with self._lock:
+            self._synced_at = started
+            self._warm = True
+            self._warming = False
+        logger.info('Vehicle grid index warmed with %s vehicles', len(self))
+
+    def warm_async(self):
+        """Start warming in a background thread (no-op if already warm or warming)."""
+        with self._lock:
+            if self._warm or self._warming:
+                return
+            self._warming = True
+
+        def _run():
+            try:
+                self.warm()
+            except Exception:
+                logger.exception('Vehicle grid index warm-up failed')
+                with self._lock:
+                    self._warming = False
+            finally:
+                close_old_connections()
+
+        threading.Thread(target=_run, name='vehicle-grid-warm', daemon=True).start()
+
+    def sync(self):
+        """Apply positions updated since the last sync (throttled). Requires a warm index."""
+        if not self._warm:
+            return
+        now_mono = time.monotonic()
+        if now_mono - self._last_sync_check < SYNC_MIN_INTERVAL_SECONDS:
+            return
+        self._last_sync_check = now_mono
+        started = timezone.now()
+        rows = VehicleLastPosition.objects.filter(updated_at__gte=self._synced_at - SYNC_OVERLAP).values_list(
+            'vehicle_id', 'latitude', 'longitude',
+        )
+        for vehicle_id, lat, lng in rows:
+            self.update(vehicle_id, lat, lng)
+        self._synced_at = started
+
+
+vehicle_index = VehicleGridIndex()
@@ -0,0 +1,141 @@
+"""
+Relational seat rows for vehicle ticket bookings.
+
+VehicleTicketBooking.seat keeps the seats as submitted (a list of {side, number}, or a legacy single
+dict). Each valid entry is mirrored into a VehicleTicketBookingSeat row carrying the schedule and the
+booked segment [from_order, to_order) in the schedule's direction, so readers, seat conflict checks
+and seat counts query rows instead of re-parsing JSON. Rows are rewritten in the booking's
+transaction on save (booking.signals) and re-derived when the schedule or its route changes.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import VehicleSchedule, VehicleTicketBooking, VehicleTicketBookingSeat
+from ..route_order import get_route_place_order
+
+# Booking fields the seat rows are derived from (saves touching only other fields skip the rewrite)
+SEAT_SOURCE_FIELDS = frozenset(('seat', 'pickup_point', 'destination_point', 'vehicle_schedule'))
+SEAT_SIDE_MAX_LENGTH = VehicleTicketBookingSeat._meta.get_field('side').max_length
+
+
+def parse_seat_entries(seat):
+    """
+    (side, number) pairs of a seat JSON value (list or legacy single dict); invalid and repeated
+    entries skipped, so a booking has at most one row per seat.
+    """
+    if isinstance(seat, dict):
+        seat = [seat]
+    if not isinstance(seat, list):
+        return []
+    entries = []
+    for s in seat:
+        if not isinstance(s, dict) or s.get('side') is None or s.get('number') is None:
+            continue
+        try:
+            number = int(s['number'])
+        except (TypeError, ValueError):
+            continue
+        side = str(s['side'])
+        if len(side) <= SEAT_SIDE_MAX_LENGTH and (side, number) not in entries:
+            entries.append((side, number))
+    return entries
+
+
+def segment_orders(pickup_point_id, destination_point_id, place_order):
+    """
+    (from_order, to_order) booked by a ticket: pickup -> destination indices, or the whole route
+    when pickup/destination are missing or not on the route.
+    """
+    if (
+        pickup_point_id and destination_point_id
+        and pickup_point_id in place_order and destination_point_id in place_order
+    ):
+        return place_order[pickup_point_id], place_order[destination_point_id]
+    return 0, (max(place_order.values()) + 1) if place_order else 1
+
+
+def _seat_rows(booking, place_order):
+    from_order, to_order = segment_orders(booking.pickup_point_id, booking.destination_point_id, place_order)
+    return [
+        VehicleTicketBookingSeat(
+            booking_id=booking.pk,
+            vehicle_schedule_id=booking.vehicle_schedule_id,
+            side=side,
+            number=number,
+            from_order=from_order,
+            to_order=to_order,
+        )
+        for side, number in parse_seat_entries(booking.seat)
+    ]
+
+
+def sync_booking_seats(booking):
+    """
+    Rewrite the seat rows of one booking from its seat JSON.
+    Returns ids of schedules the booking previously had rows on (to refresh when it moved).
+    """
+    schedule = VehicleSchedule.objects.select_related('route').get(pk=booking.vehicle_schedule_id)
+    place_order = get_route_place_order(schedule.route, schedule.reverse_direction)
+    with transaction.atomic():
+        # Serialize rewrites of one booking (e.g. the post_save signal racing an explicit sync)
+        VehicleTicketBooking.objects.select_for_update().filter(pk=booking.pk).exists()
+        existing = VehicleTicketBookingSeat.objects.filter(booking_id=booking.pk)
+        previous_schedule_ids = set(existing.values_list('vehicle_schedule_id', flat=True))
+        existing.delete()
+        VehicleTicketBookingSeat.objects.bulk_create(_seat_rows(booking, place_order))
+    return previous_schedule_ids
+
+
+def resync_schedule_seats(schedule_id):
+    """Re-derive from_order/to_order for all seat rows of a schedule (route or direction changed)."""
+    schedule = VehicleSchedule.objects.select_related('route').filter(pk=schedule_id).first()
+    if schedule is None:
+        return
+    place_order = get_route_place_order(schedule.route, schedule.reverse_direction)
+    bookings = VehicleTicketBooking.objects.filter(vehicle_schedule_id=schedule_id).only(
+        'id', 'vehicle_schedule_id', 'seat', 'pickup_point_id', 'destination_point_id',
+    )
+    with transaction.atomic():
+        VehicleTicketBookingSeat.objects.filter(vehicle_schedule_id=schedule_id).delete()
+        rows = []
+        for booking in bookings:
+            rows.extend(_seat_rows(booking, place_order))
+        VehicleTicketBookingSeat.objects.bulk_create(rows)
+
+
+def booking_seat_list(booking):
+    """Seats of a booking as [{side, number}] in booking order (uses prefetched booked_seats when present)."""
+    if 'booked_seats' in getattr(booking, '_prefetched_objects_cache', {}):
+        rows = sorted(booking.booked_seats.all(), key=lambda r: r.pk)
+    else:
+        rows = booking.booked_seats.order_by('pk')
+    return [{'side': r.side, 'number': r.number} for r in rows]
+
+
+def booking_seat_labels(booking):
+    """Seats of a booking for remarks and tickets, e.g. 'A1, B2' ('' when none)."""
+    return ', '.join(f"{s['side']}{s['number']}" for s in booking_seat_list(booking))
+
+
+def conflicting_seat(schedule_id, seats, from_order, to_order):
+    """
+    First of seats ((side, number) pairs, in the given order) already booked on the schedule for any
+    part of [from_order, to_order), or None. One indexed query on (schedule, side, number).
+    """
+    if not seats:
+        return None
+    match = Q()
+    for side, number in seats:
+        match |= Q(side=side, number=number)
+    booked = set(
+        VehicleTicketBookingSeat.objects.filter(
+            match,
+            vehicle_schedule_id=schedule_id,
+            from_order__lt=to_order,
+            to_order__gt=from_order,
+        ).values_list('side', 'number')
+    )
+    for seat in seats:
+        if seat in booked:
+            return seat
+    return None
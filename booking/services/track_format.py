@@ -0,0 +1,105 @@
+"""
+Compact encodings of GPS tracks for location responses (format=polyline / format=binary).
+
+Points are (latitude, longitude, epoch seconds, speed or None) in track order.
+
+polyline: {"polyline": Google encoded polyline (1e-5 degree precision),
+           "timestamps": epoch milliseconds, the first absolute and then deltas from the previous point,
+           "speeds": speed in hundredths (Location.speed has 2 decimals), delta from the previous known
+                     speed; null where the point has no speed}
+binary:   little-endian TRACK_RECORD per point: float32 latitude, float32 longitude, uint32 epoch
+          seconds, float32 speed (NaN when unknown); 16 bytes per point, no header.
+"""
+import math
+import struct
+from datetime import datetime
+
+POLYLINE_PRECISION = 5
+TRACK_RECORD = struct.Struct('<ffIf')
+
+
+def track_point_tuple(point):
+    """(lat, lng, epoch seconds, speed or None) from a stored track point (services.trip_track)."""
+    _, lat, lng, speed, _, created_at = point
+    return (
+        float(lat),
+        float(lng),
+        datetime.fromisoformat(created_at).timestamp(),
+        float(speed) if speed is not None else None,
+    )
+
+
+def _append_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(lats, lngs, precision=POLYLINE_PRECISION):
+    """Google encoded polyline of parallel latitude / longitude sequences."""
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in zip(lats, lngs):
+        lat_i = math.floor(float(lat) * factor + 0.5)
+        lng_i = math.floor(float(lng) * factor + 0.5)
+        _append_value(lat_i - prev_lat, out)
+        _append_value(lng_i - prev_lng, out)
+        prev_lat, prev_lng = lat_i, lng_i
+    return ''.join(out)
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """[(lat, lng)] from a Google encoded polyline."""
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+    return points
+
+
+def _deltas(values):
+    """Delta-encode integers; None entries stay None and do not reset the running value."""
+    out = []
+    prev = 0
+    for value in values:
+        if value is None:
+            out.append(None)
+        else:
+            out.append(value - prev)
+            prev = value
+    return out
+
+
+def track_polyline(points):
+    """polyline / timestamps / speeds payload (see module docstring) for track points."""
+    return {
+        'polyline': encode_polyline([p[0] for p in points], [p[1] for p in points]),
+        'timestamps': _deltas([round(p[2] * 1000) for p in points]),
+        'speeds': _deltas([round(p[3] * 100) if p[3] is not None else None for p in points]),
+    }
+
+
+def track_binary(points):
+    """Packed TRACK_RECORD bytes for track points."""
+    pack = TRACK_RECORD.pack
+    return b''.join(
+        pack(lat, lng, int(ts), speed if speed is not None else math.nan)
+        for lat, lng, ts, speed in points
+    )
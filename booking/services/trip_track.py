@@ -0,0 +1,204 @@
+"""
+Stored multi-resolution tracks of finished trips, for playback and map views.
+
+Once a trip ends its locations are simplified with Douglas-Peucker at each of
+TRIP_TRACK_TOLERANCES_M (geo.track_significance: one pass serves every tolerance) and stored as
+TripTrack rows. Trip detail keeps returning every Location by default; a client that asks for a
+track_tolerance or track_zoom gets the few hundred points of the matching level instead.
+
+Levels are never built on the request thread. Ending a trip stamps Trip.track_stale_at as already
+due (mark_trip_tracks_stale(immediate=True)); points uploaded late to a finished trip stamp it with
+the current time, so the levels are rebuilt once the trip has had no late point for
+TRIP_TRACK_REBUILD_DELAY_SECONDS and a buffered device flushing many small batches costs one
+rebuild instead of one per request. Stale trips are rebuilt by a daemon thread in each web process
+that is woken after commit (TRIP_TRACK_INLINE_WORKER), or by `manage.py build_trip_tracks --stale`.
+Until then trip detail serves the previous levels, or full resolution when there are none.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..geo import track_significance
+from ..models import Location, Trip, TripTrack
+from .background_worker import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+TRACK_TOLERANCES_M = tuple(sorted(getattr(settings, 'TRIP_TRACK_TOLERANCES_M', (100.0, 20.0, 5.0)), reverse=True))
+# Web Mercator ground resolution at zoom 0 (metres per 256 px tile pixel at the equator)
+METRES_PER_PIXEL_ZOOM0 = 156543.03392
+# Fields of a stored track point, in order (track_locations(...).values_list(*TRACK_POINT_FIELDS) rows -> track_point)
+TRACK_POINT_FIELDS = ('id', 'latitude', 'longitude', 'speed', 'course', 'point_time')
+REBUILD_DELAY_SECONDS = getattr(settings, 'TRIP_TRACK_REBUILD_DELAY_SECONDS', 30)
+CLAIM_LEASE_SECONDS = 120  # a claimed trip is skipped by other workers until the lease expires
+SWEEP_INTERVAL_SECONDS = 10
+BATCH_SIZE = 20
+
+_stats_lock = threading.Lock()
+_stats = {
+    'builds': 0,
+    'build_failures': 0,
+    'marked_stale': 0,
+    'stale_rebuilds': 0,
+    'points_in': 0,
+    'points_stored': 0,
+    'build_seconds': 0.0,
+}
+
+
+def _bump(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def track_locations(locations):
+    """
+    Location queryset annotated with point_time and in track order. point_time is the device time
+    of batch-uploaded points (recorded_at) and the server time of single posts (created_at), so an
+    offline buffer lands where it was driven, not as a burst at upload time.
+    """
+    return locations.annotate(point_time=Coalesce('recorded_at', 'created_at')).order_by('point_time', 'id')
+
+
+def track_point(row):
+    """Stored point from a TRACK_POINT_FIELDS row (strings as in the location API responses)."""
+    loc_id, lat, lng, speed, course, point_time = row
+    return [
+        loc_id,
+        str(lat),
+        str(lng),
+        str(speed) if speed is not None else None,
+        str(course) if course is not None else None,
+        point_time.isoformat(),
+    ]
+
+
+def track_point_to_response(point):
+    """Location-shaped dict (id, latitude, longitude, speed, course, created_at = point time) for a stored point."""
+    loc_id, lat, lng, speed, course, point_time = point
+    return {
+        'id': str(loc_id),
+        'latitude': lat,
+        'longitude': lng,
+        'speed': speed,
+        'course': course,
+        'created_at': point_time,
+    }
+
+
+def zoom_tolerance_m(zoom, latitude):
+    """Ground size in metres of one map pixel at a Web Mercator zoom level and latitude."""
+    return METRES_PER_PIXEL_ZOOM0 * math.cos(math.radians(float(latitude))) / (2 ** float(zoom))
+
+
+def build_trip_tracks(trip_id):
+    """(Re)build and store the simplified levels of a trip's track. Returns the TripTrack rows."""
+    started = time.perf_counter()
+    rows = list(track_locations(Location.objects.filter(trip_id=trip_id)).values_list(*TRACK_POINT_FIELDS))
+    significance = track_significance(
+        [row[1] for row in rows], [row[2] for row in rows], min(TRACK_TOLERANCES_M),
+    ) if rows else []
+    points = [track_point(row) for row in rows]
+    tracks = []
+    for tolerance in TRACK_TOLERANCES_M:
+        kept = [point for point, value in zip(points, significance) if value > tolerance]
+        tracks.append(TripTrack(
+            trip_id=trip_id,
+            tolerance_m=tolerance,
+            point_count=len(kept),
+            source_point_count=len(points),
+            points=kept,
+        ))
+    with transaction.atomic():
+        TripTrack.objects.filter(trip_id=trip_id).delete()
+        TripTrack.objects.bulk_create(tracks)
+    _bump('builds')
+    _bump('points_in', len(points))
+    _bump('points_stored', sum(t.point_count for t in tracks))
+    _bump('build_seconds', time.perf_counter() - started)
+    return tracks
+
+
+def mark_trip_tracks_stale(trip_ids, immediate=False):
+    """
+    Flag trips whose stored levels need (re)building. Trips that received late points are rebuilt
+    after REBUILD_DELAY_SECONDS without further late points (rebuild_stale_tracks); immediate=True
+    (a trip that just ended) makes them due on the next worker pass.
+    """
+    trip_ids = list(trip_ids)
+    if not trip_ids:
+        return
+    stale_at = timezone.now()
+    if immediate:
+        stale_at -= timedelta(seconds=REBUILD_DELAY_SECONDS)
+    Trip.objects.filter(pk__in=trip_ids).update(track_stale_at=stale_at)
+    _bump('marked_stale', len(trip_ids))
+    if getattr(settings, 'TRIP_TRACK_INLINE_WORKER', True):
+        transaction.on_commit(_worker.wake)
+
+
+def _rebuild_stale(trip_id, stale_at):
+    lease = timezone.now() + timedelta(seconds=CLAIM_LEASE_SECONDS)
+    claimed = Trip.objects.filter(pk=trip_id, track_stale_at=stale_at).update(track_stale_at=lease)
+    if not claimed:
+        return
+    try:
+        build_trip_tracks(trip_id)
+    except Exception:
+        _bump('build_failures')
+        logger.exception('Rebuilding stale tracks failed for trip %s', trip_id)
+        return
+    # A late point committed during the build moved track_stale_at off the lease: the trip stays stale
+    Trip.objects.filter(pk=trip_id, track_stale_at=lease).update(track_stale_at=None)
+    _bump('stale_rebuilds')
+
+
+def rebuild_stale_tracks(limit=BATCH_SIZE, delay_seconds=None):
+    """
+    Rebuild one batch of stale trips whose last late point is at least delay_seconds old
+    (default REBUILD_DELAY_SECONDS). Returns the number of trips taken.
+    """
+    if delay_seconds is None:
+        delay_seconds = REBUILD_DELAY_SECONDS
+    due = list(
+        Trip.objects.filter(track_stale_at__lte=timezone.now() - timedelta(seconds=delay_seconds))
+        .order_by('track_stale_at').values_list('pk', 'track_stale_at')[:limit]
+    )
+    for trip_id, stale_at in due:
+        _rebuild_stale(trip_id, stale_at)
+    return len(due)
+
+
+def _handle(_items):
+    while rebuild_stale_tracks():
+        pass
+
+
+_worker = BackgroundWorker('trip-track-rebuild', _handle, SWEEP_INTERVAL_SECONDS)
+
+
+def get_trip_track(trip_id, tolerance_m):
+    """
+    Stored level for a trip: the coarsest one at most tolerance_m, else the finest stored.
+    None when the trip has no stored levels (running, or not built yet).
+    """
+    track = TripTrack.objects.filter(trip_id=trip_id, tolerance_m__lte=tolerance_m).order_by('-tolerance_m').first()
+    if track is None:
+        track = TripTrack.objects.filter(trip_id=trip_id).order_by('tolerance_m').first()
+    return track
+
+
+def get_trip_track_stats():
+    """Track build counters for this process plus the number of trips waiting for a rebuild."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['build_seconds'] = round(stats['build_seconds'], 3)
+    stats['stale_trips'] = Trip.objects.filter(track_stale_at__isnull=False).count()
+    return stats
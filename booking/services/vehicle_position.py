@@ -0,0 +1,61 @@
+"""Keep VehicleLastPosition in sync with Location ingest (one row per vehicle)."""
+from django.db import IntegrityError, transaction
+
+from ..models import VehicleLastPosition
+from .spatial_index import vehicle_index
+
+
+def _locked_position(vehicle_id):
+    return VehicleLastPosition.objects.select_for_update().filter(vehicle_id=vehicle_id).first()
+
+
+def record_last_position(location):
+    """
+    Upsert the vehicle's last known position from a saved Location.
+    Call inside the same transaction as the Location insert. Older points
+    (recorded before the stored one) are ignored so late uploads cannot move the bus backwards.
+    Points are compared on the server clock: a batch point's device time is capped at its upload
+    time, so a device clock running ahead cannot make later single posts look older.
+    Returns the VehicleLastPosition row.
+    """
+    recorded_at = location.created_at
+    if location.recorded_at is not None:
+        recorded_at = min(location.recorded_at, location.created_at)
+    defaults = {
+        'trip_id': location.trip_id,
+        'latitude': location.latitude,
+        'longitude': location.longitude,
+        'speed': location.speed,
+        'course': location.course,
+        'recorded_at': recorded_at,
+    }
+    pos = _locked_position(location.vehicle_id)
+    if pos is None:
+        # No row to lock yet: a concurrent first point may insert it between our read and insert.
+        # The loser of the OneToOne race falls back to the locked update below.
+        try:
+            with transaction.atomic():
+                pos = VehicleLastPosition.objects.create(vehicle_id=location.vehicle_id, **defaults)
+        except IntegrityError:
+            pos = VehicleLastPosition.objects.select_for_update().get(vehicle_id=location.vehicle_id)
+        else:
+            _schedule_index_update(pos)
+            return pos
+    if pos.recorded_at and defaults['recorded_at'] < pos.recorded_at:
+        return pos
+    for field, value in defaults.items():
+        setattr(pos, field, value)
+    pos.save()
+    _schedule_index_update(pos)
+    return pos
+
+
+def _schedule_index_update(pos):
+    vehicle_id, lat, lng = pos.vehicle_id, pos.latitude, pos.longitude
+    transaction.on_commit(lambda: vehicle_index.update(vehicle_id, lat, lng))
+
+
+def get_last_position(vehicle):
+    """Return VehicleLastPosition for vehicle (instance or id), or None."""
+    vehicle_id = getattr(vehicle, 'pk', vehicle)
+    return VehicleLastPosition.objects.filter(vehicle_id=vehicle_id).first()
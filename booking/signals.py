@@ -0,0 +1,153 @@
+"""Signal handlers for the booking app (cache invalidation, place indexes, derived route place order, ticket seat rows and occupancy)."""
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.models import User
+
+from .models import Place, Route, RouteStopPoint, Vehicle, VehicleImage, VehicleSchedule, VehicleSeat, VehicleTicketBooking
+from .route_order import refresh_route_place_orders
+from .services.place_autocomplete import autocomplete_index
+from .services.place_index import place_index
+from .services.place_search import place_search_index
+from .services.seat_occupancy import refresh_route_schedules, schedule_occupancy_refresh, schedule_seats_refresh
+from .services.ticket_seats import SEAT_SOURCE_FIELDS, sync_booking_seats
+from .vehicle_payload import USER_BRIEF_FIELDS, invalidate_vehicle_payload, invalidate_vehicle_payloads
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def vehicle_changed(sender, instance, **kwargs):
+    invalidate_vehicle_payload(instance.pk)
+
+
+@receiver(post_save, sender=VehicleSeat)
+@receiver(post_delete, sender=VehicleSeat)
+@receiver(post_save, sender=VehicleImage)
+@receiver(post_delete, sender=VehicleImage)
+def vehicle_child_changed(sender, instance, **kwargs):
+    invalidate_vehicle_payload(instance.vehicle_id)
+
+
+@receiver(m2m_changed, sender=Vehicle.drivers.through)
+@receiver(m2m_changed, sender=Vehicle.routes.through)
+def vehicle_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_vehicle_payload(instance.pk)
+        return
+    # Changed from the user/route side: pk_set holds vehicle ids, except on clear
+    if action == 'pre_clear':
+        other_fk = next(
+            f.name for f in sender._meta.get_fields()
+            if f.is_relation and f.related_model is type(instance)
+        )
+        vehicle_ids = sender.objects.filter(**{other_fk: instance.pk}).values_list('vehicle_id', flat=True)
+    elif action in ('post_add', 'post_remove'):
+        vehicle_ids = pk_set or ()
+    else:
+        return
+    for vehicle_id in vehicle_ids:
+        invalidate_vehicle_payload(vehicle_id)
+
+
+def _invalidate_vehicles(condition):
+    """Drop the cached payloads of the vehicles matching condition (a Q over Vehicle)."""
+    invalidate_vehicle_payloads(Vehicle.objects.filter(condition).values_list('pk', flat=True).distinct())
+
+
+# Deletes are handled before the fact: the cascade removes the m2m rows that link the vehicles.
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not USER_BRIEF_FIELDS.intersection(update_fields):
+        return
+    _invalidate_vehicles(Q(drivers=instance) | Q(active_driver=instance))
+
+
+@receiver(post_save, sender=Route)
+@receiver(pre_delete, sender=Route)
+def route_changed_for_vehicles(sender, instance, **kwargs):
+    _invalidate_vehicles(Q(routes=instance))
+
+
+@receiver(post_save, sender=RouteStopPoint)
+@receiver(pre_delete, sender=RouteStopPoint)
+def route_stop_point_changed_for_vehicles(sender, instance, **kwargs):
+    _invalidate_vehicles(Q(routes=instance.route_id))
+
+
+@receiver(post_save, sender=Place)
+@receiver(pre_delete, sender=Place)
+def place_changed_for_vehicles(sender, instance, **kwargs):
+    _invalidate_vehicles(
+        Q(routes__start_point=instance) | Q(routes__end_point=instance) | Q(routes__stop_points__place=instance)
+    )
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def place_changed(sender, instance, **kwargs):
+    place_index.invalidate()
+    place_search_index.invalidate()
+
+
+@receiver(post_save, sender=Place)
+def place_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete_index.upsert_place(instance))
+
+
+@receiver(post_delete, sender=Place)
+def place_deleted(sender, instance, **kwargs):
+    place_id = instance.pk
+    transaction.on_commit(lambda: autocomplete_index.remove('place', place_id))
+
+
+@receiver(post_delete, sender=Route)
+def route_deleted(sender, instance, **kwargs):
+    route_id = instance.pk
+    transaction.on_commit(lambda: autocomplete_index.remove('route', route_id))
+
+
+def _refresh_route_order(route_id):
+    """After commit: rebuild the route's place order, then seat rows/occupancy of its booked schedules (indices may shift)."""
+    def _run():
+        refresh_route_place_orders(route_id)
+        refresh_route_schedules(route_id)
+    if route_id:
+        transaction.on_commit(_run)
+
+
+@receiver(post_save, sender=Route)
+def route_saved(sender, instance, **kwargs):
+    _refresh_route_order(instance.pk)
+    transaction.on_commit(lambda: autocomplete_index.upsert_route(instance))
+
+
+@receiver(post_save, sender=RouteStopPoint)
+@receiver(post_delete, sender=RouteStopPoint)
+def route_stop_point_changed(sender, instance, **kwargs):
+    _refresh_route_order(instance.route_id)
+
+
+@receiver(post_save, sender=VehicleTicketBooking)
+def ticket_booking_saved(sender, instance, update_fields=None, **kwargs):
+    # Seat rows are written in the booking's transaction; saves of other fields (e.g. is_paid) skip this
+    if update_fields is not None and not SEAT_SOURCE_FIELDS.intersection(update_fields):
+        return
+    previous_schedule_ids = sync_booking_seats(instance)
+    for schedule_id in previous_schedule_ids | {instance.vehicle_schedule_id}:
+        schedule_occupancy_refresh(schedule_id)
+
+
+@receiver(post_delete, sender=VehicleTicketBooking)
+def ticket_booking_deleted(sender, instance, **kwargs):
+    schedule_occupancy_refresh(instance.vehicle_schedule_id)
+
+
+@receiver(post_save, sender=VehicleSchedule)
+def vehicle_schedule_saved(sender, instance, created, **kwargs):
+    # Route or direction may have changed; new schedules have no bookings yet
+    if not created:
+        schedule_seats_refresh(instance.pk)
@@ -1,3 +1,1106 @@
-from django.test import TestCase
+import json
+import math
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import SuperSetting, User
+from core.services.super_setting import get_super_settings, invalidate_super_settings
+from ev_yatayat_sewa_server.metrics import HISTOGRAM_SUB_BITS, QUANTILES, Histogram, request_metrics
+from ev_yatayat_sewa_server.query_budget import record_queries
+from . import geo
+from .models import (
+    GeocodeCache, Location, NodeOutboxEvent, Place, Route, RoutePlaceOrder, RouteStopPoint, SeatBooking, SeatHold,
+    Trip, TripTrack, Vehicle, VehicleLastPosition, VehicleSchedule, VehicleSeat, VehicleTicketBooking,
+    VehicleTicketBookingSeat,
+)
+from .route_order import get_route_place_order, refresh_route_place_orders
+from .services import node_dispatcher, place_autocomplete, reverse_geocode, spatial_index, trip_track, vehicle_position
+from .services.background_worker import BackgroundWorker
+from .services.place_index import place_index
+from .services.place_search import PlaceSearchIndex
+from .services.seat_occupancy import booked_seats_for_segment, build_occupancy, decode_mask, segment_mask
+from .services.ticket_seats import booking_seat_list, sync_booking_seats
+from .services.track_format import TRACK_RECORD, decode_polyline, encode_polyline, track_binary, track_polyline
+from .services.trip_track import build_trip_tracks, rebuild_stale_tracks
+from .transliteration import consonant_skeleton, name_search_forms, normalize_phonetic, romanize, search_matches
+from .vehicle_payload import _cache_key
+from .views import vehicle_views
+from .views.vehicle_schedule_views import _filter_schedules_by_segment
+
+
+def make_user(phone, **fields):
+    return User.objects.create_user(phone=phone, username=phone, password=None, **fields)
+
+
+def make_route(code='T'):
+    start = Place.objects.create(name=f'{code} Start', code=f'{code}-S', latitude=Decimal('27.70'), longitude=Decimal('85.30'))
+    end = Place.objects.create(name=f'{code} End', code=f'{code}-E', latitude=Decimal('27.80'), longitude=Decimal('85.40'))
+    return Route.objects.create(name=f'{code} Route', start_point=start, end_point=end)
+
+
+def make_vehicle(vehicle_no, **fields):
+    return Vehicle.objects.create(name=f'Bus {vehicle_no}', vehicle_no=vehicle_no, vehicle_type='bus', **fields)
+
+
+def make_fleet(n, start=0, seats=4):
+    """n vehicles, each with its driver, a route with two stops, seats, a running trip and a last position."""
+    vehicles = []
+    for i in range(start, start + n):
+        driver = make_user(f'98100{i:05d}', is_driver=True)
+        route = make_route(f'F{i}')
+        for order in range(2):
+            place = Place.objects.create(
+                name=f'F{i} Stop {order}', code=f'F{i}-{order}',
+                latitude=Decimal('27.72') + order * Decimal('0.02'), longitude=Decimal('85.32') + order * Decimal('0.02'),
+            )
+            RouteStopPoint.objects.create(route=route, place=place, order=order)
+        vehicle = make_vehicle(f'F-{i}', active_driver=driver, active_route=route)
+        vehicle.drivers.add(driver)
+        vehicle.routes.add(route)
+        VehicleSeat.objects.bulk_create([
+            VehicleSeat(vehicle=vehicle, side='A', number=number) for number in range(1, seats + 1)
+        ])
+        Trip.objects.create(
+            vehicle=vehicle, driver=driver, route=route, trip_id=f'F-TRIP-{i}', start_time=timezone.now(),
+        )
+        VehicleLastPosition.objects.create(
+            vehicle=vehicle, latitude=Decimal('27.7') + i * Decimal('0.001'), longitude=Decimal('85.3'),
+            recorded_at=timezone.now(),
+        )
+        vehicles.append(vehicle)
+    return vehicles
+
+
+class LastPositionTests(TestCase):
+    def setUp(self):
+        self.vehicle = make_vehicle('T-1')
+
+    def _location(self, latitude, recorded_at=None):
+        return Location.objects.create(
+            vehicle=self.vehicle, latitude=Decimal(latitude), longitude=Decimal('85.3'), recorded_at=recorded_at,
+        )
+
+    def test_concurrent_first_point_updates_instead_of_failing(self):
+        # Another request inserted the row after our locked read found none
+        self._location('27.70')
+        vehicle_position.record_last_position(Location.objects.get())
+        newer = self._location('27.71')
+        with mock.patch.object(vehicle_position, '_locked_position', return_value=None):
+            pos = vehicle_position.record_last_position(newer)
+        self.assertEqual(VehicleLastPosition.objects.count(), 1)
+        self.assertEqual(pos.latitude, Decimal('27.71'))
+
+    def test_older_point_is_ignored(self):
+        now = timezone.now()
+        vehicle_position.record_last_position(self._location('27.70', recorded_at=now))
+        vehicle_position.record_last_position(self._location('27.60', recorded_at=now - timedelta(minutes=5)))
+        self.assertEqual(VehicleLastPosition.objects.get().latitude, Decimal('27.70'))
+
+    def test_fast_device_clock_does_not_block_later_posts(self):
+        # Batch point stamped an hour ahead of the server, then a live single post
+        vehicle_position.record_last_position(self._location('27.70', recorded_at=timezone.now() + timedelta(hours=1)))
+        vehicle_position.record_last_position(self._location('27.71'))
+        self.assertEqual(VehicleLastPosition.objects.get().latitude, Decimal('27.71'))
+
+
+class TrackTimeTests(TestCase):
+    """Batch-uploaded points are placed on the track by device time, not upload time."""
+
+    def setUp(self):
+        self.driver = make_user('9800000001', is_driver=True)
+        self.vehicle = make_vehicle('T-2', active_driver=self.driver)
+        self.now = timezone.now()
+        self.trip = Trip.objects.create(
+            vehicle=self.vehicle, driver=self.driver, route=make_route(), trip_id='T-TRIP-1',
+            start_time=self.now - timedelta(hours=1),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+        self.client.post(reverse('location-list-post'), {
+            'vehicle': self.vehicle.pk, 'trip': self.trip.pk, 'latitude': '27.75', 'longitude': '85.35',
+        }, format='json')
+        # Offline buffer uploaded after the live point, out of order
+        self.client.post(reverse('location-batch-post'), {
+            'vehicle': self.vehicle.pk, 'trip': self.trip.pk, 'points': [
+                {'latitude': '27.73', 'longitude': '85.33', 'timestamp': (self.now - timedelta(minutes=10)).isoformat()},
+                {'latitude': '27.71', 'longitude': '85.31', 'timestamp': (self.now - timedelta(minutes=30)).isoformat()},
+                {'latitude': '27.72', 'longitude': '85.32', 'timestamp': (self.now - timedelta(minutes=20)).isoformat()},
+            ],
+        }, format='json')
+
+    def _track_latitudes(self, **params):
+        response = self.client.get(reverse('trip-detail-get', args=[self.trip.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return [loc['latitude'][:5] for loc in response.json()['locations']]
+
+    def test_full_track_is_ordered_by_device_time(self):
+        self.assertEqual(self._track_latitudes(track='full'), ['27.71', '27.72', '27.73', '27.75'])
+
+    def test_time_window_uses_device_time(self):
+        self.assertEqual(self._track_latitudes(
+            track_from=(self.now - timedelta(minutes=25)).isoformat(),
+            track_to=(self.now - timedelta(minutes=15)).isoformat(),
+        ), ['27.72'])
+
+    def test_polyline_and_binary_decode_to_the_json_track(self):
+        url = reverse('trip-detail-get', args=[self.trip.pk])
+        locations = self.client.get(url).json()['locations']
+        expected = [(float(loc['latitude']), float(loc['longitude'])) for loc in locations]
+
+        track = self.client.get(url, {'format': 'polyline'}).json()['track']
+        self.assertEqual(track['format'], 'polyline')
+        for (lat, lng), (want_lat, want_lng) in zip(decode_polyline(track['polyline']), expected, strict=True):
+            self.assertAlmostEqual(lat, want_lat, places=5)
+            self.assertAlmostEqual(lng, want_lng, places=5)
+
+        response = self.client.get(url, {'format': 'binary'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        records = list(TRACK_RECORD.iter_unpack(response.content))
+        self.assertEqual(len(records), len(expected))
+        for (lat, lng, _, _), (want_lat, want_lng) in zip(records, expected):
+            self.assertAlmostEqual(lat, want_lat, places=5)
+            self.assertAlmostEqual(lng, want_lng, places=5)
+
+    def test_stored_levels_are_ordered_by_device_time(self):
+        finest = min(build_trip_tracks(self.trip.pk), key=lambda track: track.tolerance_m)
+        times = [point[5] for point in finest.points]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(finest.source_point_count, 4)
+
+
+class TripDetailQueryCountTests(TestCase):
+    """Trip detail runs the same number of queries however many stops, points and bookings the trip has."""
+
+    def setUp(self):
+        self.vehicle = make_fleet(1)[0]
+        self.trip = Trip.objects.get(vehicle=self.vehicle)
+        self.schedule = VehicleSchedule.objects.create(
+            vehicle=self.vehicle, route=self.trip.route, date=timezone.localdate(), time='08:00', price=Decimal('100'),
+        )
+        self.trip.vehicle_schedule = self.schedule
+        self.trip.save()
+        self.seats = list(VehicleSeat.objects.filter(vehicle=self.vehicle).order_by('number'))
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('9800000060', is_superuser=True))
+        self.url = reverse('trip-detail-get', args=[self.trip.pk])
+        self.added = 0
+
+    def _grow(self, n):
+        stops = list(Place.objects.filter(code__startswith='F0-'))
+        for _ in range(n):
+            i = self.added
+            self.added += 1
+            place = Place.objects.create(
+                name=f'Extra {i}', code=f'X-{i}', latitude=Decimal('27.75'), longitude=Decimal('85.35'),
+            )
+            RouteStopPoint.objects.create(route=self.trip.route, place=place, order=10 + i)
+            Location.objects.create(
+                vehicle=self.vehicle, trip=self.trip, latitude=Decimal('27.7') + Decimal(i) / 1000, longitude=Decimal('85.3'),
+            )
+            SeatBooking.objects.create(
+                user=make_user(f'98200{i:05d}'), vehicle=self.vehicle, vehicle_seat=self.seats[i % len(self.seats)],
+                trip=self.trip, check_in_lat=Decimal('27.7'), check_in_lng=Decimal('85.3'),
+                check_in_datetime=timezone.now(), check_in_address='Stop', destination_place=place,
+                trip_amount=Decimal('25'),
+            )
+            VehicleTicketBooking.objects.create(
+                is_guest=True, name=f'Guest {i}', phone=f'98300{i:05d}', vehicle_schedule=self.schedule,
+                pickup_point=stops[0], destination_point=stops[1], ticket_id=f'TQ{i}', pnr=f'EYSTQ{i}',
+                seat=[{'side': 'A', 'number': i % len(self.seats) + 1}], price=Decimal('100'),
+            )
+
+    def test_query_count_is_constant(self):
+        self._grow(1)
+        self.client.get(self.url)  # warm-up: settings cache
+        with record_queries() as small:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['seat_bookings']), 1)
+        self._grow(5)
+        with self.assertNumQueries(small.count):
+            response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual(len(data['seat_bookings']), 6)
+        self.assertEqual(len(data['ticket_bookings']), 6)
+        self.assertEqual(len(data['locations']), 6)
+        self.assertEqual(len(data['route']['stop_points']), 10)
+
+
+@override_settings(NODE_BASE_URL='', TRIP_TRACK_INLINE_WORKER=False)
+class LateTrackRebuildTests(TestCase):
+    """Late points to a finished trip mark its stored levels stale; they are rebuilt once, later."""
+
+    def setUp(self):
+        self.driver = make_user('9800000003', is_driver=True)
+        self.vehicle = make_vehicle('T-4', active_driver=self.driver)
+        self.now = timezone.now()
+        self.trip = Trip.objects.create(
+            vehicle=self.vehicle, driver=self.driver, route=make_route('L'), trip_id='T-TRIP-L',
+            start_time=self.now - timedelta(hours=2), end_time=self.now - timedelta(hours=1),
+        )
+        build_trip_tracks(self.trip.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def _post_late_batch(self, minutes):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('location-batch-post'), {
+                'vehicle': self.vehicle.pk, 'trip': self.trip.pk, 'points': [{
+                    'latitude': f'27.7{minutes:02d}', 'longitude': '85.3',
+                    'timestamp': (self.now - timedelta(minutes=90 - minutes)).isoformat(),
+                }],
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def _finest_source_count(self):
+        return TripTrack.objects.get(trip=self.trip, tolerance_m=min(trip_track.TRACK_TOLERANCES_M)).source_point_count
+
+    def test_late_batches_only_mark_the_track_stale(self):
+        with mock.patch.object(trip_track, 'build_trip_tracks') as build:
+            for minutes in range(3):
+                self._post_late_batch(minutes)
+        build.assert_not_called()
+        self.trip.refresh_from_db()
+        self.assertIsNotNone(self.trip.track_stale_at)
+        self.assertEqual(self._finest_source_count(), 0)
+
+    def test_stale_trip_is_rebuilt_once_after_the_delay(self):
+        for minutes in range(3):
+            self._post_late_batch(minutes)
+        self.assertEqual(rebuild_stale_tracks(), 0)  # still within TRIP_TRACK_REBUILD_DELAY_SECONDS
+        with mock.patch.object(trip_track, 'build_trip_tracks', wraps=build_trip_tracks) as build:
+            self.assertEqual(rebuild_stale_tracks(delay_seconds=0), 1)
+        build.assert_called_once_with(self.trip.pk)
+        self.assertEqual(self._finest_source_count(), 3)
+        self.trip.refresh_from_db()
+        self.assertIsNone(self.trip.track_stale_at)
+
+    def test_point_arriving_during_the_rebuild_keeps_the_trip_stale(self):
+        self._post_late_batch(0)
+
+        def build_with_late_point(trip_id):
+            tracks = build_trip_tracks(trip_id)
+            self._post_late_batch(1)
+            return tracks
+
+        with mock.patch.object(trip_track, 'build_trip_tracks', side_effect=build_with_late_point):
+            rebuild_stale_tracks(delay_seconds=0)
+        self.trip.refresh_from_db()
+        self.assertIsNotNone(self.trip.track_stale_at)
+        self.assertEqual(rebuild_stale_tracks(delay_seconds=0), 1)
+        self.assertEqual(self._finest_source_count(), 2)
+
+    def test_trip_end_queues_the_build_without_running_it(self):
+        trip = Trip.objects.create(
+            vehicle=self.vehicle, driver=self.driver, route=self.trip.route, trip_id='T-TRIP-E',
+            start_time=self.now - timedelta(minutes=30),
+        )
+        with mock.patch.object(trip_track, 'build_trip_tracks') as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('trip-end', args=[trip.pk]), {
+                    'latitude': '27.80', 'longitude': '85.40',
+                }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        build.assert_not_called()
+        self.assertFalse(TripTrack.objects.filter(trip=trip).exists())
+        # Due at once: no rebuild delay for a trip that just ended
+        self.assertEqual(rebuild_stale_tracks(), 1)
+        self.assertEqual(TripTrack.objects.filter(trip=trip).count(), len(trip_track.TRACK_TOLERANCES_M))
+
+    def test_detail_returns_every_location_unless_a_level_is_asked_for(self):
+        for minutes in range(3):
+            self._post_late_batch(minutes)
+        rebuild_stale_tracks(delay_seconds=0)
+        url = reverse('trip-detail-get', args=[self.trip.pk])
+        data = self.client.get(url).json()
+        self.assertEqual(data['track']['resolution'], 'full')
+        self.assertEqual(len(data['locations']), 3)
+        data = self.client.get(url, {'track_tolerance': '5'}).json()
+        self.assertEqual(data['track']['resolution'], 'simplified')
+        self.assertEqual(data['track']['tolerance_m'], min(trip_track.TRACK_TOLERANCES_M))
+        data = self.client.get(url, {'track_zoom': '1'}).json()
+        self.assertEqual(data['track']['tolerance_m'], max(trip_track.TRACK_TOLERANCES_M))
+
+
+@mock.patch.object(reverse_geocode, '_nominatim_reverse', side_effect=AssertionError('network call'))
+class OfflineAddressTests(TestCase):
+    """Placeholder addresses are resolved from places and cached cells only, never from Nominatim."""
+
+    def setUp(self):
+        Place.objects.create(name='Ratna Park', code='RP', latitude=Decimal('27.7050'), longitude=Decimal('85.3150'))
+        place_index.invalidate()
+        reverse_geocode.clear_geocode_memory()
+
+    def test_point_near_a_place(self, remote):
+        self.assertEqual(reverse_geocode.resolve_address_from_coords('Current location', '27.7060', '85.3150'), 'Near Ratna Park')
+
+    def test_point_in_a_cached_cell(self, remote):
+        lat_key, lng_key = reverse_geocode._cell(27.80, 85.50)
+        GeocodeCache.objects.create(
+            lat_key=lat_key, lng_key=lng_key, address='Gokarna, Kathmandu', expires_at=timezone.now() + timedelta(days=1),
+        )
+        self.assertEqual(reverse_geocode.resolve_address_from_coords('', 27.80, 85.50), 'Gokarna, Kathmandu')
+
+    def test_miss_keeps_the_placeholder(self, remote):
+        self.assertEqual(reverse_geocode.resolve_address_from_coords(' My location ', 28.20, 83.98), 'My location')
+        self.assertEqual(reverse_geocode.resolve_address_from_coords('Lakeside', 28.20, 83.98), 'Lakeside')
+        remote.assert_not_called()
+
+
+class LocationBatchTests(TestCase):
+    def setUp(self):
+        self.driver = make_user('9800000002', is_driver=True)
+        self.vehicle = make_vehicle('T-3', active_driver=self.driver)
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def test_non_numeric_trip_is_rejected(self):
+        response = self.client.post(reverse('location-batch-post'), {
+            'vehicle': self.vehicle.pk,
+            'points': [{'latitude': '27.7', 'longitude': '85.3', 'timestamp': timezone.now().isoformat(), 'trip': 'abc'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Location.objects.exists())
+
+
+@override_settings(NODE_BASE_URL='http://node.test', NODE_OUTBOX_INLINE_WORKER=False)
+class NodeOutboxTests(TestCase):
+    def test_location_events_reuse_one_row_per_trip(self):
+        key = 'trip_location:TRIP-1'
+        first = node_dispatcher.enqueue('trip_location', {'lat': 1}, coalesce_key=key)
+        NodeOutboxEvent.objects.filter(pk=first.pk).update(status='delivered', delivered_at=timezone.now())
+        node_dispatcher.enqueue('trip_location', {'lat': 2}, coalesce_key=key)
+        event = NodeOutboxEvent.objects.get()
+        self.assertEqual((event.status, event.payload), ('pending', {'lat': 2}))
+
+    def test_new_point_is_due_now_even_during_backoff(self):
+        key = 'trip_location:TRIP-2'
+        first = node_dispatcher.enqueue('trip_location', {'lat': 1}, coalesce_key=key)
+        NodeOutboxEvent.objects.filter(pk=first.pk).update(attempts=5, next_attempt_at=timezone.now() + timedelta(minutes=5))
+        node_dispatcher.enqueue('trip_location', {'lat': 2}, coalesce_key=key)
+        event = NodeOutboxEvent.objects.get()
+        self.assertLessEqual(event.next_attempt_at, timezone.now())
+        self.assertEqual(event.attempts, 0)
+
+    def _fail_while_coalescing(self, retryable):
+        key = 'trip_location:TRIP-3'
+        first = node_dispatcher.enqueue('trip_location', {'lat': 1}, coalesce_key=key)
+
+        def post(kind, payload, session):
+            node_dispatcher.enqueue('trip_location', {'lat': 2}, coalesce_key=key)  # newer point while in flight
+            return False, retryable, '400 bad request'
+
+        with mock.patch.object(node_dispatcher, '_post', side_effect=post):
+            node_dispatcher.deliver_events([first.pk], session=None)
+        event = NodeOutboxEvent.objects.get()
+        self.assertEqual((event.status, event.payload, event.attempts), ('pending', {'lat': 2}, 0))
+        self.assertLessEqual(event.next_attempt_at, timezone.now())
+
+    def test_permanent_failure_does_not_fail_a_newer_point(self):
+        self._fail_while_coalescing(retryable=False)
+
+    def test_retry_backoff_does_not_delay_a_newer_point(self):
+        self._fail_while_coalescing(retryable=True)
+
+
+@mock.patch.object(spatial_index, 'SYNC_MIN_INTERVAL_SECONDS', 0)
+class VehicleListQueryCountTests(TestCase):
+    """Vehicle list and nearby run the same number of queries whatever the fleet size."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('9800000009', is_superuser=True))
+
+    def _prepare(self, url):
+        spatial_index.vehicle_index.warm()
+        self.client.get(url)  # warm-up: settings cache
+        cache.clear()  # measured requests build vehicle payloads instead of reading the cache
+
+    def _assert_constant(self, url):
+        make_fleet(2)
+        self._prepare(url)
+        with record_queries() as small:
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 2)
+        make_fleet(6, start=2)
+        self._prepare(url)
+        with self.assertNumQueries(small.count):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 8)
+
+    def test_vehicle_list(self):
+        self._assert_constant(reverse('vehicle-list-get') + '?per_page=50')
+
+    def test_vehicle_nearby(self):
+        self._assert_constant(reverse('vehicle-nearby') + '?latitude=27.7&longitude=85.3&radius_km=50')
+
+
+class FieldSelectionTests(TestCase):
+    """?fields= and ?exclude= restrict the vehicle and schedule list payloads to the selected keys."""
+
+    def setUp(self):
+        vehicle = make_fleet(2)[0]
+        VehicleSchedule.objects.create(
+            vehicle=vehicle, route=vehicle.active_route, date=timezone.localdate(), time='08:00', price=Decimal('100'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('9800000011', is_superuser=True))
+        cache.clear()
+
+    def _results(self, name, **params):
+        response = self.client.get(reverse(name), {'per_page': 50, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_fields_keeps_only_the_listed_keys(self):
+        results = self._results('vehicle-list-get', fields='id,vehicle_no')
+        self.assertEqual(len(results), 2)
+        for row in results:
+            self.assertEqual(set(row), {'id', 'vehicle_no'})
+
+    def test_exclude_drops_keys_and_skips_their_queries(self):
+        self._results('vehicle-list-get')  # warm-up: settings cache
+        cache.clear()
+        with record_queries() as full:
+            self._results('vehicle-list-get')
+        cache.clear()
+        with record_queries() as slim:
+            results = self._results('vehicle-list-get', exclude='seats,images,drivers,driver_details')
+        for row in results:
+            self.assertIn('vehicle_no', row)
+            self.assertTrue({'seats', 'images', 'drivers', 'driver_details'}.isdisjoint(row))
+        self.assertLess(slim.count, full.count)
+
+    def test_schedule_list_selection(self):
+        rows = self._results('vehicle-schedule-list-get', expand='1', fields='id,available_seats')
+        self.assertEqual(rows, [{'id': rows[0]['id'], 'available_seats': 4}])
+
+
+class VehiclePayloadCacheTests(TestCase):
+    def setUp(self):
+        self.vehicle = make_fleet(1)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.vehicle.active_driver)
+        cache.clear()
+
+    def _seat_statuses(self):
+        response = self.client.get(reverse('vehicle-detail-get', args=[self.vehicle.pk]))
+        return [seat['status'] for seat in response.json()['seats']]
+
+    def test_seat_status_is_not_served_from_the_cache(self):
+        self.assertEqual(self._seat_statuses(), ['available'] * 4)
+        # Queryset updates send no signals, so nothing invalidates the cached payload
+        VehicleSeat.objects.filter(vehicle=self.vehicle, number=2).update(status='booked')
+        self.assertEqual(self._seat_statuses(), ['available', 'booked', 'available', 'available'])
+
+    @override_settings(NODE_BASE_URL='')
+    def test_booking_a_seat_drops_the_cached_payload(self):
+        self.assertEqual(self._seat_statuses(), ['available'] * 4)
+        seat = VehicleSeat.objects.get(vehicle=self.vehicle, number=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('seat-booking-create'), {
+                'vehicle': self.vehicle.pk, 'vehicle_seat': seat.pk, 'is_guest': 'true',
+                'check_in_lat': '27.72', 'check_in_lng': '85.32', 'check_in_address': 'Stop 0',
+                'check_in_datetime': timezone.now().isoformat(),
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(cache.get(_cache_key(self.vehicle.pk)))
+        self.assertEqual(self._seat_statuses(), ['available', 'available', 'booked', 'available'])
+
+    def _detail(self):
+        response = self.client.get(reverse('vehicle-detail-get', args=[self.vehicle.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_editing_an_embedded_route_place_or_driver_drops_the_cached_payload(self):
+        other = make_fleet(1, start=1)[0]
+        route = self.vehicle.routes.get()
+        self._detail()
+        self.client.get(reverse('vehicle-detail-get', args=[other.pk]))
+
+        route.name = 'Renamed Route'
+        route.save()
+        self.assertEqual(self._detail()['route_details'][0]['name'], 'Renamed Route')
+
+        route.start_point.name = 'Renamed Start'
+        route.start_point.save()
+        self.assertEqual(self._detail()['route_details'][0]['start_point_details']['name'], 'Renamed Start')
+
+        driver = self.vehicle.active_driver
+        driver.name = 'Renamed Driver'
+        driver.save()
+        data = self._detail()
+        self.assertEqual(data['driver_details'][0]['name'], 'Renamed Driver')
+        self.assertEqual(data['active_driver_details']['name'], 'Renamed Driver')
+
+        self.assertIsNotNone(cache.get(_cache_key(other.pk)))  # unrelated vehicle keeps its entry
+
+    def test_login_timestamp_keeps_the_cached_payload(self):
+        self._detail()
+        driver = self.vehicle.active_driver
+        driver.last_login = timezone.now()
+        driver.save(update_fields=['last_login'])
+        self.assertIsNotNone(cache.get(_cache_key(self.vehicle.pk)))
+
+    def test_deleting_a_route_drops_the_cached_payload(self):
+        self._detail()
+        self.vehicle.routes.get().stop_points.first().delete()
+        self.assertIsNone(cache.get(_cache_key(self.vehicle.pk)))
+        self._detail()
+        Route.objects.filter(vehicles=self.vehicle).get().delete()
+        self.assertIsNone(cache.get(_cache_key(self.vehicle.pk)))
+
+
+@mock.patch.object(spatial_index, 'SYNC_MIN_INTERVAL_SECONDS', 0)
+@mock.patch.object(vehicle_views, 'NEARBY_ID_CHUNK', 2)
+class NearbyChunkTests(TestCase):
+    def setUp(self):
+        make_fleet(5)
+        spatial_index.vehicle_index.warm()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('9800000010'))
+        self.url = reverse('vehicle-nearby')
+
+    def _nearby(self, **params):
+        response = self.client.get(self.url, {'latitude': '27.7', 'longitude': '85.3', 'radius_km': '50', **params})
+        return [vehicle['vehicle_no'] for vehicle in response.json()['results']]
+
+    def test_every_chunk_is_loaded_without_limit(self):
+        self.assertEqual(sorted(self._nearby()), ['F-0', 'F-1', 'F-2', 'F-3', 'F-4'])
+
+    def test_limit_stops_after_the_nearest_chunk(self):
+        with record_queries() as queries:
+            self.assertEqual(self._nearby(limit='2', active_trip_only='true'), ['F-0', 'F-1'])
+        vehicle_loads = [sql for sql in queries.statements if 'FROM "vehicles"' in sql and 'IN (' in sql]
+        self.assertEqual(sum(queries.statements[sql] for sql in vehicle_loads), 1)
+
+
+@mock.patch.object(spatial_index, 'SYNC_MIN_INTERVAL_SECONDS', 0)
+class SettingQueryTests(TestCase):
+    """Hot booking endpoints read SuperSetting from the per-process cache once it is warm."""
+
+    def setUp(self):
+        SuperSetting.objects.create(per_km_charge=Decimal('10'), initial_km=Decimal('2'), initial_km_charge=Decimal('20'))
+        self.vehicle = make_fleet(1)[0]
+        self.trip = Trip.objects.get(vehicle=self.vehicle)
+        self.route = self.trip.route
+        seat = VehicleSeat.objects.filter(vehicle=self.vehicle).first()
+        VehicleSeat.objects.filter(pk=seat.pk).update(status='booked')
+        self.booking = SeatBooking.objects.create(
+            is_guest=True, vehicle=self.vehicle, vehicle_seat=seat, trip=self.trip,
+            check_in_lat=Decimal('27.70'), check_in_lng=Decimal('85.30'), check_in_datetime=timezone.now(),
+            check_in_address='F0 Start',
+        )
+        spatial_index.vehicle_index.warm()
+        self.client = APIClient()
+        self.client.force_authenticate(self.trip.driver)
+        invalidate_super_settings()
+        get_super_settings()
+
+    def _assert_no_setting_queries(self, method, url, data, expected_status=200):
+        with record_queries() as queries:
+            response = getattr(self.client, method)(url, data, format='json' if method == 'post' else None)
+        self.assertEqual(response.status_code, expected_status, response.content)
+        self.assertEqual([sql for sql in queries.statements if 'super_settings' in sql], [])
+        return response
+
+    def test_hot_endpoints_use_the_cached_settings(self):
+        end = self.route.end_point
+        at_start = {'latitude': '27.70', 'longitude': '85.30'}
+        self._assert_no_setting_queries('get', reverse('vehicle-nearby'), at_start)
+        self._assert_no_setting_queries('get', reverse('trip-detail-get', args=[self.trip.pk]), {})
+        self._assert_no_setting_queries('get', reverse('trip-current-stop'), dict(at_start, trip=self.trip.pk))
+        self._assert_no_setting_queries('get', reverse('route-stop-point-list-get', args=[self.route.pk]), {})
+        # Pick-up two stops ahead of the bus, which is at the route start
+        preview = self._assert_no_setting_queries('get', reverse('direct-seat-booking-preview'), {
+            'vehicle': self.vehicle.pk, 'origin_place': Place.objects.get(code='F0-1').pk, 'destination_place': end.pk,
+        })
+        self.assertEqual(preview.json()['per_km_charge'], '10.00')
+        self._assert_no_setting_queries('post', reverse('seat-booking-checkout'), {
+            'vehicle_seat_id': self.booking.vehicle_seat_id, 'check_out_lat': str(end.latitude),
+            'check_out_lng': str(end.longitude), 'check_out_address': end.name, 'confirm_out_of_range': 'true',
+        })
+        self.booking.refresh_from_db()
+        self.assertIsNotNone(self.booking.check_out_datetime)
+        self._assert_no_setting_queries('post', reverse('trip-end', args=[self.trip.pk]), {
+            'latitude': str(end.latitude), 'longitude': str(end.longitude), 'confirm_out_of_range': 'true',
+        })
+        self.trip.refresh_from_db()
+        self.assertIsNotNone(self.trip.end_time)
+
+
+class TransliterationGoldenTests(SimpleTestCase):
+    """Place.name_roman / name_phonetic / name_skeleton are stored from these outputs; a change needs a backfill."""
+
+    GOLDEN_PATH = Path(__file__).resolve().parent / 'data' / 'transliteration_golden.json'
+
+    def test_outputs_match_the_golden_corpus(self):
+        with open(self.GOLDEN_PATH, encoding='utf-8') as f:
+            entries = json.load(f)
+        self.assertTrue(entries)
+        for entry in entries:
+            for func in (romanize, normalize_phonetic, consonant_skeleton):
+                with self.subTest(text=entry['text'], function=func.__name__):
+                    self.assertEqual(func(entry['text']), entry[func.__name__])
+
+
+@mock.patch.object(place_autocomplete, 'PLACE_INDEX_CHECK_SECONDS', 0)
+class PlaceAutocompleteTests(TestCase):
+    def setUp(self):
+        for name, code in (('Kalanki', 'KLK'), ('Kalimati', 'KLM'), ('Thamel', 'THM')):
+            Place.objects.create(name=name, code=code, latitude=Decimal('27.70'), longitude=Decimal('85.30'))
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('9800000040'))
+        self.url = reverse('place-autocomplete')
+
+    def _names(self, query):
+        response = self.client.get(self.url, {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_prefix_lookup(self):
+        self.assertEqual(self._names('kal'), ['Kalanki', 'Kalimati'])
+        self.assertEqual(self._names('Kali'), ['Kalimati', 'Kalanki'])  # typed prefix before skeleton "kl"
+        self.assertEqual(self._names('kalim'), ['Kalimati'])
+        self.assertEqual(self._names('thm'), ['Thamel'])  # code
+        self.assertEqual(self._names('amel'), [])
+
+    def test_matching_etag_gets_not_modified(self):
+        response = self.client.get(self.url, {'q': 'kal'})
+        etag = response['ETag']
+        response = self.client.get(self.url, {'q': 'kal'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        Place.objects.create(name='Kalopul', code='KLP', latitude=Decimal('27.70'), longitude=Decimal('85.30'))
+        response = self.client.get(self.url, {'q': 'kal'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Kalopul', [row['name'] for row in response.json()['results']])
+
+
+class PlaceSearchIndexTests(SimpleTestCase):
+    """Ranked index search returns the places search_matches accepts, best match first."""
+
+    NAMES = [
+        'New Kalanki', 'Kalanki Chowk', 'Kalanki', 'काठमाडौं', 'Kathmandu Durbar Square', 'Thamel',
+        'Chabahil', 'Chhabahil Chowk', 'शान्ति नगर', 'Shanti Nagar Gate', 'A',
+    ]
+
+    def setUp(self):
+        self.index = PlaceSearchIndex()
+        self.index.load([(i, name, *name_search_forms(name)) for i, name in enumerate(self.NAMES)])
+
+    def _names(self, query):
+        return [self.NAMES[i] for i in self.index.search(query)]
+
+    def test_exact_then_prefix_then_substring(self):
+        # "A" occurs inside the query, the weakest kind of match
+        self.assertEqual(self._names('kalanki'), ['Kalanki', 'Kalanki Chowk', 'New Kalanki', 'A'])
+
+    def test_name_inside_the_query_ranks_last(self):
+        names = self._names('Thamel A')
+        self.assertEqual(names[-1], 'A')
+        self.assertIn('Thamel', names)
+
+    def test_same_matches_as_search_matches(self):
+        for query in ('kalanki', 'kathmandu', 'काठमाडौं', 'chabahil', 'chhabahil', 'shanti', 'santi nagar', 'ktm', 'xyz', 'a'):
+            expected = {i for i, name in enumerate(self.NAMES) if search_matches(name, query)}
+            self.assertEqual(set(self.index.search(query)), expected, query)
+        self.assertEqual(self.index.search('  '), [])
+
+
+class MetricsTests(TestCase):
+    def test_histogram_percentiles(self):
+        hist = Histogram()
+        for value in range(1, 10001):
+            hist.record(value)
+        # Highest value of the bucket holding the exact percentile: never below it, within one bucket width
+        for q, value in zip(QUANTILES, hist.percentiles(QUANTILES)):
+            exact = round(q * 10000)
+            self.assertGreaterEqual(value, exact)
+            self.assertLess(value, exact * (1 + 2 ** (1 - HISTOGRAM_SUB_BITS)))
+        self.assertEqual((hist.count, hist.total, hist.max), (10000, 50005000, 10000))
+        small = Histogram()
+        for value in (3, 1, 2, 2):
+            small.record(value)
+        self.assertEqual(small.percentiles((0.25, 0.5, 1.0)), [1, 2, 3])  # exact below 2**HISTOGRAM_SUB_BITS
+        self.assertEqual(Histogram().percentiles(QUANTILES), [0, 0, 0])
+
+    def test_endpoint_is_admin_only(self):
+        url = reverse('metrics')
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        client = APIClient()
+        client.force_authenticate(make_user('9800000050'))
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(make_user('9800000051', is_staff=True))
+        request_metrics.reset()
+        client.get(reverse('vehicle-list-get'))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('ev_request_duration_seconds_count{view="vehicle-list-get",method="GET"} 1', response.content.decode())
+
+
+class SeedFleetTests(TestCase):
+    """seed_fleet runs on SQLite and writes the derived rows that signals would have written."""
+
+    OPTIONS = {
+        'places': 30, 'routes': 3, 'vehicles': 2, 'passengers': 5, 'days': 1, 'trips_per_day': 1,
+        'points_per_trip': 6, 'seats': 6, 'schedule_days': 1, 'tickets_per_schedule': 2,
+    }
+
+    def _seed(self, **options):
+        call_command('seed_fleet', stdout=StringIO(), **self.OPTIONS, **options)
+
+    def test_seeds_consistent_rows(self):
+        self._seed()
+        self.assertEqual(Place.objects.filter(code__startswith='SF-').count(), 30)
+        self.assertEqual(Vehicle.objects.filter(vehicle_no__startswith='SF-').count(), 2)
+        self.assertEqual(VehicleSeat.objects.count(), 12)
+        for route in Route.objects.all():
+            self.assertEqual(RoutePlaceOrder.objects.filter(route=route).count(), route.stop_points.count() + 2)
+        finished = Trip.objects.filter(end_time__isnull=False)
+        self.assertTrue(finished.exists())
+        self.assertFalse(finished.exclude(tracks__isnull=False).exists())
+        schedules = VehicleSchedule.objects.all()
+        self.assertTrue(schedules.exists())
+        for schedule in schedules:
+            rows = VehicleTicketBookingSeat.objects.filter(vehicle_schedule=schedule)
+            self.assertEqual(schedule.booked_seat_count, rows.count())
+            occupancy, _ = build_occupancy(rows.values_list('side', 'number', 'from_order', 'to_order'))
+            self.assertEqual(schedule.seat_occupancy, occupancy)
+
+    def test_flush_reseeds_and_an_existing_prefix_is_refused(self):
+        self._seed()
+        with self.assertRaises(CommandError):
+            self._seed()
+        self._seed(flush=True)
+        self.assertEqual(Place.objects.filter(code__startswith='SF-').count(), 30)
+        self.assertEqual(Vehicle.objects.filter(vehicle_no__startswith='SF-').count(), 2)
+
+
+class QueryBudgetTests(TestCase):
+    """Runs check_query_budgets (booking/data/query_budgets.json) on a seeded fleet at two sizes."""
+
+    SEED_OPTIONS = {
+        'places': 40, 'routes': 4, 'passengers': 20, 'trips_per_day': 1, 'points_per_trip': 8,
+        'seats': 8, 'schedule_days': 1, 'tickets_per_schedule': 2,
+    }
+
+    def setUp(self):
+        cache.clear()
+        spatial_index.vehicle_index.load([])
+
+    def _check_budgets(self, **sizes):
+        call_command('seed_fleet', stdout=StringIO(), **self.SEED_OPTIONS, **sizes)
+        spatial_index.vehicle_index.warm()
+        admin = make_user('9800000099', is_superuser=True, is_staff=True)
+        out = StringIO()
+        try:
+            call_command('check_query_budgets', user=admin.pk, stdout=out)
+        except CommandError as exc:
+            self.fail(f'{exc}\n{out.getvalue()}')
+        self.assertNotIn('skipped', out.getvalue())
+
+    def test_small_fleet(self):
+        self._check_budgets(vehicles=3, days=2)
+
+    def test_larger_fleet(self):
+        self._check_budgets(vehicles=12, days=5)
+
+
+class SeatHoldTests(TestCase):
+    """Ticket bookings and seat holds on a schedule (route F0: start 0, stops 1 and 2, end 3)."""
+
+    def setUp(self):
+        vehicle = make_fleet(1)[0]
+        self.schedule = VehicleSchedule.objects.create(
+            vehicle=vehicle, route=vehicle.active_route, date=timezone.localdate(), time='08:00', price=Decimal('100'),
+        )
+        self.stop1, self.stop2 = Place.objects.get(code='F0-0'), Place.objects.get(code='F0-1')
+        self.buyer = make_user('9800000020')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def _hold(self, seats, client=None, **segment):
+        response = (client or self.client).post(reverse('vehicle-ticket-booking-hold'), {
+            'vehicle_schedule': self.schedule.pk, 'seats': seats, **segment,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['hold_token']
+
+    def _book(self, seats, client=None, **fields):
+        return (client or self.client).post(reverse('vehicle-ticket-booking-list-post'), {
+            'name': 'Buyer', 'phone': '9800000020', 'vehicle_schedule': self.schedule.pk, 'seats': seats, **fields,
+        }, format='json')
+
+    def test_same_seat_cannot_be_booked_twice(self):
+        self.assertEqual(self._book([{'side': 'A', 'number': 1}]).status_code, 201)
+        response = self._book([{'side': 'A', 'number': 1}, {'side': 'A', 'number': 2}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(VehicleTicketBooking.objects.count(), 1)
+
+    def test_disjoint_segments_share_a_seat(self):
+        seat = [{'side': 'A', 'number': 1}]
+        self.assertEqual(self._book(seat, destination_point=self.stop1.pk, pickup_point=self.schedule.route.start_point_id).status_code, 201)
+        self.assertEqual(self._book(seat, pickup_point=self.stop1.pk, destination_point=self.stop2.pk).status_code, 201)
+
+    def test_held_seat_cannot_be_booked_by_others(self):
+        self._hold([{'side': 'A', 'number': 1}])
+        other = APIClient()
+        other.force_authenticate(make_user('9800000021'))
+        self.assertEqual(self._book([{'side': 'A', 'number': 1}], client=other).status_code, 400)
+
+    def test_expired_hold_cannot_be_confirmed(self):
+        token = self._hold([{'side': 'A', 'number': 1}])
+        SeatHold.objects.filter(token=token).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self._book([{'side': 'A', 'number': 1}], hold_token=token)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expired', response.json()['error'])
+
+    def test_confirming_requires_the_held_seats_and_segment(self):
+        seat = [{'side': 'A', 'number': 1}]
+        token = self._hold(seat, pickup_point=self.stop1.pk, destination_point=self.stop2.pk)
+        for seats, segment in (
+            (seat + [{'side': 'A', 'number': 2}], {'pickup_point': self.stop1.pk, 'destination_point': self.stop2.pk}),
+            ([{'side': 'A', 'number': 2}], {'pickup_point': self.stop1.pk, 'destination_point': self.stop2.pk}),
+            (seat, {}),
+        ):
+            response = self._book(seats, hold_token=token, **segment)
+            self.assertEqual(response.status_code, 400, seats)
+        self.assertTrue(SeatHold.objects.filter(token=token).exists())
+        response = self._book(seat, hold_token=token, pickup_point=self.stop1.pk, destination_point=self.stop2.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(SeatHold.objects.filter(token=token).exists())
+
+    def test_only_the_holder_releases_a_hold(self):
+        token = self._hold([{'side': 'A', 'number': 1}])
+        url = reverse('vehicle-ticket-booking-hold-release', args=[token])
+        other = APIClient()
+        other.force_authenticate(make_user('9800000022'))
+        self.assertEqual(other.post(url).status_code, 403)
+        self.assertEqual(APIClient().post(url).status_code, 401)
+        self.assertEqual(self._book([{'side': 'A', 'number': 1}], client=other, hold_token=token).status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertFalse(SeatHold.objects.filter(token=token).exists())
+
+    def test_seat_rows_round_trip_the_seat_json(self):
+        seats = [{'side': 'A', 'number': 3}, {'side': 'A', 'number': 1}]
+        response = self._book(seats)
+        self.assertEqual(response.status_code, 201, response.content)
+        booking = VehicleTicketBooking.objects.get()
+        self.assertEqual(booking_seat_list(booking), seats)
+        # The edit view saves without update_fields, which re-runs the seat sync
+        response = self.client.post(reverse('vehicle-ticket-booking-detail-post', args=[booking.pk]), {
+            'is_paid': 'true',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['seat'], seats)
+        sync_booking_seats(booking)
+        self.assertEqual(booking_seat_list(booking), seats)
+        self.assertEqual(VehicleTicketBookingSeat.objects.filter(booking=booking).count(), 2)
+
+    def test_a_booking_has_one_row_per_seat(self):
+        seat = {'side': 'A', 'number': 1}
+        response = self._book([seat, dict(seat)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('more than once', response.json()['error'])
+        self.assertEqual(self._book([seat]).status_code, 201)
+        booking = VehicleTicketBooking.objects.get()
+        booking.seat = [seat, {'side': 'A', 'number': '1'}]  # legacy JSON with a repeated seat
+        booking.save()
+        self.assertEqual(booking_seat_list(booking), [seat])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VehicleTicketBookingSeat.objects.create(
+                booking=booking, vehicle_schedule=self.schedule, side='A', number=1, from_order=0, to_order=1,
+            )
+
+
+
+class SegmentScheduleSearchTests(TestCase):
+    """The SQL segment filter returns the schedules the in-memory route order says it should."""
+
+    def setUp(self):
+        vehicles = make_fleet(2)
+        vehicles[1].active_route.is_bidirectional = True
+        vehicles[1].active_route.save()
+        for vehicle in vehicles:
+            refresh_route_place_orders(vehicle.active_route_id)
+            for reverse in (False, True):
+                VehicleSchedule.objects.create(
+                    vehicle=vehicle, route=vehicle.active_route, date=timezone.localdate(), time='08:00',
+                    price=Decimal('100'), reverse_direction=reverse,
+                )
+
+    def test_matches_the_python_filter_for_every_place_pair(self):
+        schedules = list(VehicleSchedule.objects.select_related('route'))
+        place_ids = list(Place.objects.values_list('pk', flat=True))
+        matched = 0
+        for from_id in place_ids:
+            for to_id in place_ids:
+                expected = set()
+                for schedule in schedules:
+                    order = get_route_place_order(schedule.route, schedule.reverse_direction)
+                    if from_id in order and to_id in order and order[from_id] < order[to_id]:
+                        expected.add(schedule.pk)
+                got = set(_filter_schedules_by_segment(VehicleSchedule.objects.all(), from_id, to_id).values_list('pk', flat=True))
+                self.assertEqual(got, expected, (from_id, to_id))
+                matched += len(got)
+        self.assertGreater(matched, 0)
+
+
+class HaversineManyTests(SimpleTestCase):
+    """Batched distances match haversine_km point by point, with NumPy and with the Python fallback."""
+
+    def setUp(self):
+        # Enough points for the automatic NumPy path; mixed input types as read from DecimalFields
+        self.lats = [Decimal('27.70') + Decimal(i) / 100 for i in range(geo.NUMPY_MIN_POINTS + 8)]
+        self.lngs = [85.30 + (i % 7) / 50 for i in range(len(self.lats))]
+        self.expected = [geo.haversine_km('27.7172', '85.3240', lat, lng) for lat, lng in zip(self.lats, self.lngs)]
+
+    def _assert_matches(self, **kwargs):
+        distances = geo.haversine_many('27.7172', '85.3240', self.lats, self.lngs, **kwargs)
+        self.assertEqual(len(distances), len(self.expected))
+        for got, want in zip(distances, self.expected):
+            self.assertAlmostEqual(got, want, places=9)
+        self.assertEqual(geo.haversine_many(27.7, 85.3, [], []), [])
+
+    def test_python_loop(self):
+        self._assert_matches(use_numpy=False)
+
+    def test_numpy(self):
+        if not geo.HAS_NUMPY:
+            self.skipTest('NumPy is not installed')
+        self._assert_matches(use_numpy=True)
+        self._assert_matches()
+
+    def test_without_numpy_installed(self):
+        with mock.patch.object(geo, 'np', None), mock.patch.object(geo, 'HAS_NUMPY', False):
+            self._assert_matches()
+            self._assert_matches(use_numpy=True)
+            self.assertEqual(geo.nearest_index(27.7, 85.3, self.lats, self.lngs)[0], 0)
+
+
+class TrackFormatTests(SimpleTestCase):
+    POINTS = [(27.71, 85.31, 1700000000.0, 12.5), (27.7123, 85.3141, 1700000004.5, None), (27.7099, 85.3102, 1700000010.0, 0.0)]
+
+    def test_polyline_matches_the_reference_encoding(self):
+        lats, lngs = (38.5, 40.7, 43.252), (-120.2, -120.95, -126.453)
+        self.assertEqual(encode_polyline(lats, lngs), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        self.assertEqual(decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@'), list(zip(lats, lngs)))
+
+    def test_polyline_payload_round_trip(self):
+        payload = json.loads(json.dumps(track_polyline(self.POINTS)))
+        coords = decode_polyline(payload['polyline'])
+        timestamps, speeds, time_ms, speed = [], [], 0, 0
+        for delta in payload['timestamps']:
+            time_ms += delta
+            timestamps.append(time_ms / 1000)
+        for delta in payload['speeds']:
+            if delta is None:
+                speeds.append(None)
+            else:
+                speed += delta
+                speeds.append(speed / 100)
+        self.assertEqual(coords, [(lat, lng) for lat, lng, _, _ in self.POINTS])
+        self.assertEqual(timestamps, [ts for _, _, ts, _ in self.POINTS])
+        self.assertEqual(speeds, [sp for _, _, _, sp in self.POINTS])
+
+    def test_binary_round_trip(self):
+        data = track_binary(self.POINTS)
+        self.assertEqual(len(data), TRACK_RECORD.size * len(self.POINTS))
+        for (lat, lng, ts, speed), (want_lat, want_lng, want_ts, want_speed) in zip(TRACK_RECORD.iter_unpack(data), self.POINTS):
+            self.assertAlmostEqual(lat, want_lat, places=5)
+            self.assertAlmostEqual(lng, want_lng, places=5)
+            self.assertEqual(ts, int(want_ts))
+            if want_speed is None:
+                self.assertTrue(math.isnan(speed))
+            else:
+                self.assertAlmostEqual(speed, want_speed, places=5)
+
+
+class SegmentMaskTests(SimpleTestCase):
+    def test_mask_covers_the_booked_segments(self):
+        self.assertEqual(segment_mask(1, 3), 0b110)
+        self.assertEqual(segment_mask(0, 1), 0b1)
+        for empty in ((2, 2), (3, 1), (None, 2), (-1, 2)):
+            self.assertEqual(segment_mask(*empty), 0)
+
+    def test_occupancy_merges_rows_of_a_seat_as_hex(self):
+        occupancy, count = build_occupancy([('A', 1, 0, 1), ('A', 1, 2, 3), ('B', 2, 1, 3)])
+        self.assertEqual(occupancy, {'A:1': '5', 'B:2': '6'})
+        self.assertEqual(count, 3)
+
+
+@override_settings(NODE_BASE_URL='')
+class SeatOccupancyTests(TestCase):
+    """Segment availability of schedules (route F0: start 0, stops 1 and 2, end 3)."""
+
+    def setUp(self):
+        vehicle = make_fleet(1)[0]
+        self.route = vehicle.active_route
+        refresh_route_place_orders(self.route.pk)
+        self.schedule = VehicleSchedule.objects.create(
+            vehicle=vehicle, route=self.route, date=timezone.localdate(), time='08:00', price=Decimal('100'),
+        )
+        self.stop1, self.stop2 = Place.objects.get(code='F0-0'), Place.objects.get(code='F0-1')
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('9800000030'))
+
+    def _available(self, from_place, to_place):
+        response = self.client.get(reverse('vehicle-schedule-list-get'), {
+            'from_place': from_place.pk, 'to_place': to_place.pk, 'expand': '1',
+        })
+        self.assertEqual(response.status_code, 200)
+        return [row['available_seats'] for row in response.json()['results']]
+
+    def test_seat_is_only_taken_on_its_booked_segment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('vehicle-ticket-booking-list-post'), {
+                'name': 'Buyer', 'phone': '9800000030', 'vehicle_schedule': self.schedule.pk,
+                'seats': [{'side': 'A', 'number': 1}],
+                'pickup_point': self.route.start_point_id, 'destination_point': self.stop1.pk,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.seat_occupancy, {'A:1': '1'})
+        self.assertEqual(self._available(self.route.start_point, self.stop2), [3])
+        self.assertEqual(self._available(self.stop1, self.stop2), [4])
+        self.assertEqual(self._available(self.stop2, self.stop1), [])  # wrong direction
+
+    def test_masks_past_64_segments_survive_the_json_field(self):
+        occupancy, count = build_occupancy([('A', 1, 70, 72), ('A', 2, 0, 1)])
+        VehicleSchedule.objects.filter(pk=self.schedule.pk).update(seat_occupancy=occupancy, booked_seat_count=count)
+        self.schedule.refresh_from_db()
+        self.assertEqual(decode_mask(self.schedule.seat_occupancy['A:1']), segment_mask(70, 72))
+        self.assertEqual(booked_seats_for_segment(self.schedule, 71, 80), {('A', 1)})
+        self.assertEqual(booked_seats_for_segment(self.schedule, 1, 70), set())
+
+
+class BackgroundWorkerTests(SimpleTestCase):
+    def test_handler_gets_queued_items_in_batches(self):
+        batches, done = [], threading.Event()
+
+        def handler(items):
+            if items:
+                batches.append(items)
+                done.set()
+
+        worker = BackgroundWorker('test-worker', handler, interval=0.05, batch_size=10)
+        for item in (1, 2, 3):
+            worker.put(item)
+        worker.wake()
+        self.assertTrue(done.wait(2))
+        self.assertEqual(batches[0], [1, 2, 3])
 
-# Create your tests here.
@@ -1,8 +1,15 @@
 """
 Simple Devanagari (Nepali) to Roman transliteration for search matching.
 Maps common characters so that "राम" and "Ram" match.
+
+Table-driven: one regex pass for consonant+nukta pairs, then str.translate with a per-character
+table; normalize_phonetic applies its rewrites with one compiled regex. romanize,
+normalize_phonetic and consonant_skeleton are memoized (TRANSLITERATION_CACHE_SIZE entries each).
+Outputs are pinned by the golden corpus in booking/data/transliteration_golden.json
+(booking.tests.TransliterationGoldenTests).
 """
 import re
+from functools import lru_cache
 
 # Devanagari consonants (with inherent 'a') and vowels -> Latin (ASCII, no diacritics)
 _DEVA_TO_ROMAN = {
@@ -25,94 +32,82 @@ _DEVA_TO_ROMAN = {
     "\u0902": "n", "\u0903": "h", "\u0901": "n",  # anusvara, visarga, candrabindu
 }
 
-# Single-code-point consonants (Devanagari block 0x0915-0x0939) for iteration
-def _deva_to_roman_char(c: str) -> str:
-    if c in _DEVA_TO_ROMAN:
-        return _DEVA_TO_ROMAN[c]
-    o = ord(c)
-    if 0x0905 <= o <= 0x0920:  # vowels and consonants
-        return _DEVA_TO_ROMAN.get(c, "")
-    if 0x093e <= o <= 0x094c:  # vowel signs
-        return _DEVA_TO_ROMAN.get(c, "")
-    if o in (0x0902, 0x0903, 0x0901):
-        return _DEVA_TO_ROMAN.get(c, "")
-    if 0x0921 <= o <= 0x0939:
-        return _DEVA_TO_ROMAN.get(c, "")
-    return ""
+# Consonant + nukta pairs, matched before single characters
+_PAIR_RE = re.compile("|".join(sorted(k for k in _DEVA_TO_ROMAN if len(k) == 2)))
+
+
+class _RomanTable(dict):
+    """str.translate table filled on first use of each character (Devanagari mapped, other letters/digits
+    lowercased, whitespace -> space, anything else dropped)."""
+
+    def __missing__(self, code_point):
+        c = chr(code_point)
+        if "\u0900" <= c <= "\u097f":
+            value = _DEVA_TO_ROMAN.get(c)
+        elif c.isalpha() or c.isdigit():
+            value = c.lower()
+        elif c.isspace():
+            value = " "
+        else:
+            value = None
+        self[code_point] = value
+        return value
+
+
+_ROMAN_TABLE = _RomanTable()
+
+# normalize_phonetic digraph/vowel rewrites in one pass. Equivalent to applying, in order:
+# sh->s kh->k gh->g ch->c th->t dh->d ph->p bh->b ng->n, then (after w/v/z) au->o ow->o ou->o.
+# "ngh" and "auu" are the chains where one rewrite creates the input of a later one
+# (gh->g then ng->n; au->o then ou->o); ow->o never applies because w is already gone.
+_PHONETIC_REWRITES = {
+    "ngh": "n", "auu": "o",
+    "sh": "s", "kh": "k", "gh": "g", "ch": "c", "th": "t", "dh": "d", "ph": "p", "bh": "b", "ng": "n",
+    "au": "o", "ou": "o",
+}
+_PHONETIC_RE = re.compile("|".join(sorted(_PHONETIC_REWRITES, key=len, reverse=True)))
+_NO_SPACES_TABLE = str.maketrans("", "", " ")
+# w -> v -> b (koteshwor <-> koteshwar, व as w), z -> j; after the digraphs so "vh" stays "bh"
+_LETTERS_TABLE = str.maketrans("wvz", "bbj")
+_REPEAT_RE = re.compile(r"(.)\1+")
+_VOWELS_TABLE = str.maketrans("", "", "aeiou")
+
+TRANSLITERATION_CACHE_SIZE = 16384
 
 
+@lru_cache(maxsize=TRANSLITERATION_CACHE_SIZE)
 def romanize(text: str) -> str:
     """Convert Devanagari/Nepali text to ASCII Roman for search matching.
     Latin characters are left as-is (lowercased). Other scripts are best-effort mapped.
     """
     if not text:
         return ""
-    out = []
-    i = 0
-    text = text.strip()
-    while i < len(text):
-        c = text[i]
-        # Two-char combo (e.g. consonant + nukta)
-        if i + 1 < len(text) and (text[i] + text[i + 1]) in _DEVA_TO_ROMAN:
-            out.append(_DEVA_TO_ROMAN[text[i] + text[i + 1]])
-            i += 2
-            continue
-        if c in _DEVA_TO_ROMAN:
-            out.append(_DEVA_TO_ROMAN[c])
-            i += 1
-            continue
-        if "\u0900" <= c <= "\u097f":
-            # Other Devanagari: try single-char map or skip
-            mapped = _deva_to_roman_char(c)
-            if mapped:
-                out.append(mapped)
-            i += 1
-            continue
-        if c.isalpha() or c.isdigit():
-            out.append(c.lower())
-            i += 1
-            continue
-        if c.isspace():
-            out.append(" ")
-            i += 1
-            continue
-        i += 1
-    return "".join(out).lower()
+    text = _PAIR_RE.sub(lambda m: _DEVA_TO_ROMAN[m.group()], text.strip())
+    return text.translate(_ROMAN_TABLE).lower()
 
 
+@lru_cache(maxsize=TRANSLITERATION_CACHE_SIZE)
 def normalize_phonetic(text: str) -> str:
     """Romanize, lowercase, remove spaces, apply phonetic equivalences, then collapse repeated chars for flexible/voice matching."""
     if not text:
         return ""
-    s = romanize(text).lower()
-    s = re.sub(r"\s+", "", s)  # space-insensitive: "sama kusi" -> "samakusi"
-    # Order: longer digraphs first
-    s = s.replace("sh", "s")
-    s = s.replace("kh", "k")
-    s = s.replace("gh", "g")
-    s = s.replace("ch", "c")
-    s = s.replace("th", "t")
-    s = s.replace("dh", "d")
-    s = s.replace("ph", "p")
-    s = s.replace("bh", "b")
-    s = s.replace("ng", "n")
-    s = s.replace("w", "v")   # koteshwor <-> koteshwar (व as w)
-    s = s.replace("v", "b")
-    s = s.replace("z", "j")
-    # Vowel equivalences: chowk <-> chok, chauk <-> chok (चौक/चोक)
-    s = s.replace("au", "o")
-    s = s.replace("ow", "o")
-    s = s.replace("ou", "o")
-    s = re.sub(r"(.)\1+", r"\1", s)  # collapse repeated chars (voice/typos): samakhusii -> samakhusi
-    return s
+    # romanize() leaves only plain spaces as whitespace: "sama kusi" -> "samakusi"
+    s = romanize(text).translate(_NO_SPACES_TABLE)
+    # Digraphs (sh -> s, ...) and vowel equivalences: chowk <-> chok, chauk <-> chok (चौक/चोक)
+    s = _PHONETIC_RE.sub(lambda m: _PHONETIC_REWRITES[m.group()], s).translate(_LETTERS_TABLE)
+    return _REPEAT_RE.sub(r"\1", s)  # collapse repeated chars (voice/typos): samakhusii -> samakhusi
 
 
+@lru_cache(maxsize=TRANSLITERATION_CACHE_SIZE)
 def consonant_skeleton(text: str) -> str:
     """From normalize_phonetic(text), remove vowels a,e,i,o,u for fuzzy match (e.g. bsundhra vs basundhara)."""
-    s = normalize_phonetic(text)
-    for v in "aeiou":
-        s = s.replace(v, "")
-    return s
+    return normalize_phonetic(text).translate(_VOWELS_TABLE)
+
+
+def name_search_forms(name: str) -> tuple:
+    """(roman, phonetic, skeleton) of a place name as stored on Place, capped to the column length."""
+    name = name or ""
+    return romanize(name)[:255], normalize_phonetic(name)[:255], consonant_skeleton(name)[:255]
 
 
 def search_matches(name: str, query: str) -> bool:
@@ -16,6 +16,7 @@ urlpatterns = [
     # Place endpoints
     path('places/', place_views.place_list_get_view, name='place-list-get'),
     path('places/create/', place_views.place_list_post_view, name='place-list-post'),
+    path('places/autocomplete/', place_views.place_autocomplete_view, name='place-autocomplete'),
     path('places/<int:pk>/', place_views.place_detail_get_view, name='place-detail-get'),
     path('places/<int:pk>/edit/', place_views.place_detail_post_view, name='place-detail-post'),
     path('places/<int:pk>/delete/', place_views.place_delete_get_view, name='place-delete'),
@@ -85,6 +86,7 @@ urlpatterns = [
     # Location endpoints
     path('locations/', location_views.location_list_get_view, name='location-list-get'),
     path('locations/create/', location_views.location_list_post_view, name='location-list-post'),
+    path('locations/batch/', location_views.location_batch_post_view, name='location-batch-post'),
     # Vehicle Schedule endpoints
     path('vehicle-schedules/', vehicle_schedule_views.vehicle_schedule_list_get_view, name='vehicle-schedule-list-get'),
     path('vehicle-schedules/start-places/', vehicle_schedule_views.vehicle_schedule_start_places_view, name='vehicle-schedule-start-places'),
@@ -96,6 +98,8 @@ urlpatterns = [
     # Vehicle Ticket Booking endpoints
     path('vehicle-ticket-bookings/', vehicle_ticket_booking_views.vehicle_ticket_booking_list_get_view, name='vehicle-ticket-booking-list-get'),
     path('vehicle-ticket-bookings/create/', vehicle_ticket_booking_views.vehicle_ticket_booking_list_post_view, name='vehicle-ticket-booking-list-post'),
+    path('vehicle-ticket-bookings/holds/', vehicle_ticket_booking_views.vehicle_ticket_booking_hold_view, name='vehicle-ticket-booking-hold'),
+    path('vehicle-ticket-bookings/holds/<str:token>/release/', vehicle_ticket_booking_views.vehicle_ticket_booking_hold_release_view, name='vehicle-ticket-booking-hold-release'),
     path('vehicle-ticket-bookings/<int:pk>/', vehicle_ticket_booking_views.vehicle_ticket_booking_detail_get_view, name='vehicle-ticket-booking-detail-get'),
     path('vehicle-ticket-bookings/<int:pk>/pay/', vehicle_ticket_booking_views.vehicle_ticket_booking_pay_view, name='vehicle-ticket-booking-pay'),
     path('vehicle-ticket-bookings/<int:pk>/edit/', vehicle_ticket_booking_views.vehicle_ticket_booking_detail_post_view, name='vehicle-ticket-booking-detail-post'),
@@ -28,3 +28,31 @@ def date_range_to_datetime_range(
         d = date_to.date() if hasattr(date_to, 'date') else date_to
         end_dt = tz.make_aware(datetime.combine(d, time(23, 59, 59)), tz_info)
     return start_dt, end_dt
+
+
+def parse_field_selection(request):
+    """
+    Read sparse fieldset params: ?fields=id,name,seats (keys to return) and ?exclude=images,seats (keys to drop).
+    Returns (fields, exclude): fields is a set or None (all keys), exclude is a set (possibly empty).
+    """
+    def _split(value):
+        return {f.strip() for f in (value or '').split(',') if f.strip()}
+
+    fields = _split(request.query_params.get('fields'))
+    exclude = _split(request.query_params.get('exclude'))
+    return (fields or None), exclude
+
+
+def field_wanted(selection, key):
+    """True if key should be in the response for selection from parse_field_selection (None = all)."""
+    if selection is None:
+        return True
+    fields, exclude = selection
+    return (fields is None or key in fields) and key not in exclude
+
+
+def apply_field_selection(selection, payload):
+    """Return payload restricted to the selected top-level keys (payload itself when everything is selected)."""
+    if selection is None or (selection[0] is None and not selection[1]):
+        return payload
+    return {k: v for k, v in payload.items() if field_wanted(selection, k)}
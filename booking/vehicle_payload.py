@@ -0,0 +1,302 @@
+"""
+Shared vehicle representation used by the vehicle APIs (list, nearby, detail, create/update,
+connect, set active route, my active vehicle).
+
+The static part of a vehicle (own fields, drivers, routes, seats, images, seat layout) is cached
+per vehicle and checked against vehicle.updated_at; booking.signals drops the entry when the
+vehicle, its seats, images, drivers or routes change, and for every vehicle embedding a route,
+stop point, place or driver (user_brief) that is edited or deleted. Seat status changes with every booking and is
+written with queryset updates that send no signals, so it is not cached: cached seats carry
+status None, and status / updated_at are read per request in one query (SEAT_VOLATILE_FIELDS).
+The volatile part (active trip and active route details in trip direction) is merged in per
+request; callers add last position fields.
+The default cache backend is per process, so configure a shared CACHES backend when running
+several workers.
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import Route, VehicleSeat
+from .route_order import get_route_ordered_points
+from .utils import apply_field_selection, field_wanted
+
+VEHICLE_PAYLOAD_CACHE_TIMEOUT = 600  # seconds; also bounds staleness after edits that send no signals
+
+# Heavy groups of the static part: response keys and the prefetch each one needs.
+# Prefetches are applied only to vehicles missing from the cache, and only for requested groups.
+VEHICLE_STATIC_GROUPS = {
+    'drivers': (('drivers', 'driver_details'), 'drivers'),
+    'routes': (
+        ('routes', 'route_details'),
+        Prefetch('routes', queryset=Route.objects.select_related('start_point', 'end_point')),
+    ),
+    'seats': (('seats',), Prefetch('seats', queryset=VehicleSeat.objects.order_by('side', 'number'))),
+    'images': (('images',), 'images'),
+}
+
+# select_related for querysets passed to build_vehicle_payloads (active route details are not cached).
+VEHICLE_PAYLOAD_SELECT_RELATED = (
+    'active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point',
+)
+
+
+# Seat fields that change on booking / check-out; never served from the cache
+SEAT_VOLATILE_FIELDS = ('status', 'updated_at')
+
+
+def _cache_key(vehicle_id):
+    return f'vehicle_payload:{vehicle_id}'
+
+
+def invalidate_vehicle_payload(vehicle_id):
+    """Drop the cached static payload for a vehicle."""
+    if vehicle_id:
+        cache.delete(_cache_key(vehicle_id))
+
+
+def invalidate_vehicle_payloads(vehicle_ids):
+    """Drop the cached static payloads of several vehicles."""
+    keys = [_cache_key(vehicle_id) for vehicle_id in vehicle_ids if vehicle_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+# User fields embedded by user_brief; saves touching none of them (e.g. last_login) keep the cache
+USER_BRIEF_FIELDS = frozenset(('username', 'phone', 'email', 'name', 'is_driver', 'is_active'))
+
+
+def place_brief(place):
+    return {
+        'id': str(place.id),
+        'name': place.name,
+        'code': place.code,
+        'latitude': str(place.latitude),
+        'longitude': str(place.longitude),
+    }
+
+
+def user_brief(user):
+    return {
+        'id': str(user.id),
+        'username': user.username,
+        'phone': user.phone,
+        'email': user.email or '',
+        'name': user.name or '',
+        'is_driver': user.is_driver,
+        'is_active': user.is_active,
+    }
+
+
+def seat_to_dict(seat):
+    return {
+        'id': str(seat.id),
+        'vehicle': str(seat.vehicle_id),
+        'side': seat.side,
+        'number': seat.number,
+        'status': seat.status,
+        'created_at': seat.created_at.isoformat(),
+        'updated_at': seat.updated_at.isoformat(),
+    }
+
+
+def image_to_dict(img):
+    return {
+        'id': str(img.id),
+        'vehicle': str(img.vehicle_id),
+        'title': img.title or '',
+        'description': img.description or '',
+        'image': img.image.url if img.image else None,
+        'created_at': img.created_at.isoformat(),
+        'updated_at': img.updated_at.isoformat(),
+    }
+
+
+def build_active_route_details(route, reverse=False):
+    """Build active_route_details dict from a Route instance, including stop_points.
+    When reverse=True (e.g. active trip is return), start/end and stop_points are in traversal order."""
+    if not route:
+        return None
+    points = get_route_ordered_points(route, reverse=reverse)
+    if not points:
+        return None
+    # First and last are start/end; middle are stops
+    start_kind, start_place, _ = points[0]
+    end_kind, end_place, _ = points[-1]
+    stop_points = []
+    for order_idx, (kind, place, rsp) in enumerate(points[1:-1]):
+        stop_points.append({
+            'id': str(rsp.id),
+            'route': str(route.id),
+            'place': str(place.id),
+            'place_details': place_brief(place),
+            'order': order_idx,
+            'created_at': rsp.created_at.isoformat(),
+            'updated_at': rsp.updated_at.isoformat(),
+        })
+    return {
+        'id': str(route.id),
+        'name': route.name,
+        'is_bidirectional': route.is_bidirectional,
+        'start_point': str(start_place.id),
+        'start_point_details': place_brief(start_place),
+        'end_point': str(end_place.id),
+        'end_point_details': place_brief(end_place),
+        'stop_points': stop_points,
+    }
+
+
+def _build_static_payload(vehicle, groups=None):
+    """Vehicle fields and related rows that change only when the vehicle (or its seats/images) is edited.
+    groups: subset of VEHICLE_STATIC_GROUPS to include (None = all)."""
+    def _has(group):
+        return groups is None or group in groups
+
+    payload = {
+        'id': str(vehicle.id),
+        'imei': vehicle.imei or '',
+        'name': vehicle.name,
+        'vehicle_no': vehicle.vehicle_no,
+        'vehicle_type': vehicle.vehicle_type,
+        'odometer': str(vehicle.odometer),
+        'overspeed_limit': vehicle.overspeed_limit,
+        'description': vehicle.description or '',
+        'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
+    }
+    if _has('drivers'):
+        drivers = list(vehicle.drivers.all())
+        payload['drivers'] = [str(d.id) for d in drivers]
+        payload['driver_details'] = [user_brief(d) for d in drivers]
+    payload['active_driver'] = str(vehicle.active_driver.id) if vehicle.active_driver else None
+    payload['active_driver_details'] = user_brief(vehicle.active_driver) if vehicle.active_driver else None
+    if _has('routes'):
+        routes = list(vehicle.routes.all())
+        payload['routes'] = [str(r.id) for r in routes]
+        payload['route_details'] = [
+            {
+                'id': str(r.id),
+                'name': r.name,
+                'is_bidirectional': r.is_bidirectional,
+                'start_point_details': place_brief(r.start_point),
+                'end_point_details': place_brief(r.end_point),
+            }
+            for r in routes
+        ]
+    payload.update({
+        'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
+        'is_active': vehicle.is_active,
+        'bill_book': vehicle.bill_book or '',
+        'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
+        'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
+        'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
+        'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
+    })
+    if _has('seats'):
+        payload['seats'] = [seat_to_dict(s) for s in vehicle.seats.all()]
+    if _has('images'):
+        payload['images'] = [image_to_dict(img) for img in vehicle.images.all()]
+    payload['created_at'] = vehicle.created_at.isoformat()
+    payload['updated_at'] = vehicle.updated_at.isoformat()
+    return payload
+
+
+def _requested_groups(selection):
+    """Static groups needed for a field selection (None = all groups)."""
+    if selection is None:
+        return None
+    groups = {
+        name for name, (keys, _) in VEHICLE_STATIC_GROUPS.items()
+        if any(field_wanted(selection, k) for k in keys)
+    }
+    return None if len(groups) == len(VEHICLE_STATIC_GROUPS) else groups
+
+
+def _cacheable(payload):
+    """Payload to cache: seat status / updated_at blanked (see SEAT_VOLATILE_FIELDS)."""
+    blank = dict.fromkeys(SEAT_VOLATILE_FIELDS)
+    return dict(payload, seats=[dict(seat, **blank) for seat in payload['seats']])
+
+
+def _with_current_seats(statics, vehicle_ids):
+    """Fill seat status / updated_at of cached payloads from one query; seats no longer present are dropped."""
+    current = {
+        str(seat_id): {'status': status, 'updated_at': updated_at.isoformat()}
+        for seat_id, status, updated_at in VehicleSeat.objects.filter(vehicle_id__in=vehicle_ids).values_list(
+            'id', *SEAT_VOLATILE_FIELDS,
+        )
+    }
+    for vehicle_id in vehicle_ids:
+        payload = statics[vehicle_id]
+        statics[vehicle_id] = dict(payload, seats=[
+            dict(seat, **current[seat['id']]) for seat in payload['seats'] if seat['id'] in current
+        ])
+
+
+def _get_static_payloads(vehicles, groups=None):
+    """Return {vehicle_id: static payload}, building only the ones not cached for this updated_at.
+    Full payloads are cached; with a group subset, misses are built partially (and not cached)."""
+    keys = {v.id: _cache_key(v.id) for v in vehicles}
+    cached = cache.get_many(list(keys.values()))
+    statics = {}
+    missing = []
+    for v in vehicles:
+        entry = cached.get(keys[v.id])
+        if entry and entry.get('updated_at') == v.updated_at.isoformat():
+            statics[v.id] = entry['payload']
+        else:
+            missing.append(v)
+    if statics and (groups is None or 'seats' in groups):
+        _with_current_seats(statics, list(statics))
+    if missing:
+        build_groups = VEHICLE_STATIC_GROUPS.keys() if groups is None else groups
+        prefetches = [VEHICLE_STATIC_GROUPS[g][1] for g in build_groups]
+        if prefetches:
+            prefetch_related_objects(missing, *prefetches)
+        to_cache = {}
+        for v in missing:
+            payload = _build_static_payload(v, groups)
+            statics[v.id] = payload
+            if groups is None:
+                to_cache[keys[v.id]] = {'updated_at': v.updated_at.isoformat(), 'payload': _cacheable(payload)}
+        if to_cache:
+            cache.set_many(to_cache, VEHICLE_PAYLOAD_CACHE_TIMEOUT)
+    return statics
+
+
+def _merge_volatile(static, vehicle, active_trip, selection=None):
+    reverse = active_trip.get('reverse_direction', False) if active_trip else False
+    payload = {}
+    for key, value in static.items():
+        payload[key] = value
+        if key == 'active_route':
+            # Keep the original key order: active_route, active_route_details, active_trip, is_active...
+            if field_wanted(selection, 'active_route_details'):
+                payload['active_route_details'] = build_active_route_details(vehicle.active_route, reverse=reverse)
+            payload['active_trip'] = active_trip
+    return payload
+
+
+def wants_active_route_details(selection):
+    """True if active_route_details is requested (views prefetch active_route__stop_points__place only then)."""
+    return field_wanted(selection, 'active_route_details')
+
+
+def build_vehicle_payloads(vehicles, active_trips, selection=None):
+    """
+    Return payload dicts for vehicles (same order).
+    active_trips: {vehicle_id: active_trip dict} for vehicles with a running trip.
+    selection: sparse fieldset from utils.parse_field_selection; unrequested groups are neither
+    prefetched nor serialized. Callers adding keys (e.g. last position) apply the selection again.
+    Vehicles should be loaded with VEHICLE_PAYLOAD_SELECT_RELATED; prefetch 'active_route__stop_points__place'
+    when building many payloads with active_route_details.
+    """
+    vehicles = list(vehicles)
+    statics = _get_static_payloads(vehicles, _requested_groups(selection))
+    return [
+        apply_field_selection(selection, _merge_volatile(statics[v.id], v, active_trips.get(v.id), selection))
+        for v in vehicles
+    ]
+
+
+def build_vehicle_payload(vehicle, active_trip):
+    """Return the payload dict for a single vehicle."""
+    return build_vehicle_payloads([vehicle], {vehicle.id: active_trip} if active_trip else {})[0]
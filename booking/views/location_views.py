@@ -1,13 +1,20 @@
-"""Location views: create and list."""
-from decimal import Decimal
+"""Location views: create, batch create and list."""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
 
-from rest_framework.decorators import api_view, permission_classes
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
 from ..models import Location, Vehicle, Trip
+from ..renderers import TRACK_RENDERER_CLASSES, binary_track_response
 from ..services.notify_node import notify_node_trip_location
+from ..services.track_format import track_point_tuple, track_polyline
+from ..services.trip_track import TRACK_POINT_FIELDS, mark_trip_tracks_stale, track_locations, track_point
+from ..services.vehicle_position import record_last_position
 
 
 def _location_to_response(loc):
@@ -24,6 +31,7 @@ def _location_to_response(loc):
         'longitude': str(loc.longitude),
         'speed': str(loc.speed) if loc.speed is not None else None,
         'course': str(loc.course) if getattr(loc, 'course', None) is not None else None,
+        'recorded_at': loc.recorded_at.isoformat() if getattr(loc, 'recorded_at', None) else None,
         'created_at': loc.created_at.isoformat(),
         'updated_at': loc.updated_at.isoformat(),
     }
@@ -55,14 +63,18 @@ def location_list_post_view(request):
         except Trip.DoesNotExist:
             pass
 
-    loc = Location.objects.create(
-        vehicle=vehicle,
-        trip=trip,
-        latitude=Decimal(str(latitude)),
-        longitude=Decimal(str(longitude)),
-        speed=Decimal(str(speed)) if speed is not None else None,
-        course=Decimal(str(course)) if course is not None else None,
-    )
+    with transaction.atomic():
+        loc = Location.objects.create(
+            vehicle=vehicle,
+            trip=trip,
+            latitude=Decimal(str(latitude)),
+            longitude=Decimal(str(longitude)),
+            speed=Decimal(str(speed)) if speed is not None else None,
+            course=Decimal(str(course)) if course is not None else None,
+        )
+        record_last_position(loc)
+        if trip is not None and trip.end_time:
+            mark_trip_tracks_stale([trip.pk])  # late point: stored simplified tracks are stale
     if trip:
         try:
             notify_node_trip_location(
@@ -77,9 +89,162 @@ def location_list_post_view(request):
     return Response(_location_to_response(loc), status=status.HTTP_201_CREATED)
 
 
+LOCATION_BATCH_MAX_POINTS = 500
+
+
+def _parse_client_timestamp(value):
+    """Parse a point timestamp: ISO 8601 string or epoch seconds/milliseconds. Returns aware datetime or None."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit()):
+        ts = float(value)
+        if ts > 1e11:  # epoch milliseconds
+            ts = ts / 1000.0
+        return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+    try:
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt
+
+
+def _parse_optional_decimal(value):
+    if value is None or value == '':
+        return None
+    return Decimal(str(value))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def location_batch_post_view(request):
+    """
+    POST /api/locations/batch/
+    Body: {"vehicle": id, "trip": id (optional), "points": [{"latitude", "longitude", "speed", "course",
+    "timestamp", "trip" (optional, overrides top-level)}, ...]}
+    Points buffered by the driver app while offline are validated in one pass and written with bulk_create.
+    Idempotent on (vehicle, timestamp): points already stored are skipped, so retries are safe.
+    Only the newest point per trip is sent to Node.
+    """
+    vehicle_id = request.data.get('vehicle')
+    default_trip_id = request.data.get('trip')
+    points = request.data.get('points')
+
+    if not vehicle_id or not isinstance(points, list) or not points:
+        return Response({'error': 'vehicle and a non-empty points list are required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(points) > LOCATION_BATCH_MAX_POINTS:
+        return Response(
+            {'error': f'At most {LOCATION_BATCH_MAX_POINTS} points per batch'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        vehicle = Vehicle.objects.get(pk=vehicle_id)
+    except (Vehicle.DoesNotExist, ValueError):
+        return Response({'error': 'Vehicle not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    # Validate every point before writing anything
+    parsed = []
+    for idx, point in enumerate(points):
+        if not isinstance(point, dict):
+            return Response({'error': f'points[{idx}] must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+        recorded_at = _parse_client_timestamp(point.get('timestamp'))
+        if recorded_at is None:
+            return Response({'error': f'points[{idx}].timestamp is required (ISO 8601 or epoch)'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            latitude = Decimal(str(point.get('latitude')))
+            longitude = Decimal(str(point.get('longitude')))
+            speed = _parse_optional_decimal(point.get('speed'))
+            course = _parse_optional_decimal(point.get('course'))
+        except (InvalidOperation, ValueError):
+            return Response({'error': f'points[{idx}] has an invalid number'}, status=status.HTTP_400_BAD_REQUEST)
+        if not latitude.is_finite() or not longitude.is_finite() or abs(latitude) > 90 or abs(longitude) > 180:
+            return Response({'error': f'points[{idx}] latitude/longitude out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        trip_id = point.get('trip') or default_trip_id
+        if trip_id:
+            try:
+                trip_id = int(trip_id)
+            except (TypeError, ValueError):
+                return Response({'error': f'points[{idx}].trip must be a trip id'}, status=status.HTTP_400_BAD_REQUEST)
+        parsed.append({
+            'trip_id': trip_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'speed': speed,
+            'course': course,
+            'recorded_at': recorded_at,
+        })
+
+    # Resolve all referenced trips for this vehicle in one query; unknown trips are dropped (as in single create)
+    trip_ids = {p['trip_id'] for p in parsed if p['trip_id']}
+    trips = {}
+    if trip_ids:
+        trips = {t.pk: t for t in Trip.objects.filter(pk__in=trip_ids, vehicle=vehicle)}
+
+    # Skip points already stored (retries) and duplicates within this batch
+    existing = set(
+        Location.objects.filter(vehicle=vehicle, recorded_at__in=[p['recorded_at'] for p in parsed])
+        .values_list('recorded_at', flat=True)
+    )
+    new_locations = []
+    seen = set(existing)
+    for p in sorted(parsed, key=lambda x: x['recorded_at']):
+        if p['recorded_at'] in seen:
+            continue
+        seen.add(p['recorded_at'])
+        trip = trips.get(p['trip_id']) if p['trip_id'] else None
+        new_locations.append(Location(
+            vehicle=vehicle,
+            trip=trip,
+            latitude=p['latitude'],
+            longitude=p['longitude'],
+            speed=p['speed'],
+            course=p['course'],
+            recorded_at=p['recorded_at'],
+        ))
+
+    if new_locations:
+        with transaction.atomic():
+            # ignore_conflicts covers a concurrent retry racing past the existence check above
+            Location.objects.bulk_create(new_locations, ignore_conflicts=True)
+            record_last_position(new_locations[-1])
+            # Late uploads to finished trips: their stored simplified tracks are stale
+            mark_trip_tracks_stale({loc.trip_id for loc in new_locations if loc.trip_id and loc.trip.end_time})
+
+    # Newest point per trip -> Node (locations are sorted by recorded_at, so later entries win)
+    latest_per_trip = {}
+    for loc in new_locations:
+        if loc.trip_id:
+            latest_per_trip[loc.trip_id] = loc
+    for loc in latest_per_trip.values():
+        try:
+            notify_node_trip_location(
+                loc.trip.trip_id,
+                float(loc.latitude),
+                float(loc.longitude),
+                float(loc.course) if loc.course is not None else None,
+                float(loc.speed) if loc.speed is not None else None,
+            )
+        except Exception:
+            pass
+
+    return Response({
+        'received': len(points),
+        'created': len(new_locations),
+        'duplicates': len(points) - len(new_locations),
+        'last_recorded_at': new_locations[-1].recorded_at.isoformat() if new_locations else None,
+    }, status=status.HTTP_201_CREATED)
+
+
 @api_view(['GET'])
+@renderer_classes(TRACK_RENDERER_CLASSES)
 def location_list_get_view(request):
-    """List locations, optionally filter by vehicle and/or trip. Includes vehicle_name, vehicle_no, trip_id."""
+    """
+    List locations, optionally filter by vehicle and/or trip. Includes vehicle_name, vehicle_no, trip_id.
+    format=polyline / format=binary return the page as a compact track (services.track_format),
+    oldest first; binary pagination is in X-Total-Count / X-Page / X-Per-Page.
+    """
     vehicle_id = request.query_params.get('vehicle')
     trip_id = request.query_params.get('trip')
     queryset = Location.objects.select_related('vehicle', 'trip').all().order_by('-created_at')
@@ -93,6 +258,23 @@ def location_list_get_view(request):
     start = (page - 1) * per_page
     end = start + per_page
     total = queryset.count()
+    track_format = request.accepted_renderer.format
+    if track_format in ('polyline', 'binary'):
+        rows = track_locations(queryset).reverse().values_list(*TRACK_POINT_FIELDS)[start:end]
+        points = [track_point_tuple(track_point(row)) for row in list(rows)[::-1]]
+        if track_format == 'binary':
+            return binary_track_response(points, {
+                'X-Total-Count': total,
+                'X-Page': page,
+                'X-Per-Page': per_page,
+            })
+        return Response({
+            'format': 'polyline',
+            **track_polyline(points),
+            'count': total,
+            'page': page,
+            'per_page': per_page,
+        })
     locations = queryset.order_by('-created_at')[start:end]
 
     return Response({
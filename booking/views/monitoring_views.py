@@ -2,7 +2,7 @@
 from datetime import date, timedelta
 from decimal import Decimal
 
-from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+from django.db.models import Count, Exists, OuterRef, Sum
 from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -10,7 +10,6 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from ..models import (
-    Location,
     SeatBooking,
     Trip,
     Vehicle,
@@ -53,21 +52,11 @@ def monitoring_snapshot_view(request):
             'active_route',
             'active_route__start_point',
             'active_route__end_point',
+            'last_position',
         )
         .prefetch_related('seats')
     )
 
-    # Annotate with last location (one subquery per field to avoid N+1)
-    latest_loc = (
-        Location.objects.filter(vehicle_id=OuterRef('pk'))
-        .order_by('-created_at')
-    )
-    vehicles_qs = vehicles_qs.annotate(
-        last_lat=Subquery(latest_loc.values('latitude')[:1]),
-        last_lng=Subquery(latest_loc.values('longitude')[:1]),
-        last_location_at=Subquery(latest_loc.values('created_at')[:1]),
-        last_speed=Subquery(latest_loc.values('speed')[:1]),
-    )
     has_active_trip = Trip.objects.filter(
         vehicle_id=OuterRef('pk'),
         end_time__isnull=True,
@@ -176,9 +165,12 @@ def monitoring_snapshot_view(request):
             if v.active_route.end_point:
                 end_point = v.active_route.end_point.name or ''
 
-        lat = float(v.last_lat) if v.last_lat is not None else None
-        lng = float(v.last_lng) if v.last_lng is not None else None
-        speed_kmh = int(float(v.last_speed)) if v.last_speed is not None else 0
+        # Last known position from VehicleLastPosition (missing row => never reported)
+        pos = getattr(v, 'last_position', None)
+        lat = float(pos.latitude) if pos else None
+        lng = float(pos.longitude) if pos else None
+        speed_kmh = int(float(pos.speed)) if pos and pos.speed is not None else 0
+        last_location_at = pos.recorded_at if pos else None
 
         vehicles_payload.append({
             'id': str(v.id),
@@ -196,7 +188,7 @@ def monitoring_snapshot_view(request):
             'lat': lat,
             'lng': lng,
             'speed_kmh': speed_kmh,
-            'last_location_at': v.last_location_at.isoformat() if v.last_location_at else None,
+            'last_location_at': last_location_at.isoformat() if last_location_at else None,
             'status': 'on_trip' if getattr(v, 'has_active_trip', False) else 'idle',
         })
 
@@ -2,42 +2,52 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from decimal import Decimal
 from ..models import Place
-from ..transliteration import search_matches
+from ..services.place_autocomplete import (
+    AUTOCOMPLETE_DEFAULT_LIMIT,
+    AUTOCOMPLETE_MAX_AGE_SECONDS,
+    AUTOCOMPLETE_MAX_LIMIT,
+    autocomplete_index,
+)
+from ..services.place_search import place_search_index
 
 
 @api_view(['GET'])
 def place_list_get_view(request):
-    """List all places. Search matches name/code/address with Nepali/English and phonetic variants (e.g. basundhara, vasundhara, bsundhra)."""
+    """List all places. Search matches name/code/address with Nepali/English and phonetic variants (e.g. basundhara, vasundhara, bsundhra), best matches first."""
     # Get query parameters
     search = (request.query_params.get('search') or '').strip()
     
-    # Build queryset
-    queryset = Place.objects.all()
-    
-    if search:
-        # Direct match on name, code, address
-        queryset = queryset.filter(
-            Q(name__icontains=search) |
-            Q(code__icontains=search) |
-            Q(address__icontains=search)
-        )
-        # Also match by romanized, phonetic, and consonant-skeleton (e.g. vasundhara, bsundhra -> बसुन्धरा)
-        all_place_ids = set(queryset.values_list('id', flat=True))
-        for place in Place.objects.only('id', 'name').iterator(chunk_size=200):
-            if search_matches(place.name or '', search):
-                all_place_ids.add(place.id)
-        queryset = Place.objects.filter(id__in=all_place_ids)
-    
     # Pagination
     page = int(request.query_params.get('page', 1))
     per_page = int(request.query_params.get('per_page', 10))
     start = (page - 1) * per_page
     end = start + per_page
     
-    total = queryset.count()
-    places = queryset[start:end]
+    if search:
+        # Name matches (direct, romanized, phonetic, consonant skeleton; e.g. vasundhara, bsundhra -> बसुन्धरा), ranked
+        place_ids = place_search_index.search(search)
+        # Then code/address matches not already found by name
+        found = set(place_ids)
+        place_ids.extend(
+            pid for pid in Place.objects.filter(
+                Q(name__icontains=search) |
+                Q(code__icontains=search) |
+                Q(address__icontains=search)
+            ).order_by('id').values_list('id', flat=True)
+            if pid not in found
+        )
+        total = len(place_ids)
+        page_ids = place_ids[start:end]
+        places_by_id = Place.objects.in_bulk(page_ids)
+        places = [places_by_id[pid] for pid in page_ids if pid in places_by_id]
+    else:
+        queryset = Place.objects.all()
+        total = queryset.count()
+        places = queryset[start:end]
     
     # Return data without serializer
     results = []
@@ -62,6 +72,30 @@ def place_list_get_view(request):
     })
 
 
+@api_view(['GET'])
+def place_autocomplete_view(request):
+    """Top matches for search-as-you-type: places and routes whose name, code or romanized/phonetic name starts with q."""
+    query = (request.query_params.get('q') or '').strip()
+    try:
+        limit = int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        limit = AUTOCOMPLETE_DEFAULT_LIMIT
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+
+    # The URL carries q and limit, so the index version alone identifies the response
+    etag = f'"{autocomplete_index.version()}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response({
+            'query': query,
+            'results': autocomplete_index.lookup(query, limit) if query else [],
+        })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=AUTOCOMPLETE_MAX_AGE_SECONDS)
+    return response
+
+
 @api_view(['POST'])
 def place_list_post_view(request):
     """Create a new place"""
@@ -4,27 +4,19 @@ from rest_framework import status
 from django.db.models import Q
 import json
 from ..models import Route, RouteStopPoint, Place
-from core.models import SuperSetting
+from core.services.super_setting import get_super_settings
 
 
 def _default_announcement_text(place):
     """Return stop_point_announcement_header with $x replaced by place.name from latest SuperSetting, or place.name."""
-    try:
-        ss = SuperSetting.objects.latest('created_at')
-        header = (getattr(ss, 'stop_point_announcement_header', None) or '').strip()
-        if header:
-            name = (place.name or '').strip()
-            return (header.replace('$x', name).replace('$X', name).strip() or name)[:500]
-    except (SuperSetting.DoesNotExist, (TypeError, ValueError)):
-        pass
-    return (place.name or '')[:500]
+    return get_super_settings().announcement_text(place.name)
 
 
 def _stop_point_to_dict(sp):
     """Build stop point dict for API response including announcement_text."""
     return {
         'id': str(sp.id),
-        'route': str(sp.route.id),
+        'route': str(sp.route_id),
         'place': str(sp.place.id),
         'place_details': {
             'id': str(sp.place.id),
@@ -6,47 +6,33 @@ from django.db.models import Q
 from django.db import transaction as db_transaction
 from decimal import Decimal
 from datetime import datetime
-import math
 import json
 from django.db.models import F
-from ..models import Vehicle, VehicleSeat, SeatBooking, Trip, Place, Location
+from ..geo import haversine_km, nearest_index
+from ..models import Vehicle, VehicleSeat, SeatBooking, Trip, Place
 from ..route_order import get_route_ordered_points, get_route_place_order
+from ..services.address_resolution import defer_address_resolution, link_address_transaction
 from ..services.notify_node import notify_node_seat_booked
 from ..services.reverse_geocode import resolve_address_from_coords
+from ..services.seat_reservation import claim_vehicle_seats
+from ..services.vehicle_position import get_last_position
 from ..utils import date_range_to_datetime_range
-from core.models import User, SuperSetting, Wallet, Transaction
+from core.models import User, Wallet, Transaction
+from core.services.super_setting import get_super_settings
 from core.services.wallet_transaction import create_wallet_transaction
 from ..serializers import SeatBookingSerializer
 
 def _get_booking_distance_km():
     """Return (min_km, max_km) from latest SuperSetting, or (5, 200) as fallback."""
-    try:
-        ss = SuperSetting.objects.latest('created_at')
-        min_km = float(ss.short_trip_min_distance_for_booking) if ss.short_trip_min_distance_for_booking is not None else 5
-        max_km = float(ss.short_trip_max_distance_for_booking) if ss.short_trip_max_distance_for_booking is not None else 200
-        return min_km, max_km
-    except SuperSetting.DoesNotExist:
-        return 5, 200
+    return get_super_settings().booking_distance_km
 
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the great circle distance between two points on Earth (in kilometers)
-    using the Haversine formula
+    using the Haversine formula; rounded to 2 decimals as Decimal for fare calculation.
     """
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
-    
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    
-    # Radius of earth in kilometers
-    r = 6371
-    
-    return Decimal(str(round(c * r, 2)))
+    return Decimal(str(round(haversine_km(lat1, lon1, lat2, lon2), 2)))
 
 
 def _trip_amount_from_distance(distance_km, per_km_charge, initial_km=None, initial_km_charge=None):
@@ -97,7 +83,7 @@ def seat_booking_list_get_view(request):
     
     # Build queryset
     queryset = SeatBooking.objects.select_related(
-        'user', 'vehicle', 'vehicle_seat', 'trip', 'destination_place'
+        'user', 'vehicle', 'vehicle_seat', 'trip', 'destination_place', 'origin_place'
     ).all()
     
     if driver_id:
@@ -287,11 +273,14 @@ def _create_seat_booking(request):
         booking_kwargs['trip_amount'] = Decimal(str(trip_amount))
     booking_kwargs['is_paid'] = is_paid_val
 
-    booking = SeatBooking.objects.create(**booking_kwargs)
-
-    # Update seat status to booked
+    # Claim the seat (available -> booked) atomically with the booking; a concurrent request loses here
+    with db_transaction.atomic():
+        if not claim_vehicle_seats(vehicle_seat.vehicle_id, [vehicle_seat.id]):
+            return Response({'error': 'Seat is not available'}, status=status.HTTP_400_BAD_REQUEST)
+        booking = SeatBooking.objects.create(**booking_kwargs)
+        defer_address_resolution(booking, 'check_in_address')
+        defer_address_resolution(booking, 'check_out_address')
     vehicle_seat.status = 'booked'
-    vehicle_seat.save()
 
     if active_trip:
         user_name = (user.name or getattr(user, 'username', None) or 'Guest') if user else 'Guest'
@@ -442,16 +431,15 @@ def seat_booking_switch_view(request):
     except SeatBooking.DoesNotExist:
         return Response({'error': 'No active booking found for current seat'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Update booking to use new seat
-    booking.vehicle_seat = new_seat
-    booking.save()
-    
-    # Update seat statuses
-    current_seat.status = 'available'
-    current_seat.save()
-    
+    with db_transaction.atomic():
+        if not claim_vehicle_seats(new_seat.vehicle_id, [new_seat.id]):
+            return Response({'error': 'New seat is not available'}, status=status.HTTP_400_BAD_REQUEST)
+        # Update booking to use new seat
+        booking.vehicle_seat = new_seat
+        booking.save()
+        current_seat.status = 'available'
+        current_seat.save()
     new_seat.status = 'booked'
-    new_seat.save()
     
     serializer = SeatBookingSerializer(booking)
     return Response(serializer.data)
@@ -504,15 +492,10 @@ def seat_booking_checkout_view(request):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-    initial_km = None
-    initial_km_charge = None
-    try:
-        super_setting = SuperSetting.objects.latest('created_at')
-        per_km_charge = super_setting.per_km_charge
-        initial_km = getattr(super_setting, 'initial_km', None)
-        initial_km_charge = getattr(super_setting, 'initial_km_charge', None)
-    except SuperSetting.DoesNotExist:
-        per_km_charge = None
+    super_setting = get_super_settings()
+    per_km_charge = super_setting.per_km_charge
+    initial_km = super_setting.initial_km
+    initial_km_charge = super_setting.initial_km_charge
 
     use_destination_coords = False
     if booking.destination_place_id and booking.destination_place:
@@ -579,6 +562,7 @@ def seat_booking_checkout_view(request):
     booking.trip_amount = trip_amount
     booking.is_paid = is_paid.lower() == 'true' if isinstance(is_paid, str) else bool(is_paid)
     booking.save()
+    defer_address_resolution(booking, 'check_out_address')
 
     vehicle_seat.status = 'available'
     vehicle_seat.save()
@@ -592,7 +576,7 @@ def seat_booking_checkout_view(request):
             driver_wallet.refresh_from_db()
             driver_label = (booking.trip.driver.name or booking.trip.driver.phone) if booking.trip and booking.trip.driver else 'N/A'
             trip_label = booking.trip.trip_id if booking.trip else 'N/A'
-            Transaction.objects.create(
+            fare_transaction = Transaction.objects.create(
                 wallet=driver_wallet,
                 user=driver,
                 amount=booking.trip_amount,
@@ -612,6 +596,7 @@ def seat_booking_checkout_view(request):
                     f' | Fare: Rs. {booking.trip_amount}'
                 ),
             )
+            link_address_transaction(booking, fare_transaction)
 
     serializer = SeatBookingSerializer(booking)
     return Response(serializer.data)
@@ -624,11 +609,11 @@ def _vehicle_direct_book_eligible(vehicle, user_lat, user_lng):
     active_trip = Trip.objects.filter(vehicle=vehicle, end_time__isnull=True).order_by('-start_time').first()
     if not active_trip:
         return False, 'Vehicle has no running trip'
-    last_loc = Location.objects.filter(vehicle=vehicle).order_by('-created_at').first()
-    if not last_loc:
+    last_pos = get_last_position(vehicle)
+    if not last_pos:
         return False, 'Vehicle has no location'
     min_km, max_km = _get_booking_distance_km()
-    dist_km = float(haversine_distance(user_lat, user_lng, last_loc.latitude, last_loc.longitude))
+    dist_km = float(haversine_distance(user_lat, user_lng, last_pos.latitude, last_pos.longitude))
     if dist_km <= min_km:
         return False, f'Vehicle must be more than {min_km} km away to book'
     if dist_km > max_km:
@@ -643,19 +628,17 @@ def _vehicle_current_stop_order(vehicle):
         return None, {}
     active_trip = Trip.objects.filter(vehicle=vehicle, end_time__isnull=True).order_by('-start_time').first()
     reverse = getattr(active_trip, 'reverse_direction', False) if active_trip else False
-    last_loc = Location.objects.filter(vehicle=vehicle).order_by('-created_at').first()
-    if not last_loc:
+    last_pos = get_last_position(vehicle)
+    if not last_pos:
         return None, {}
     points = get_route_ordered_points(vehicle.active_route, reverse=reverse)
     if not points:
         return None, {}
-    current_order = 0
-    min_dist = float('inf')
-    for order_idx, (kind, place, rsp) in enumerate(points):
-        dist = float(haversine_distance(last_loc.latitude, last_loc.longitude, place.latitude, place.longitude))
-        if dist < min_dist:
-            min_dist = dist
-            current_order = order_idx
+    current_order, _dist = nearest_index(
+        last_pos.latitude, last_pos.longitude,
+        [place.latitude for _kind, place, _rsp in points],
+        [place.longitude for _kind, place, _rsp in points],
+    )
     order_map = get_route_place_order(vehicle.active_route, reverse=reverse)
     return current_order, order_map
 
@@ -718,13 +701,12 @@ def direct_seat_booking_preview_view(request):
         ok, err = _origin_at_least_n_stops_ahead(vehicle, origin_place_id, n=2)
         if not ok:
             return Response({'error': err}, status=status.HTTP_400_BAD_REQUEST)
-    try:
-        super_setting = SuperSetting.objects.latest('created_at')
-        per_km = super_setting.per_km_charge
-        initial_km = getattr(super_setting, 'initial_km', None)
-        initial_km_charge = getattr(super_setting, 'initial_km_charge', None)
-    except SuperSetting.DoesNotExist:
+    super_setting = get_super_settings()
+    if not super_setting.exists:
         return Response({'error': 'Per km charge not configured'}, status=status.HTTP_400_BAD_REQUEST)
+    per_km = super_setting.per_km_charge
+    initial_km = super_setting.initial_km
+    initial_km_charge = super_setting.initial_km_charge
 
     try:
         dest = Place.objects.get(pk=destination_place_id)
@@ -850,12 +832,23 @@ def direct_seat_booking_create_view(request):
     seat_remarks = ', '.join(f'{vs.side}{vs.number}' for vs in vehicle_seats)
 
     with db_transaction.atomic():
+        # Claim all seats first (conditional update); roll back if any was taken meanwhile
+        if not claim_vehicle_seats(vehicle.id, [vs.id for vs in vehicle_seats]):
+            db_transaction.set_rollback(True)
+            return Response({'error': 'One or more seats are no longer available'}, status=status.HTTP_400_BAD_REQUEST)
+        wallet = Wallet.objects.select_for_update().get(pk=wallet.pk)
+        if wallet.balance < trip_amount_total:
+            db_transaction.set_rollback(True)
+            return Response(
+                {'error': 'Insufficient wallet balance. Please recharge.', 'code': 'insufficient_balance'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         wallet.balance -= trip_amount_total
         wallet.save(update_fields=['balance', 'updated_at'])
         direct_driver_label = (active_trip.driver.name or active_trip.driver.phone) if active_trip and active_trip.driver else 'N/A'
         direct_trip_label = active_trip.trip_id if active_trip else 'N/A'
         direct_to_label = destination_place.name if destination_place else 'N/A'
-        create_wallet_transaction(
+        booking_transaction = create_wallet_transaction(
             wallet=wallet,
             user=request.user,
             amount=trip_amount_total,
@@ -889,9 +882,9 @@ def direct_seat_booking_create_view(request):
                 trip_amount=amount_per_booking,
                 is_paid=True,
             )
+            defer_address_resolution(booking, 'check_in_address', transactions=[booking_transaction])
             bookings.append(booking)
             vs.status = 'booked'
-            vs.save(update_fields=['status', 'updated_at'])
 
     user_name = (request.user.name or getattr(request.user, 'username', None) or 'Guest') or 'Guest'
     to_name = (destination_place.name if destination_place else '') or ''
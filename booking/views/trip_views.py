@@ -1,31 +1,32 @@
 """Trip views: start trip, end trip, CRUD"""
-import math
 import uuid
 from datetime import date, datetime
 from decimal import Decimal
 
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.db import transaction
-from rest_framework.decorators import api_view, permission_classes
+from django.db.models import Prefetch
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from ..models import Trip, Vehicle, Route, Location, VehicleSchedule, VehicleTicketBooking, SeatBooking, VehicleSeat
+from ..geo import first_within, haversine_km
+from ..models import Trip, Vehicle, Route, RouteStopPoint, Location, VehicleSchedule, VehicleTicketBooking, SeatBooking, VehicleSeat
+from ..renderers import TRACK_RENDERER_CLASSES, binary_track_response
 from ..route_order import get_route_place_order, get_route_ordered_points
 from ..services.notify_node import notify_node_seat_booked
+from ..services.ticket_seats import booking_seat_labels, booking_seat_list
+from ..services.track_format import track_point_tuple, track_polyline
+from ..services.trip_track import (
+    TRACK_POINT_FIELDS, TRACK_TOLERANCES_M, get_trip_track, mark_trip_tracks_stale, track_locations,
+    track_point, track_point_to_response, zoom_tolerance_m,
+)
+from ..services.vehicle_position import record_last_position
 from ..utils import date_range_to_datetime_range
-from core.models import User, SuperSetting
-
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    """Distance in km between two points (Haversine)."""
-    lat1, lon1, lat2, lon2 = map(math.radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    return round(c * 6371, 4)
+from core.models import User
+from core.services.super_setting import get_super_settings
 
 
 def _trip_to_response(trip):
@@ -55,14 +56,6 @@ def _trip_to_response(trip):
     }
 
 
-def _seat_to_list(seat):
-    if isinstance(seat, list):
-        return [x for x in seat if isinstance(x, dict) and x.get('side') is not None and x.get('number') is not None]
-    if isinstance(seat, dict) and seat.get('side') is not None and seat.get('number') is not None:
-        return [seat]
-    return []
-
-
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def trip_start_view(request):
@@ -102,7 +95,7 @@ def trip_start_view(request):
     if vehicle_schedule_id:
         try:
             vs = VehicleSchedule.objects.select_related('vehicle', 'route', 'route__start_point').prefetch_related(
-                'ticket_bookings', 'ticket_bookings__user'
+                'ticket_bookings', 'ticket_bookings__user', 'ticket_bookings__booked_seats'
             ).get(pk=vehicle_schedule_id, vehicle=vehicle, date=today)
         except VehicleSchedule.DoesNotExist:
             return Response({'error': 'Vehicle schedule not found or not for today'}, status=status.HTTP_404_NOT_FOUND)
@@ -126,18 +119,13 @@ def trip_start_view(request):
                 reverse_direction=reverse,
             )
             for tb in vs.ticket_bookings.all():
-                seat_list = _seat_to_list(tb.seat)
+                seat_list = booking_seat_list(tb)
                 if not seat_list:
                     continue
-                amount_per_seat = (tb.price / len(seat_list)) if seat_list else tb.price
+                amount_per_seat = tb.price / len(seat_list)
                 for s in seat_list:
-                    side = str(s.get('side', ''))
                     try:
-                        num = int(s.get('number', 0))
-                    except (TypeError, ValueError):
-                        continue
-                    try:
-                        vseat = VehicleSeat.objects.get(vehicle=vehicle, side=side, number=num)
+                        vseat = VehicleSeat.objects.get(vehicle=vehicle, side=s['side'], number=s['number'])
                     except VehicleSeat.DoesNotExist:
                         continue
                     SeatBooking.objects.create(
@@ -173,50 +161,51 @@ def trip_start_view(request):
         return Response(_trip_to_response(trip), status=status.HTTP_201_CREATED)
 
     # Check for scheduled trip prompt
-    try:
-        ss = SuperSetting.objects.latest('created_at')
-        minute_coverage = int(ss.minute_coverage_schedule or 60)
-        point_radius_km = float(ss.point_cover_radius or 0.5)
-    except (SuperSetting.DoesNotExist, (TypeError, ValueError)):
-        minute_coverage = 60
-        point_radius_km = 0.5
+    ss = get_super_settings()
+    minute_coverage = ss.minute_coverage
+    point_radius_km = ss.point_cover_radius_km
 
     if latitude is not None and longitude is not None:
-        lat_f = float(latitude)
-        lng_f = float(longitude)
         # Schedules for this vehicle, today, time within ± minute_coverage of now
         now_minutes = now.hour * 60 + now.minute
-        for vs in VehicleSchedule.objects.filter(vehicle=vehicle, date=today).select_related('route', 'route__start_point', 'route__end_point').prefetch_related('ticket_bookings'):
+        candidates = []
+        for vs in VehicleSchedule.objects.filter(vehicle=vehicle, date=today).select_related('route', 'route__start_point', 'route__end_point').prefetch_related('ticket_bookings__booked_seats'):
             vs_minutes = vs.time.hour * 60 + vs.time.minute if vs.time else 0
             if abs(now_minutes - vs_minutes) > minute_coverage:
                 continue
             reverse = getattr(vs, 'reverse_direction', False)
-            start_place = vs.route.end_point if reverse else vs.route.start_point
-            dist = haversine_km(lat_f, lng_f, float(start_place.latitude), float(start_place.longitude))
-            if dist <= point_radius_km:
-                tickets = []
-                for tb in vs.ticket_bookings.all():
-                    tickets.append({
-                        'id': str(tb.id),
-                        'pnr': tb.pnr,
-                        'name': tb.name,
-                        'phone': tb.phone,
-                        'seat': _seat_to_list(tb.seat),
-                        'price': str(tb.price),
-                    })
-                return Response({
-                    'need_confirm_scheduled': True,
-                    'schedule': {
-                        'id': str(vs.id),
-                        'date': vs.date.isoformat(),
-                        'time': vs.time.strftime('%H:%M') if vs.time else None,
-                        'route_name': vs.route.name,
-                        'start_point_name': vs.route.start_point.name,
-                        'end_point_name': vs.route.end_point.name,
-                        'reverse_direction': reverse,
-                    },
-                    'tickets': tickets,
-                }, status=status.HTTP_200_OK)
+            candidates.append((vs, reverse, vs.route.end_point if reverse else vs.route.start_point))
+        # First schedule (query order) whose start point is within the cover radius
+        idx, _dist = first_within(
+            latitude, longitude,
+            [c[2].latitude for c in candidates], [c[2].longitude for c in candidates],
+            point_radius_km,
+        )
+        if idx is not None:
+            vs, reverse, _start_place = candidates[idx]
+            tickets = []
+            for tb in vs.ticket_bookings.all():
+                tickets.append({
+                    'id': str(tb.id),
+                    'pnr': tb.pnr,
+                    'name': tb.name,
+                    'phone': tb.phone,
+                    'seat': booking_seat_list(tb),
+                    'price': str(tb.price),
+                })
+            return Response({
+                'need_confirm_scheduled': True,
+                'schedule': {
+                    'id': str(vs.id),
+                    'date': vs.date.isoformat(),
+                    'time': vs.time.strftime('%H:%M') if vs.time else None,
+                    'route_name': vs.route.name,
+                    'start_point_name': vs.route.start_point.name,
+                    'end_point_name': vs.route.end_point.name,
+                    'reverse_direction': reverse,
+                },
+                'tickets': tickets,
+            }, status=status.HTTP_200_OK)
 
     # Normal trip: optional reverse_direction (only when route is bidirectional)
     reverse_direction = request.POST.get('reverse_direction') or request.data.get('reverse_direction')
@@ -285,15 +274,8 @@ def trip_end_view(request, pk):
 
     reverse = getattr(trip, 'reverse_direction', False)
     end_place = trip.route.start_point if reverse else trip.route.end_point
-    distance_km = haversine_km(
-        float(latitude), float(longitude),
-        float(end_place.latitude), float(end_place.longitude)
-    )
-    try:
-        ss = SuperSetting.objects.latest('created_at')
-        stop_radius_km = float(ss.point_cover_radius or 1.5)
-    except (SuperSetting.DoesNotExist, (TypeError, ValueError)):
-        stop_radius_km = 1.5
+    distance_km = round(haversine_km(latitude, longitude, end_place.latitude, end_place.longitude), 4)
+    stop_radius_km = get_super_settings().point_cover_radius or 1.5
 
     if distance_km > stop_radius_km:
         if not confirm_out_of_range:
@@ -309,23 +291,28 @@ def trip_end_view(request, pk):
             trip.remarks = remark
 
     now = timezone.now()
-    trip.end_time = now
-    trip.save()
+    with transaction.atomic():
+        trip.end_time = now
+        trip.save()
+
+        # Record location at end
+        end_loc = Location.objects.create(
+            vehicle=trip.vehicle,
+            trip=trip,
+            latitude=Decimal(str(latitude)),
+            longitude=Decimal(str(longitude)),
+            speed=None,
+        )
+        record_last_position(end_loc)
 
-    # Record location at end
-    Location.objects.create(
-        vehicle=trip.vehicle,
-        trip=trip,
-        latitude=Decimal(str(latitude)),
-        longitude=Decimal(str(longitude)),
-        speed=None,
-    )
+        # Clear vehicle active driver and active route when trip ends
+        vehicle = trip.vehicle
+        vehicle.active_driver = None
+        vehicle.active_route = None
+        vehicle.save()
 
-    # Clear vehicle active driver and active route when trip ends
-    vehicle = trip.vehicle
-    vehicle.active_driver = None
-    vehicle.active_route = None
-    vehicle.save()
+        # Simplified playback tracks: built by the track worker, not on this request
+        mark_trip_tracks_stale([trip.pk], immediate=True)
 
     return Response({
         'trip': _trip_to_response(trip),
@@ -393,50 +380,109 @@ def trip_list_get_view(request):
     })
 
 
-def _location_to_response(loc):
-    return {
-        'id': str(loc.id),
-        'latitude': str(loc.latitude),
-        'longitude': str(loc.longitude),
-        'speed': str(loc.speed) if loc.speed is not None else None,
-        'course': str(loc.course) if getattr(loc, 'course', None) is not None else None,
-        'created_at': loc.created_at.isoformat(),
-    }
+def _trip_detail_queryset():
+    """
+    Trip with everything the detail response reads, loaded up front: one query per relation,
+    whatever the number of stops, locations, seat bookings or ticket bookings.
+    """
+    return Trip.objects.select_related(
+        'vehicle', 'driver', 'route', 'vehicle_schedule',
+        'vehicle_schedule__vehicle', 'vehicle_schedule__route',
+        'route__start_point', 'route__end_point',
+    ).prefetch_related(
+        Prefetch('seat_bookings', queryset=SeatBooking.objects.select_related(
+            'user', 'vehicle', 'vehicle_seat', 'destination_place', 'origin_place',
+        ).order_by('check_in_datetime')),
+        Prefetch('vehicle_schedule__ticket_bookings', queryset=VehicleTicketBooking.objects.select_related(
+            'pickup_point', 'destination_point',
+        ).prefetch_related('booked_seats')),
+        Prefetch('route__stop_points', queryset=RouteStopPoint.objects.select_related('place')),
+    )
 
 
-@api_view(['GET'])
-def trip_detail_get_view(request, pk):
-    """Get single trip with locations, seat_bookings, revenue, vehicle_schedule, ticket_bookings."""
-    from django.db.models import Sum
+def _parse_track_datetime(value):
+    dt = parse_datetime(value)
+    if dt is not None and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def _track_options(query_params):
+    """
+    (options, error) from the trip detail track query params:
+    track=full, track_from / track_to (ISO datetimes, full resolution within the window),
+    track_tolerance (metres) or track_zoom (map zoom level) for the simplified level.
+    """
+    options = {'full': (query_params.get('track') or '').lower() == 'full'}
+    for name in ('track_from', 'track_to'):
+        value = query_params.get(name)
+        if value:
+            options[name] = _parse_track_datetime(value)
+            if options[name] is None:
+                return None, f'{name} must be an ISO datetime'
+    for name in ('track_tolerance', 'track_zoom'):
+        value = query_params.get(name)
+        if value:
+            try:
+                options[name] = float(value)
+            except (TypeError, ValueError):
+                return None, f'{name} must be a number'
+    return options, None
+
+
+def _trip_track(trip, full=False, track_from=None, track_to=None, track_tolerance=None, track_zoom=None):
+    """
+    (stored-format track points, track info) for trip detail. Every location is returned unless the
+    client opts into a stored simplified level with track_tolerance or track_zoom; running trips,
+    trips without stored levels, track=full and time windows always read the locations.
+    """
+    info = {'resolution': 'full', 'tolerance_m': None, 'tolerances_m': list(TRACK_TOLERANCES_M)}
+    simplified = track_tolerance is not None or track_zoom is not None
+    if simplified and not full and track_from is None and track_to is None and trip.end_time:
+        tolerance = track_tolerance
+        if tolerance is None:
+            # Trips without a route fall back to the equator's (largest) pixel size
+            latitude = trip.route.start_point.latitude if trip.route_id else 0
+            tolerance = zoom_tolerance_m(track_zoom, latitude)
+        track = get_trip_track(trip.pk, tolerance)
+        if track is not None:
+            info.update(
+                resolution='simplified', tolerance_m=track.tolerance_m,
+                point_count=track.point_count, source_point_count=track.source_point_count,
+            )
+            return track.points, info
+    locations = track_locations(Location.objects.filter(trip=trip))
+    if track_from is not None:
+        locations = locations.filter(point_time__gte=track_from)
+        info['resolution'] = 'window'
+    if track_to is not None:
+        locations = locations.filter(point_time__lte=track_to)
+        info['resolution'] = 'window'
+    points = [track_point(row) for row in locations.values_list(*TRACK_POINT_FIELDS)]
+    info['point_count'] = len(points)
+    info['source_point_count'] = len(points) if info['resolution'] == 'full' else None
+    return points, info
+
+
+def _build_trip_detail(trip, track_options=None, track_format='json'):
+    """
+    Trip detail response from a trip loaded with _trip_detail_queryset(); further queries only
+    read the track (stored simplified level, or locations). track_format='polyline' puts the
+    encoded track (services.track_format) in data['track'] instead of data['locations'].
+    """
     from ..serializers import SeatBookingSerializer
-    try:
-        trip = Trip.objects.select_related(
-            'vehicle', 'driver', 'route', 'vehicle_schedule',
-            'vehicle_schedule__vehicle', 'vehicle_schedule__route',
-            'vehicle_schedule__route__start_point', 'vehicle_schedule__route__end_point',
-            'route__start_point', 'route__end_point',
-        ).prefetch_related(
-            'locations',
-            'seat_bookings__user',
-            'seat_bookings__vehicle_seat',
-            'seat_bookings__destination_place',
-            'seat_bookings__origin_place',
-            'vehicle_schedule__ticket_bookings',
-            'vehicle_schedule__ticket_bookings__pickup_point',
-            'vehicle_schedule__ticket_bookings__destination_point',
-            'route__stop_points__place',
-        ).get(pk=pk)
-    except Trip.DoesNotExist:
-        return Response({'error': 'Trip not found'}, status=status.HTTP_404_NOT_FOUND)
 
     data = _trip_to_response(trip)
 
     # point_cover_radius_km for client-side geofence announcements
-    try:
-        ss = SuperSetting.objects.latest('created_at')
-        data['point_cover_radius_km'] = float(ss.point_cover_radius or 0.5)
-    except (SuperSetting.DoesNotExist, (TypeError, ValueError)):
-        data['point_cover_radius_km'] = 0.5
+    data['point_cover_radius_km'] = get_super_settings().point_cover_radius_km
+
+    seat_bookings = list(trip.seat_bookings.all())
+    # Stops where a passenger still on board gets off
+    open_destination_ids = {
+        b.destination_place_id for b in seat_bookings
+        if b.check_out_datetime is None and b.destination_place_id is not None
+    }
 
     # Route with stop_points in effective traversal order (forward or reverse)
     route = trip.route
@@ -449,11 +495,6 @@ def trip_detail_get_view(request, pk):
                 announcement_text = ''
             else:
                 announcement_text = getattr(rsp, 'announcement_text', '') or '' if rsp else ''
-            has_destination_booking = SeatBooking.objects.filter(
-                trip=trip,
-                destination_place_id=place.id,
-                check_out_datetime__isnull=True,
-            ).exists()
             stop_points.append({
                 'place_id': str(place.id),
                 'order': order_idx,
@@ -462,7 +503,7 @@ def trip_detail_get_view(request, pk):
                 'place_code': place.code if place else None,
                 'latitude': str(place.latitude) if place and place.latitude is not None else None,
                 'longitude': str(place.longitude) if place and place.longitude is not None else None,
-                'has_destination_booking': has_destination_booking,
+                'has_destination_booking': place.id in open_destination_ids,
             })
         data['route'] = {
             'id': str(route.id),
@@ -472,19 +513,20 @@ def trip_detail_get_view(request, pk):
     else:
         data['route'] = None
 
-    # Locations for this trip (ordered by created_at for polyline/playback)
-    locations = list(trip.locations.all().order_by('created_at'))
-    data['locations'] = [_location_to_response(loc) for loc in locations]
+    # Track for polyline/playback, ordered by point time (simplified level or full resolution)
+    points, data['track'] = _trip_track(trip, **(track_options or {}))
+    if track_format == 'polyline':
+        data['track'].update(format='polyline', **track_polyline([track_point_tuple(p) for p in points]))
+    else:
+        data['locations'] = [track_point_to_response(p) for p in points]
 
     # Seat bookings with full nested data
-    seat_bookings = trip.seat_bookings.all().select_related(
-        'user', 'vehicle', 'vehicle_seat', 'destination_place', 'origin_place'
-    ).order_by('check_in_datetime')
     data['seat_bookings'] = SeatBookingSerializer(seat_bookings, many=True).data
 
     # Revenue: seat booking total + ticket total (if scheduled)
-    seat_revenue_agg = trip.seat_bookings.aggregate(s=Sum('trip_amount'))
-    total_seat_booking_revenue = seat_revenue_agg['s'] or Decimal('0')
+    total_seat_booking_revenue = sum(
+        (b.trip_amount for b in seat_bookings if b.trip_amount is not None), Decimal('0'),
+    )
     data['total_seat_booking_revenue'] = str(total_seat_booking_revenue)
     ticket_revenue = Decimal('0')
     data['vehicle_schedule'] = None
@@ -500,14 +542,14 @@ def trip_detail_get_view(request, pk):
             'vehicle_name': vs.vehicle.name if vs.vehicle else None,
             'vehicle_no': vs.vehicle.vehicle_no if vs.vehicle else None,
         }
-        for tb in vs.ticket_bookings.all().select_related('pickup_point', 'destination_point'):
+        for tb in vs.ticket_bookings.all():
             ticket_revenue += tb.price
             data['ticket_bookings'].append({
                 'id': str(tb.id),
                 'pnr': tb.pnr,
                 'name': tb.name,
                 'phone': tb.phone,
-                'seat': tb.seat,
+                'seat': booking_seat_list(tb),
                 'price': str(tb.price),
                 'is_paid': tb.is_paid,
                 'pickup_point_name': tb.pickup_point.name if tb.pickup_point else None,
@@ -515,8 +557,39 @@ def trip_detail_get_view(request, pk):
             })
     data['ticket_revenue'] = str(ticket_revenue)
     data['total_revenue'] = str(total_seat_booking_revenue + ticket_revenue)
+    return data
+
 
-    return Response(data)
+@api_view(['GET'])
+@renderer_classes(TRACK_RENDERER_CLASSES)
+def trip_detail_get_view(request, pk):
+    """
+    Get single trip with locations, seat_bookings, revenue, vehicle_schedule, ticket_bookings.
+    locations holds every point unless track_tolerance (m) or track_zoom asks a finished trip for its
+    stored simplified level (see _trip_track); track_from / track_to select a time window.
+    format=polyline returns the track encoded in data['track']; format=binary returns only the track
+    as packed records (application/octet-stream, X-Track-* headers).
+    """
+    track_options, error = _track_options(request.query_params)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    track_format = request.accepted_renderer.format
+    if track_format == 'binary':
+        try:
+            trip = Trip.objects.select_related('route__start_point').get(pk=pk)
+        except Trip.DoesNotExist:
+            return Response({'error': 'Trip not found'}, status=status.HTTP_404_NOT_FOUND)
+        points, info = _trip_track(trip, **track_options)
+        return binary_track_response([track_point_tuple(p) for p in points], {
+            'X-Track-Resolution': info['resolution'],
+            'X-Track-Tolerance-M': info['tolerance_m'],
+            'X-Track-Source-Point-Count': info['source_point_count'],
+        })
+    try:
+        trip = _trip_detail_queryset().get(pk=pk)
+    except Trip.DoesNotExist:
+        return Response({'error': 'Trip not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_build_trip_detail(trip, track_options, track_format))
 
 
 @api_view(['POST'])
@@ -571,117 +644,94 @@ def trip_current_stop_view(request):
     if trip.end_time:
         return Response({'at_stop': None}, status=status.HTTP_200_OK)
 
-    try:
-        ss = SuperSetting.objects.latest('created_at')
-        radius_km = float(ss.point_cover_radius or 0.5)
-        header = (getattr(ss, 'stop_point_announcement_header', None) or '').strip()
-    except (SuperSetting.DoesNotExist, (TypeError, ValueError)):
-        radius_km = 0.5
-        header = ''
+    ss = get_super_settings()
+    radius_km = ss.point_cover_radius_km
 
     route = trip.route
     reverse = getattr(trip, 'reverse_direction', False)
     points = get_route_ordered_points(route, reverse)
 
-    lat_f, lng_f = float(lat), float(lng)
-    for _kind, place, rsp in points:
-        dist = haversine_km(lat_f, lng_f, float(place.latitude), float(place.longitude))
-        if dist <= radius_km:
-            if rsp is not None:
-                custom = (getattr(rsp, 'announcement_text', None) or '').strip()
-                if custom:
-                    announcement_text = custom
-                elif header:
-                    name = (place.name or '').strip()
-                    announcement_text = (header.replace('$x', name).replace('$X', name).strip() or name)[:500]
-                else:
-                    announcement_text = (place.name or '')[:500]
-            else:
-                announcement_text = ''
-            pickups = []
-            if trip.is_scheduled and trip.vehicle_schedule_id:
-                for vtb in trip.vehicle_schedule.ticket_bookings.filter(pickup_point_id=place.id).select_related('pickup_point'):
-                    seat_str = str(vtb.seat) if isinstance(vtb.seat, (dict, list)) else vtb.seat
-                    if isinstance(vtb.seat, list):
-                        seat_str = ', '.join(f"{s.get('side', '')}{s.get('number', '')}" for s in vtb.seat if isinstance(s, dict))
-                    pickups.append({
-                        'pnr': vtb.pnr,
-                        'name': vtb.name,
-                        'phone': vtb.phone,
-                        'seat': seat_str,
-                    })
-            for sb in SeatBooking.objects.filter(
-                trip=trip,
-                origin_place_id=place.id,
-                check_out_datetime__isnull=True,
-            ).select_related('user', 'vehicle_seat'):
-                pickups.append({
-                    'pnr': '',
-                    'name': sb.user.name if sb.user else 'Guest',
-                    'phone': getattr(sb.user, 'phone', None) or '',
-                    'seat': f"{sb.vehicle_seat.side}{sb.vehicle_seat.number}",
-                })
-            dropoffs = []
-            # All seat bookings (scheduled or not) whose destination is this stop and not yet checked out
-            for sb in SeatBooking.objects.filter(
-                trip=trip,
-                destination_place_id=place.id,
-                check_out_datetime__isnull=True,
-            ).select_related('vehicle_seat'):
-                seat_label = f"{sb.vehicle_seat.side}{sb.vehicle_seat.number}"
+    # First route point (traversal order) within the cover radius
+    idx, _dist = first_within(
+        lat, lng, [p[1].latitude for p in points], [p[1].longitude for p in points], radius_km,
+    )
+    if idx is None:
+        return Response({'at_stop': None}, status=status.HTTP_200_OK)
+    _kind, place, rsp = points[idx]
+    if rsp is not None:
+        custom = (getattr(rsp, 'announcement_text', None) or '').strip()
+        announcement_text = custom or ss.announcement_text(place.name)
+    else:
+        announcement_text = ''
+    pickups = []
+    if trip.is_scheduled and trip.vehicle_schedule_id:
+        for vtb in trip.vehicle_schedule.ticket_bookings.filter(pickup_point_id=place.id).prefetch_related('booked_seats'):
+            pickups.append({
+                'pnr': vtb.pnr,
+                'name': vtb.name,
+                'phone': vtb.phone,
+                'seat': booking_seat_labels(vtb),
+            })
+    for sb in SeatBooking.objects.filter(
+        trip=trip,
+        origin_place_id=place.id,
+        check_out_datetime__isnull=True,
+    ).select_related('user', 'vehicle_seat'):
+        pickups.append({
+            'pnr': '',
+            'name': sb.user.name if sb.user else 'Guest',
+            'phone': getattr(sb.user, 'phone', None) or '',
+            'seat': f"{sb.vehicle_seat.side}{sb.vehicle_seat.number}",
+        })
+    dropoffs = []
+    # All seat bookings (scheduled or not) whose destination is this stop and not yet checked out
+    for sb in SeatBooking.objects.filter(
+        trip=trip,
+        destination_place_id=place.id,
+        check_out_datetime__isnull=True,
+    ).select_related('vehicle_seat'):
+        seat_label = f"{sb.vehicle_seat.side}{sb.vehicle_seat.number}"
+        dropoffs.append({
+            'booking_id': str(sb.id),
+            'vehicle_seat_id': str(sb.vehicle_seat_id),
+            'seat_label': seat_label,
+            'name': sb.user.name if sb.user else 'Guest',
+            'pnr': '',
+            'trip_amount': str(sb.trip_amount) if sb.trip_amount is not None else '0',
+        })
+    # For scheduled trips, also include ticket dropoffs at this destination (in case no SeatBooking yet)
+    existing_seat_ids = {d['vehicle_seat_id'] for d in dropoffs}
+    if trip.is_scheduled and trip.vehicle_schedule_id and trip.vehicle_id:
+        vehicle_seat_by_key = {(vs.side, vs.number): vs for vs in trip.vehicle.seats.all()}
+        for vtb in trip.vehicle_schedule.ticket_bookings.filter(destination_point_id=place.id).prefetch_related('booked_seats'):
+            for seat_item in booking_seat_list(vtb):
+                side = seat_item['side'].strip()
+                num = seat_item['number']
+                vs = vehicle_seat_by_key.get((side, num))
+                if vs is None or str(vs.id) in existing_seat_ids:
+                    continue
+                existing_seat_ids.add(str(vs.id))
+                seat_label = f"{side}{num}"
                 dropoffs.append({
-                    'booking_id': str(sb.id),
-                    'vehicle_seat_id': str(sb.vehicle_seat_id),
+                    'booking_id': f"ticket_{vtb.id}",
+                    'vehicle_seat_id': str(vs.id),
                     'seat_label': seat_label,
-                    'name': sb.user.name if sb.user else 'Guest',
-                    'pnr': '',
-                    'trip_amount': str(sb.trip_amount) if sb.trip_amount is not None else '0',
+                    'name': vtb.name or 'Guest',
+                    'pnr': vtb.pnr or '',
+                    'trip_amount': str(vtb.price) if vtb.price is not None else '0',
                 })
-            # For scheduled trips, also include ticket dropoffs at this destination (in case no SeatBooking yet)
-            existing_seat_ids = {d['vehicle_seat_id'] for d in dropoffs}
-            if trip.is_scheduled and trip.vehicle_schedule_id and trip.vehicle_id:
-                vehicle_seat_by_key = {(vs.side, vs.number): vs for vs in trip.vehicle.seats.all()}
-                for vtb in trip.vehicle_schedule.ticket_bookings.filter(destination_point_id=place.id).select_related('destination_point'):
-                    seat_list = vtb.seat if isinstance(vtb.seat, list) else ([vtb.seat] if vtb.seat and isinstance(vtb.seat, dict) else [])
-                    for seat_item in seat_list:
-                        if not isinstance(seat_item, dict):
-                            continue
-                        side = str(seat_item.get('side', '')).strip()
-                        num = seat_item.get('number')
-                        if num is not None:
-                            try:
-                                num = int(num)
-                            except (TypeError, ValueError):
-                                continue
-                        else:
-                            continue
-                        vs = vehicle_seat_by_key.get((side, num))
-                        if vs is None or str(vs.id) in existing_seat_ids:
-                            continue
-                        existing_seat_ids.add(str(vs.id))
-                        seat_label = f"{side}{num}"
-                        dropoffs.append({
-                            'booking_id': f"ticket_{vtb.id}",
-                            'vehicle_seat_id': str(vs.id),
-                            'seat_label': seat_label,
-                            'name': vtb.name or 'Guest',
-                            'pnr': vtb.pnr or '',
-                            'trip_amount': str(vtb.price) if vtb.price is not None else '0',
-                        })
-            has_destination_booking = SeatBooking.objects.filter(
-                trip=trip,
-                destination_place_id=place.id,
-                check_out_datetime__isnull=True,
-            ).exists()
-            return Response({
-                'at_stop': {
-                    'place_id': str(place.id),
-                    'name': place.name,
-                    'announcement_text': announcement_text[:500] if announcement_text else '',
-                    'pickups': pickups,
-                    'dropoffs': dropoffs,
-                    'has_destination_booking': has_destination_booking,
-                },
-            }, status=status.HTTP_200_OK)
-
-    return Response({'at_stop': None}, status=status.HTTP_200_OK)
+    has_destination_booking = SeatBooking.objects.filter(
+        trip=trip,
+        destination_place_id=place.id,
+        check_out_datetime__isnull=True,
+    ).exists()
+    return Response({
+        'at_stop': {
+            'place_id': str(place.id),
+            'name': place.name,
+            'announcement_text': announcement_text[:500] if announcement_text else '',
+            'pickups': pickups,
+            'dropoffs': dropoffs,
+            'has_destination_booking': has_destination_booking,
+        },
+    }, status=status.HTTP_200_OK)
@@ -201,17 +201,18 @@ def vehicle_analytics_view(request, vehicle_id):
         .annotate(trip_count=Count('id'))
         .order_by('-trip_count')
     )
+    # Seat revenue of all those trips in one grouped query (not one aggregate per driver)
+    seat_revenue_by_driver = {
+        row['trip__driver_id']: row['s']
+        for row in SeatBooking.objects.filter(trip__in=trips_qs).values('trip__driver_id').annotate(s=Sum('trip_amount')).order_by()
+    }
     by_driver = []
     for row in driver_agg:
-        driver_trip_ids = list(trips_qs.filter(driver_id=row['driver_id']).values_list('id', flat=True))
-        driver_seat_revenue = SeatBooking.objects.filter(
-            trip_id__in=driver_trip_ids,
-        ).aggregate(s=Sum('trip_amount'))
         by_driver.append({
             'driver_id': str(row['driver_id']),
             'driver_name': row['driver__name'] or row['driver__username'] or 'Unknown',
             'trip_count': row['trip_count'],
-            'seat_revenue': str(driver_seat_revenue['s'] or 0),
+            'seat_revenue': str(seat_revenue_by_driver.get(row['driver_id']) or 0),
         })
 
     return Response({
@@ -4,35 +4,50 @@ from datetime import datetime
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 
-from ..models import VehicleSchedule, Vehicle, Route, Place, VehicleTicketBooking, RouteStopPoint
-from ..route_order import get_route_place_order
+from ..models import VehicleSchedule, Vehicle, VehicleSeat, Route, Place, RouteStopPoint, RoutePlaceOrder
+from ..services.seat_occupancy import booked_seats_for_segment
+from ..utils import apply_field_selection, field_wanted, parse_field_selection
 
 
-def _route_place_order(route):
-    """Return dict place_id -> order (0=start, 1..n=stops, n+1=end). Forward direction."""
-    return get_route_place_order(route, reverse=False)
-
-
-def _schedule_place_order(schedule):
-    """Return dict place_id -> order for this schedule's effective direction."""
-    return get_route_place_order(schedule.route, getattr(schedule, 'reverse_direction', False))
+def _place_index(place_id, field, route_ref='route_id'):
+    """Subquery: RoutePlaceOrder index (forward_index / reverse_index) of place_id on the outer row's route."""
+    return Subquery(
+        RoutePlaceOrder.objects.filter(route_id=OuterRef(route_ref), place_id=place_id).values(field)[:1]
+    )
 
 
-def _route_contains_place_before(route, from_place_id, to_place_id):
-    """True if both places are on route and from comes before to (forward direction)."""
-    order_map = _route_place_order(route)
-    if from_place_id not in order_map or to_place_id not in order_map:
-        return False
-    return order_map[from_place_id] < order_map[to_place_id]
+def _filter_schedules_by_segment(queryset, from_place_id, to_place_id):
+    """Schedules whose route has from_place before to_place in the schedule's direction (indexed SQL, no Python loop)."""
+    return queryset.annotate(
+        seg_from_fwd=_place_index(from_place_id, 'forward_index'),
+        seg_to_fwd=_place_index(to_place_id, 'forward_index'),
+        seg_from_rev=_place_index(from_place_id, 'reverse_index'),
+        seg_to_rev=_place_index(to_place_id, 'reverse_index'),
+    ).filter(
+        Q(reverse_direction=False, seg_from_fwd__lt=F('seg_to_fwd')) |
+        Q(reverse_direction=True, seg_from_rev__lt=F('seg_to_rev'))
+    )
 
 
-def _schedule_contains_place_before(schedule, from_place_id, to_place_id):
-    """True if both places are on schedule's route and from comes before to in schedule direction."""
-    order_map = _schedule_place_order(schedule)
-    if from_place_id not in order_map or to_place_id not in order_map:
-        return False
-    return order_map[from_place_id] < order_map[to_place_id]
+def _places_after(route_ids, from_place_id, reverse=None):
+    """
+    Place ids after from_place_id on the given routes.
+    reverse=False/True: that direction only; None: forward, plus reverse on bidirectional routes.
+    """
+    rows = RoutePlaceOrder.objects.filter(route_id__in=route_ids).annotate(
+        from_fwd=_place_index(from_place_id, 'forward_index'),
+        from_rev=_place_index(from_place_id, 'reverse_index'),
+    )
+    if reverse is None:
+        cond = Q(forward_index__gt=F('from_fwd')) | Q(route__is_bidirectional=True, reverse_index__gt=F('from_rev'))
+    elif reverse:
+        cond = Q(reverse_index__gt=F('from_rev'))
+    else:
+        cond = Q(forward_index__gt=F('from_fwd'))
+    return rows.filter(cond).values('place_id')
 
 
 def _schedule_to_response(s):
@@ -64,9 +79,10 @@ def _build_media_url(request, path):
     return f"{base}{path}" if path.startswith('/') else f"{base}/{path}"
 
 
-def _schedule_to_response_expanded(s, request):
+def _schedule_to_response_expanded(s, request, include_vehicle_details=True):
     """Response with nested route (start/end place) and vehicle (name, vehicle_no, featured_image, images).
-    Route start/end are in schedule direction (swapped when reverse_direction is True)."""
+    Route start/end are in schedule direction (swapped when reverse_direction is True).
+    include_vehicle_details=False skips vehicle_details (and its image lookups) for sparse fieldsets."""
     route = s.route
     vehicle = s.vehicle
     reverse = getattr(s, 'reverse_direction', False)
@@ -82,6 +98,25 @@ def _schedule_to_response_expanded(s, request):
         'start_point': {'id': str(first_place.id), 'name': first_place.name, 'code': first_place.code},
         'end_point': {'id': str(last_place.id), 'name': last_place.name, 'code': last_place.code},
     }
+    row = {
+        'id': str(s.id),
+        'vehicle': str(s.vehicle.id),
+        'route': str(s.route.id),
+        'date': s.date.isoformat(),
+        'time': (s.time.strftime('%H:%M') if s.time else None),
+        'price': str(s.price),
+        'reverse_direction': getattr(s, 'reverse_direction', False),
+        'created_at': s.created_at.isoformat(),
+        'updated_at': s.updated_at.isoformat(),
+        'route_details': route_data,
+    }
+    if include_vehicle_details:
+        row['vehicle_details'] = _schedule_vehicle_details(vehicle, request)
+    return row
+
+
+def _schedule_vehicle_details(vehicle, request):
+    """vehicle_details for expanded schedule rows: name, vehicle_no, featured_image and up to 20 image URLs."""
     featured_image = None
     if vehicle.featured_image:
         featured_image = _build_media_url(request, vehicle.featured_image.url)
@@ -93,42 +128,21 @@ def _schedule_to_response_expanded(s, request):
         for img in vehicle.images.all()[:20]:
             if img.image:
                 images.append(_build_media_url(request, img.image.url))
-    vehicle_data = {
+    return {
         'id': str(vehicle.id),
         'name': vehicle.name,
         'vehicle_no': vehicle.vehicle_no,
         'featured_image': featured_image,
         'images': images,
     }
-    return {
-        'id': str(s.id),
-        'vehicle': str(s.vehicle.id),
-        'route': str(s.route.id),
-        'date': s.date.isoformat(),
-        'time': (s.time.strftime('%H:%M') if s.time else None),
-        'price': str(s.price),
-        'reverse_direction': getattr(s, 'reverse_direction', False),
-        'created_at': s.created_at.isoformat(),
-        'updated_at': s.updated_at.isoformat(),
-        'route_details': route_data,
-        'vehicle_details': vehicle_data,
-    }
 
 
 @api_view(['GET'])
 def vehicle_schedule_start_places_view(request):
     """All places that appear on any vehicle_schedule route: start + stop_points + end, distinct, by name."""
-    # Routes that have at least one VehicleSchedule
-    route_ids = VehicleSchedule.objects.values_list('route_id', flat=True).distinct()
-    routes = Route.objects.filter(id__in=route_ids).prefetch_related(
-        'start_point', 'end_point', 'stop_points__place'
-    )
-    place_ids = set()
-    for route in routes:
-        place_ids.add(route.start_point_id)
-        place_ids.add(route.end_point_id)
-        for sp in route.stop_points.all():
-            place_ids.add(sp.place_id)
+    # Places on routes that have at least one VehicleSchedule
+    route_ids = VehicleSchedule.objects.values('route_id')
+    place_ids = RoutePlaceOrder.objects.filter(route_id__in=route_ids).values('place_id')
     places = Place.objects.filter(id__in=place_ids).order_by('name')
     return Response([
         {'id': str(p.id), 'name': p.name, 'code': p.code}
@@ -151,49 +165,16 @@ def vehicle_schedule_end_places_view(request):
     if reverse_direction is not None:
         reverse_direction = reverse_direction.lower() in ('true', '1', 'yes')
 
-    place_ids = set()
+    place_ids = []
     if vehicle_schedule_id:
-        try:
-            s = VehicleSchedule.objects.select_related('route').get(pk=vehicle_schedule_id)
-            order_map = _schedule_place_order(s)
-            if from_place_id in order_map:
-                from_order = order_map[from_place_id]
-                for pid, o in order_map.items():
-                    if o > from_order:
-                        place_ids.add(pid)
-        except VehicleSchedule.DoesNotExist:
-            pass
+        schedule = VehicleSchedule.objects.filter(pk=vehicle_schedule_id).values('route_id', 'reverse_direction').first()
+        if schedule:
+            place_ids = _places_after([schedule['route_id']], from_place_id, reverse=schedule['reverse_direction'])
     elif route_id and reverse_direction is not None:
-        try:
-            route = Route.objects.prefetch_related('start_point', 'end_point', 'stop_points__place').get(pk=route_id)
-            order_map = get_route_place_order(route, reverse=reverse_direction)
-            if from_place_id in order_map:
-                from_order = order_map[from_place_id]
-                for pid, o in order_map.items():
-                    if o > from_order:
-                        place_ids.add(pid)
-        except Route.DoesNotExist:
-            pass
+        place_ids = _places_after([route_id], from_place_id, reverse=reverse_direction)
     else:
-        route_ids = VehicleSchedule.objects.values_list('route_id', flat=True).distinct()
-        routes = Route.objects.filter(id__in=route_ids).prefetch_related(
-            'start_point', 'end_point', 'stop_points__place'
-        )
-        for route in routes:
-            order_map = _route_place_order(route)
-            if from_place_id not in order_map:
-                continue
-            from_order = order_map[from_place_id]
-            for pid, o in order_map.items():
-                if o > from_order:
-                    place_ids.add(pid)
-            if route.is_bidirectional:
-                order_map_reverse = get_route_place_order(route, reverse=True)
-                if from_place_id in order_map_reverse:
-                    from_order_rev = order_map_reverse[from_place_id]
-                    for pid, o in order_map_reverse.items():
-                        if o > from_order_rev:
-                            place_ids.add(pid)
+        route_ids = VehicleSchedule.objects.values('route_id')
+        place_ids = _places_after(route_ids, from_place_id)
     places = Place.objects.filter(id__in=place_ids).order_by('name')
     return Response([
         {'id': str(p.id), 'name': p.name, 'code': p.code}
@@ -201,44 +182,6 @@ def vehicle_schedule_end_places_view(request):
     ])
 
 
-def _seat_to_list(seat):
-    if isinstance(seat, list):
-        return [x for x in seat if isinstance(x, dict) and x.get('side') is not None and x.get('number') is not None]
-    if isinstance(seat, dict) and seat.get('side') is not None and seat.get('number') is not None:
-        return [seat]
-    return []
-
-
-def _segment_overlap(a_start, a_end, b_start, b_end):
-    """True if segment [a_start, a_end] overlaps [b_start, b_end] (order indices)."""
-    return a_start < b_end and b_start < a_end
-
-
-def _booked_seats_for_segment(schedule, from_order, to_order, order_map):
-    """Set of (side, number) that are booked for a segment overlapping [from_order, to_order]."""
-    booked = set()
-    for b in VehicleTicketBooking.objects.filter(vehicle_schedule=schedule).select_related('pickup_point', 'destination_point'):
-        seat_list = _seat_to_list(b.seat)
-        if not seat_list:
-            continue
-        if b.pickup_point_id and b.destination_point_id and b.pickup_point_id in order_map and b.destination_point_id in order_map:
-            b_start = order_map[b.pickup_point_id]
-            b_end = order_map[b.destination_point_id]
-        else:
-            b_start = 0
-            b_end = max(order_map.values()) + 1
-        if not _segment_overlap(from_order, to_order, b_start, b_end):
-            continue
-        for s in seat_list:
-            side = str(s.get('side', ''))
-            try:
-                num = int(s.get('number', 0))
-            except (TypeError, ValueError):
-                continue
-            booked.add((side, num))
-    return booked
-
-
 def _parse_date_vs(val):
     if val is None or val == '':
         return None
@@ -260,8 +203,9 @@ def vehicle_schedule_list_get_view(request):
     from_place = request.query_params.get('from_place')
     to_place = request.query_params.get('to_place')
     expand = request.query_params.get('expand', '').lower() in ('1', 'true', 'yes')
+    selection = parse_field_selection(request)
 
-    queryset = VehicleSchedule.objects.select_related('vehicle', 'route', 'route__start_point', 'route__end_point').prefetch_related('route__stop_points__place')
+    queryset = VehicleSchedule.objects.select_related('vehicle', 'route', 'route__start_point', 'route__end_point')
     if vehicle_id:
         queryset = queryset.filter(vehicle_id=vehicle_id)
     if route_id:
@@ -282,13 +226,7 @@ def vehicle_schedule_list_get_view(request):
         )
     # Segment search: both from_place and to_place => filter by schedule's effective order
     if from_place and to_place:
-        from_place_id = int(from_place)
-        to_place_id = int(to_place)
-        valid_schedule_ids = []
-        for s in queryset:
-            if _schedule_contains_place_before(s, from_place_id, to_place_id):
-                valid_schedule_ids.append(s.id)
-        queryset = queryset.filter(id__in=valid_schedule_ids)
+        queryset = _filter_schedules_by_segment(queryset, int(from_place), int(to_place))
     elif from_place:
         # Effective start = from_place: start_point when forward, end_point when reverse
         queryset = queryset.filter(
@@ -307,49 +245,55 @@ def vehicle_schedule_list_get_view(request):
     start = (page - 1) * per_page
     end = start + per_page
     total = queryset.count()
+    want_seat_counts = expand and (field_wanted(selection, 'available_seats') or field_wanted(selection, 'total_seats'))
+    if want_seat_counts:
+        # Seat totals for the whole page in the page query; booked seats come from seat_occupancy
+        seat_totals = (
+            VehicleSeat.objects.filter(vehicle_id=OuterRef('vehicle_id'))
+            .order_by().values('vehicle_id').annotate(c=Count('id')).values('c')
+        )
+        queryset = queryset.annotate(vehicle_seat_total=Coalesce(Subquery(seat_totals), 0))
     items = list(queryset.order_by('date', 'time')[start:end])
 
     if expand and items:
-        vehicle_ids = [s.vehicle_id for s in items]
-        from django.db.models import Prefetch
-        from ..models import VehicleImage
-        vehicles_with_images = Vehicle.objects.filter(id__in=vehicle_ids).prefetch_related(
-            Prefetch('images', queryset=VehicleImage.objects.all())
-        )
-        vehicle_map = {v.id: v for v in vehicles_with_images}
-
-        def _count_seats_in_booking(seat_field):
-            if isinstance(seat_field, list):
-                return sum(1 for x in seat_field if isinstance(x, dict) and x.get('side') is not None and x.get('number') is not None)
-            if isinstance(seat_field, dict) and seat_field.get('side') is not None and seat_field.get('number') is not None:
-                return 1
-            return 0
+        want_vehicle_details = field_wanted(selection, 'vehicle_details')
+        vehicle_map = {}
+        if want_vehicle_details:
+            vehicle_ids = [s.vehicle_id for s in items]
+            from django.db.models import Prefetch
+            from ..models import VehicleImage
+            vehicles_with_images = Vehicle.objects.filter(id__in=vehicle_ids).prefetch_related(
+                Prefetch('images', queryset=VehicleImage.objects.all())
+            )
+            vehicle_map = {v.id: v for v in vehicles_with_images}
 
         results = []
         for s in items:
-            v = vehicle_map.get(s.vehicle_id) or s.vehicle
-            if hasattr(v, 'images'):
+            v = vehicle_map.get(s.vehicle_id)
+            if v is not None:
                 s.vehicle._prefetched_images = list(v.images.all())[:20]
-            row = _schedule_to_response_expanded(s, request)
-            total_seats = s.vehicle.seats.count() if hasattr(s.vehicle, 'seats') else 0
+            row = _schedule_to_response_expanded(s, request, include_vehicle_details=want_vehicle_details)
+            if not want_seat_counts:
+                results.append(apply_field_selection(selection, row))
+                continue
+            total_seats = s.vehicle_seat_total
             if total_seats == 0:
                 layout = getattr(s.vehicle, 'seat_layout', None) or []
                 total_seats = sum(1 for c in layout if c == 'x')
             if from_place and to_place:
-                order_map = _schedule_place_order(s)
-                from_order = order_map.get(int(from_place), -1)
-                to_order = order_map.get(int(to_place), -1)
-                booked_for_segment = _booked_seats_for_segment(s, from_order, to_order, order_map)
-                seats_used = len(booked_for_segment)
+                # Segment indices were annotated by _filter_schedules_by_segment
+                if s.reverse_direction:
+                    from_order, to_order = s.seg_from_rev, s.seg_to_rev
+                else:
+                    from_order, to_order = s.seg_from_fwd, s.seg_to_fwd
+                seats_used = len(booked_seats_for_segment(s, from_order, to_order))
             else:
-                seats_used = 0
-                for b in VehicleTicketBooking.objects.filter(vehicle_schedule=s).only('seat'):
-                    seats_used += _count_seats_in_booking(b.seat)
+                seats_used = s.booked_seat_count
             row['available_seats'] = max(0, total_seats - seats_used)
             row['total_seats'] = total_seats
-            results.append(row)
+            results.append(apply_field_selection(selection, row))
     else:
-        results = [_schedule_to_response(s) for s in items]
+        results = [apply_field_selection(selection, _schedule_to_response(s)) for s in items]
 
     return Response({
         'results': results,
@@ -12,13 +12,17 @@ from django.db import transaction as db_transaction
 
 from ..models import VehicleTicketBooking, VehicleSchedule, VehicleSeat, Place
 from ..route_order import get_route_place_order
+from ..services.seat_reservation import (
+    create_hold, hold_mismatch, hold_user_allowed, hold_user_ids, lock_schedule, release_hold, unavailable_seat,
+)
+from ..services.ticket_seats import booking_seat_labels, booking_seat_list, parse_seat_entries, segment_orders
 from ..utils import date_range_to_datetime_range
 from core.models import User, Wallet
 from core.services.wallet_transaction import create_wallet_transaction
 
 
 def _seat_to_list(seat):
-    """Normalize seat (dict or list) to list of {side, number}."""
+    """Normalize submitted seat/seats (dict or list) to list of {side, number}."""
     if isinstance(seat, list):
         return [s for s in seat if isinstance(s, dict) and s.get('side') is not None and s.get('number') is not None]
     if isinstance(seat, dict) and seat.get('side') is not None and seat.get('number') is not None:
@@ -26,19 +30,8 @@ def _seat_to_list(seat):
     return []
 
 
-def _format_seat_remarks(seat_field):
-    """Format seat field for transaction remarks, e.g. 'A1, B2'."""
-    seats = _seat_to_list(seat_field) if seat_field else []
-    if not seats:
-        return ''
-    parts = [f"{s.get('side', '')}{s.get('number', '')}" for s in seats]
-    return ', '.join(parts)
-
-
 def _ticket_booking_to_response(b, include_schedule_details=False):
-    seat = b.seat
-    if not isinstance(seat, list):
-        seat = _seat_to_list(seat) if seat else []
+    seat = booking_seat_list(b)
     data = {
         'id': str(b.id),
         'user': str(b.user.id) if b.user_id else None,
@@ -97,7 +90,7 @@ def vehicle_ticket_booking_list_get_view(request):
     search = request.query_params.get('search', '').strip()
     date_from = _parse_date_vtb(request.query_params.get('date_from'))
     date_to = _parse_date_vtb(request.query_params.get('date_to'))
-    queryset = VehicleTicketBooking.objects.select_related('user', 'booked_by', 'vehicle_schedule', 'pickup_point', 'destination_point').all()
+    queryset = VehicleTicketBooking.objects.select_related('user', 'booked_by', 'vehicle_schedule', 'pickup_point', 'destination_point').prefetch_related('booked_seats')
     if vs_id:
         queryset = queryset.filter(vehicle_schedule_id=vs_id)
     if user_id:
@@ -133,32 +126,16 @@ def vehicle_ticket_booking_list_get_view(request):
     })
 
 
-@api_view(['POST'])
-def vehicle_ticket_booking_list_post_view(request):
-    user_id = request.POST.get('user') or request.data.get('user')
-    is_guest = request.POST.get('is_guest') or request.data.get('is_guest', 'false')
-    name = request.POST.get('name') or request.data.get('name')
-    phone = request.POST.get('phone') or request.data.get('phone')
-    vehicle_schedule_id = request.POST.get('vehicle_schedule') or request.data.get('vehicle_schedule')
-    pickup_point_id = request.POST.get('pickup_point') or request.data.get('pickup_point')
-    destination_point_id = request.POST.get('destination_point') or request.data.get('destination_point')
-    ticket_id = request.POST.get('ticket_id') or request.data.get('ticket_id')
-    seat = request.POST.get('seat') or request.data.get('seat')
-    seats = request.POST.get('seats') or request.data.get('seats')
-    price = request.POST.get('price') or request.data.get('price')
-    is_paid = request.POST.get('is_paid') or request.data.get('is_paid', 'false')
-
-    if not name or not phone or not vehicle_schedule_id:
-        return Response({'error': 'name, phone, vehicle_schedule are required'}, status=status.HTTP_400_BAD_REQUEST)
-
-    is_guest = is_guest.lower() == 'true' if isinstance(is_guest, str) else bool(is_guest)
-    if not request.user.is_authenticated and not is_guest and not user_id:
-        return Response({'error': 'user required when not guest'}, status=status.HTTP_400_BAD_REQUEST)
-
+def _resolve_seat_request(vehicle_schedule_id, pickup_point_id, destination_point_id, seat, seats):
+    """
+    Validate schedule, optional pickup/destination segment and seats of a booking or hold request.
+    Returns (request dict, None) or (None, error Response). The dict has vs, pickup_point,
+    destination_point, seats_list ([{side, number}]), seat_entries ((side, number) pairs), from_order, to_order.
+    """
     try:
         vs = VehicleSchedule.objects.select_related('vehicle', 'route').prefetch_related('route__stop_points__place').get(pk=vehicle_schedule_id)
     except VehicleSchedule.DoesNotExist:
-        return Response({'error': 'Vehicle schedule not found'}, status=status.HTTP_404_NOT_FOUND)
+        return None, Response({'error': 'Vehicle schedule not found'}, status=status.HTTP_404_NOT_FOUND)
 
     # Validate pickup_point and destination_point if provided (must be on route, pickup before destination)
     pickup_point = None
@@ -169,20 +146,20 @@ def vehicle_ticket_booking_list_post_view(request):
             try:
                 pickup_point = Place.objects.get(pk=pickup_point_id)
             except Place.DoesNotExist:
-                return Response({'error': 'pickup_point not found'}, status=status.HTTP_400_BAD_REQUEST)
+                return None, Response({'error': 'pickup_point not found'}, status=status.HTTP_400_BAD_REQUEST)
             if pickup_point.id not in place_order:
-                return Response({'error': 'pickup_point is not on this schedule route'}, status=status.HTTP_400_BAD_REQUEST)
+                return None, Response({'error': 'pickup_point is not on this schedule route'}, status=status.HTTP_400_BAD_REQUEST)
         if destination_point_id:
             try:
                 destination_point = Place.objects.get(pk=destination_point_id)
             except Place.DoesNotExist:
-                return Response({'error': 'destination_point not found'}, status=status.HTTP_400_BAD_REQUEST)
+                return None, Response({'error': 'destination_point not found'}, status=status.HTTP_400_BAD_REQUEST)
             if destination_point.id not in place_order:
-                return Response({'error': 'destination_point is not on this schedule route'}, status=status.HTTP_400_BAD_REQUEST)
+                return None, Response({'error': 'destination_point is not on this schedule route'}, status=status.HTTP_400_BAD_REQUEST)
         if pickup_point and destination_point and place_order[pickup_point.id] >= place_order[destination_point.id]:
-            return Response({'error': 'pickup_point must be before destination_point on the route'}, status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({'error': 'pickup_point must be before destination_point on the route'}, status=status.HTTP_400_BAD_REQUEST)
         if (pickup_point_id and not destination_point_id) or (destination_point_id and not pickup_point_id):
-            return Response({'error': 'both pickup_point and destination_point are required when using segment booking'}, status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({'error': 'both pickup_point and destination_point are required when using segment booking'}, status=status.HTTP_400_BAD_REQUEST)
 
     # Normalize seats: accept seats (list) or seat (single dict)
     seats_list = seats if seats is not None else seat
@@ -193,46 +170,72 @@ def vehicle_ticket_booking_list_post_view(request):
             seats_list = []
     seats_list = _seat_to_list(seats_list) if seats_list else []
     if not seats_list:
-        return Response({'error': 'At least one seat is required'}, status=status.HTTP_400_BAD_REQUEST)
+        return None, Response({'error': 'At least one seat is required'}, status=status.HTTP_400_BAD_REQUEST)
 
     # Validate each seat exists on vehicle
     vehicle = vs.vehicle
     vehicle_seat_keys = set(
         (s.side, int(s.number)) for s in VehicleSeat.objects.filter(vehicle=vehicle).only('side', 'number')
     )
+    requested = set()
     for s in seats_list:
         side = s.get('side')
         number = s.get('number')
         try:
             number = int(number)
         except (TypeError, ValueError):
-            return Response({'error': f'Invalid seat number for {side}{number}'}, status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({'error': f'Invalid seat number for {side}{number}'}, status=status.HTTP_400_BAD_REQUEST)
         if (side, number) not in vehicle_seat_keys:
-            return Response({'error': f'Seat {side}{number} does not exist on this vehicle'}, status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({'error': f'Seat {side}{number} does not exist on this vehicle'}, status=status.HTTP_400_BAD_REQUEST)
+        if (side, number) in requested:
+            return None, Response({'error': f'Seat {side}{number} is listed more than once'}, status=status.HTTP_400_BAD_REQUEST)
+        requested.add((side, number))
 
-    # Already booked seats: by segment overlap when pickup/destination provided, else whole schedule
     place_order = get_route_place_order(vs.route, getattr(vs, 'reverse_direction', False))
-    from_order = place_order.get(pickup_point.id) if pickup_point else 0
-    to_order = place_order.get(destination_point.id) if destination_point else (max(place_order.values()) + 1)
-
-    booked = set()
-    for existing in VehicleTicketBooking.objects.filter(vehicle_schedule=vs).select_related('pickup_point', 'destination_point').only('seat', 'pickup_point_id', 'destination_point_id'):
-        seat_list = _seat_to_list(existing.seat)
-        if not seat_list:
-            continue
-        if existing.pickup_point_id and existing.destination_point_id and existing.pickup_point_id in place_order and existing.destination_point_id in place_order:
-            b_start = place_order[existing.pickup_point_id]
-            b_end = place_order[existing.destination_point_id]
-        else:
-            b_start = 0
-            b_end = max(place_order.values()) + 1
-        # overlap: [from_order, to_order] vs [b_start, b_end]
-        if not (to_order <= b_start or b_end <= from_order):
-            for s in seat_list:
-                booked.add((str(s.get('side')), int(s.get('number', 0))))
-    for s in seats_list:
-        if (str(s.get('side')), int(s.get('number', 0))) in booked:
-            return Response({'error': f"Seat {s.get('side')}{s.get('number')} is already booked for this segment"}, status=status.HTTP_400_BAD_REQUEST)
+    from_order, to_order = segment_orders(
+        pickup_point.id if pickup_point else None,
+        destination_point.id if destination_point else None,
+        place_order,
+    )
+    return {
+        'vs': vs,
+        'pickup_point': pickup_point,
+        'destination_point': destination_point,
+        'seats_list': seats_list,
+        'seat_entries': parse_seat_entries(seats_list),
+        'from_order': from_order,
+        'to_order': to_order,
+    }, None
+
+
+@api_view(['POST'])
+def vehicle_ticket_booking_list_post_view(request):
+    user_id = request.POST.get('user') or request.data.get('user')
+    is_guest = request.POST.get('is_guest') or request.data.get('is_guest', 'false')
+    name = request.POST.get('name') or request.data.get('name')
+    phone = request.POST.get('phone') or request.data.get('phone')
+    vehicle_schedule_id = request.POST.get('vehicle_schedule') or request.data.get('vehicle_schedule')
+    pickup_point_id = request.POST.get('pickup_point') or request.data.get('pickup_point')
+    destination_point_id = request.POST.get('destination_point') or request.data.get('destination_point')
+    ticket_id = request.POST.get('ticket_id') or request.data.get('ticket_id')
+    seat = request.POST.get('seat') or request.data.get('seat')
+    seats = request.POST.get('seats') or request.data.get('seats')
+    price = request.POST.get('price') or request.data.get('price')
+    is_paid = request.POST.get('is_paid') or request.data.get('is_paid', 'false')
+    hold_token = request.POST.get('hold_token') or request.data.get('hold_token')
+
+    if not name or not phone or not vehicle_schedule_id:
+        return Response({'error': 'name, phone, vehicle_schedule are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    is_guest = is_guest.lower() == 'true' if isinstance(is_guest, str) else bool(is_guest)
+    if not request.user.is_authenticated and not is_guest and not user_id:
+        return Response({'error': 'user required when not guest'}, status=status.HTTP_400_BAD_REQUEST)
+
+    seat_request, error = _resolve_seat_request(vehicle_schedule_id, pickup_point_id, destination_point_id, seat, seats)
+    if error is not None:
+        return error
+    vs = seat_request['vs']
+    seats_list = seat_request['seats_list']
 
     # Generate ticket_id if not provided
     if not ticket_id or not str(ticket_id).strip():
@@ -259,24 +262,94 @@ def vehicle_ticket_booking_list_post_view(request):
 
     pnr = f"EYS{ticket_id}"
     is_paid_val = is_paid.lower() == 'true' if isinstance(is_paid, str) else bool(is_paid)
-    b = VehicleTicketBooking.objects.create(
-        user=user,
-        is_guest=is_guest,
-        booked_by=booked_by,
-        name=name,
-        phone=phone,
-        vehicle_schedule=vs,
-        pickup_point=pickup_point,
-        destination_point=destination_point,
-        ticket_id=ticket_id,
-        seat=seats_list,
-        price=total_price,
-        is_paid=is_paid_val,
-        pnr=pnr,
-    )
+    # Check and insert under the schedule row lock so concurrent bookers cannot take the same seat;
+    # seat rows are written by the post_save signal in the same transaction
+    with db_transaction.atomic():
+        lock_schedule(vs.id)
+        if hold_token:
+            mismatch = hold_mismatch(
+                hold_token, vs.id, seat_request['seat_entries'], seat_request['from_order'], seat_request['to_order'],
+                user=request.user,
+            )
+            if mismatch:
+                return Response({'error': mismatch}, status=status.HTTP_400_BAD_REQUEST)
+        taken = unavailable_seat(
+            vs.id, seat_request['seat_entries'], seat_request['from_order'], seat_request['to_order'],
+            hold_token=hold_token,
+        )
+        if taken is not None:
+            return Response({'error': f"Seat {taken[0]}{taken[1]} is already booked for this segment"}, status=status.HTTP_400_BAD_REQUEST)
+        b = VehicleTicketBooking.objects.create(
+            user=user,
+            is_guest=is_guest,
+            booked_by=booked_by,
+            name=name,
+            phone=phone,
+            vehicle_schedule=vs,
+            pickup_point=seat_request['pickup_point'],
+            destination_point=seat_request['destination_point'],
+            ticket_id=ticket_id,
+            seat=seats_list,
+            price=total_price,
+            is_paid=is_paid_val,
+            pnr=pnr,
+        )
+        if hold_token:
+            release_hold(hold_token)
     return Response(_ticket_booking_to_response(b), status=status.HTTP_201_CREATED)
 
 
+@api_view(['POST'])
+def vehicle_ticket_booking_hold_view(request):
+    """
+    Hold seats on a schedule for SEAT_HOLD_TTL_SECONDS. Body: vehicle_schedule, seat or seats,
+    pickup_point and destination_point (optional segment). Confirm by creating the ticket booking
+    with hold_token, or release the hold.
+    """
+    vehicle_schedule_id = request.POST.get('vehicle_schedule') or request.data.get('vehicle_schedule')
+    pickup_point_id = request.POST.get('pickup_point') or request.data.get('pickup_point')
+    destination_point_id = request.POST.get('destination_point') or request.data.get('destination_point')
+    seat = request.POST.get('seat') or request.data.get('seat')
+    seats = request.POST.get('seats') or request.data.get('seats')
+    if not vehicle_schedule_id:
+        return Response({'error': 'vehicle_schedule is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    seat_request, error = _resolve_seat_request(vehicle_schedule_id, pickup_point_id, destination_point_id, seat, seats)
+    if error is not None:
+        return error
+    vs = seat_request['vs']
+    with db_transaction.atomic():
+        lock_schedule(vs.id)
+        token, expires_at, taken = create_hold(
+            vs.id, seat_request['seat_entries'], seat_request['from_order'], seat_request['to_order'],
+            user=request.user if request.user.is_authenticated else None,
+        )
+    if taken is not None:
+        return Response({'error': f"Seat {taken[0]}{taken[1]} is already booked for this segment"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'hold_token': token,
+        'expires_at': expires_at.isoformat(),
+        'vehicle_schedule': str(vs.id),
+        'pickup_point': str(seat_request['pickup_point'].id) if seat_request['pickup_point'] else None,
+        'destination_point': str(seat_request['destination_point'].id) if seat_request['destination_point'] else None,
+        'seat': [{'side': side, 'number': number} for side, number in seat_request['seat_entries']],
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+def vehicle_ticket_booking_hold_release_view(request, token):
+    """Release all seats held under a hold token (holds taken while logged in: the holder or staff only)."""
+    user_ids = hold_user_ids(token)
+    if not user_ids:
+        return Response({'error': 'Seat hold not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not hold_user_allowed(user_ids, request.user):
+        return Response({'error': 'Seat hold belongs to another user'}, status=status.HTTP_403_FORBIDDEN)
+    released = release_hold(token)
+    if not released:
+        return Response({'error': 'Seat hold not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'message': 'Released', 'released': released}, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def vehicle_ticket_booking_pay_view(request, pk):
@@ -306,7 +379,7 @@ def vehicle_ticket_booking_pay_view(request, pk):
             commission = amount * (request.user.ticket_commission / Decimal('100'))
         except (TypeError, ValueError):
             pass
-    seat_remarks = _format_seat_remarks(b.seat)
+    seat_remarks = booking_seat_labels(b)
     seat_suffix = f' | Seat(s): {seat_remarks}' if seat_remarks else ''
 
     with db_transaction.atomic():
@@ -449,8 +522,7 @@ def vehicle_ticket_booking_ticket_pdf_view(request, pk):
     c.drawString(width / 2 + 2 * mm, y, f"Phone: {b.phone}")
     y -= 6 * mm
 
-    seat_list = _seat_to_list(b.seat) if b.seat else []
-    seats_str = ", ".join(f"{s.get('side', '')}{s.get('number', '')}" for s in seat_list) or "N/A"
+    seats_str = booking_seat_labels(b) or "N/A"
 
     # Row 5: Seats, Price, Paid
     c.setFont("Helvetica-Bold", 9)
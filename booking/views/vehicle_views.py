@@ -1,25 +1,27 @@
-import math
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Subquery, OuterRef, Exists
+from django.db.models import Q, Prefetch, prefetch_related_objects
 from decimal import Decimal
 import json
 from datetime import datetime
-from ..models import Vehicle, VehicleSeat, VehicleImage, Route, Trip, Location
-from ..route_order import get_route_ordered_points
-from core.models import User, SuperSetting
-
-
-def _haversine_km(lat1, lon1, lat2, lon2):
-    """Distance in km between two points (Haversine)."""
-    lat1, lon1, lat2, lon2 = map(math.radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-    c = 2 * math.asin(math.sqrt(a))
-    return round(c * 6371, 4)
+from ..geo import haversine_many
+from ..models import Vehicle, VehicleSeat, VehicleImage, Route, Trip
+from ..services.spatial_index import bbox_filter, vehicle_index
+from ..services.vehicle_position import get_last_position
+from ..vehicle_payload import (
+    VEHICLE_PAYLOAD_SELECT_RELATED,
+    build_active_route_details,
+    build_vehicle_payload,
+    build_vehicle_payloads,
+    seat_to_dict,
+    user_brief,
+    wants_active_route_details,
+)
+from ..utils import apply_field_selection, field_wanted, parse_field_selection
+from core.models import User
+from core.services.super_setting import get_super_settings
 
 
 def _parse_date(val):
@@ -34,11 +36,7 @@ def _parse_date(val):
         return None
 
 
-def _get_active_trip_for_vehicle(vehicle):
-    """Return active_trip dict for vehicle (trip with end_time=None) or None."""
-    trip = Trip.objects.filter(vehicle=vehicle, end_time__isnull=True).order_by('-start_time').first()
-    if not trip:
-        return None
+def _active_trip_to_dict(trip):
     return {
         'id': str(trip.id),
         'trip_id': trip.trip_id,
@@ -48,81 +46,47 @@ def _get_active_trip_for_vehicle(vehicle):
     }
 
 
-def _build_active_route_details(route, reverse=False):
-    """Build active_route_details dict from a Route instance, including stop_points.
-    When reverse=True (e.g. active trip is return), start/end and stop_points are in traversal order."""
-    if not route:
-        return None
-    points = get_route_ordered_points(route, reverse=reverse)
-    if not points:
+def _get_active_trip_for_vehicle(vehicle):
+    """Return active_trip dict for vehicle (trip with end_time=None) or None."""
+    trip = Trip.objects.filter(vehicle=vehicle, end_time__isnull=True).order_by('-start_time').first()
+    if not trip:
         return None
-    # First and last are start/end; middle are stops
-    start_kind, start_place, _ = points[0]
-    end_kind, end_place, _ = points[-1]
-    stop_points = []
-    for order_idx, (kind, place, rsp) in enumerate(points[1:-1]):
-        stop_points.append({
-            'id': str(rsp.id),
-            'route': str(route.id),
-            'place': str(place.id),
-            'place_details': {
-                'id': str(place.id),
-                'name': place.name,
-                'code': place.code,
-                'latitude': str(place.latitude),
-                'longitude': str(place.longitude),
-            },
-            'order': order_idx,
-            'created_at': rsp.created_at.isoformat(),
-            'updated_at': rsp.updated_at.isoformat(),
-        })
-    return {
-        'id': str(route.id),
-        'name': route.name,
-        'is_bidirectional': route.is_bidirectional,
-        'start_point': str(start_place.id),
-        'start_point_details': {
-            'id': str(start_place.id),
-            'name': start_place.name,
-            'code': start_place.code,
-            'latitude': str(start_place.latitude),
-            'longitude': str(start_place.longitude),
-        },
-        'end_point': str(end_place.id),
-        'end_point_details': {
-            'id': str(end_place.id),
-            'name': end_place.name,
-            'code': end_place.code,
-            'latitude': str(end_place.latitude),
-            'longitude': str(end_place.longitude),
-        },
-        'stop_points': stop_points,
-    }
+    return _active_trip_to_dict(trip)
+
+
+def _get_active_trips_for_vehicles(vehicle_ids):
+    """Return {vehicle_id: active_trip dict} for all given vehicles in one query (latest running trip wins)."""
+    active_trips = {}
+    trips = Trip.objects.filter(vehicle_id__in=list(vehicle_ids), end_time__isnull=True).order_by('vehicle_id', '-start_time')
+    for trip in trips:
+        if trip.vehicle_id not in active_trips:
+            active_trips[trip.vehicle_id] = _active_trip_to_dict(trip)
+    return active_trips
 
 
 def _get_vehicle_last_location(vehicle):
     """Return (last_lat, last_lng, last_location_at) for vehicle or (None, None, None)."""
-    loc = Location.objects.filter(vehicle=vehicle).order_by('-created_at').first()
-    if not loc:
+    pos = get_last_position(vehicle)
+    if not pos:
         return None, None, None
-    return loc.latitude, loc.longitude, loc.created_at
+    return pos.latitude, pos.longitude, pos.recorded_at
 
 
 @api_view(['GET'])
 def vehicle_list_get_view(request):
-    """List all vehicles"""
+    """List all vehicles. Optional fields / exclude (comma-separated response keys) skip unrequested groups."""
     # Get query parameters
     search = request.query_params.get('search', '')
     vehicle_type = request.query_params.get('vehicle_type', None)
     is_active = request.query_params.get('is_active', None)
     driver_id = request.query_params.get('driver', None)
     route_id = request.query_params.get('route', None)
+    selection = parse_field_selection(request)
     
     # Build queryset
-    queryset = Vehicle.objects.prefetch_related(
-        'drivers', 'routes', 'seats', 'images',
-        'active_route__stop_points__place',
-    ).select_related('active_route', 'active_route__start_point', 'active_route__end_point').all()
+    queryset = Vehicle.objects.select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).all()
+    if wants_active_route_details(selection):
+        queryset = queryset.prefetch_related('active_route__stop_points__place')
     
     if search:
         queryset = queryset.filter(
@@ -151,121 +115,14 @@ def vehicle_list_get_view(request):
     end = start + per_page
     
     total = queryset.count()
-    vehicles = queryset[start:end]
+    vehicles = list(queryset[start:end])
+    if field_wanted(selection, 'active_trip') or wants_active_route_details(selection):
+        active_trips = _get_active_trips_for_vehicles(v.id for v in vehicles)
+    else:
+        active_trips = {}
     
     # Return data without serializer
-    results = []
-    for vehicle in vehicles:
-        # Build driver_details
-        driver_details = []
-        for driver in vehicle.drivers.all():
-            driver_details.append({
-                'id': str(driver.id),
-                'username': driver.username,
-                'phone': driver.phone,
-                'email': driver.email or '',
-                'name': driver.name or '',
-                'is_driver': driver.is_driver,
-                'is_active': driver.is_active,
-            })
-        
-        # Build route_details
-        route_details = []
-        for route in vehicle.routes.all():
-            route_details.append({
-                'id': str(route.id),
-                'name': route.name,
-                'is_bidirectional': route.is_bidirectional,
-                'start_point_details': {
-                    'id': str(route.start_point.id),
-                    'name': route.start_point.name,
-                    'code': route.start_point.code,
-                    'latitude': str(route.start_point.latitude),
-                    'longitude': str(route.start_point.longitude),
-                },
-                'end_point_details': {
-                    'id': str(route.end_point.id),
-                    'name': route.end_point.name,
-                    'code': route.end_point.code,
-                    'latitude': str(route.end_point.latitude),
-                    'longitude': str(route.end_point.longitude),
-                },
-            })
-        
-        # Build seats
-        seats = []
-        for seat in vehicle.seats.all().order_by('side', 'number'):
-            seats.append({
-                'id': str(seat.id),
-                'vehicle': str(seat.vehicle.id),
-                'side': seat.side,
-                'number': seat.number,
-                'status': seat.status,
-                'created_at': seat.created_at.isoformat(),
-                'updated_at': seat.updated_at.isoformat(),
-            })
-        
-        # Build images
-        images = []
-        for img in vehicle.images.all():
-            images.append({
-                'id': str(img.id),
-                'vehicle': str(img.vehicle.id),
-                'title': img.title or '',
-                'description': img.description or '',
-                'image': img.image.url if img.image else None,
-                'created_at': img.created_at.isoformat(),
-                'updated_at': img.updated_at.isoformat(),
-            })
-        
-        # Build active_driver_details
-        active_driver_details = None
-        if vehicle.active_driver:
-            active_driver_details = {
-                'id': str(vehicle.active_driver.id),
-                'username': vehicle.active_driver.username,
-                'phone': vehicle.active_driver.phone,
-                'email': vehicle.active_driver.email or '',
-                'name': vehicle.active_driver.name or '',
-                'is_driver': vehicle.active_driver.is_driver,
-                'is_active': vehicle.active_driver.is_active,
-            }
-        
-        # Build active_route_details (in trip direction when vehicle has active trip)
-        active_trip = _get_active_trip_for_vehicle(vehicle)
-        reverse = active_trip.get('reverse_direction', False) if active_trip else False
-        active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
-        
-        results.append({
-            'id': str(vehicle.id),
-            'imei': vehicle.imei or '',
-            'name': vehicle.name,
-            'vehicle_no': vehicle.vehicle_no,
-            'vehicle_type': vehicle.vehicle_type,
-            'odometer': str(vehicle.odometer),
-            'overspeed_limit': vehicle.overspeed_limit,
-            'description': vehicle.description or '',
-            'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-            'drivers': [str(d.id) for d in vehicle.drivers.all()],
-            'driver_details': driver_details,
-            'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-            'active_driver_details': active_driver_details,
-            'routes': [str(r.id) for r in vehicle.routes.all()],
-            'route_details': route_details,
-            'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-            'active_route_details': active_route_details,
-            'active_trip': active_trip,
-            'is_active': vehicle.is_active,
-            'bill_book': vehicle.bill_book or '',
-            'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
-            'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
-            'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
-            'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
-            'seats': seats,
-            'images': images,
-            'created_at': vehicle.created_at.isoformat(),
-            'updated_at': vehicle.updated_at.isoformat(),
-        })
+    results = build_vehicle_payloads(vehicles, active_trips, selection)
     
     return Response({
         'results': results,
@@ -277,23 +134,24 @@ def vehicle_list_get_view(request):
 
 # Bookable: min/max distance from SuperSetting (short_trip_min/max_distance_for_booking), fallback 5–200 km
 NEARBY_FETCH_RADIUS_KM = 200  # Show vehicles up to 200 km (e.g. Nepal radius)
+# Vehicle document fields not exposed on the passenger-facing nearby list
+NEARBY_OMIT_FIELDS = ('bill_book', 'bill_book_expiry_date', 'insurance_expiry_date', 'road_permit_expiry_date')
+# Grid index hits are loaded in id__in chunks of this size (nearest first), so a wide radius never
+# sends the whole fleet in one IN list; with limit, loading stops once enough vehicles matched.
+NEARBY_ID_CHUNK = 500
 
 
 def _get_booking_distance_km():
     """Return (min_km, max_km) from latest SuperSetting, or (5, 200) as fallback."""
-    try:
-        ss = SuperSetting.objects.latest('created_at')
-        min_km = float(ss.short_trip_min_distance_for_booking) if ss.short_trip_min_distance_for_booking is not None else 5
-        max_km = float(ss.short_trip_max_distance_for_booking) if ss.short_trip_max_distance_for_booking is not None else 200
-        return min_km, max_km
-    except SuperSetting.DoesNotExist:
-        return 5, 200
+    return get_super_settings().booking_distance_km
 
 
 @api_view(['GET'])
 def vehicle_nearby_get_view(request):
     """List vehicles with last location within radius_km of (latitude, longitude).
-    Query params: latitude, longitude, radius_km (default 200 for display), bookable_only (optional), active_trip_only (optional).
+    Query params: latitude, longitude, radius_km (default 200 for display), bookable_only (optional), active_trip_only (optional),
+    fields / exclude (optional, comma-separated response keys; e.g. fields=id,name,vehicle_no,last_latitude,last_longitude,distance_km,can_book),
+    limit (optional): return only the k nearest matching vehicles, nearest first.
     Returns last_latitude, last_longitude, last_location_at, distance_km, can_book.
     can_book = (min_km < distance_km <= max_km and active_route and running trip); min/max from SuperSetting.
     active_trip_only: when true, return only vehicles that have a running trip (end_time is null).
@@ -306,7 +164,12 @@ def vehicle_nearby_get_view(request):
         radius_km = NEARBY_FETCH_RADIUS_KM
     bookable_only = request.query_params.get('bookable_only', '').lower() in ('true', '1', 'yes')
     active_trip_only = request.query_params.get('active_trip_only', '').lower() in ('true', '1', 'yes')
+    try:
+        limit = max(0, int(request.query_params.get('limit', 0)))
+    except (TypeError, ValueError):
+        limit = 0
     min_km, max_km = _get_booking_distance_km()
+    selection = parse_field_selection(request)
 
     if lat is None or lng is None:
         return Response({'error': 'latitude and longitude are required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -316,138 +179,72 @@ def vehicle_nearby_get_view(request):
     except (TypeError, ValueError):
         return Response({'error': 'Invalid latitude or longitude'}, status=status.HTTP_400_BAD_REQUEST)
 
-    latest_loc = Location.objects.filter(vehicle_id=OuterRef('pk')).order_by('-created_at')
-    has_running_trip = Trip.objects.filter(vehicle_id=OuterRef('pk'), end_time__isnull=True)
     queryset = (
-        Vehicle.objects.prefetch_related(
-            'drivers', 'routes', 'seats', 'images',
-            'active_route__stop_points__place',
-        )
-        .select_related('active_route', 'active_route__start_point', 'active_route__end_point', 'active_driver')
-        .annotate(
-            last_lat=Subquery(latest_loc.values('latitude')[:1]),
-            last_lng=Subquery(latest_loc.values('longitude')[:1]),
-            last_location_at=Subquery(latest_loc.values('created_at')[:1]),
-            has_running_trip=Exists(has_running_trip),
-        )
-        .filter(last_lat__isnull=False, last_lng__isnull=False)
+        Vehicle.objects.select_related(*VEHICLE_PAYLOAD_SELECT_RELATED, 'last_position')
+        .filter(last_position__isnull=False)
     )
-
-    results = []
-    for vehicle in queryset:
-        distance_km = _haversine_km(user_lat, user_lng, float(vehicle.last_lat), float(vehicle.last_lng))
-        if distance_km > radius_km:
-            continue
-        can_book = (
-            min_km < distance_km <= max_km
-            and vehicle.active_route_id is not None
-            and vehicle.has_running_trip
+    # Candidates from the in-memory grid index; SQL bounding box while the index is still warming up
+    if vehicle_index.is_warm:
+        vehicle_index.sync()
+        if limit and not bookable_only and not active_trip_only:
+            hits = vehicle_index.query_nearest(user_lat, user_lng, limit, max_radius_km=radius_km)
+        else:
+            hits = vehicle_index.query_radius(user_lat, user_lng, radius_km)
+        hit_ids = [vehicle_id for vehicle_id, _ in hits]
+        batches = [
+            queryset.filter(id__in=hit_ids[i:i + NEARBY_ID_CHUNK]) for i in range(0, len(hit_ids), NEARBY_ID_CHUNK)
+        ]
+    else:
+        vehicle_index.warm_async()
+        batches = [bbox_filter(queryset, user_lat, user_lng, radius_km)]
+
+    # Filter by distance / bookability first, then prefetch related rows only for vehicles we return
+    active_trips = {}
+    matched = []
+    for batch in batches:
+        vehicles = list(batch.order_by('id'))
+        active_trips.update(_get_active_trips_for_vehicles(v.id for v in vehicles))
+        distances = haversine_many(
+            user_lat, user_lng,
+            [v.last_position.latitude for v in vehicles],
+            [v.last_position.longitude for v in vehicles],
         )
-        if bookable_only and not can_book:
-            continue
-        if active_trip_only and not vehicle.has_running_trip:
-            continue
-
-        driver_details = []
-        for driver in vehicle.drivers.all():
-            driver_details.append({
-                'id': str(driver.id),
-                'username': driver.username,
-                'phone': driver.phone,
-                'email': driver.email or '',
-                'name': driver.name or '',
-                'is_driver': driver.is_driver,
-                'is_active': driver.is_active,
-            })
-        route_details = []
-        for route in vehicle.routes.all():
-            route_details.append({
-                'id': str(route.id),
-                'name': route.name,
-                'is_bidirectional': route.is_bidirectional,
-                'start_point_details': {
-                    'id': str(route.start_point.id),
-                    'name': route.start_point.name,
-                    'code': route.start_point.code,
-                    'latitude': str(route.start_point.latitude),
-                    'longitude': str(route.start_point.longitude),
-                },
-                'end_point_details': {
-                    'id': str(route.end_point.id),
-                    'name': route.end_point.name,
-                    'code': route.end_point.code,
-                    'latitude': str(route.end_point.latitude),
-                    'longitude': str(route.end_point.longitude),
-                },
-            })
-        seats = []
-        for seat in vehicle.seats.all().order_by('side', 'number'):
-            seats.append({
-                'id': str(seat.id),
-                'vehicle': str(seat.vehicle.id),
-                'side': seat.side,
-                'number': seat.number,
-                'status': seat.status,
-                'created_at': seat.created_at.isoformat(),
-                'updated_at': seat.updated_at.isoformat(),
-            })
-        images = []
-        for img in vehicle.images.all():
-            images.append({
-                'id': str(img.id),
-                'vehicle': str(img.vehicle.id),
-                'title': img.title or '',
-                'description': img.description or '',
-                'image': img.image.url if img.image else None,
-                'created_at': img.created_at.isoformat(),
-                'updated_at': img.updated_at.isoformat(),
-            })
-        active_driver_details = None
-        if vehicle.active_driver:
-            active_driver_details = {
-                'id': str(vehicle.active_driver.id),
-                'username': vehicle.active_driver.username,
-                'phone': vehicle.active_driver.phone,
-                'email': vehicle.active_driver.email or '',
-                'name': vehicle.active_driver.name or '',
-                'is_driver': vehicle.active_driver.is_driver,
-                'is_active': vehicle.active_driver.is_active,
-            }
-        active_trip = _get_active_trip_for_vehicle(vehicle)
-        reverse = active_trip.get('reverse_direction', False) if active_trip else False
-        active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
+        for vehicle, distance_km in zip(vehicles, distances):
+            distance_km = round(distance_km, 4)
+            if distance_km > radius_km:
+                continue
+            has_running_trip = vehicle.id in active_trips
+            can_book = (
+                min_km < distance_km <= max_km
+                and vehicle.active_route_id is not None
+                and has_running_trip
+            )
+            if bookable_only and not can_book:
+                continue
+            if active_trip_only and not has_running_trip:
+                continue
+            matched.append((vehicle, distance_km, can_book))
+        if limit and len(matched) >= limit:
+            break  # later chunks are farther away
+    if limit:
+        matched = sorted(matched, key=lambda m: m[1])[:limit]
+    if wants_active_route_details(selection):
+        prefetch_related_objects([m[0] for m in matched], 'active_route__stop_points__place')
+    payloads = build_vehicle_payloads([m[0] for m in matched], active_trips, selection)
 
-        results.append({
-            'id': str(vehicle.id),
-            'imei': vehicle.imei or '',
-            'name': vehicle.name,
-            'vehicle_no': vehicle.vehicle_no,
-            'vehicle_type': vehicle.vehicle_type,
-            'odometer': str(vehicle.odometer),
-            'overspeed_limit': vehicle.overspeed_limit,
-            'description': vehicle.description or '',
-            'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-            'drivers': [str(d.id) for d in vehicle.drivers.all()],
-            'driver_details': driver_details,
-            'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-            'active_driver_details': active_driver_details,
-            'routes': [str(r.id) for r in vehicle.routes.all()],
-            'route_details': route_details,
-            'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-            'active_route_details': active_route_details,
-            'active_trip': active_trip,
-            'is_active': vehicle.is_active,
-            'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
-            'seats': seats,
-            'images': images,
-            'created_at': vehicle.created_at.isoformat(),
-            'updated_at': vehicle.updated_at.isoformat(),
-            'last_latitude': str(vehicle.last_lat),
-            'last_longitude': str(vehicle.last_lng),
-            'last_location_at': vehicle.last_location_at.isoformat() if vehicle.last_location_at else None,
+    results = []
+    for (vehicle, distance_km, can_book), payload in zip(matched, payloads):
+        pos = vehicle.last_position
+        for key in NEARBY_OMIT_FIELDS:
+            payload.pop(key, None)
+        payload.update({
+            'last_latitude': str(pos.latitude),
+            'last_longitude': str(pos.longitude),
+            'last_location_at': pos.recorded_at.isoformat() if pos.recorded_at else None,
             'distance_km': round(distance_km, 2),
             'can_book': can_book,
         })
+        results.append(apply_field_selection(selection, payload))
     return Response({'results': results, 'count': len(results)})
 
 
@@ -533,13 +330,7 @@ def vehicle_list_post_view(request):
         if not isinstance(seat_layout, list):
             seat_layout = []
     else:
-        try:
-            ss = SuperSetting.objects.latest('created_at')
-            seat_layout = getattr(ss, 'seat_layout', None) or []
-            if not isinstance(seat_layout, list):
-                seat_layout = []
-        except SuperSetting.DoesNotExist:
-            seat_layout = []
+        seat_layout = get_super_settings().seat_layout
     
     # Parse date fields
     bill_book_expiry_date = _parse_date(bill_book_expiry_date)
@@ -613,113 +404,12 @@ def vehicle_list_post_view(request):
     
     # Reload vehicle with all relationships
     vehicle.refresh_from_db()
-    vehicle = Vehicle.objects.prefetch_related('drivers', 'routes', 'seats', 'images').select_related('active_driver', 'active_route').get(pk=vehicle.id)
-    
-    # Build response data (similar to GET)
-    driver_details = []
-    for driver in vehicle.drivers.all():
-        driver_details.append({
-            'id': str(driver.id),
-            'username': driver.username,
-            'phone': driver.phone,
-            'email': driver.email or '',
-            'name': driver.name or '',
-            'is_driver': driver.is_driver,
-            'is_active': driver.is_active,
-        })
-    
-    route_details = []
-    for route in vehicle.routes.all():
-        route_details.append({
-            'id': str(route.id),
-            'name': route.name,
-            'is_bidirectional': route.is_bidirectional,
-            'start_point_details': {
-                'id': str(route.start_point.id),
-                'name': route.start_point.name,
-                'code': route.start_point.code,
-                'latitude': str(route.start_point.latitude),
-                'longitude': str(route.start_point.longitude),
-            },
-            'end_point_details': {
-                'id': str(route.end_point.id),
-                'name': route.end_point.name,
-                'code': route.end_point.code,
-                'latitude': str(route.end_point.latitude),
-                'longitude': str(route.end_point.longitude),
-            },
-        })
-    
-    seats = []
-    for seat in vehicle.seats.all().order_by('side', 'number'):
-        seats.append({
-            'id': str(seat.id),
-            'vehicle': str(seat.vehicle.id),
-            'side': seat.side,
-            'number': seat.number,
-            'status': seat.status,
-            'created_at': seat.created_at.isoformat(),
-            'updated_at': seat.updated_at.isoformat(),
-        })
-    
-    images = []
-    for img in vehicle.images.all():
-        images.append({
-            'id': str(img.id),
-            'vehicle': str(img.vehicle.id),
-            'title': img.title or '',
-            'description': img.description or '',
-            'image': img.image.url if img.image else None,
-            'created_at': img.created_at.isoformat(),
-            'updated_at': img.updated_at.isoformat(),
-        })
-    
-    active_driver_details = None
-    if vehicle.active_driver:
-        active_driver_details = {
-            'id': str(vehicle.active_driver.id),
-            'username': vehicle.active_driver.username,
-            'phone': vehicle.active_driver.phone,
-            'email': vehicle.active_driver.email or '',
-            'name': vehicle.active_driver.name or '',
-            'is_driver': vehicle.active_driver.is_driver,
-            'is_active': vehicle.active_driver.is_active,
-        }
+    vehicle = Vehicle.objects.prefetch_related(
+        'active_route__stop_points__place',
+    ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=vehicle.id)
     
     active_trip = _get_active_trip_for_vehicle(vehicle)
-    reverse = active_trip.get('reverse_direction', False) if active_trip else False
-    active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
-    
-    return Response({
-        'id': str(vehicle.id),
-        'imei': vehicle.imei or '',
-        'name': vehicle.name,
-        'vehicle_no': vehicle.vehicle_no,
-        'vehicle_type': vehicle.vehicle_type,
-        'odometer': str(vehicle.odometer),
-        'overspeed_limit': vehicle.overspeed_limit,
-        'description': vehicle.description or '',
-        'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-        'drivers': [str(d.id) for d in vehicle.drivers.all()],
-        'driver_details': driver_details,
-        'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-        'active_driver_details': active_driver_details,
-        'routes': [str(r.id) for r in vehicle.routes.all()],
-        'route_details': route_details,
-        'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-        'active_route_details': active_route_details,
-        'active_trip': active_trip,
-        'is_active': vehicle.is_active,
-        'bill_book': vehicle.bill_book or '',
-        'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
-        'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
-        'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
-        'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
-        'seats': seats,
-        'images': images,
-        'created_at': vehicle.created_at.isoformat(),
-        'updated_at': vehicle.updated_at.isoformat(),
-    }, status=status.HTTP_201_CREATED)
+    return Response(build_vehicle_payload(vehicle, active_trip), status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
@@ -727,121 +417,21 @@ def vehicle_detail_get_view(request, pk):
     """Retrieve a single vehicle"""
     try:
         vehicle = Vehicle.objects.prefetch_related(
-            'drivers', 'routes', 'seats', 'images',
             'active_route__stop_points__place',
-        ).select_related('active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point').get(pk=pk)
+        ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=pk)
     except Vehicle.DoesNotExist:
         return Response({'error': 'Vehicle not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Build response data (same as list view)
-    driver_details = []
-    for driver in vehicle.drivers.all():
-        driver_details.append({
-            'id': str(driver.id),
-            'username': driver.username,
-            'phone': driver.phone,
-            'email': driver.email or '',
-            'name': driver.name or '',
-            'is_driver': driver.is_driver,
-            'is_active': driver.is_active,
-        })
-    
-    route_details = []
-    for route in vehicle.routes.all():
-        route_details.append({
-            'id': str(route.id),
-            'name': route.name,
-            'is_bidirectional': route.is_bidirectional,
-            'start_point_details': {
-                'id': str(route.start_point.id),
-                'name': route.start_point.name,
-                'code': route.start_point.code,
-                'latitude': str(route.start_point.latitude),
-                'longitude': str(route.start_point.longitude),
-            },
-            'end_point_details': {
-                'id': str(route.end_point.id),
-                'name': route.end_point.name,
-                'code': route.end_point.code,
-                'latitude': str(route.end_point.latitude),
-                'longitude': str(route.end_point.longitude),
-            },
-        })
-    
-    seats = []
-    for seat in vehicle.seats.all().order_by('side', 'number'):
-        seats.append({
-            'id': str(seat.id),
-            'vehicle': str(seat.vehicle.id),
-            'side': seat.side,
-            'number': seat.number,
-            'status': seat.status,
-            'created_at': seat.created_at.isoformat(),
-            'updated_at': seat.updated_at.isoformat(),
-        })
-    
-    images = []
-    for img in vehicle.images.all():
-        images.append({
-            'id': str(img.id),
-            'vehicle': str(img.vehicle.id),
-            'title': img.title or '',
-            'description': img.description or '',
-            'image': img.image.url if img.image else None,
-            'created_at': img.created_at.isoformat(),
-            'updated_at': img.updated_at.isoformat(),
-        })
-    
-    active_driver_details = None
-    if vehicle.active_driver:
-        active_driver_details = {
-            'id': str(vehicle.active_driver.id),
-            'username': vehicle.active_driver.username,
-            'phone': vehicle.active_driver.phone,
-            'email': vehicle.active_driver.email or '',
-            'name': vehicle.active_driver.name or '',
-            'is_driver': vehicle.active_driver.is_driver,
-            'is_active': vehicle.active_driver.is_active,
-        }
-    
     active_trip = _get_active_trip_for_vehicle(vehicle)
-    reverse = active_trip.get('reverse_direction', False) if active_trip else False
-    active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
     last_lat, last_lng, last_location_at = _get_vehicle_last_location(vehicle)
 
-    return Response({
-        'id': str(vehicle.id),
-        'imei': vehicle.imei or '',
-        'name': vehicle.name,
-        'vehicle_no': vehicle.vehicle_no,
-        'vehicle_type': vehicle.vehicle_type,
-        'odometer': str(vehicle.odometer),
-        'overspeed_limit': vehicle.overspeed_limit,
-        'description': vehicle.description or '',
-        'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-        'drivers': [str(d.id) for d in vehicle.drivers.all()],
-        'driver_details': driver_details,
-        'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-        'active_driver_details': active_driver_details,
-        'routes': [str(r.id) for r in vehicle.routes.all()],
-        'route_details': route_details,
-        'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-        'active_route_details': active_route_details,
-        'active_trip': active_trip,
-        'is_active': vehicle.is_active,
-        'bill_book': vehicle.bill_book or '',
-        'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
-        'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
-        'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
-        'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
-        'seats': seats,
-        'images': images,
-        'created_at': vehicle.created_at.isoformat(),
-        'updated_at': vehicle.updated_at.isoformat(),
+    payload = build_vehicle_payload(vehicle, active_trip)
+    payload.update({
         'last_latitude': str(last_lat) if last_lat is not None else None,
         'last_longitude': str(last_lng) if last_lng is not None else None,
         'last_location_at': last_location_at.isoformat() if last_location_at else None,
     })
+    return Response(payload)
 
 
 @api_view(['GET'])
@@ -851,9 +441,9 @@ def vehicle_direct_book_info_get_view(request, pk):
     """
     try:
         vehicle = Vehicle.objects.prefetch_related(
-            'drivers', 'routes', 'seats', 'images',
+            Prefetch('seats', queryset=VehicleSeat.objects.order_by('side', 'number')),
             'active_route__stop_points__place',
-        ).select_related('active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point').get(pk=pk)
+        ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=pk)
     except Vehicle.DoesNotExist:
         return Response({'error': 'Vehicle not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -866,32 +456,11 @@ def vehicle_direct_book_info_get_view(request, pk):
         and last_lng is not None
     )
 
-    seats = []
-    for seat in vehicle.seats.all().order_by('side', 'number'):
-        seats.append({
-            'id': str(seat.id),
-            'vehicle': str(seat.vehicle.id),
-            'side': seat.side,
-            'number': seat.number,
-            'status': seat.status,
-            'created_at': seat.created_at.isoformat(),
-            'updated_at': seat.updated_at.isoformat(),
-        })
-
-    active_driver_details = None
-    if vehicle.active_driver:
-        active_driver_details = {
-            'id': str(vehicle.active_driver.id),
-            'username': vehicle.active_driver.username,
-            'phone': vehicle.active_driver.phone,
-            'email': vehicle.active_driver.email or '',
-            'name': vehicle.active_driver.name or '',
-            'is_driver': vehicle.active_driver.is_driver,
-            'is_active': vehicle.active_driver.is_active,
-        }
+    seats = [seat_to_dict(seat) for seat in vehicle.seats.all()]
+    active_driver_details = user_brief(vehicle.active_driver) if vehicle.active_driver else None
     active_trip = _get_active_trip_for_vehicle(vehicle)
     reverse = active_trip.get('reverse_direction', False) if active_trip else False
-    active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
+    active_route_details = build_active_route_details(vehicle.active_route, reverse=reverse)
 
     return Response({
         'id': str(vehicle.id),
@@ -1102,113 +671,12 @@ def vehicle_detail_post_view(request, pk):
     
     # Reload vehicle with all relationships
     vehicle.refresh_from_db()
-    vehicle = Vehicle.objects.prefetch_related('drivers', 'routes', 'seats', 'images').select_related('active_driver', 'active_route').get(pk=vehicle.id)
-    
-    # Build response data (same as GET)
-    driver_details = []
-    for driver in vehicle.drivers.all():
-        driver_details.append({
-            'id': str(driver.id),
-            'username': driver.username,
-            'phone': driver.phone,
-            'email': driver.email or '',
-            'name': driver.name or '',
-            'is_driver': driver.is_driver,
-            'is_active': driver.is_active,
-        })
-    
-    route_details = []
-    for route in vehicle.routes.all():
-        route_details.append({
-            'id': str(route.id),
-            'name': route.name,
-            'is_bidirectional': route.is_bidirectional,
-            'start_point_details': {
-                'id': str(route.start_point.id),
-                'name': route.start_point.name,
-                'code': route.start_point.code,
-                'latitude': str(route.start_point.latitude),
-                'longitude': str(route.start_point.longitude),
-            },
-            'end_point_details': {
-                'id': str(route.end_point.id),
-                'name': route.end_point.name,
-                'code': route.end_point.code,
-                'latitude': str(route.end_point.latitude),
-                'longitude': str(route.end_point.longitude),
-            },
-        })
-    
-    seats = []
-    for seat in vehicle.seats.all().order_by('side', 'number'):
-        seats.append({
-            'id': str(seat.id),
-            'vehicle': str(seat.vehicle.id),
-            'side': seat.side,
-            'number': seat.number,
-            'status': seat.status,
-            'created_at': seat.created_at.isoformat(),
-            'updated_at': seat.updated_at.isoformat(),
-        })
-    
-    images = []
-    for img in vehicle.images.all():
-        images.append({
-            'id': str(img.id),
-            'vehicle': str(img.vehicle.id),
-            'title': img.title or '',
-            'description': img.description or '',
-            'image': img.image.url if img.image else None,
-            'created_at': img.created_at.isoformat(),
-            'updated_at': img.updated_at.isoformat(),
-        })
-    
-    active_driver_details = None
-    if vehicle.active_driver:
-        active_driver_details = {
-            'id': str(vehicle.active_driver.id),
-            'username': vehicle.active_driver.username,
-            'phone': vehicle.active_driver.phone,
-            'email': vehicle.active_driver.email or '',
-            'name': vehicle.active_driver.name or '',
-            'is_driver': vehicle.active_driver.is_driver,
-            'is_active': vehicle.active_driver.is_active,
-        }
+    vehicle = Vehicle.objects.prefetch_related(
+        'active_route__stop_points__place',
+    ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=vehicle.id)
     
     active_trip = _get_active_trip_for_vehicle(vehicle)
-    reverse = active_trip.get('reverse_direction', False) if active_trip else False
-    active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
-    
-    return Response({
-        'id': str(vehicle.id),
-        'imei': vehicle.imei or '',
-        'name': vehicle.name,
-        'vehicle_no': vehicle.vehicle_no,
-        'vehicle_type': vehicle.vehicle_type,
-        'odometer': str(vehicle.odometer),
-        'overspeed_limit': vehicle.overspeed_limit,
-        'description': vehicle.description or '',
-        'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-        'drivers': [str(d.id) for d in vehicle.drivers.all()],
-        'driver_details': driver_details,
-        'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-        'active_driver_details': active_driver_details,
-        'routes': [str(r.id) for r in vehicle.routes.all()],
-        'route_details': route_details,
-        'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-        'active_route_details': active_route_details,
-        'active_trip': active_trip,
-        'is_active': vehicle.is_active,
-        'bill_book': vehicle.bill_book or '',
-        'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
-        'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
-        'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
-        'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
-        'seats': seats,
-        'images': images,
-        'created_at': vehicle.created_at.isoformat(),
-        'updated_at': vehicle.updated_at.isoformat(),
-    })
+    return Response(build_vehicle_payload(vehicle, active_trip))
 
 
 @api_view(['GET'])
@@ -1515,9 +983,8 @@ def vehicle_connect_view(request):
     
     try:
         vehicle = Vehicle.objects.prefetch_related(
-            'drivers', 'routes', 'seats', 'images',
             'active_route__stop_points__place',
-        ).select_related('active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point').get(pk=vehicle_id)
+        ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=vehicle_id)
     except Vehicle.DoesNotExist:
         return Response({'error': 'Vehicle not found'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -1535,115 +1002,11 @@ def vehicle_connect_view(request):
     
     # Refresh vehicle to get updated data
     vehicle = Vehicle.objects.prefetch_related(
-        'drivers', 'routes', 'seats', 'images',
         'active_route__stop_points__place',
-    ).select_related('active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point').get(pk=vehicle_id)
-    
-    # Build response data (same format as vehicle_detail_get_view)
-    driver_details = []
-    for driver in vehicle.drivers.all():
-        driver_details.append({
-            'id': str(driver.id),
-            'username': driver.username,
-            'phone': driver.phone,
-            'email': driver.email or '',
-            'name': driver.name or '',
-            'is_driver': driver.is_driver,
-            'is_active': driver.is_active,
-        })
-    
-    route_details = []
-    for route in vehicle.routes.all():
-        route_details.append({
-            'id': str(route.id),
-            'name': route.name,
-            'is_bidirectional': route.is_bidirectional,
-            'start_point_details': {
-                'id': str(route.start_point.id),
-                'name': route.start_point.name,
-                'code': route.start_point.code,
-                'latitude': str(route.start_point.latitude),
-                'longitude': str(route.start_point.longitude),
-            },
-            'end_point_details': {
-                'id': str(route.end_point.id),
-                'name': route.end_point.name,
-                'code': route.end_point.code,
-                'latitude': str(route.end_point.latitude),
-                'longitude': str(route.end_point.longitude),
-            },
-        })
-    
-    seats = []
-    for seat in vehicle.seats.all().order_by('side', 'number'):
-        seats.append({
-            'id': str(seat.id),
-            'vehicle': str(seat.vehicle.id),
-            'side': seat.side,
-            'number': seat.number,
-            'status': seat.status,
-            'created_at': seat.created_at.isoformat(),
-            'updated_at': seat.updated_at.isoformat(),
-        })
-    
-    images = []
-    for img in vehicle.images.all():
-        images.append({
-            'id': str(img.id),
-            'vehicle': str(img.vehicle.id),
-            'title': img.title or '',
-            'description': img.description or '',
-            'image': img.image.url if img.image else None,
-            'created_at': img.created_at.isoformat(),
-            'updated_at': img.updated_at.isoformat(),
-        })
-    
-    active_driver_details = None
-    if vehicle.active_driver:
-        active_driver_details = {
-            'id': str(vehicle.active_driver.id),
-            'username': vehicle.active_driver.username,
-            'phone': vehicle.active_driver.phone,
-            'email': vehicle.active_driver.email or '',
-            'name': vehicle.active_driver.name or '',
-            'is_driver': vehicle.active_driver.is_driver,
-            'is_active': vehicle.active_driver.is_active,
-        }
+    ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=vehicle_id)
     
     active_trip = _get_active_trip_for_vehicle(vehicle)
-    reverse = active_trip.get('reverse_direction', False) if active_trip else False
-    active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
-    
-    return Response({
-        'id': str(vehicle.id),
-        'imei': vehicle.imei or '',
-        'name': vehicle.name,
-        'vehicle_no': vehicle.vehicle_no,
-        'vehicle_type': vehicle.vehicle_type,
-        'odometer': str(vehicle.odometer),
-        'overspeed_limit': vehicle.overspeed_limit,
-        'description': vehicle.description or '',
-        'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-        'drivers': [str(d.id) for d in vehicle.drivers.all()],
-        'driver_details': driver_details,
-        'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-        'active_driver_details': active_driver_details,
-        'routes': [str(r.id) for r in vehicle.routes.all()],
-        'route_details': route_details,
-        'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-        'active_route_details': active_route_details,
-        'active_trip': active_trip,
-        'is_active': vehicle.is_active,
-        'bill_book': vehicle.bill_book or '',
-        'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
-        'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
-        'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
-        'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
-        'seats': seats,
-        'images': images,
-        'created_at': vehicle.created_at.isoformat(),
-        'updated_at': vehicle.updated_at.isoformat(),
-    }, status=status.HTTP_200_OK)
+    return Response(build_vehicle_payload(vehicle, active_trip), status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -1655,9 +1018,8 @@ def vehicle_set_active_route_view(request, vehicle_id):
         return Response({'error': 'route_id is required'}, status=status.HTTP_400_BAD_REQUEST)
     try:
         vehicle = Vehicle.objects.prefetch_related(
-            'drivers', 'routes', 'seats', 'images',
             'active_route__stop_points__place',
-        ).select_related('active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point').get(pk=vehicle_id)
+        ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=vehicle_id)
     except Vehicle.DoesNotExist:
         return Response({'error': 'Vehicle not found'}, status=status.HTTP_404_NOT_FOUND)
     if vehicle.active_driver_id != request.user.id:
@@ -1677,69 +1039,10 @@ def vehicle_set_active_route_view(request, vehicle_id):
     vehicle.active_route = route
     vehicle.save(update_fields=['active_route', 'updated_at'])
     vehicle = Vehicle.objects.prefetch_related(
-        'drivers', 'routes', 'seats', 'images',
         'active_route__stop_points__place',
-    ).select_related('active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point').get(pk=vehicle_id)
-    driver_details = []
-    for driver in vehicle.drivers.all():
-        driver_details.append({
-            'id': str(driver.id), 'username': driver.username, 'phone': driver.phone,
-            'email': driver.email or '', 'name': driver.name or '',
-            'is_driver': driver.is_driver, 'is_active': driver.is_active,
-        })
-    route_details = []
-    for r in vehicle.routes.all():
-        route_details.append({
-            'id': str(r.id), 'name': r.name, 'is_bidirectional': r.is_bidirectional,
-            'start_point_details': {'id': str(r.start_point.id), 'name': r.start_point.name, 'code': r.start_point.code,
-                'latitude': str(r.start_point.latitude), 'longitude': str(r.start_point.longitude)},
-            'end_point_details': {'id': str(r.end_point.id), 'name': r.end_point.name, 'code': r.end_point.code,
-                'latitude': str(r.end_point.latitude), 'longitude': str(r.end_point.longitude)},
-        })
-    seats = []
-    for seat in vehicle.seats.all().order_by('side', 'number'):
-        seats.append({
-            'id': str(seat.id), 'vehicle': str(seat.vehicle.id), 'side': seat.side,
-            'number': seat.number, 'status': seat.status,
-            'created_at': seat.created_at.isoformat(), 'updated_at': seat.updated_at.isoformat(),
-        })
-    images = []
-    for img in vehicle.images.all():
-        images.append({
-            'id': str(img.id), 'vehicle': str(img.vehicle.id), 'title': img.title or '',
-            'description': img.description or '', 'image': img.image.url if img.image else None,
-            'created_at': img.created_at.isoformat(), 'updated_at': img.updated_at.isoformat(),
-        })
-    active_driver_details = None
-    if vehicle.active_driver:
-        active_driver_details = {
-            'id': str(vehicle.active_driver.id), 'username': vehicle.active_driver.username,
-            'phone': vehicle.active_driver.phone, 'email': vehicle.active_driver.email or '',
-            'name': vehicle.active_driver.name or '', 'is_driver': vehicle.active_driver.is_driver,
-            'is_active': vehicle.active_driver.is_active,
-        }
+    ).select_related(*VEHICLE_PAYLOAD_SELECT_RELATED).get(pk=vehicle_id)
     active_trip = _get_active_trip_for_vehicle(vehicle)
-    reverse = active_trip.get('reverse_direction', False) if active_trip else False
-    active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
-    return Response({
-        'id': str(vehicle.id), 'imei': vehicle.imei or '', 'name': vehicle.name,
-        'vehicle_no': vehicle.vehicle_no, 'vehicle_type': vehicle.vehicle_type,
-        'odometer': str(vehicle.odometer), 'overspeed_limit': vehicle.overspeed_limit,
-        'description': vehicle.description or '', 'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-        'drivers': [str(d.id) for d in vehicle.drivers.all()], 'driver_details': driver_details,
-        'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-        'active_driver_details': active_driver_details,
-        'routes': [str(r.id) for r in vehicle.routes.all()], 'route_details': route_details,
-        'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-        'active_route_details': active_route_details,
-        'active_trip': active_trip, 'is_active': vehicle.is_active,
-        'bill_book': vehicle.bill_book or '',
-        'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
-        'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
-        'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
-        'seat_layout': getattr(vehicle, 'seat_layout', []) or [], 'seats': seats, 'images': images,
-        'created_at': vehicle.created_at.isoformat(), 'updated_at': vehicle.updated_at.isoformat(),
-    }, status=status.HTTP_200_OK)
+    return Response(build_vehicle_payload(vehicle, active_trip), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -1751,11 +1054,8 @@ def vehicle_my_active_get_view(request):
     user = request.user
 
     vehicle = (
-        Vehicle.objects.prefetch_related(
-            'drivers', 'routes', 'seats', 'images',
-            'active_route__stop_points__place',
-        )
-        .select_related('active_driver', 'active_route', 'active_route__start_point', 'active_route__end_point')
+        Vehicle.objects.prefetch_related('active_route__stop_points__place')
+        .select_related(*VEHICLE_PAYLOAD_SELECT_RELATED)
         .filter(active_driver=user)
         .order_by('-updated_at')
         .first()
@@ -1763,114 +1063,13 @@ def vehicle_my_active_get_view(request):
     if not vehicle:
         return Response({'vehicle': None}, status=status.HTTP_200_OK)
     
-    # Build response data (same format as vehicle_detail_get_view)
-    driver_details = []
-    for driver in vehicle.drivers.all():
-        driver_details.append({
-            'id': str(driver.id),
-            'username': driver.username,
-            'phone': driver.phone,
-            'email': driver.email or '',
-            'name': driver.name or '',
-            'is_driver': driver.is_driver,
-            'is_active': driver.is_active,
-        })
-    
-    route_details = []
-    for route in vehicle.routes.all():
-        route_details.append({
-            'id': str(route.id),
-            'name': route.name,
-            'is_bidirectional': route.is_bidirectional,
-            'start_point_details': {
-                'id': str(route.start_point.id),
-                'name': route.start_point.name,
-                'code': route.start_point.code,
-                'latitude': str(route.start_point.latitude),
-                'longitude': str(route.start_point.longitude),
-            },
-            'end_point_details': {
-                'id': str(route.end_point.id),
-                'name': route.end_point.name,
-                'code': route.end_point.code,
-                'latitude': str(route.end_point.latitude),
-                'longitude': str(route.end_point.longitude),
-            },
-        })
-    
-    seats = []
-    for seat in vehicle.seats.all().order_by('side', 'number'):
-        seats.append({
-            'id': str(seat.id),
-            'vehicle': str(seat.vehicle.id),
-            'side': seat.side,
-            'number': seat.number,
-            'status': seat.status,
-            'created_at': seat.created_at.isoformat(),
-            'updated_at': seat.updated_at.isoformat(),
-        })
-    
-    images = []
-    for img in vehicle.images.all():
-        images.append({
-            'id': str(img.id),
-            'vehicle': str(img.vehicle.id),
-            'title': img.title or '',
-            'description': img.description or '',
-            'image': img.image.url if img.image else None,
-            'created_at': img.created_at.isoformat(),
-            'updated_at': img.updated_at.isoformat(),
-        })
-    
-    active_driver_details = None
-    if vehicle.active_driver:
-        active_driver_details = {
-            'id': str(vehicle.active_driver.id),
-            'username': vehicle.active_driver.username,
-            'phone': vehicle.active_driver.phone,
-            'email': vehicle.active_driver.email or '',
-            'name': vehicle.active_driver.name or '',
-            'is_driver': vehicle.active_driver.is_driver,
-            'is_active': vehicle.active_driver.is_active,
-        }
-    
     active_trip = _get_active_trip_for_vehicle(vehicle)
-    reverse = active_trip.get('reverse_direction', False) if active_trip else False
-    active_route_details = _build_active_route_details(vehicle.active_route, reverse=reverse)
     last_lat, last_lng, last_location_at = _get_vehicle_last_location(vehicle)
 
-    return Response({
-        'vehicle': {
-            'id': str(vehicle.id),
-            'imei': vehicle.imei or '',
-            'name': vehicle.name,
-            'vehicle_no': vehicle.vehicle_no,
-            'vehicle_type': vehicle.vehicle_type,
-            'odometer': str(vehicle.odometer),
-            'overspeed_limit': vehicle.overspeed_limit,
-            'description': vehicle.description or '',
-            'featured_image': vehicle.featured_image.url if vehicle.featured_image else None,
-            'drivers': [str(d.id) for d in vehicle.drivers.all()],
-            'driver_details': driver_details,
-            'active_driver': str(vehicle.active_driver.id) if vehicle.active_driver else None,
-            'active_driver_details': active_driver_details,
-            'routes': [str(r.id) for r in vehicle.routes.all()],
-            'route_details': route_details,
-            'active_route': str(vehicle.active_route.id) if vehicle.active_route else None,
-            'active_route_details': active_route_details,
-            'active_trip': active_trip,
-            'is_active': vehicle.is_active,
-            'bill_book': vehicle.bill_book or '',
-            'bill_book_expiry_date': vehicle.bill_book_expiry_date.isoformat() if vehicle.bill_book_expiry_date else None,
-            'insurance_expiry_date': vehicle.insurance_expiry_date.isoformat() if vehicle.insurance_expiry_date else None,
-            'road_permit_expiry_date': vehicle.road_permit_expiry_date.isoformat() if vehicle.road_permit_expiry_date else None,
-            'seat_layout': getattr(vehicle, 'seat_layout', []) or [],
-            'seats': seats,
-            'images': images,
-            'created_at': vehicle.created_at.isoformat(),
-            'updated_at': vehicle.updated_at.isoformat(),
-            'last_latitude': str(last_lat) if last_lat is not None else None,
-            'last_longitude': str(last_lng) if last_lng is not None else None,
-            'last_location_at': last_location_at.isoformat() if last_location_at else None,
-        }
-    }, status=status.HTTP_200_OK)
+    payload = build_vehicle_payload(vehicle, active_trip)
+    payload.update({
+        'last_latitude': str(last_lat) if last_lat is not None else None,
+        'last_longitude': str(last_lng) if last_lng is not None else None,
+        'last_location_at': last_location_at.isoformat() if last_location_at else None,
+    })
+    return Response({'vehicle': payload}, status=status.HTTP_200_OK)
@@ -0,0 +1,128 @@
+"""
+Cached access to the latest SuperSetting row.
+
+The hot booking endpoints (nearby, trip start/end, current stop, trip detail, check-out, direct
+booking preview, route announcements) read the settings on every request, while the row changes
+rarely. get_super_settings() keeps a parsed snapshot per process for SUPER_SETTING_CACHE_TTL
+seconds; core.signals clears it when a SuperSetting is saved or deleted in this process, and the
+TTL bounds staleness for other worker processes.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from ..models import SuperSetting
+
+SUPER_SETTING_CACHE_TTL = 60  # seconds
+
+DEFAULT_POINT_COVER_RADIUS_KM = 0.5
+DEFAULT_MINUTE_COVERAGE_SCHEDULE = 60
+DEFAULT_MIN_BOOKING_KM = 5
+DEFAULT_MAX_BOOKING_KM = 200
+
+_lock = threading.Lock()
+_cached = None
+_expires_at = 0.0
+_generation = 0
+
+
+def _to_float(value, default=None):
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_decimal(value):
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value))
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+
+
+class SuperSettingValues:
+    """
+    Parsed values of the latest SuperSetting (or defaults when none exists).
+    Distances/radii are floats (km); charges stay Decimal (None when not configured).
+    """
+
+    def __init__(self, setting=None):
+        self.exists = setting is not None
+        self.id = setting.pk if setting is not None else None
+        # None when unset or zero; callers pick their own fallback (0.5 km at stops, 1.5 km at trip end)
+        self.point_cover_radius = _to_float(getattr(setting, 'point_cover_radius', None)) or None
+        self.minute_coverage_schedule = int(_to_float(getattr(setting, 'minute_coverage_schedule', None)) or 0) or None
+        self.min_booking_km = _to_float(
+            getattr(setting, 'short_trip_min_distance_for_booking', None), DEFAULT_MIN_BOOKING_KM,
+        )
+        self.max_booking_km = _to_float(
+            getattr(setting, 'short_trip_max_distance_for_booking', None), DEFAULT_MAX_BOOKING_KM,
+        )
+        self.per_km_charge = _to_decimal(getattr(setting, 'per_km_charge', None))
+        self.initial_km = _to_decimal(getattr(setting, 'initial_km', None))
+        self.initial_km_charge = _to_decimal(getattr(setting, 'initial_km_charge', None))
+        self.stop_point_announcement_header = (getattr(setting, 'stop_point_announcement_header', None) or '').strip()
+        seat_layout = getattr(setting, 'seat_layout', None) or []
+        self._seat_layout = seat_layout if isinstance(seat_layout, list) else []
+
+    @property
+    def point_cover_radius_km(self):
+        """point_cover_radius with the default used at stops and trip start (0.5 km)."""
+        return self.point_cover_radius or DEFAULT_POINT_COVER_RADIUS_KM
+
+    @property
+    def minute_coverage(self):
+        """minute_coverage_schedule with the default (60 minutes)."""
+        return self.minute_coverage_schedule or DEFAULT_MINUTE_COVERAGE_SCHEDULE
+
+    @property
+    def booking_distance_km(self):
+        """(min_km, max_km) for short-trip direct booking."""
+        return self.min_booking_km, self.max_booking_km
+
+    @property
+    def seat_layout(self):
+        """Default vehicle seat layout (a fresh list, safe to modify)."""
+        return list(self._seat_layout)
+
+    def announcement_text(self, place_name):
+        """Default stop announcement: header with $x replaced by the place name, else the name (max 500 chars)."""
+        name = (place_name or '').strip()
+        if self.stop_point_announcement_header:
+            header = self.stop_point_announcement_header
+            return (header.replace('$x', name).replace('$X', name).strip() or name)[:500]
+        return (place_name or '')[:500]
+
+
+def get_super_settings():
+    """Return SuperSettingValues for the latest SuperSetting, cached for SUPER_SETTING_CACHE_TTL seconds."""
+    global _cached, _expires_at
+    now = time.monotonic()
+    values = _cached
+    if values is not None and now < _expires_at:
+        return values
+    generation = _generation
+    try:
+        setting = SuperSetting.objects.latest('created_at')
+    except SuperSetting.DoesNotExist:
+        setting = None
+    values = SuperSettingValues(setting)
+    with _lock:
+        # Do not store a snapshot read before a concurrent invalidation
+        if generation == _generation:
+            _cached = values
+            _expires_at = now + SUPER_SETTING_CACHE_TTL
+    return values
+
+
+def invalidate_super_settings():
+    """Drop the cached snapshot (called on SuperSetting save/delete)."""
+    global _cached, _expires_at, _generation
+    with _lock:
+        _cached = None
+        _expires_at = 0.0
+        _generation += 1
@@ -0,0 +1,12 @@
+"""Signal handlers for the core app (cache invalidation)."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import SuperSetting
+from .services.super_setting import invalidate_super_settings
+
+
+@receiver(post_save, sender=SuperSetting)
+@receiver(post_delete, sender=SuperSetting)
+def super_setting_changed(sender, instance, **kwargs):
+    invalidate_super_settings()
@@ -1,3 +1,30 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from .models import SuperSetting
+from .services.super_setting import get_super_settings, invalidate_super_settings
+
+
+class SuperSettingCacheTests(TestCase):
+    def setUp(self):
+        invalidate_super_settings()
+
+    def test_warm_cache_skips_the_database(self):
+        SuperSetting.objects.create(per_km_charge=Decimal('10'))
+        get_super_settings()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_super_settings().per_km_charge, Decimal('10'))
+
+    def test_save_drops_the_cached_snapshot(self):
+        setting = SuperSetting.objects.create(per_km_charge=Decimal('10'))
+        get_super_settings()
+        setting.per_km_charge = Decimal('12')
+        setting.save()
+        self.assertEqual(get_super_settings().per_km_charge, Decimal('12'))
+
+    def test_defaults_without_a_setting(self):
+        values = get_super_settings()
+        self.assertFalse(values.exists)
+        self.assertIsNone(values.per_km_charge)
+        self.assertEqual(values.point_cover_radius_km, 0.5)
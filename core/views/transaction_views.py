@@ -88,7 +88,7 @@ def transaction_list_get_view(request):
     is_ticket_dealer = _parse_bool(request.query_params.get('is_ticket_dealer'))
     
     # Build queryset
-    queryset = Transaction.objects.select_related('wallet', 'user', 'card').all()
+    queryset = Transaction.objects.select_related('wallet__user', 'user', 'card').all()
     
     if search:
         queryset = queryset.filter(
@@ -0,0 +1,188 @@
+"""
+In-process request metrics (per process) and the staff-only /api/metrics/ endpoint.
+
+RequestMetricsMiddleware records, per resolved URL name and method, the request latency, the
+number of SQL queries, total SQL time and response size. Each series is an HDR-style histogram:
+values are integers in a fixed unit (microseconds, queries, bytes), bucketed log-linearly with
+2**HISTOGRAM_SUB_BITS sub-buckets per power of two, so any percentile is within ~1% of the
+recorded value while memory stays bounded by the value range, not the number of requests.
+
+metrics_view renders the histograms as Prometheus summaries (quantiles, _sum, _count) plus
+a _max gauge, followed by the booking service counters (geocode cache, address resolution, Node
+outbox, trip track builds). Every process keeps its own numbers; with several workers a scrape sees
+one of them.
+"""
+import threading
+
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+HISTOGRAM_SUB_BITS = 7
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Metric name -> (help, unit divisor for export)
+REQUEST_SERIES = {
+    'request_duration_seconds': ('Request latency', 1_000_000),
+    'request_sql_queries': ('SQL queries per request', 1),
+    'request_sql_duration_seconds': ('Total SQL time per request', 1_000_000),
+    'response_size_bytes': ('Response body size (streaming responses are not counted)', 1),
+}
+METRIC_PREFIX = 'ev_'
+
+
+class Histogram:
+    """Log-linear integer histogram: bucket (shift, v >> shift) holds values sharing their top HISTOGRAM_SUB_BITS bits."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = max(int(value), 0)
+        shift = max(value.bit_length() - HISTOGRAM_SUB_BITS, 0)
+        key = (shift, value >> shift)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentiles(self, quantiles):
+        """Highest value equivalent to the recorded value at each quantile (0 when empty)."""
+        if not self.count:
+            return [0 for _ in quantiles]
+        buckets = sorted(self.counts.items(), key=lambda item: item[0][1] << item[0][0])
+        results = []
+        for q in quantiles:
+            target = max(1, int(q * self.count + 0.5))
+            seen = 0
+            for (shift, top), n in buckets:
+                seen += n
+                if seen >= target:
+                    results.append(min(((top + 1) << shift) - 1, self.max))
+                    break
+        return results
+
+
+class RequestMetrics:
+    """(view name, method) -> {series name: Histogram}, plus responses by status class."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._statuses = {}
+
+    def record(self, view, method, status_code, duration_us, sql_queries, sql_us, size):
+        key = (view, method)
+        status_class = f'{status_code // 100}xx'
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {name: Histogram() for name in REQUEST_SERIES}
+            series['request_duration_seconds'].record(duration_us)
+            series['request_sql_queries'].record(sql_queries)
+            series['request_sql_duration_seconds'].record(sql_us)
+            if size is not None:
+                series['response_size_bytes'].record(size)
+            status_key = (view, method, status_class)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._statuses.clear()
+
+    def snapshot(self):
+        """[(view, method, {series: (quantile values, sum, count, max)})] and {(view, method, class): n}."""
+        with self._lock:
+            rows = [
+                (view, method, {
+                    name: (hist.percentiles(QUANTILES), hist.total, hist.count, hist.max)
+                    for name, hist in series.items()
+                })
+                for (view, method), series in sorted(self._series.items())
+            ]
+            statuses = dict(self._statuses)
+        return rows, statuses
+
+
+request_metrics = RequestMetrics()
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value, divisor=1):
+    if divisor > 1:
+        value = value / divisor
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def _service_stats():
+    """(component, stats dict) for the booking service counters of this process."""
+    from booking.services.address_resolution import get_address_resolution_stats
+    from booking.services.node_dispatcher import get_dispatcher_stats
+    from booking.services.reverse_geocode import get_geocode_stats
+    from booking.services.trip_track import get_trip_track_stats
+
+    return [
+        ('geocode', get_geocode_stats()),
+        ('address_resolution', get_address_resolution_stats()),
+        ('node_outbox', get_dispatcher_stats()),
+        ('trip_track', get_trip_track_stats()),
+    ]
+
+
+def render_prometheus():
+    """Prometheus text exposition (format 0.0.4) of the request histograms and service counters."""
+    rows, statuses = request_metrics.snapshot()
+    lines = []
+    for name, (help_text, divisor) in REQUEST_SERIES.items():
+        metric = METRIC_PREFIX + name
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} summary')
+        for view, method, series in rows:
+            quantiles, total, count, _ = series[name]
+            labels = f'view="{_label_value(view)}",method="{method}"'
+            for q, value in zip(QUANTILES, quantiles):
+                lines.append(f'{metric}{{{labels},quantile="{q}"}} {_format_number(value, divisor)}')
+            lines.append(f'{metric}_sum{{{labels}}} {_format_number(total, divisor)}')
+            lines.append(f'{metric}_count{{{labels}}} {count}')
+        lines.append(f'# TYPE {metric}_max gauge')
+        for view, method, series in rows:
+            maximum = series[name][3]
+            labels = f'view="{_label_value(view)}",method="{method}"'
+            lines.append(f'{metric}_max{{{labels}}} {_format_number(maximum, divisor)}')
+
+    metric = METRIC_PREFIX + 'responses_total'
+    lines.append(f'# HELP {metric} Responses by status class')
+    lines.append(f'# TYPE {metric} counter')
+    for (view, method, status_class), n in sorted(statuses.items()):
+        lines.append(f'{metric}{{view="{_label_value(view)}",method="{method}",status="{status_class}"}} {n}')
+
+    for component, stats in _service_stats():
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = f'{METRIC_PREFIX}{component}_{key}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {_format_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """
+    GET /api/metrics/ (staff only)
+    Prometheus text format: per-endpoint latency / SQL / response size summaries and service counters.
+    """
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,9 +1,20 @@
 """Project middleware."""
+import logging
 import os
+import time
 
+from django.conf import settings
+from django.db import connection
 from django.http import HttpResponseRedirect
 from django.utils.deprecation import MiddlewareMixin
 
+from .metrics import request_metrics
+from .query_budget import QueryRecorder
+
+slow_logger = logging.getLogger('ev_yatayat_sewa_server.slow_requests')
+
+SLOW_LOG_TOP_STATEMENTS = 5
+
 
 class SystemSubdomainRootRedirectMiddleware(MiddlewareMixin):
     """
@@ -30,3 +41,50 @@ class SystemSubdomainRootRedirectMiddleware(MiddlewareMixin):
         if request.path not in ('/', ''):
             return None
         return HttpResponseRedirect('/admin/')
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL query count / time and response size per resolved URL name into
+    metrics.request_metrics (exposed at /api/metrics/). Requests slower than
+    METRICS_SLOW_REQUEST_MS or running more than METRICS_SLOW_REQUEST_QUERIES queries are logged to
+    ev_yatayat_sewa_server.slow_requests with their most repeated SQL statements. Disable with
+    METRICS_ENABLED=0.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+        self.slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 0)
+        self.slow_queries = getattr(settings, 'METRICS_SLOW_REQUEST_QUERIES', 0)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        request_metrics.record(
+            view, request.method, response.status_code,
+            elapsed * 1_000_000, recorder.count, recorder.seconds * 1_000_000, size,
+        )
+        if (self.slow_ms and elapsed * 1000 >= self.slow_ms) or (self.slow_queries and recorder.count > self.slow_queries):
+            self._log_slow(request, view, response, elapsed, recorder)
+        return response
+
+    def _log_slow(self, request, view, response, elapsed, recorder):
+        top = '\n'.join(
+            f'  {n}x {recorder.statement_seconds[sql] * 1000:.1f} ms  {sql}'
+            for sql, n in recorder.statements.most_common(SLOW_LOG_TOP_STATEMENTS)
+        )
+        slow_logger.warning(
+            'Slow request %s %s (%s) -> %s: %.1f ms, %s queries, %.1f ms SQL\n%s',
+            request.method, request.get_full_path(), view, response.status_code,
+            elapsed * 1000, recorder.count, recorder.seconds * 1000, top,
+        )
@@ -0,0 +1,101 @@
+"""
+SQL query recording and query budgets.
+
+QueryRecorder is a connection.execute_wrapper that counts queries and SQL time, grouped by
+statement text with IN (...) lists collapsed, so an N+1 loop shows up as one statement repeated N
+times. It backs the request metrics middleware (slow-request log) and the query budget checks:
+
+    with record_queries() as queries:
+        client.get(url)
+    print(queries.count, format_statements(queries.repeated()))
+
+    @query_budget(8)
+    def build_payload(...):
+        ...
+
+query_budget (context manager or decorator) raises QueryBudgetExceeded, with the repeated
+statements in the message, when the block runs more than max_queries queries.
+`manage.py check_query_budgets` checks the endpoints listed in booking/data/query_budgets.json;
+booking.tests.QueryBudgetTests runs it against a seeded fleet.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ContextDecorator, contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_IN_LIST_RE = re.compile(r'\((?:%s, )+%s\)')
+
+
+def normalize_statement(sql):
+    """Statement text used for grouping: "IN (%s, %s, ...)" of any length is the same statement."""
+    return _IN_LIST_RE.sub('(%s, ...)', sql)
+
+
+class QueryRecorder:
+    """execute_wrapper counting queries and SQL time, grouped by normalized statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.statement_seconds = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            statement = normalize_statement(sql)
+            self.count += 1
+            self.seconds += elapsed
+            self.statements[statement] += 1
+            self.statement_seconds[statement] += elapsed
+
+    def repeated(self, min_count=2):
+        """[(statement, count)] run at least min_count times, most repeated first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= min_count]
+
+
+@contextmanager
+def record_queries(using=DEFAULT_DB_ALIAS):
+    """Record the queries run on one connection (this thread) inside the block."""
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+
+
+def format_statements(statements, limit=5):
+    """Indented '<n>x <sql>' lines for (statement, count) pairs."""
+    return '\n'.join(f'  {n}x  {sql}' for sql, n in list(statements)[:limit])
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Fail (QueryBudgetExceeded) when the block or decorated function runs more than max_queries queries."""
+
+    def __init__(self, max_queries, label='', using=DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.label = label
+        self.using = using
+
+    def __enter__(self):
+        self.recorder = QueryRecorder()
+        self._wrapper = connections[self.using].execute_wrapper(self.recorder)
+        self._wrapper.__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc, tb):
+        self._wrapper.__exit__(exc_type, exc, tb)
+        if exc_type is None and self.recorder.count > self.max_queries:
+            label = f'{self.label}: ' if self.label else ''
+            raise QueryBudgetExceeded(
+                f'{label}{self.recorder.count} queries, budget {self.max_queries}\n'
+                f'{format_statements(self.recorder.repeated() or self.recorder.statements.most_common())}'
+            )
+        return False
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'core.User'
 
 MIDDLEWARE = [
+    'ev_yatayat_sewa_server.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'ev_yatayat_sewa_server.middleware.SystemSubdomainRootRedirectMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -178,6 +179,13 @@ NOMINATIM_USER_AGENT = os.environ.get(
     'NOMINATIM_USER_AGENT',
     'EV-Yatayat-Sewa/1.0 (seat booking; contact: admin@evyatayatsewa.com)',
 )
+# Points within this distance of a stored Place are named "Near <place>" offline (no Nominatim call)
+PLACE_GEOCODE_RADIUS_METERS = int(os.environ.get('PLACE_GEOCODE_RADIUS_METERS', '300'))
+# Other points keep their placeholder and are resolved later from address_resolution_jobs by a single
+# `manage.py resolve_addresses --loop` process. Nominatim allows 1 request/s in total and the request spacing
+# is per process, so web processes do not resolve by default; ADDRESS_RESOLUTION_INLINE_WORKER=1 runs a
+# resolver thread in each web process instead (only for single-process deployments).
+ADDRESS_RESOLUTION_INLINE_WORKER = os.environ.get('ADDRESS_RESOLUTION_INLINE_WORKER', '0') == '1'
 
 USE_I18N = True
 
@@ -242,6 +250,28 @@ ENABLE_PUBLIC_SPA_SHELL = os.environ.get('ENABLE_PUBLIC_SPA_SHELL', 'true').lowe
 
 # Node real-time server (seat-booked webhook, trip socket)
 NODE_BASE_URL = os.environ.get('NODE_BASE_URL', 'https://node.evyatayatsewa.com').rstrip('/')
+# Webhooks go through the booking outbox (node_outbox_events). Each web process runs a delivery thread;
+# set NODE_OUTBOX_INLINE_WORKER=0 to deliver only via `manage.py dispatch_node_outbox --loop` instead.
+NODE_OUTBOX_INLINE_WORKER = os.environ.get('NODE_OUTBOX_INLINE_WORKER', '1') != '0'
+
+# Per-endpoint latency / SQL query / response size histograms, served to staff at /api/metrics/ (per process).
+# Requests slower than METRICS_SLOW_REQUEST_MS, or running more than METRICS_SLOW_REQUEST_QUERIES SQL queries,
+# are logged to ev_yatayat_sewa_server.slow_requests with their most repeated statements (0 = off).
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', '1000'))
+METRICS_SLOW_REQUEST_QUERIES = int(os.environ.get('METRICS_SLOW_REQUEST_QUERIES', '50'))
 
 # Walkie-Talkie: directory where Node saves recording files (same as Node RECORDINGS_PATH in production)
 WALKIETALKIE_RECORDINGS_DIR = '/home/luna/apps/EV-Yatayat-Sewa-Node/recordings'
+
+# Finished trips store their track simplified at these tolerances (metres, Douglas-Peucker) for playback and
+# map views; trip detail returns every location unless a track_tolerance or track_zoom asks for a stored level.
+# Rebuild stored levels with `manage.py build_trip_tracks --all`.
+TRIP_TRACK_TOLERANCES_M = tuple(
+    float(v) for v in os.environ.get('TRIP_TRACK_TOLERANCES_M', '100,20,5').split(',') if v.strip()
+)
+# Ending a trip marks its levels due at once; late points to a finished trip mark them stale, rebuilt once the
+# trip has had no late point for TRIP_TRACK_REBUILD_DELAY_SECONDS. Both are built by a thread in each web process
+# or, with TRIP_TRACK_INLINE_WORKER=0, by `manage.py build_trip_tracks --stale` run from cron.
+TRIP_TRACK_INLINE_WORKER = os.environ.get('TRIP_TRACK_INLINE_WORKER', '1') != '0'
+TRIP_TRACK_REBUILD_DELAY_SECONDS = int(os.environ.get('TRIP_TRACK_REBUILD_DELAY_SECONDS', '30'))
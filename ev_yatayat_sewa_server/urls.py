@@ -19,6 +19,7 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from core.views.media_views import serve_media
+from ev_yatayat_sewa_server.metrics import metrics_view
 from website.views.sitemap_robots import robots_txt_view, sitemap_view
 
 urlpatterns = [
@@ -26,6 +27,7 @@ urlpatterns = [
     re_path(r'^media/(?P<path>.*)$', serve_media, name='media'),
     path('sitemap.xml', sitemap_view),
     path('robots.txt', robots_txt_view),
+    path('api/metrics/', metrics_view, name='metrics'),
     # Booking first so /api/trips/current-stop/ etc. are matched; then core (auth, users, wallets); then walkietalkie
     path('api/', include('booking.urls')),
     path('api/', include('core.urls')),